@@ -1,47 +1,113 @@
 from fastapi import FastAPI, Request
 from prometheus_fastapi_instrumentator import Instrumentator
-from fastapi import FastAPI, HTTPException,status
+from fastapi import FastAPI, Header, HTTPException, Query, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
 from pydantic import BaseModel,EmailStr
 from typing import Optional
 from bson import ObjectId
-from database import mongo_db
+from database import mongo_db, pool_metrics, retry
+from indexes import ensure_indexes
+from pymongo.errors import DuplicateKeyError, PyMongoError
+import asyncio
+import hmac
 import os
 
 
 from userrepository import user_repository
-from waterintakerepository import waterintake_repository
-from moodrepository import mood_repository
+from passwords import passwords
+from refreshtokenrepository import refresh_token_repository
+from reminderscheduler import fire_dates, reminder_scheduler
+from reminderrepository import reminder_repository
+from waterintakerepository import DEFAULT_GOAL, waterintake_repository
+from moodrepository import VALID_MOODS, mood_repository
+from dailytaskrepository import dailytask_repository
+from forumrepository import forum_repository, forum_reply_repository
+from forumstream import forum_broker
+from searchindex import guide_entry, post_entry, query_terms, reply_entry, search_index, search_result
+from tokencache import TokenCache
+from middleware import CompressionMiddleware, RoundTripMiddleware, SecurityHeadersMiddleware
+from responses import MongoJSONResponse
+from cache import Cache, make_backend
+from guides import GuideStore, serve as serve_guide
+from starlette.responses import Response, StreamingResponse
+from settings import settings
 import jwt
-from datetime import datetime, timedelta, timezone
+from datetime import date as Date, datetime, timedelta, timezone
 from typing import List
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import Response
-app = FastAPI()
-
-class CSPMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request, call_next):
-        response: Response = await call_next(request)
-        
-        response.headers['Content-Security-Policy'] = (
-            "default-src 'self'; "
-            "script-src 'self' https://cdnjs.cloudflare.com; "
-            "style-src 'self' 'unsafe-inline' https://fonts.googleapis.com; "
-            "font-src 'self' https://fonts.gstatic.com; "
-            "img-src 'self' data: https://example.com; "
-            "connect-src 'self'; "
-            "frame-ancestors 'none'; "
-            "base-uri 'self';"
-        )
-        
-        return response
-
-app.add_middleware(CSPMiddleware)
+from contextlib import asynccontextmanager
+from anyio import to_thread
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # threads available to sync handlers and dependencies in this worker
+    to_thread.current_default_thread_limiter().total_tokens = settings.threadpool_size
+    # needs Mongo; retried in the background so the worker boots, and /readyz
+    # reports it, while the database is unreachable
+    startup = asyncio.create_task(prepare_database())
+    watcher = asyncio.create_task(guide_store.watch(guide_collection)) if settings.guide_watch else None
+    stop_reminders = asyncio.Event()
+    reminder_worker = asyncio.create_task(reminder_scheduler.run(stop_reminders)) if settings.reminder_worker else None
+    forum_watcher = asyncio.create_task(forum_broker.watch(forum_repository.collection)) if settings.forum_stream_watch else None
+    # built in the background, retried if Mongo fails; /search answers 503 until it is ready
+    search_tasks = [asyncio.create_task(build_search_index())]
+    if settings.search_watch:
+        # other workers' posts and replies; resumed after errors, rebuilt if resuming fails
+        search_tasks += [
+            asyncio.create_task(search_index.watch(forum_repository.collection, post_entry, build_search_index)),
+            asyncio.create_task(search_index.watch(forum_reply_repository.collection, reply_entry, build_search_index)),
+        ]
+    yield
+    startup.cancel()
+    for task in search_tasks:
+        task.cancel()
+    if watcher:
+        watcher.cancel()
+    if forum_watcher:
+        forum_watcher.cancel()
+    # end any stream still open; clients reconnect elsewhere with Last-Event-ID
+    forum_broker.close()
+    if reminder_worker:
+        # let the batch in flight finish before the client closes
+        stop_reminders.set()
+        await reminder_worker
+    # release pooled Mongo connections when the worker shuts down
+    await mongo_db.close()
+    await cache.close()
+    passwords.close()
+
+async def build_search_index():
+    """Index the forum. A failed build starts over after a backoff;
+    documents the first attempt already indexed are skipped."""
+    await retry(lambda: search_index.build([
+        (forum_repository.collection, {"title": 1, "content": 1}, post_entry),
+        (forum_reply_repository.collection, {"content": 1}, reply_entry),
+    ]), "Building the search index")
+
+
+async def prepare_database():
+    """Create the declared indexes, then build the guide index."""
+    await retry(lambda: ensure_indexes(mongo_db.db), "Creating indexes")
+    await retry(lambda: guide_store.refresh(guide_collection), "Loading guides")
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=MongoJSONResponse)
+
+# CSP and any other configured security headers
+app.add_middleware(SecurityHeadersMiddleware, headers=settings.security_headers)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.compression_minimum_size,
+    gzip_level=settings.compression_gzip_level,
+    brotli_quality=settings.compression_brotli_quality,
+)
 
-# instrument metrics
-Instrumentator().instrument(app).expose(app, endpoint="/metrics")
+# instrument metrics; Mongo command and repository metrics are in mongometrics.py
+Instrumentator(excluded_handlers=["/healthz", "/readyz"]).instrument(app).expose(app, endpoint="/metrics")
+# Mongo round trips per request, so N+1 query patterns show up per route
+app.add_middleware(RoundTripMiddleware, excluded_handlers=["/healthz", "/readyz", "/metrics"])
 # CORS for React
 app.add_middleware(
     CORSMiddleware,
@@ -55,15 +121,24 @@ app.add_middleware(
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "dev_secret_key")
 SECRET_KEY = JWT_SECRET_KEY
 ALGORITHM = "HS256"
+# verified token -> claims, so repeat requests skip the HMAC check
+token_cache = TokenCache(maxsize=settings.jwt_cache_size)
+
+# serialized bodies of read-mostly endpoints; writers invalidate their keys
+cache = Cache(make_backend(settings.cache_backend, settings.redis_url), settings.cache_ttls)
+
+# guide corpus, pre-serialized at startup; searchable too
+guide_store = GuideStore(
+    on_refresh=lambda docs: search_index.replace("guide", map(guide_entry, docs)),
+    meta=mongo_db.get_collection("guide_meta"),
+    check_interval_s=settings.guide_version_check_s,
+)
 
 # MONGODB CONNECTION
 
 
 tasks_collection = mongo_db.get_collection("daily_tasks")
-forum_collection = mongo_db.get_collection("forum_posts")
-reminder_collection = mongo_db.get_collection("reminder")
 guide_collection = mongo_db.get_collection("guide")
-waterintake_collection = mongo_db.get_collection("water_intake")
     
 
 # MODELS
@@ -104,6 +179,14 @@ class UserLogin(BaseModel):
     email: EmailStr
     password: str
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+class LogoutRequest(BaseModel):
+    refresh_token: str
+    # revoke every session of the user, not just this one
+    everywhere: bool = False
+
 class UserRegistration(BaseModel):
     email: EmailStr
     name: str
@@ -162,22 +245,65 @@ def build_task_dict(task: TaskCreate) -> dict:
     }
 
 
-def find_doc(user_id: str, date: str):
-    return tasks_collection.find_one({"userId": user_id, "date": date})
+def json_body(body: bytes) -> Response:
+    """Response for an already serialized JSON body, e.g. from the cache."""
+    return Response(content=body, media_type="application/json")
 
 
-def create_access_token(user_id: int):
-    """Generates a JWT token that expires in 30 minutes."""
+async def find_doc(user_id: str, date: str):
+    return await tasks_collection.find_one({"userId": user_id, "date": date})
+
+
+def reminder_due_on(reminder: dict, day: str) -> bool:
+    """Whether a reminder fires on ``day`` (YYYY-MM-DD), honouring its repeat."""
+    if reminder.get("date") == day:
+        return True
+    try:
+        start, target = Date.fromisoformat(reminder["date"]), Date.fromisoformat(day)
+    except (KeyError, TypeError, ValueError):
+        return False
+    # same repeat rules as the scheduler
+    return next(fire_dates(start, reminder.get("repeat"), target), None) == target
+
+
+async def load_water_day(user_id: str, date: str):
+    """Return (intake, created) for the day, starting it with the user's
+    previous goal (or the default) if there is no record yet."""
+    intake = await waterintake_repository.find_by_user_and_date(user_id, date)
+    if intake:
+        return intake, False
+
+    # Get user's last known goal, or use default
+    last_goal = await waterintake_repository.find_latest_goal(user_id)
+    goal = last_goal if last_goal else DEFAULT_GOAL
+
+    # Create new record for today with 0 intake (a no-op if a concurrent
+    # request already started the day)
+    return await waterintake_repository.ensure_day(user_id, date, goal)
+
+
+def create_access_token(user_id: int, email: Optional[str] = None, name: Optional[str] = None):
+    """Generates a JWT token that expires after ACCESS_TOKEN_TTL_MINUTES.
+
+    The email and name ride along as claims so handlers can read them
+    from validate_token_manual's result instead of looking the user up.
+    """
     to_encode = {"user_id": user_id}
-    expire = datetime.now(timezone.utc) + timedelta(minutes=5)
+    if email is not None:
+        to_encode.update({"email": email, "name": name})
+    expire = datetime.now(timezone.utc) + timedelta(minutes=settings.access_token_ttl_minutes)
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 def verify_token(token: str):
     """Verifies a JWT token and returns the payload if valid."""
+    cached = token_cache.get(token)
+    if cached is not None:
+        return cached
     try:
         decoded_payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        token_cache.put(token, decoded_payload)
         return decoded_payload
     except jwt.ExpiredSignatureError:
         raise HTTPException(
@@ -190,8 +316,11 @@ def verify_token(token: str):
             detail="Invalid or expired token",
         )
 
-def validate_token_manual(request: Request):
-    """Checks the Authorization header and raises an exception if invalid."""
+def validate_token_manual(request: Request) -> dict:
+    """Checks the Authorization header and returns the token's claims.
+
+    Raises 401 if the header is missing or the token is invalid.
+    """
     auth_header = request.headers.get("Authorization")
     if not auth_header or not auth_header.startswith("Bearer "):
         raise HTTPException(
@@ -200,29 +329,25 @@ def validate_token_manual(request: Request):
         )
     
     token = auth_header.split("Bearer ")[1] 
-    verify_token(token)
+    return verify_token(token)
+
    
 # ROUTES
 
 @app.post("/login",status_code=status.HTTP_200_OK)
-def login_for_access_token(user_data: UserLogin):
+async def login_for_access_token(user_data: UserLogin):
 
-    user_in_db = user_repository.find_by_email(user_data.email)
+    # hashing runs in its own bounded pool, see passwords.py
+    user_in_db = await user_repository.authenticate(user_data.email, user_data.password)
     if not user_in_db:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-        
-    if (user_data.password != user_in_db['password']):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Incorrect username or password",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
 
-    token = create_access_token(user_in_db["_id"])
+    token = create_access_token(user_in_db["_id"], user_in_db["email"], user_in_db.get("name"))
+    refresh_token = await refresh_token_repository.issue(user_in_db)
 
 
     return JSONResponse(
@@ -238,18 +363,54 @@ def login_for_access_token(user_data: UserLogin):
            "working":user_in_db['working'],
            "pregnancyMonth":user_in_db['pregnancyMonth']
            },
-           "token": token
+           "token": token,
+           "refresh_token": refresh_token
        }
     )
 
 
+@app.post("/token/refresh")
+async def refresh_access_token(body: RefreshRequest):
+    """Swap a refresh token for a new access token and a new refresh token.
+
+    The presented refresh token stops working; reusing it revokes the session.
+    """
+    rotated = await refresh_token_repository.rotate(body.refresh_token)
+    if rotated is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token",
+        )
+
+    session, refresh_token = rotated
+    # claims are read fresh, so a profile update shows up in the next access token
+    user = await user_repository.find_claims(session["userId"])
+    if user is None:
+        # the account was deleted; end the session
+        await refresh_token_repository.revoke_family(session["family"])
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token",
+        )
+    token = create_access_token(session["userId"], user.get("email"), user.get("name"))
+    return {"token": token, "refresh_token": refresh_token}
+
+
+@app.post("/logout")
+async def logout(body: LogoutRequest):
+    session = await refresh_token_repository.revoke(body.refresh_token)
+    if session and body.everywhere:
+        await refresh_token_repository.revoke_user(session["userId"])
+    return {"message": "Logged out"}
+
+
 @app.post("/register", status_code=status.HTTP_201_CREATED)
-def register_user(user_data: UserRegistration):
+async def register_user(user_data: UserRegistration):
 
     user_dict = user_data.model_dump()
     
     # Check if the user already exists in the database
-    existing_user = user_repository.find_by_email(user_dict['email'])
+    existing_user = await user_repository.find_by_email(user_dict['email'])
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -257,23 +418,32 @@ def register_user(user_data: UserRegistration):
         )
         
     # Create the user using the repository (which handles hashing)
-    user_id = user_repository.create(user_dict)
+    try:
+        user_id = await user_repository.create(user_dict)
+    except DuplicateKeyError:
+        # lost a race with a concurrent registration for the same email
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
+        )
     
     # Return a success message and the new user ID
     return {"message": "User registered successfully", "user_id": user_id, "email": user_dict['email']}
 
 @app.get("/users")
-def get_user(request:Request,status_code=status.HTTP_200_OK):
+async def get_user(request:Request,status_code=status.HTTP_200_OK):
     validate_token_manual(request)
-    return user_repository.find_all()
+    return MongoJSONResponse(await user_repository.find_all())
 
 @app.get("/user/{id}")
-def get_userbyid(request:Request,id):
+async def get_userbyid(request:Request,id):
     validate_token_manual(request)
-    res = user_repository.find_by_email(id)
-    return JSONResponse(
-           status_code=status.HTTP_200_OK,
-           content =    {
+
+    async def load():
+        res = await user_repository.find_by_email(id)
+        if not res:
+            return None
+        return {
             "userdata":{
                 "email":res["email"],
                 "name": res["name"],
@@ -290,11 +460,15 @@ def get_userbyid(request:Request,id):
                 "age" : res['age']
             }
         }
-    )
+
+    body = await cache.get_or_load("user", id, load)
+    if body is None:
+        raise HTTPException(status_code=404, detail="user not found")
+    return json_body(body)
 
 
 @app.put("/updateprofile")
-def update_user(request:Request,user_data: UserUpdate):
+async def update_user(request:Request,user_data: UserUpdate):
 
     validate_token_manual(request)
 
@@ -302,7 +476,7 @@ def update_user(request:Request,user_data: UserUpdate):
     user_dict = user_data.model_dump()
     
     # Check if the user already exists in the database
-    existing_user = user_repository.find_by_email(user_dict['email'])
+    existing_user = await user_repository.find_by_email(user_dict['email'])
     if not existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -310,94 +484,69 @@ def update_user(request:Request,user_data: UserUpdate):
         )
         
     # Create the user using the repository (which handles hashing)
-    user_id = user_repository.update(existing_user['_id'],user_dict)
+    user_id = await user_repository.update(existing_user['_id'],user_dict)
+    await cache.invalidate("user", user_dict['email'])
     
     # Return a success message and the new user ID
     return {"message": "User updated successfully"}
 
 @app.get("/tasks")
-def get_tasks(request:Request,userId: str, date: str):
+async def get_tasks(request:Request,userId: str, date: str):
     """
     Get all tasks for a user for a given date.
     ONE document per (userId, date) with tasks array.
     """
     validate_token_manual(request) 
 
-    doc = find_doc(userId, date)
+    doc = await find_doc(userId, date)
     if not doc:
         return {"tasks": []}
     return {"tasks": doc.get("tasks", [])}
 
 
 @app.post("/tasks/{userId}/{date}")
-def create_task(request:Request,userId:str,date:str,tasks: UsersDailyTasksWrapper):
+async def create_task(request:Request,userId:str,date:str,tasks: UsersDailyTasksWrapper):
     """
-    Add one task to the user's task list for that date.
-    If doc doesn't exist, create it.
+    Add tasks to the user's task list for that date.
+    All tasks are written with a single upsert, creating the doc if needed.
     """
     validate_token_manual(request) 
 
+    new_tasks = [build_task_dict(task) for task in tasks.tasks]
+    if new_tasks:
+        await dailytask_repository.add_tasks(userId, date, new_tasks)
 
-    for task in tasks.tasks:
-        existing = find_doc(userId, date)
-        new_task = build_task_dict(task)
-
-        if existing:
-            tasks_collection.update_one(
-                {"_id": existing["_id"]},
-                {"$push": {"tasks": new_task}}
-            )
-        else:
-            tasks_collection.insert_one(
-                {
-                    "userId": userId,
-                    "date": date,
-                    "tasks": [new_task],
-                }
-            )
-
-    return {"task": new_task}
+    return {"tasks": new_tasks}
 
 
 @app.patch("/tasks/{task_id}")
-def update_task(request:Request,task_id: str, userId: str, date: str, patch: TaskUpdate):
+async def update_task(request:Request,task_id: str, userId: str, date: str, patch: TaskUpdate):
     """
     Update one task in the tasks array (currently only 'completed').
     """
     validate_token_manual(request) 
 
-    update_ops = {}
-
-    if patch.completed is not None:
-        update_ops["tasks.$.completed"] = patch.completed
+    update_ops = patch.model_dump(exclude_none=True)
 
     if not update_ops:
         raise HTTPException(status_code=400, detail="Nothing to update")
 
-    result = tasks_collection.update_one(
-        {"userId": userId, "date": date, "tasks.id": task_id},
-        {"$set": update_ops},
-    )
+    updated_task = await dailytask_repository.update_task_and_get(userId, date, task_id, update_ops)
 
-    if result.matched_count == 0:
+    if updated_task is None:
         raise HTTPException(status_code=404, detail="Task not found")
 
-    # fetch the updated task
-    doc = find_doc(userId, date)
-    tasks = doc.get("tasks", [])
-    updated_task = next((t for t in tasks if t["id"] == task_id), None)
-
     return {"task": updated_task}
 
 
 @app.delete("/tasks/{task_id}")
-def delete_task(request:Request,task_id: str, userId: str, date: str):
+async def delete_task(request:Request,task_id: str, userId: str, date: str):
     """
     Delete one task from the tasks array.
     """
     validate_token_manual(request) 
 
-    result = tasks_collection.update_one(
+    result = await tasks_collection.update_one(
         {"userId": userId, "date": date},
         {"$pull": {"tasks": {"id": task_id}}},
     )
@@ -409,13 +558,13 @@ def delete_task(request:Request,task_id: str, userId: str, date: str):
 
 
 @app.post("/tasks/mark-all-complete")
-def mark_all_complete(request:Request,userId: str, date: str):
+async def mark_all_complete(request:Request,userId: str, date: str):
     """
     Mark all tasks for this user & date as completed.
     """
     validate_token_manual(request) 
 
-    result = tasks_collection.update_one(
+    result = await tasks_collection.update_one(
         {"userId": userId, "date": date},
         {"$set": {"tasks.$[].completed": True}},
     )
@@ -426,184 +575,311 @@ def mark_all_complete(request:Request,userId: str, date: str):
     return {"updated": result.modified_count}
 
 @app.post("/forum", status_code=201)
-def create_post(request:Request,post: ForumPost):
+async def create_post(request:Request,post: ForumPost):
     validate_token_manual(request) 
 
     post_dict = post.model_dump()
     post_dict["created_at"] = datetime.now(timezone.utc).isoformat(timespec="milliseconds")
-    post_dict["replies"] = []  
-    result = forum_collection.insert_one(post_dict)
-    post_dict["_id"] = str(result.inserted_id)
+    post_dict["reply_count"] = 0
+    post_dict["_id"] = await forum_repository.create(post_dict)
+    forum_broker.publish_local("post", post_dict)
+    search_index.add(post_entry(post_dict))
     return post_dict
 
 
 @app.get("/forum")
-def get_posts(request:Request,userId: Optional[str] = None):
+async def get_posts(
+    request:Request,
+    userId: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    after: Optional[str] = None,
+):
+    """
+    One page of posts, newest first, without reply bodies.
+    Pass the returned next_cursor as `after` to fetch the following page.
+    """
     validate_token_manual(request) 
 
-    query = {"userId": userId} if userId else {}
-    posts = list(forum_collection.find(query))
-    for p in posts:
-        p["_id"] = str(p["_id"])
-    return posts
+    try:
+        page = await forum_repository.find_page(userId, limit=limit, after=after)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return MongoJSONResponse(page)
+
+
+@app.get("/forum/stream")
+async def stream_forum(request:Request, last_event_id: Optional[str] = Header(None)):
+    """
+    Live forum activity as Server-Sent Events: `post` for every new post and
+    `reply_count` when a post gets a reply. Send the last event id received
+    as Last-Event-ID when reconnecting to pick up what was missed; a `reset`
+    event means the gap was too long and the first page should be reloaded.
+    """
+    validate_token_manual(request)
+
+    # subscribe now, so nothing published before the body starts is lost
+    subscription = forum_broker.subscribe(last_event_id)
+
+    async def events():
+        try:
+            async for message in subscription.messages(settings.forum_stream_heartbeat_s):
+                yield message
+        finally:
+            forum_broker.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # X-Accel-Buffering stops nginx-style proxies from holding events back
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.get("/forum/{post_id}")
-def get_post(request:Request,post_id: str):
+async def get_post(request:Request,post_id: str):
     validate_token_manual(request) 
 
-    post = forum_collection.find_one({"_id": ObjectId(post_id)})
+    post = await forum_repository.find_by_id(post_id)
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
-    post["_id"] = str(post["_id"])
-    return post
+    return MongoJSONResponse(post)
 
 
 @app.post("/forum/{post_id}/replies", status_code=201)
-def add_reply(request:Request,post_id: str, reply: ForumReply):
+async def add_reply(request:Request,post_id: str, reply: ForumReply):
     validate_token_manual(request) 
 
     reply_dict = reply.model_dump()
     reply_dict["id"] = str(ObjectId())
     reply_dict["created_at"] = datetime.now(timezone.utc).isoformat(timespec="milliseconds")
 
-
-    result = forum_collection.update_one(
-        {"_id": ObjectId(post_id)},
-        {"$push": {"replies": reply_dict}}
-    )
-
-    if result.matched_count == 0:
+    # counting first doubles as the existence check for the post
+    reply_count = await forum_repository.increment_reply_count(post_id)
+    if reply_count is None:
         raise HTTPException(status_code=404, detail="Post not found")
 
+    try:
+        await forum_reply_repository.create(post_id, reply_dict)
+    except Exception:
+        await forum_repository.increment_reply_count(post_id, -1)
+        raise
+
+    forum_broker.publish_local("reply_count", {"postId": post_id, "reply_count": reply_count})
+    search_index.add(reply_entry(reply_dict))
     return reply_dict
 
 @app.get("/forum/{post_id}/replies")
-def get_replies(request:Request,post_id: str):
+async def get_replies(
+    request:Request,
+    post_id: str,
+    limit: int = Query(50, ge=1, le=200),
+    after: Optional[str] = None,
+):
+    """
+    One page of replies to a post, oldest first.
+    Pass the returned next_cursor as `after` to fetch the following page.
+    """
     validate_token_manual(request) 
 
-    post = forum_collection.find_one({"_id": ObjectId(post_id)})
-    if not post:
+    try:
+        page = await forum_reply_repository.find_page(post_id, limit=limit, after=after)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    # only an empty first page needs the extra lookup to tell "no replies"
+    # apart from "no such post"
+    if not page["replies"] and not after and not await forum_repository.find_by_id(post_id):
         raise HTTPException(status_code=404, detail="Post not found")
-    return post.get("replies", [])
+    return MongoJSONResponse(page)
 
 @app.get("/getreminder")
-def get_reminder(request:Request,userId: str):
+async def get_reminder(
+    request:Request,
+    userId: str,
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    category: Optional[str] = None,
+):
+    """
+    The user's reminders by date and time.
+    If from and/or to are provided (YYYY-MM-DD, inclusive), only reminders
+    that can fire in that range: one-off reminders dated inside it and
+    repeating reminders that started on or before to.
+    If category is provided, only reminders in that category.
+    """
     validate_token_manual(request)
 
-    doc = reminder_collection.find_one({"userId": userId})
-    if not doc:
-        return {"reminders": []}
-    return {"reminders": doc.get("reminders", [])}
+    if date_from or date_to or category:
+        parse_date_param("from", date_from)
+        parse_date_param("to", date_to)
+        reminders = await reminder_repository.find_by_user(userId, date_from, date_to, category)
+        return {"reminders": reminders}
+
+    async def load():
+        return {"reminders": await reminder_repository.find_by_user(userId)}
+
+    return json_body(await cache.get_or_load("reminders", userId, load))
 
 
 @app.post("/createreminder")
-def create_reminder(request:Request,reminder: ReminderData):
+async def create_reminder(request:Request,reminder: ReminderData):
     validate_token_manual(request) 
 
-    existing = reminder_collection.find_one({"userId": reminder.userId})
-    new_reminder = {
-    "id": str(ObjectId()),           
-    "title": reminder.title,
-    "description": reminder.description,
-    "date": reminder.date,
-    "time": reminder.time,
-    "category": reminder.category,
-    "repeat": reminder.repeat,
-    }
-
-    if existing:
-        reminder_collection.update_one(
-            {"_id": existing["_id"]},
-            {"$push": {"reminders": new_reminder}}
-        )
-    else:
-        reminder_collection.insert_one(
-            {
-                "userId": reminder.userId,
-                "reminders": [new_reminder],
-            }
-        )
+    new_reminder = await reminder_repository.create(reminder.userId, reminder.model_dump(exclude={"userId"}))
 
+    await reminder_scheduler.schedule(reminder.userId, new_reminder)
+    await cache.invalidate("reminders", reminder.userId)
     return {"reminders": new_reminder}
 
 
 @app.delete("/deletereminder/{reminder_id}")
-def delete_reminder(request:Request,reminder_id: str, userId: str):
+async def delete_reminder(request:Request,reminder_id: str, userId: str):
     """
-    Delete one task from the tasks array.
+    Delete one of the user's reminders.
     """
     validate_token_manual(request)
 
-    result = reminder_collection.update_one(
-        {"userId": userId},
-        {"$pull": {"reminders": {"id": reminder_id}}},
-    )
-
-    if result.modified_count == 0:
+    if not await reminder_repository.delete(userId, reminder_id):
         raise HTTPException(status_code=404, detail="reminder not found")
 
+    await reminder_scheduler.unschedule(reminder_id)
+    await cache.invalidate("reminders", userId)
     return {"message": "reminder deleted"}
     
 @app.put("/updatereminder/{reminder_id}")
-def update_task(request:Request,reminder_id: str, userId: str, patch: ReminderData):
+async def update_task(request:Request,reminder_id: str, userId: str, patch: ReminderData):
     validate_token_manual(request) 
 
-    update_ops = {}
-    
-    if patch is not None:
-        update_ops["reminders.$.title"] = patch.title
-        update_ops["reminders.$.description"] = patch.description
-        update_ops["reminders.$.date"] = patch.date
-        update_ops["reminders.$.time"] = patch.time
-        update_ops["reminders.$.category"] = patch.category
-        update_ops["reminders.$.repeat"] = patch.repeat
+    # the write hands back the updated reminder, no second read
+    updated_reminder = await reminder_repository.update(userId, reminder_id, patch.model_dump(exclude={"userId"}))
+
+    if updated_reminder is None:
+        raise HTTPException(status_code=404, detail="reminder not found")
+    await cache.invalidate("reminders", userId)
+    await reminder_scheduler.schedule(userId, updated_reminder)
 
+    return {"reminders": updated_reminder}
 
 
-    if not update_ops:
-        raise HTTPException(status_code=400, detail="Nothing to update")
+def parse_datetime_param(name: str, value: Optional[str]) -> Optional[datetime]:
+    """An ISO 8601 query parameter as an aware datetime (naive means UTC); 400 if malformed."""
+    if value is None:
+        return None
+    if value[-1:] in ("Z", "z"):
+        # what JavaScript's toISOString() sends; fromisoformat only accepts it from Python 3.11
+        value = value[:-1] + "+00:00"
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be an ISO 8601 date-time")
+    return parsed.replace(tzinfo=timezone.utc) if parsed.tzinfo is None else parsed
+
+
+@app.get("/reminders/due")
+async def get_due_reminders(
+    request:Request,
+    userId: str,
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+):
+    """
+    Occurrences of the user's reminders that fire between from and to
+    (inclusive, ISO 8601), expanded from their repeat rules.
+    Defaults to the next 24 hours; the window may span at most 31 days.
+    """
+    validate_token_manual(request)
+
+    start = parse_datetime_param("from", date_from) or reminder_scheduler.clock()
+    end = parse_datetime_param("to", date_to) or start + timedelta(days=1)
+    if end < start or end - start > timedelta(days=31):
+        raise HTTPException(status_code=400, detail="to must be after from and at most 31 days later")
 
-    result = reminder_collection.update_one(
-        {"userId": userId, "reminders.id": reminder_id},
-        {"$set": update_ops},
+    return MongoJSONResponse({"reminders": await reminder_scheduler.due(userId, start, end)})
+    
+async def load_search_documents(hits) -> dict:
+    """The documents behind a page of hits, keyed by (kind, id). Guides
+    come from the in-memory guide index; posts and replies from Mongo."""
+    ids = {kind: [hit.id for hit in hits if hit.kind == kind] for kind in ("post", "reply", "guide")}
+    # kinds without hits skip their round trip
+    posts, replies = await asyncio.gather(
+        forum_repository.find_by_ids(ids["post"]) if ids["post"] else asyncio.sleep(0, []),
+        forum_reply_repository.find_by_ids(ids["reply"]) if ids["reply"] else asyncio.sleep(0, []),
     )
+    documents = {}
+    for kind, docs in (("post", posts), ("reply", replies)):
+        documents.update({(kind, str(doc["_id"])): doc for doc in docs})
+    if ids["guide"]:
+        guides = (await guide_store.get_index(guide_collection)).sources
+        documents.update({("guide", i): guides[i] for i in ids["guide"] if i in guides})
+    return documents
+
+
+@app.get("/search")
+async def search(
+    request:Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=50),
+    offset: int = Query(0, ge=0, le=1000),
+):
+    """
+    Forum posts, replies and guides matching q, best match first (BM25).
+    Each result has a snippet of its text and the [start, end) offsets of
+    the matched words in it (`highlights`; `title_highlights` for titles).
+    Pass next_offset as offset to fetch the following page.
+    """
+    validate_token_manual(request)
 
-    if result.matched_count == 0:
-        raise HTTPException(status_code=404, detail="reminder not found")
+    if not search_index.ready:
+        raise HTTPException(status_code=503, detail="Search index is still being built", headers={"Retry-After": "5"})
+
+    hits, more = search_index.search(q, limit=limit, offset=offset)
+    documents = await load_search_documents(hits)
+    terms = query_terms(q)
+    # a hit whose document was deleted since it was indexed is left out
+    results = [search_result(hit, documents[hit.kind, hit.id], terms) for hit in hits if (hit.kind, hit.id) in documents]
+    return MongoJSONResponse({"results": results, "next_offset": offset + limit if more else None})
 
-    # fetch the updated task
-    doc = reminder_collection.find_one({"userId": userId})
-    reminders = doc.get("reminders", [])
-    updated_reminder = next((r for r in reminders if r["id"] == reminder_id), None)
 
-    return {"reminders": updated_reminder}
-    
 @app.get("/guide")
-def get_guides(request:Request):
+async def get_guides(request:Request):
     validate_token_manual(request) 
 
-    docs = list(guide_collection.find({}, {"_id": 1, "title": 1}))
-    # Convert ObjectId to string if needed
-    for d in docs:
-        d["_id"] = str(d["_id"])
-    return {"documents": docs}
+    index = await guide_store.get_index(guide_collection)
+    return serve_guide(request, index.listing, settings.guide_cache_control)
 
 @app.get("/guide/{doc_id}")
-def get_guide_content(request:Request,doc_id: str):
+async def get_guide_content(request:Request,doc_id: str):
     validate_token_manual(request) 
 
-    doc = guide_collection.find_one({"_id": doc_id})
-    if not doc:
+    index = await guide_store.get_index(guide_collection)
+    guide = index.get(doc_id)
+    if guide is None:
         raise HTTPException(status_code=404, detail="Guide not found")
+    return serve_guide(request, guide, settings.guide_cache_control)
 
-    doc["_id"] = str(doc["_id"])
-    return doc
+
+@app.post("/guide/refresh")
+async def refresh_guides(x_admin_token: Optional[str] = Header(None)):
+    """Reload the guides after editing guide content. Needs ADMIN_TOKEN.
+
+    This worker rebuilds at once; the others pick up the new version the
+    next time they serve a guide after GUIDE_VERSION_CHECK_S.
+    """
+    if not settings.admin_token or not hmac.compare_digest(x_admin_token or "", settings.admin_token):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+    index = await guide_store.publish(guide_collection)
+    return {
+        "message": "Guide index refreshed; other workers reload within other_workers_within_s",
+        "documents": len(index.documents),
+        "version": guide_store.version,
+        "other_workers_within_s": settings.guide_version_check_s,
+    }
 
 # WATER INTAKE ROUTES
 
 @app.get("/waterintake")
-def get_water_intake(request:Request,userId: str, date: str):
+async def get_water_intake(request:Request,userId: str, date: str):
     """
     Get water intake data for a specific user and date.
     Automatically creates a new record for today with 0 intake if it doesn't exist.
@@ -611,143 +887,87 @@ def get_water_intake(request:Request,userId: str, date: str):
     """
     validate_token_manual(request) 
 
-    intake = waterintake_repository.find_by_user_and_date(userId, date)
-    
-    if not intake:
-        # Get user's last known goal, or use default
-        last_goal = waterintake_repository.find_latest_goal(userId)
-        goal = last_goal if last_goal else 2000
-        
-        # Create new record for today with 0 intake
-        new_intake = {
-            "userId": userId,
-            "date": date,
-            "goalIntake": goal,
-            "currentIntake": 0
-        }
-        intake_id = waterintake_repository.create(new_intake)
-        new_intake["_id"] = intake_id
-        return {"data": new_intake, "message": "New day started - water intake reset"}
-    
+    intake, created = await load_water_day(userId, date)
+    if created:
+        return {"data": intake, "message": "New day started - water intake reset"}
     return {"data": intake}
 
 
 @app.post("/waterintake", status_code=201)
-def create_water_intake(request:Request,intake: WaterIntakeData):
+async def create_water_intake(request:Request,intake: WaterIntakeData):
     """
     Create a new water intake record for a user on a specific date.
     If a record already exists, return an error.
     """
     validate_token_manual(request) 
 
-    existing = waterintake_repository.find_by_user_and_date(intake.userId, intake.date)
-    
-    if existing:
+    intake_dict = intake.model_dump()
+    try:
+        intake_id = await waterintake_repository.create(intake_dict)
+    except DuplicateKeyError:
+        # the unique (userId, date) index is the existence check
         raise HTTPException(
             status_code=400, 
             detail="Water intake record already exists for this date"
         )
-    
-    intake_dict = intake.model_dump()
-    intake_id = waterintake_repository.create(intake_dict)
     intake_dict["_id"] = intake_id
     
     return {"message": "Water intake record created", "data": intake_dict}
 
 
 @app.patch("/waterintake/add")
-def add_water_intake(request:Request,userId: str, date: str, update: WaterIntakeUpdate):
+async def add_water_intake(request:Request,userId: str, date: str, update: WaterIntakeUpdate):
     """
     Increment water intake by a specific amount.
     Creates a new record with default goal if it doesn't exist.
     """
     validate_token_manual(request) 
 
-    existing = waterintake_repository.find_by_user_and_date(userId, date)
-    
-    if not existing:
-        # Create new record with default goal of 2000ml
-        new_intake = {
-            "userId": userId,
-            "date": date,
-            "goalIntake": 2000,
-            "currentIntake": update.amount
-        }
-        intake_id = waterintake_repository.create(new_intake)
-        new_intake["_id"] = intake_id
-        return {"message": "Water intake tracked", "data": new_intake}
-    
-    # Increment existing intake
-    success = waterintake_repository.increment_intake(userId, date, update.amount)
-    
-    if not success:
-        raise HTTPException(status_code=404, detail="Failed to update water intake")
-    
-    # Fetch updated record
-    updated = waterintake_repository.find_by_user_and_date(userId, date)
-    return {"message": "Water intake updated", "data": updated}
+    intake, created = await waterintake_repository.add(userId, date, update.amount)
+
+    if created:
+        return {"message": "Water intake tracked", "data": intake}
+    return {"message": "Water intake updated", "data": intake}
 
 
 @app.put("/waterintake/goal")
-def update_water_goal(request:Request,userId: str, date: str, goalIntake: int):
+async def update_water_goal(request:Request,userId: str, date: str, goalIntake: int):
     """
     Update the daily water intake goal for a user.
+    Creates the day's record with 0 intake if it doesn't exist.
     """
     validate_token_manual(request) 
 
-    existing = waterintake_repository.find_by_user_and_date(userId, date)
-    
-    if not existing:
-        # Create new record with specified goal
-        new_intake = {
-            "userId": userId,
-            "date": date,
-            "goalIntake": goalIntake,
-            "currentIntake": 0
-        }
-        intake_id = waterintake_repository.create(new_intake)
-        new_intake["_id"] = intake_id
-        return {"message": "Water intake goal set", "data": new_intake}
-    
-    # Update goal
-    waterintake_collection.update_one(
-        {"userId": userId, "date": date},
-        {"$set": {"goalIntake": goalIntake}}
-    )
-    
-    updated = waterintake_repository.find_by_user_and_date(userId, date)
-    return {"message": "Water intake goal updated", "data": updated}
+    intake, created = await waterintake_repository.set_goal(userId, date, goalIntake)
+
+    if created:
+        return {"message": "Water intake goal set", "data": intake}
+    return {"message": "Water intake goal updated", "data": intake}
 
 
 @app.put("/waterintake/reset")
-def reset_water_intake(request:Request,userId: str, date: str):
+async def reset_water_intake(request:Request,userId: str, date: str):
     """
     Reset the current water intake to 0 for a specific date.
     """
     validate_token_manual(request) 
 
-    existing = waterintake_repository.find_by_user_and_date(userId, date)
+    updated = await waterintake_repository.update_intake_and_get(userId, date, 0)
     
-    if not existing:
+    if not updated:
         raise HTTPException(status_code=404, detail="Water intake record not found")
     
-    success = waterintake_repository.update_intake(userId, date, 0)
-    
-    if not success:
-        raise HTTPException(status_code=404, detail="Failed to reset water intake")
-    
-    updated = waterintake_repository.find_by_user_and_date(userId, date)
     return {"message": "Water intake reset", "data": updated}
 
 
 @app.delete("/waterintake")
-def delete_water_intake(request:Request,userId: str, date: str):
+async def delete_water_intake(request:Request,userId: str, date: str):
     """
     Delete water intake record for a specific date.
     """
     validate_token_manual(request) 
 
-    success = waterintake_repository.delete(userId, date)
+    success = await waterintake_repository.delete(userId, date)
     
     if not success:
         raise HTTPException(status_code=404, detail="Water intake record not found")
@@ -759,7 +979,7 @@ def delete_water_intake(request:Request,userId: str, date: str):
 # MOOD TRACKING ROUTES
 
 @app.post("/mood", status_code=201)
-def create_mood(request:Request,mood: MoodData):
+async def create_mood(request:Request,mood: MoodData):
     """
     Save or update mood for a user on a specific date.
     If mood already exists for that date, update it.
@@ -767,89 +987,129 @@ def create_mood(request:Request,mood: MoodData):
     validate_token_manual(request) 
 
     # Validate mood value
-    valid_moods = ["happy", "calm", "tired", "anxious", "unwell"]
-    if mood.mood not in valid_moods:
+    if mood.mood not in VALID_MOODS:
         raise HTTPException(
             status_code=400,
-            detail=f"Invalid mood value. Must be one of: {', '.join(valid_moods)}"
+            detail=f"Invalid mood value. Must be one of: {', '.join(VALID_MOODS)}"
         )
     
-    existing = mood_repository.find_by_user_and_date(mood.userId, mood.date)
-    
-    if existing:
-        # Update existing mood
-        success = mood_repository.update(mood.userId, mood.date, mood.mood)
-        if not success:
-            raise HTTPException(status_code=500, detail="Failed to update mood")
-        updated = mood_repository.find_by_user_and_date(mood.userId, mood.date)
+    # Update existing mood
+    updated = await mood_repository.update_and_get(mood.userId, mood.date, mood.mood)
+    if updated:
         return {"message": "Mood updated", "data": updated}
-    else:
-        # Create new mood entry
-        mood_dict = mood.model_dump()
-        mood_id = mood_repository.create(mood_dict)
-        mood_dict["_id"] = mood_id
-        return {"message": "Mood saved", "data": mood_dict}
+
+    # Create new mood entry
+    mood_dict = mood.model_dump()
+    try:
+        mood_id = await mood_repository.create(mood_dict)
+    except DuplicateKeyError:
+        # saved concurrently for the same day, last write wins
+        updated = await mood_repository.update_and_get(mood.userId, mood.date, mood.mood)
+        return {"message": "Mood updated", "data": updated}
+    mood_dict["_id"] = mood_id
+    return {"message": "Mood saved", "data": mood_dict}
+
+
+def parse_date_param(name: str, value: Optional[str]) -> Optional[Date]:
+    """A YYYY-MM-DD query parameter as a date; 400 if malformed."""
+    if value is None:
+        return None
+    try:
+        return Date.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be a date in YYYY-MM-DD format")
 
 
 @app.get("/mood")
-def get_mood(request:Request,userId: str, date: Optional[str] = None):
+async def get_mood(
+    request:Request,
+    userId: str,
+    date: Optional[str] = None,
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    limit: Optional[int] = Query(None, ge=1, le=366),
+):
     """
     Get mood data for a user.
     If date is provided, get mood for that specific date.
-    If date is not provided, get all mood history (last 30 days).
+    If from and/or to are provided, get the entries in that range (inclusive),
+    most recent first, up to limit (default 366).
+    Otherwise get the latest mood history (limit, default 30 entries).
     """
     validate_token_manual(request) 
 
     if date:
-        mood = mood_repository.find_by_user_and_date(userId, date)
+        mood = await mood_repository.find_by_user_and_date(userId, date)
         if not mood:
             return {"data": None}
         return {"data": mood}
     else:
-        moods = mood_repository.find_by_user(userId, limit=30)
-        return {"data": moods}
+        parse_date_param("from", date_from)
+        parse_date_param("to", date_to)
+        default_limit = 366 if date_from or date_to else 30
+        moods = await mood_repository.find_by_user(
+            userId, limit=limit or default_limit, date_from=date_from, date_to=date_to
+        )
+        return MongoJSONResponse({"data": moods})
+
+
+@app.get("/mood/summary")
+async def get_mood_summary(
+    request:Request,
+    userId: str,
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    period: str = Query("week", pattern="^(week|month)$"),
+):
+    """
+    Mood trends computed in Mongo: counts of each mood per ISO week or per
+    month, overall counts, the most common mood, and logging streaks.
+    Defaults to the year up to today (UTC).
+    """
+    validate_token_manual(request) 
+
+    end = parse_date_param("to", date_to) or datetime.now(timezone.utc).date()
+    start = parse_date_param("from", date_from) or end - timedelta(days=364)
+    if start > end:
+        raise HTTPException(status_code=400, detail="from must not be after to")
+
+    summary = await mood_repository.summarize(userId, start.isoformat(), end.isoformat(), period)
+    return MongoJSONResponse(summary)
 
 
 @app.put("/mood")
-def update_mood(request:Request,mood: MoodData):
+async def update_mood(request:Request,mood: MoodData):
     """
     Update mood value for a specific user and date.
     """
     validate_token_manual(request) 
 
     # Validate mood value
-    valid_moods = ["happy", "calm", "tired", "anxious", "unwell"]
-    if mood.mood not in valid_moods:
+    if mood.mood not in VALID_MOODS:
         raise HTTPException(
             status_code=400,
-            detail=f"Invalid mood value. Must be one of: {', '.join(valid_moods)}"
+            detail=f"Invalid mood value. Must be one of: {', '.join(VALID_MOODS)}"
         )
     
-    existing = mood_repository.find_by_user_and_date(mood.userId, mood.date)
+    updated = await mood_repository.update_and_get(mood.userId, mood.date, mood.mood)
     
-    if not existing:
+    if not updated:
         raise HTTPException(
             status_code=404,
             detail="Mood entry not found for this date"
         )
     
-    success = mood_repository.update(mood.userId, mood.date, mood.mood)
-    
-    if not success:
-        raise HTTPException(status_code=500, detail="Failed to update mood")
-    
-    updated = mood_repository.find_by_user_and_date(mood.userId, mood.date)
     return {"message": "Mood updated", "data": updated}
 
 
 @app.delete("/mood")
-def delete_mood(request:Request,userId: str, date: str):
+async def delete_mood(request:Request,userId: str, date: str):
     """
     Delete mood entry for a specific date.
     """
     validate_token_manual(request) 
 
-    success = mood_repository.delete(userId, date)
+    success = await mood_repository.delete(userId, date)
     
     if not success:
         raise HTTPException(status_code=404, detail="Mood entry not found")
@@ -857,3 +1117,55 @@ def delete_mood(request:Request,userId: str, date: str):
     return {"message": "Mood entry deleted"}
 
 
+# DASHBOARD
+
+@app.get("/dashboard")
+async def get_dashboard(request:Request,userId: str, date: str):
+    """
+    Everything the dashboard shows for one day, in a single request:
+    the day's tasks, water intake (started for the day if missing, as in
+    GET /waterintake), the mood for the date and the reminders due that day.
+    The four lookups run concurrently.
+    """
+    validate_token_manual(request)
+
+    tasks_doc, (intake, _), mood, reminders = await asyncio.gather(
+        find_doc(userId, date),
+        load_water_day(userId, date),
+        mood_repository.find_by_user_and_date(userId, date),
+        reminder_repository.find_by_user(userId, date_from=date, date_to=date),
+    )
+
+    return {
+        "tasks": tasks_doc.get("tasks", []) if tasks_doc else [],
+        "waterIntake": intake,
+        "mood": mood,
+        "reminders": [r for r in reminders if reminder_due_on(r, date)],
+    }
+
+
+# HEALTH
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and serving requests."""
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz():
+    """
+    Readiness: Mongo answers a ping through the pool and the pool is not
+    saturated. Returns 503 otherwise so the pod is taken out of rotation.
+    """
+    pool = pool_metrics.snapshot()
+    if pool_metrics.saturated(settings.mongo_max_pool_size):
+        return JSONResponse(status_code=503, content={"status": "saturated", "pool": pool})
+    try:
+        await asyncio.wait_for(mongo_db.ping(), settings.readiness_timeout_s)
+    except (PyMongoError, asyncio.TimeoutError) as exc:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "unavailable", "detail": type(exc).__name__, "pool": pool},
+        )
+    return {"status": "ok", "pool": pool}
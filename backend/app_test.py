@@ -1,18 +1,36 @@
+import asyncio
+import copy
+from dataclasses import replace
+import httpx
 import pytest
 from fastapi.testclient import TestClient
 from bson import ObjectId
-from unittest.mock import MagicMock
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from fastapi import HTTPException
+from unittest.mock import AsyncMock, MagicMock
 import jwt
 from datetime import datetime, timedelta, timezone
 from app import create_access_token, verify_token
 import os
 from app import app
+from settings import settings
 
 client = TestClient(app)
 
 
 # Shared Mock Collection used for all database interactions
 
+class MockCursor:
+    """Mimics the async cursor returned by AsyncCollection.find()."""
+
+    def __init__(self, documents):
+        self.documents = documents
+
+    async def to_list(self, length=None):
+        return list(self.documents)
+
+
 class MockCollection:
     """A simple mock collection that simulates MongoDB behavior."""
 
@@ -22,24 +40,24 @@ class MockCollection:
         self.insert_result = ObjectId()
         self.update_result = True
 
-    def find_one(self, query):
+    async def find_one(self, query):
         return self.find_one_result
 
     def find(self, query=None, projection=None):
-        return self.find_result or []
+        return MockCursor(self.find_result or [])
 
-    def insert_one(self, document):
+    async def insert_one(self, document):
         class R:
             inserted_id = str(self.insert_result)
         return R()
 
-    def update_one(self, query, update):
+    async def update_one(self, query, update):
         class R:
             matched_count = 1 if self.update_result else 0
             modified_count = 1 if self.update_result else 0
         return R()
 
-    def delete_one(self, query):
+    async def delete_one(self, query):
         class R:
             deleted_count = 1 if self.update_result else 0
         return R()
@@ -56,12 +74,64 @@ def patch_collections(monkeypatch):
     fake = MockCollection()
 
     monkeypatch.setattr("app.tasks_collection", fake)
-    monkeypatch.setattr("app.forum_collection", fake)
     monkeypatch.setattr("app.guide_collection", fake)
-    monkeypatch.setattr("app.reminder_collection", fake)
 
     return fake
 
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    from cache import Cache, MemoryCache
+
+    cache = Cache(MemoryCache(), settings.cache_ttls)
+    monkeypatch.setattr("app.cache", cache)
+    return cache
+
+@pytest.fixture(autouse=True)
+def fast_passwords(monkeypatch):
+    from passwords import Passwords
+    from userrepository import user_repository
+
+    passwords = Passwords(time_cost=1, memory_cost=8, parallelism=1)
+    monkeypatch.setattr(user_repository, "passwords", passwords)
+    return passwords
+
+@pytest.fixture(autouse=True)
+def fake_reminders(monkeypatch):
+    reminders = AsyncMock()
+    reminders.find_by_user.return_value = []
+    monkeypatch.setattr("app.reminder_repository", reminders)
+    return reminders
+
+@pytest.fixture(autouse=True)
+def fake_scheduler(monkeypatch):
+    scheduler = AsyncMock()
+    monkeypatch.setattr("app.reminder_scheduler", scheduler)
+    return scheduler
+
+@pytest.fixture(autouse=True)
+def forum_broker(monkeypatch):
+    from forumstream import ForumBroker
+
+    broker = ForumBroker(queue_size=10, replay_size=10)
+    monkeypatch.setattr("app.forum_broker", broker)
+    return broker
+
+@pytest.fixture(autouse=True)
+def search_index(monkeypatch):
+    from searchindex import SearchIndex
+
+    index = SearchIndex(champions=100)
+    monkeypatch.setattr("app.search_index", index)
+    return index
+
+@pytest.fixture(autouse=True)
+def fresh_guide_store(monkeypatch):
+    from guides import GuideStore
+
+    store = GuideStore()
+    monkeypatch.setattr("app.guide_store", store)
+    return store
+
 # JWT Fixture for Authenticated Requests
 
 
@@ -77,8 +147,8 @@ def auth_header():
 def test_register_user(monkeypatch):
     from userrepository import user_repository
 
-    monkeypatch.setattr(user_repository, "find_by_email", lambda email: None)
-    monkeypatch.setattr(user_repository, "create", lambda data: "mock_user")
+    monkeypatch.setattr(user_repository, "find_by_email", AsyncMock(return_value=None))
+    monkeypatch.setattr(user_repository, "create", AsyncMock(return_value="mock_user"))
 
     payload = {
         "email": "test@example.com",
@@ -102,23 +172,139 @@ def test_register_user(monkeypatch):
     assert r.json()["user_id"] == "mock_user"
 
 
+def test_register_user_duplicate_race(monkeypatch):
+    from userrepository import user_repository
+
+    # the pre-check passes but the unique email index rejects the insert
+    monkeypatch.setattr(user_repository, "find_by_email", AsyncMock(return_value=None))
+    monkeypatch.setattr(user_repository, "create", AsyncMock(side_effect=DuplicateKeyError("E11000")))
+
+    payload = {
+        "email": "test@example.com",
+        "name": "Test",
+        "password": "secret",
+        "pregnancyMonth": 4,
+        "working": True,
+        "workHours": 8,
+        "wakeTime": "06:00",
+        "sleepTime": "22:00",
+        "mealTime": "12:00",
+        "emergencyContact": "123",
+        "dueDate": "2025-12-01",
+        "height": 160,
+        "weight": 55,
+        "age": 30
+    }
+
+    r = client.post("/register", json=payload)
+    assert r.status_code == 400
+
+
 def test_login_user(monkeypatch):
     from userrepository import user_repository
-    monkeypatch.setattr(user_repository, "find_by_email",
-                        lambda email: {"_id": VALID_ID, "email": email, "password": "secret", "name": "A", "age":30, "height":160, "weight":55, "pregnancyMonth":4, "working":True})
+    # the legacy plaintext password is rehashed on login
+    users = MagicMock(
+        find_one=AsyncMock(return_value={"_id": ObjectId(VALID_ID), "email": "x@test.com", "password": "secret", "name": "A", "age":30, "height":160, "weight":55, "pregnancyMonth":4, "working":True}),
+        update_one=AsyncMock(),
+    )
+    monkeypatch.setattr(user_repository, "collection", users)
+    refresh_tokens = MagicMock(issue=AsyncMock(return_value="refresh-1"))
+    monkeypatch.setattr("app.refresh_token_repository", refresh_tokens)
 
     monkeypatch.setattr("app.SECRET_KEY", os.getenv("JWT_SECRET_KEY"))
 
     r = client.post("/login", json={"email": "x@test.com", "password": "secret"})
     assert r.status_code == 200
     assert "token" in r.json()
+    assert r.json()["refresh_token"] == "refresh-1"
+    claims = jwt.decode(r.json()["token"], os.getenv("JWT_SECRET_KEY"), algorithms=["HS256"])
+    assert claims["email"] == "x@test.com" and claims["name"] == "A"
+    assert "password" not in refresh_tokens.issue.await_args.args[0]
+    update = users.update_one.await_args.args[1]
+    assert update["$set"]["password"].startswith("$argon2id$")
+
+
+def test_login_wrong_password(monkeypatch, fast_passwords):
+    import anyio
+    from userrepository import user_repository
+
+    stored = anyio.run(fast_passwords.hash, "secret")
+    monkeypatch.setattr(user_repository, "collection",
+                        MagicMock(find_one=AsyncMock(return_value={"_id": ObjectId(VALID_ID), "email": "x@test.com", "password": stored})))
+
+    r = client.post("/login", json={"email": "x@test.com", "password": "wrong"})
+    assert r.status_code == 401
+
+
+def test_refresh_token_rotates(monkeypatch):
+    from userrepository import user_repository
+
+    session = {"userId": VALID_ID, "family": "f1"}
+    refresh_tokens = MagicMock(rotate=AsyncMock(return_value=(session, "refresh-2")))
+    monkeypatch.setattr("app.refresh_token_repository", refresh_tokens)
+    # the profile as updated since login
+    users = MagicMock(find_one=AsyncMock(return_value={"email": "x@test.com", "name": "Renamed"}))
+    monkeypatch.setattr(user_repository, "collection", users)
+
+    r = client.post("/token/refresh", json={"refresh_token": "refresh-1"})
+
+    assert r.status_code == 200
+    assert r.json()["refresh_token"] == "refresh-2"
+    claims = jwt.decode(r.json()["token"], os.getenv("JWT_SECRET_KEY"), algorithms=["HS256"])
+    assert claims["user_id"] == VALID_ID and claims["email"] == "x@test.com" and claims["name"] == "Renamed"
+    refresh_tokens.rotate.assert_awaited_once_with("refresh-1")
+    query, projection = users.find_one.await_args.args
+    assert query == {"_id": ObjectId(VALID_ID)} and "password" not in projection
+
+
+def test_refresh_token_for_deleted_user_ends_session(monkeypatch):
+    from userrepository import user_repository
+
+    refresh_tokens = MagicMock(
+        rotate=AsyncMock(return_value=({"userId": VALID_ID, "family": "f1"}, "refresh-2")), revoke_family=AsyncMock()
+    )
+    monkeypatch.setattr("app.refresh_token_repository", refresh_tokens)
+    monkeypatch.setattr(user_repository, "collection", MagicMock(find_one=AsyncMock(return_value=None)))
+
+    r = client.post("/token/refresh", json={"refresh_token": "refresh-1"})
+
+    assert r.status_code == 401
+    refresh_tokens.revoke_family.assert_awaited_once_with("f1")
+
+
+def test_refresh_token_rejected(monkeypatch):
+    monkeypatch.setattr("app.refresh_token_repository", MagicMock(rotate=AsyncMock(return_value=None)))
+
+    r = client.post("/token/refresh", json={"refresh_token": "used"})
+    assert r.status_code == 401
+
+
+def test_logout_everywhere(monkeypatch):
+    refresh_tokens = MagicMock(
+        revoke=AsyncMock(return_value={"userId": VALID_ID}), revoke_user=AsyncMock(return_value=3)
+    )
+    monkeypatch.setattr("app.refresh_token_repository", refresh_tokens)
+
+    r = client.post("/logout", json={"refresh_token": "refresh-1", "everywhere": True})
+
+    assert r.status_code == 200
+    refresh_tokens.revoke.assert_awaited_once_with("refresh-1")
+    refresh_tokens.revoke_user.assert_awaited_once_with(VALID_ID)
+
+
+def test_login_unknown_user(monkeypatch):
+    from userrepository import user_repository
+    monkeypatch.setattr(user_repository, "collection", MagicMock(find_one=AsyncMock(return_value=None)))
+
+    r = client.post("/login", json={"email": "nobody@test.com", "password": "secret"})
+    assert r.status_code == 401
 
 
 def test_update_profile(monkeypatch, auth_header):
     from userrepository import user_repository
     monkeypatch.setattr(user_repository, "find_by_email",
-                        lambda e: {"_id": VALID_ID, "email": e})
-    monkeypatch.setattr(user_repository, "update", lambda id, d: id)
+                        AsyncMock(return_value={"_id": VALID_ID, "email": "test@example.com"}))
+    monkeypatch.setattr(user_repository, "update", AsyncMock(return_value=True))
 
     payload = {
         "email": "test@example.com",
@@ -144,8 +330,9 @@ def test_update_profile(monkeypatch, auth_header):
 # TASKS TESTS
 
 
-def test_create_task(patch_collections, auth_header):
-    patch_collections.find_one_result = None
+def test_create_task(monkeypatch, auth_header):
+    fake_repo = AsyncMock()
+    monkeypatch.setattr("app.dailytask_repository", fake_repo)
     r = client.post(
         "/tasks/u1/d1",
         json={   
@@ -162,6 +349,36 @@ def test_create_task(patch_collections, auth_header):
         headers=auth_header
     )
     assert r.status_code == 200
+    assert r.json()["tasks"][0]["title"] == "Test"
+
+
+def test_create_tasks_single_write(monkeypatch, auth_header):
+    fake_repo = AsyncMock()
+    monkeypatch.setattr("app.dailytask_repository", fake_repo)
+    preset_day = [
+        {"emoji": "💧", "title": f"Task {i}", "time": "10:00", "isPreset": True}
+        for i in range(50)
+    ]
+
+    r = client.post("/tasks/u1/d1", json={"tasks": preset_day}, headers=auth_header)
+
+    assert r.status_code == 200
+    created = r.json()["tasks"]
+    assert len(created) == 50
+    assert len({t["id"] for t in created}) == 50
+    fake_repo.add_tasks.assert_awaited_once()
+    assert fake_repo.add_tasks.await_args.args[2] == created
+
+
+def test_create_tasks_empty_payload(monkeypatch, auth_header):
+    fake_repo = AsyncMock()
+    monkeypatch.setattr("app.dailytask_repository", fake_repo)
+
+    r = client.post("/tasks/u1/d1", json={"tasks": []}, headers=auth_header)
+
+    assert r.status_code == 200
+    assert r.json() == {"tasks": []}
+    fake_repo.add_tasks.assert_not_awaited()
 
 
 def test_get_tasks(patch_collections, auth_header):
@@ -170,10 +387,24 @@ def test_get_tasks(patch_collections, auth_header):
     assert r.status_code == 200
 
 
-def test_update_task(patch_collections, auth_header):
-    patch_collections.find_one_result = {"tasks": [{"id": "t1", "completed": False}]}
+def test_update_task(monkeypatch, auth_header):
+    fake_repo = AsyncMock()
+    fake_repo.update_task_and_get.return_value = {"id": "t1", "completed": True}
+    monkeypatch.setattr("app.dailytask_repository", fake_repo)
+
     r = client.patch("/tasks/t1?userId=u1&date=d1", json={"completed": True}, headers=auth_header)
     assert r.status_code == 200
+    assert r.json()["task"] == {"id": "t1", "completed": True}
+    fake_repo.update_task_and_get.assert_awaited_once_with("u1", "d1", "t1", {"completed": True})
+
+
+def test_update_task_not_found(monkeypatch, auth_header):
+    fake_repo = AsyncMock()
+    fake_repo.update_task_and_get.return_value = None
+    monkeypatch.setattr("app.dailytask_repository", fake_repo)
+
+    r = client.patch("/tasks/t1?userId=u1&date=d1", json={"completed": True}, headers=auth_header)
+    assert r.status_code == 404
 
 
 def test_delete_task(patch_collections, auth_header):
@@ -202,27 +433,77 @@ def test_update_task_no_field(auth_header):
 # FORUM TESTS
 
 
-def test_create_forum_post(patch_collections, auth_header):
+def test_create_forum_post(monkeypatch, auth_header):
+    fake_repo = AsyncMock()
+    fake_repo.create.return_value = VALID_ID
+    monkeypatch.setattr("app.forum_repository", fake_repo)
+
     r = client.post("/forum", json={"userId": "u1", "title": "Hello", "content": "World"}, headers=auth_header)
     assert r.status_code == 201
+    assert r.json()["_id"] == VALID_ID
 
 
-def test_get_forum_post(patch_collections, auth_header):
-    patch_collections.find_one_result = {"_id": VALID_ID, "title": "Post"}
+def test_get_forum_post(monkeypatch, auth_header):
+    fake_repo = AsyncMock()
+    fake_repo.find_by_id.return_value = {"_id": VALID_ID, "title": "Post", "reply_count": 2}
+    monkeypatch.setattr("app.forum_repository", fake_repo)
+
     r = client.get(f"/forum/{VALID_ID}", headers=auth_header)
     assert r.status_code == 200
+    assert r.json()["reply_count"] == 2
 
 
-def test_add_reply(patch_collections, auth_header):
-    patch_collections.update_result = True
+def test_get_forum_post_not_found(monkeypatch, auth_header):
+    fake_repo = AsyncMock()
+    fake_repo.find_by_id.return_value = None
+    monkeypatch.setattr("app.forum_repository", fake_repo)
+
+    r = client.get("/forum/not-an-id", headers=auth_header)
+    assert r.status_code == 404
+
+
+def test_add_reply(monkeypatch, auth_header):
+    fake_posts, fake_replies = AsyncMock(), AsyncMock()
+    fake_posts.increment_reply_count.return_value = 1
+    monkeypatch.setattr("app.forum_repository", fake_posts)
+    monkeypatch.setattr("app.forum_reply_repository", fake_replies)
+
     r = client.post(f"/forum/{VALID_ID}/replies", json={"userId": "u1", "content": "Hi"}, headers=auth_header)
     assert r.status_code == 201
+    fake_posts.increment_reply_count.assert_awaited_once_with(VALID_ID)
+    stored = fake_replies.create.await_args.args[1]
+    assert stored["id"] == r.json()["id"]
+
+
+def test_add_reply_post_not_found(monkeypatch, auth_header):
+    fake_posts, fake_replies = AsyncMock(), AsyncMock()
+    fake_posts.increment_reply_count.return_value = None
+    monkeypatch.setattr("app.forum_repository", fake_posts)
+    monkeypatch.setattr("app.forum_reply_repository", fake_replies)
+
+    r = client.post(f"/forum/{VALID_ID}/replies", json={"userId": "u1", "content": "Hi"}, headers=auth_header)
+    assert r.status_code == 404
+    fake_replies.create.assert_not_awaited()
+
+
+def test_get_replies_page(monkeypatch, auth_header):
+    fake_posts, fake_replies = AsyncMock(), AsyncMock()
+    fake_replies.find_page.return_value = {"replies": [{"id": "r1", "content": "Hi"}], "next_cursor": "c1"}
+    monkeypatch.setattr("app.forum_repository", fake_posts)
+    monkeypatch.setattr("app.forum_reply_repository", fake_replies)
+
+    r = client.get(f"/forum/{VALID_ID}/replies?limit=1", headers=auth_header)
+    assert r.status_code == 200
+    assert r.json()["next_cursor"] == "c1"
+    fake_posts.find_by_id.assert_not_awaited()
 
 
 def test_get_replies_not_found(monkeypatch, auth_header):
-    fake = MockCollection()
-    fake.find_one_result = None
-    monkeypatch.setattr("app.forum_collection", fake)
+    fake_posts, fake_replies = AsyncMock(), AsyncMock()
+    fake_posts.find_by_id.return_value = None
+    fake_replies.find_page.return_value = {"replies": [], "next_cursor": None}
+    monkeypatch.setattr("app.forum_repository", fake_posts)
+    monkeypatch.setattr("app.forum_reply_repository", fake_replies)
 
     valid = str(ObjectId())
     r = client.get(f"/forum/{valid}/replies", headers=auth_header)
@@ -230,22 +511,163 @@ def test_get_replies_not_found(monkeypatch, auth_header):
 
 
 def test_get_posts_filter(monkeypatch, auth_header):
-    fake = MockCollection()
-    fake.find_result = [{"_id": VALID_ID, "userId": "u1"}]
-    monkeypatch.setattr("app.forum_collection", fake)
+    fake_repo = AsyncMock()
+    fake_repo.find_page.return_value = {"posts": [{"_id": VALID_ID, "userId": "u1", "reply_count": 0}], "next_cursor": "c1"}
+    monkeypatch.setattr("app.forum_repository", fake_repo)
     
-    r = client.get("/forum?userId=u1", headers=auth_header)
+    r = client.get("/forum?userId=u1&limit=1&after=c0", headers=auth_header)
     assert r.status_code == 200
+    assert r.json()["next_cursor"] == "c1"
+    fake_repo.find_page.assert_awaited_once_with("u1", limit=1, after="c0")
 
 
 def test_get_posts_empty(monkeypatch, auth_header):
-    fake = MockCollection()
-    fake.find_result = []
-    monkeypatch.setattr("app.forum_collection", fake)
+    fake_repo = AsyncMock()
+    fake_repo.find_page.return_value = {"posts": [], "next_cursor": None}
+    monkeypatch.setattr("app.forum_repository", fake_repo)
 
     r = client.get("/forum", headers=auth_header)
     assert r.status_code == 200
-    assert r.json() == []
+    assert r.json() == {"posts": [], "next_cursor": None}
+
+
+def test_get_posts_invalid_cursor(monkeypatch, auth_header):
+    fake_repo = AsyncMock()
+    fake_repo.find_page.side_effect = ValueError("Invalid pagination cursor")
+    monkeypatch.setattr("app.forum_repository", fake_repo)
+
+    r = client.get("/forum?after=garbage", headers=auth_header)
+    assert r.status_code == 400
+
+
+def test_get_posts_limit_capped(auth_header):
+    r = client.get("/forum?limit=1000", headers=auth_header)
+    assert r.status_code == 422
+
+
+def test_new_post_and_reply_published_to_stream(monkeypatch, auth_header, forum_broker):
+    fake_posts, fake_replies = AsyncMock(), AsyncMock()
+    fake_posts.create.return_value = VALID_ID
+    fake_posts.increment_reply_count.return_value = 3
+    monkeypatch.setattr("app.forum_repository", fake_posts)
+    monkeypatch.setattr("app.forum_reply_repository", fake_replies)
+
+    client.post("/forum", json={"userId": "u1", "title": "Hello", "content": "World"}, headers=auth_header)
+    client.post(f"/forum/{VALID_ID}/replies", json={"userId": "u2", "content": "Hi"}, headers=auth_header)
+
+    post, reply = [event.message for event in forum_broker.recent]
+    assert b"event: post\n" in post and f'"_id":"{VALID_ID}"'.encode() in post
+    assert f'data: {{"postId":"{VALID_ID}","reply_count":3}}'.encode() in reply
+
+
+def test_forum_stream_resumes_from_last_event_id(monkeypatch, auth_header, forum_broker):
+    from forumstream import ForumBroker
+
+    class EndingBroker(ForumBroker):
+        """Ends each stream once its catch-up is sent, so the response completes."""
+
+        def subscribe(self, last_event_id=None):
+            subscription = super().subscribe(last_event_id)
+            subscription.close()
+            return subscription
+
+    broker = EndingBroker(queue_size=10, replay_size=10)
+    monkeypatch.setattr("app.forum_broker", broker)
+    seen = broker.publish("post", {"title": "Seen"})
+    broker.publish("post", {"title": "Missed"})
+
+    r = client.get("/forum/stream", headers={**auth_header, "Last-Event-ID": seen})
+
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/event-stream")
+    assert r.headers["cache-control"] == "no-cache"
+    assert "Seen" not in r.text and '"title":"Missed"' in r.text
+    assert r.text.startswith("retry: 3000\n\n")
+    assert broker.subscribers == set()
+
+
+def test_forum_stream_requires_token():
+    assert client.get("/forum/stream").status_code == 401
+
+
+# SEARCH TESTS
+
+
+def test_search_unavailable_until_built(auth_header):
+    r = client.get("/search?q=ginger", headers=auth_header)
+
+    assert r.status_code == 503
+    assert r.headers["retry-after"] == "5"
+
+
+def test_search_returns_snippets(monkeypatch, auth_header, search_index, patch_collections):
+    from searchindex import Entry
+
+    post_id, reply_id = str(ObjectId()), str(ObjectId())
+    # a string _id that happens to look like an ObjectId
+    guide_id = "0123456789abcdef01234567"
+    search_index.add_batch([
+        Entry("post", post_id, "Ginger for nausea", "Ginger tea before breakfast"),
+        Entry("reply", reply_id, "", "Ginger biscuits too"),
+        Entry("guide", guide_id, "Nutrition", "Ginger and lemon"),
+        Entry("post", str(ObjectId()), "Deleted since", "Ginger"),
+    ])
+    search_index.ready = True
+    fake_posts, fake_replies = AsyncMock(), AsyncMock()
+    fake_posts.find_by_ids.return_value = [{"_id": ObjectId(post_id), "title": "Ginger for nausea", "content": "Ginger tea before breakfast"}]
+    fake_replies.find_by_ids.return_value = [{"_id": ObjectId(reply_id), "postId": ObjectId(post_id), "content": "Ginger biscuits too"}]
+    monkeypatch.setattr("app.forum_repository", fake_posts)
+    monkeypatch.setattr("app.forum_reply_repository", fake_replies)
+    patch_collections.find_result = [{"_id": guide_id, "title": "Nutrition", "content": "<p>Ginger and lemon</p>"}]
+
+    r = client.get("/search?q=ginger&limit=3", headers=auth_header)
+
+    assert r.status_code == 200
+    body = r.json()
+    assert body["next_offset"] == 3
+    results = {result["type"]: result for result in body["results"]}
+    assert len(body["results"]) <= 3
+    assert results["post"]["title_highlights"] == [[0, 6]]
+    assert results["post"]["highlights"] == [[0, 6]]
+    assert results["guide"]["snippet"].strip() == "Ginger and lemon"
+    assert results["reply"]["postId"] == post_id
+    assert results["guide"]["id"] == guide_id
+
+
+def test_search_skips_kinds_without_hits(monkeypatch, auth_header, search_index):
+    from searchindex import Entry
+
+    search_index.add(Entry("post", VALID_ID, "Kicks", "Counting kicks"))
+    search_index.ready = True
+    fake_posts, fake_replies = AsyncMock(), AsyncMock()
+    fake_posts.find_by_ids.return_value = [{"_id": ObjectId(VALID_ID), "title": "Kicks", "content": "Counting kicks"}]
+    monkeypatch.setattr("app.forum_repository", fake_posts)
+    monkeypatch.setattr("app.forum_reply_repository", fake_replies)
+
+    r = client.get("/search?q=kicks", headers=auth_header)
+
+    assert [result["id"] for result in r.json()["results"]] == [VALID_ID]
+    assert r.json()["next_offset"] is None
+    fake_replies.find_by_ids.assert_not_called()
+
+
+def test_new_post_is_searchable(monkeypatch, auth_header, search_index):
+    fake_repo = AsyncMock()
+    fake_repo.create.return_value = VALID_ID
+    monkeypatch.setattr("app.forum_repository", fake_repo)
+
+    client.post("/forum", json={"userId": "u1", "title": "Hospital bag", "content": "What to pack"}, headers=auth_header)
+
+    assert [hit.id for hit in search_index.search("pack")[0]] == [VALID_ID]
+
+
+def test_search_validates_query(auth_header):
+    assert client.get("/search?q=", headers=auth_header).status_code == 422
+    assert client.get("/search?q=a&limit=51", headers=auth_header).status_code == 422
+
+
+def test_search_requires_token():
+    assert client.get("/search?q=ginger").status_code == 401
 
 
 # GUIDE TESTS
@@ -271,8 +693,8 @@ def test_get_guide_not_found(monkeypatch, auth_header):
 # REMINDER TESTS
 
 
-def test_create_reminder(patch_collections, auth_header):
-    patch_collections.find_one_result = None
+def test_create_reminder(fake_reminders, auth_header, fake_scheduler):
+    fake_reminders.create.side_effect = lambda user_id, fields: {"id": "r1", **fields}
     r = client.post("/createreminder", json={
         "userId": "u1",
         "title": "A",
@@ -283,16 +705,33 @@ def test_create_reminder(patch_collections, auth_header):
         "repeat": "None"
     }, headers=auth_header)
     assert r.status_code == 200
+    assert r.json()["reminders"] == {"id": "r1", "title": "A", "description": "B", "date": "2025-12-01",
+                                     "time": "10:00", "category": "Health", "repeat": "None"}
+    user_id, scheduled = fake_scheduler.schedule.await_args.args
+    assert user_id == "u1" and scheduled == r.json()["reminders"]
 
 
-def test_get_reminder(patch_collections, auth_header):
-    patch_collections.find_one_result = {"reminders": [{"title": "X"}]}
+def test_get_reminder(fake_reminders, auth_header):
+    fake_reminders.find_by_user.return_value = [{"id": "r1", "title": "X"}]
     r = client.get("/getreminder?userId=u1", headers=auth_header)
     assert r.status_code == 200
+    assert r.json() == {"reminders": [{"id": "r1", "title": "X"}]}
 
 
-def test_update_reminder(patch_collections, auth_header):
-    patch_collections.find_one_result = {"reminders": [{"id": "r1"}]}
+def test_get_reminder_range_and_category(fake_reminders, auth_header):
+    r = client.get("/getreminder?userId=u1&from=2025-06-01&to=2025-06-30&category=health", headers=auth_header)
+
+    assert r.status_code == 200
+    fake_reminders.find_by_user.assert_awaited_once_with("u1", "2025-06-01", "2025-06-30", "health")
+
+
+def test_get_reminder_rejects_malformed_date(auth_header):
+    r = client.get("/getreminder?userId=u1&from=June", headers=auth_header)
+    assert r.status_code == 400
+
+
+def test_update_reminder(fake_reminders, auth_header, fake_scheduler):
+    fake_reminders.update.return_value = {"id": "r1", "title": "Updated"}
     r = client.put("/updatereminder/r1?userId=u1", json={
         "userId": "u1",
         "title": "Updated",
@@ -303,10 +742,14 @@ def test_update_reminder(patch_collections, auth_header):
         "repeat": "None"
     }, headers=auth_header)
     assert r.status_code == 200
+    assert r.json() == {"reminders": {"id": "r1", "title": "Updated"}}
+    user_id, reminder_id, fields = fake_reminders.update.await_args.args
+    assert (user_id, reminder_id) == ("u1", "r1") and "userId" not in fields
+    fake_scheduler.schedule.assert_awaited_once_with("u1", {"id": "r1", "title": "Updated"})
 
 
-def test_update_reminder_not_found(patch_collections, auth_header):
-    patch_collections.update_result = False
+def test_update_reminder_not_found(fake_reminders, auth_header):
+    fake_reminders.update.return_value = None
     r = client.put("/updatereminder/r1?userId=u1", json={
         "userId": "u1",
         "title": "Updated",
@@ -319,14 +762,54 @@ def test_update_reminder_not_found(patch_collections, auth_header):
     assert r.status_code == 404
 
 
-def test_delete_reminder(patch_collections, auth_header):
-    patch_collections.update_result = True
+def test_delete_reminder(fake_reminders, auth_header):
+    fake_reminders.delete.return_value = True
     r = client.delete("/deletereminder/r1?userId=u1", headers=auth_header)
     assert r.status_code == 200
+    fake_reminders.delete.assert_awaited_once_with("u1", "r1")
 
 
-def test_delete_reminder_not_found(patch_collections, auth_header):
-    patch_collections.update_result = False
+def test_delete_reminder_unschedules(fake_reminders, auth_header, fake_scheduler):
+    fake_reminders.delete.return_value = True
+    r = client.delete("/deletereminder/r1?userId=u1", headers=auth_header)
+
+    assert r.status_code == 200
+    fake_scheduler.unschedule.assert_awaited_once_with("r1")
+
+
+def test_due_reminders_default_window(auth_header, fake_scheduler):
+    now = datetime(2025, 6, 2, 8, 0, tzinfo=timezone.utc)
+    fake_scheduler.clock = lambda: now
+    fake_scheduler.due.return_value = [{"reminderId": "r1", "fire_at": now, "title": "Scan"}]
+
+    r = client.get("/reminders/due?userId=u1", headers=auth_header)
+
+    assert r.status_code == 200
+    assert r.json() == {"reminders": [{"reminderId": "r1", "fire_at": "2025-06-02T08:00:00+00:00", "title": "Scan"}]}
+    fake_scheduler.due.assert_awaited_once_with("u1", now, now + timedelta(days=1))
+
+
+def test_due_reminders_window_validated(auth_header):
+    too_long = client.get("/reminders/due?userId=u1&from=2025-01-01T00:00&to=2025-03-01T00:00", headers=auth_header)
+    backwards = client.get("/reminders/due?userId=u1&from=2025-01-02T00:00&to=2025-01-01T00:00", headers=auth_header)
+    malformed = client.get("/reminders/due?userId=u1&from=tomorrow", headers=auth_header)
+
+    assert too_long.status_code == backwards.status_code == malformed.status_code == 400
+
+
+@pytest.mark.parametrize("value", ["2025-01-01T00:00:00Z", "2025-01-01T00:00:00.000Z", "2025-01-01T00:00:00z"])
+def test_due_reminders_accept_utc_designator(auth_header, fake_scheduler, value):
+    fake_scheduler.due.return_value = []
+
+    r = client.get(f"/reminders/due?userId=u1&from={value}", headers=auth_header)
+
+    assert r.status_code == 200
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    fake_scheduler.due.assert_awaited_once_with("u1", start, start + timedelta(days=1))
+
+
+def test_delete_reminder_not_found(fake_reminders, auth_header):
+    fake_reminders.delete.return_value = False
     r = client.delete("/deletereminder/x?userId=u1", headers=auth_header)
     assert r.status_code == 404
 
@@ -369,24 +852,61 @@ def test_jwt_expired(monkeypatch):
 
     assert result is None
 
+
+def test_jwt_verified_once_then_cached(monkeypatch):
+    from app import token_cache
+
+    token_cache.clear()
+    decode = MagicMock(wraps=jwt.decode)
+    monkeypatch.setattr("app.jwt.decode", decode)
+
+    token = create_access_token("user1")
+    for _ in range(5):
+        assert verify_token(token)["user_id"] == "user1"
+
+    assert decode.call_count == 1
+    assert token_cache.hits == 4
+
+
+def test_jwt_invalid_token_not_cached():
+    from app import token_cache
+
+    token_cache.clear()
+    for _ in range(2):
+        with pytest.raises(HTTPException):
+            verify_token("invalidtoken123")
+
+    assert len(token_cache) == 0
+
+
+def test_security_headers_on_responses():
+    from settings import DEFAULT_CONTENT_SECURITY_POLICY
+
+    r = client.get("/users")
+
+    assert r.status_code == 401
+    assert r.headers["content-security-policy"] == DEFAULT_CONTENT_SECURITY_POLICY
+
 # WATER INTAKE TESTS
 
 
 def test_waterintake_new_day(monkeypatch, auth_header):
-    fake_repo = MagicMock()
+    fake_repo = AsyncMock()
     fake_repo.find_by_user_and_date.return_value = None
     fake_repo.find_latest_goal.return_value = 2500
-    fake_repo.create.return_value = "abc"
+    fake_repo.ensure_day.return_value = ({"_id": "abc", "goalIntake": 2500, "currentIntake": 0}, True)
 
     monkeypatch.setattr("app.waterintake_repository", fake_repo)
 
     r = client.get("/waterintake?userId=u1&date=d1", headers=auth_header)
     assert r.status_code == 200
     assert r.json()["data"]["goalIntake"] == 2500
+    assert "New day" in r.json()["message"]
+    fake_repo.ensure_day.assert_awaited_once_with("u1", "d1", 2500)
 
 
 def test_waterintake_existing(monkeypatch, auth_header):
-    fake_repo = MagicMock()
+    fake_repo = AsyncMock()
     fake_repo.find_by_user_and_date.return_value = {"goalIntake": 2000}
     monkeypatch.setattr("app.waterintake_repository", fake_repo)
 
@@ -395,8 +915,8 @@ def test_waterintake_existing(monkeypatch, auth_header):
 
 
 def test_waterintake_create_duplicate(monkeypatch, auth_header):
-    fake_repo = MagicMock()
-    fake_repo.find_by_user_and_date.return_value = {"id": "1"}
+    fake_repo = AsyncMock()
+    fake_repo.create.side_effect = DuplicateKeyError("E11000")
     monkeypatch.setattr("app.waterintake_repository", fake_repo)
 
     r = client.post("/waterintake", json={
@@ -406,51 +926,101 @@ def test_waterintake_create_duplicate(monkeypatch, auth_header):
 
 
 def test_add_waterintake_create_new(monkeypatch, auth_header):
-    fake_repo = MagicMock()
-    fake_repo.find_by_user_and_date.return_value = None
-    fake_repo.create.return_value = "abc"
+    fake_repo = AsyncMock()
+    fake_repo.add.return_value = ({"_id": "abc", "goalIntake": 2000, "currentIntake": 300}, True)
     monkeypatch.setattr("app.waterintake_repository", fake_repo)
 
     r = client.patch("/waterintake/add?userId=u1&date=d1", json={"amount": 300}, headers=auth_header)
     assert r.status_code == 200
+    assert r.json()["message"] == "Water intake tracked"
 
 
 def test_add_waterintake_existing(monkeypatch, auth_header):
-    fake_repo = MagicMock()
-    fake_repo.find_by_user_and_date.return_value = {"currentIntake": 0}
-    fake_repo.increment_intake.return_value = True
+    fake_repo = AsyncMock()
+    fake_repo.add.return_value = ({"_id": "abc", "goalIntake": 2000, "currentIntake": 300}, False)
     monkeypatch.setattr("app.waterintake_repository", fake_repo)
 
     r = client.patch("/waterintake/add?userId=u1&date=d1", json={"amount": 300}, headers=auth_header)
     assert r.status_code == 200
+    assert r.json()["data"]["currentIntake"] == 300
+    fake_repo.add.assert_awaited_once_with("u1", "d1", 300)
+    fake_repo.find_by_user_and_date.assert_not_awaited()
+
+
+class InMemoryCollection:
+    """Just enough of find_one_and_update to model concurrent upserts.
+
+    Each call yields to the event loop before touching the data so that
+    concurrent requests interleave, then applies the update atomically the
+    way a single MongoDB document write does.
+    """
+
+    def __init__(self):
+        self.documents = []
+
+    async def find_one_and_update(self, query, update, projection=None, upsert=False, return_document=None):
+        await asyncio.sleep(0)
+        doc = next((d for d in self.documents if all(d.get(k) == v for k, v in query.items())), None)
+        before = copy.deepcopy(doc)
+        if doc is None:
+            if not upsert:
+                return None
+            doc = {**query, **update.get("$setOnInsert", {})}
+            self.documents.append(doc)
+        doc.update(update.get("$set", {}))
+        for field, amount in update.get("$inc", {}).items():
+            doc[field] = doc.get(field, 0) + amount
+        return before if return_document == ReturnDocument.BEFORE else copy.deepcopy(doc)
+
+
+@pytest.mark.anyio
+async def test_add_waterintake_concurrent_first_sips(monkeypatch, auth_header):
+    from waterintakerepository import WaterIntakeRepository
+
+    repo = WaterIntakeRepository()
+    repo.collection = InMemoryCollection()
+    monkeypatch.setattr("app.waterintake_repository", repo)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        responses = await asyncio.gather(*[
+            ac.patch("/waterintake/add?userId=u1&date=d1", json={"amount": 250}, headers=auth_header)
+            for _ in range(100)
+        ])
+
+    assert all(r.status_code == 200 for r in responses)
+    assert len(repo.collection.documents) == 1
+    assert repo.collection.documents[0]["currentIntake"] == 100 * 250
+    assert repo.collection.documents[0]["goalIntake"] == 2000
+    assert sum(r.json()["message"] == "Water intake tracked" for r in responses) == 1
+    assert sorted(r.json()["data"]["currentIntake"] for r in responses) == [250 * i for i in range(1, 101)]
 
 
 def test_water_goal_create(monkeypatch, auth_header):
-    fake_repo = MagicMock()
-    fake_repo.find_by_user_and_date.return_value = None
-    fake_repo.create.return_value = "abc"
+    fake_repo = AsyncMock()
+    fake_repo.set_goal.return_value = ({"_id": "abc", "goalIntake": 2500, "currentIntake": 0}, True)
 
     monkeypatch.setattr("app.waterintake_repository", fake_repo)
-    monkeypatch.setattr("app.waterintake_collection", MockCollection())
 
     r = client.put("/waterintake/goal?userId=u1&date=d1&goalIntake=2500", headers=auth_header)
     assert r.status_code == 200
+    assert r.json()["message"] == "Water intake goal set"
 
 
 def test_water_goal_update(monkeypatch, auth_header):
-    fake_repo = MagicMock()
-    fake_repo.find_by_user_and_date.return_value = {"goalIntake": 2000}
+    fake_repo = AsyncMock()
+    fake_repo.set_goal.return_value = ({"_id": "abc", "goalIntake": 2500, "currentIntake": 750}, False)
 
     monkeypatch.setattr("app.waterintake_repository", fake_repo)
-    monkeypatch.setattr("app.waterintake_collection", MockCollection())
 
     r = client.put("/waterintake/goal?userId=u1&date=d1&goalIntake=2500", headers=auth_header)
     assert r.status_code == 200
+    assert r.json()["data"]["goalIntake"] == 2500
 
 
 def test_water_reset_not_found(monkeypatch, auth_header):
-    fake_repo = MagicMock()
-    fake_repo.find_by_user_and_date.return_value = None
+    fake_repo = AsyncMock()
+    fake_repo.update_intake_and_get.return_value = None
     monkeypatch.setattr("app.waterintake_repository", fake_repo)
 
     r = client.put("/waterintake/reset?userId=u1&date=d1", headers=auth_header)
@@ -458,18 +1028,19 @@ def test_water_reset_not_found(monkeypatch, auth_header):
 
 
 def test_water_reset_success(monkeypatch, auth_header):
-    fake_repo = MagicMock()
-    fake_repo.find_by_user_and_date.return_value = {"currentIntake": 100}
-    fake_repo.update_intake.return_value = True
+    fake_repo = AsyncMock()
+    fake_repo.update_intake_and_get.return_value = {"currentIntake": 0}
 
     monkeypatch.setattr("app.waterintake_repository", fake_repo)
 
     r = client.put("/waterintake/reset?userId=u1&date=d1", headers=auth_header)
     assert r.status_code == 200
+    assert r.json()["data"]["currentIntake"] == 0
+    fake_repo.find_by_user_and_date.assert_not_awaited()
 
 
 def test_water_delete(monkeypatch, auth_header):
-    fake_repo = MagicMock()
+    fake_repo = AsyncMock()
     fake_repo.delete.return_value = True
     monkeypatch.setattr("app.waterintake_repository", fake_repo)
 
@@ -478,9 +1049,429 @@ def test_water_delete(monkeypatch, auth_header):
 
 
 def test_water_delete_not_found(monkeypatch, auth_header):
-    fake_repo = MagicMock()
+    fake_repo = AsyncMock()
     fake_repo.delete.return_value = False
     monkeypatch.setattr("app.waterintake_repository", fake_repo)
 
     r = client.delete("/waterintake?userId=u1&date=d1", headers=auth_header)
     assert r.status_code == 404
+
+
+# MOOD TESTS
+
+
+def test_create_mood_updates_existing_in_one_call(monkeypatch, auth_header):
+    fake_repo = AsyncMock()
+    fake_repo.update_and_get.return_value = {"_id": VALID_ID, "mood": "calm"}
+    monkeypatch.setattr("app.mood_repository", fake_repo)
+
+    r = client.post("/mood", json={"userId": "u1", "date": "d1", "mood": "calm"}, headers=auth_header)
+    assert r.status_code == 201
+    assert r.json()["message"] == "Mood updated"
+    fake_repo.create.assert_not_awaited()
+
+
+def test_create_mood_new_entry(monkeypatch, auth_header):
+    fake_repo = AsyncMock()
+    fake_repo.update_and_get.return_value = None
+    fake_repo.create.return_value = "m1"
+    monkeypatch.setattr("app.mood_repository", fake_repo)
+
+    r = client.post("/mood", json={"userId": "u1", "date": "d1", "mood": "happy"}, headers=auth_header)
+    assert r.status_code == 201
+    assert r.json()["data"]["_id"] == "m1"
+
+
+def test_get_mood_range(monkeypatch, auth_header):
+    fake_repo = AsyncMock()
+    fake_repo.find_by_user.return_value = []
+    monkeypatch.setattr("app.mood_repository", fake_repo)
+
+    r = client.get("/mood?userId=u1&from=2025-01-01&to=2025-03-31", headers=auth_header)
+
+    assert r.status_code == 200
+    fake_repo.find_by_user.assert_awaited_once_with("u1", limit=366, date_from="2025-01-01", date_to="2025-03-31")
+
+
+def test_get_mood_range_rejects_bad_date(monkeypatch, auth_header):
+    monkeypatch.setattr("app.mood_repository", AsyncMock())
+
+    r = client.get("/mood?userId=u1&from=01/02/2025", headers=auth_header)
+    assert r.status_code == 400
+
+
+def test_mood_summary_defaults_to_last_year(monkeypatch, auth_header):
+    fake_repo = AsyncMock()
+    fake_repo.summarize.return_value = {"total": 0}
+    monkeypatch.setattr("app.mood_repository", fake_repo)
+
+    r = client.get("/mood/summary?userId=u1&to=2025-12-31&period=month", headers=auth_header)
+
+    assert r.status_code == 200
+    assert r.json() == {"total": 0}
+    fake_repo.summarize.assert_awaited_once_with("u1", "2025-01-01", "2025-12-31", "month")
+
+
+def test_mood_summary_validates_params(monkeypatch, auth_header):
+    monkeypatch.setattr("app.mood_repository", AsyncMock())
+
+    assert client.get("/mood/summary?userId=u1&period=day", headers=auth_header).status_code == 422
+    r = client.get("/mood/summary?userId=u1&from=2025-02-01&to=2025-01-01", headers=auth_header)
+    assert r.status_code == 400
+
+
+def test_update_mood_not_found(monkeypatch, auth_header):
+    fake_repo = AsyncMock()
+    fake_repo.update_and_get.return_value = None
+    monkeypatch.setattr("app.mood_repository", fake_repo)
+
+    r = client.put("/mood", json={"userId": "u1", "date": "d1", "mood": "happy"}, headers=auth_header)
+    assert r.status_code == 404
+
+
+def test_forum_listing_renders_object_ids(monkeypatch, auth_header):
+    post_id = ObjectId()
+    fake_repo = AsyncMock()
+    fake_repo.find_page.return_value = {"posts": [{"_id": post_id, "title": "Hi"}], "next_cursor": None}
+    monkeypatch.setattr("app.forum_repository", fake_repo)
+
+    r = client.get("/forum", headers=auth_header)
+
+    assert r.status_code == 200
+    assert r.json() == {"posts": [{"_id": str(post_id), "title": "Hi"}], "next_cursor": None}
+
+
+# CACHE TESTS
+
+
+def test_guide_served_from_index_until_refresh(patch_collections, auth_header, monkeypatch):
+    patch_collections.find_result = [{"_id": "g1", "title": "Week 12"}]
+    monkeypatch.setattr("app.settings", replace(settings, admin_token="t"))
+
+    first = client.get("/guide/g1", headers=auth_header)
+    patch_collections.find_result = [{"_id": "g1", "title": "changed"}]
+    second = client.get("/guide/g1", headers=auth_header)
+    refreshed = client.post("/guide/refresh", headers={"X-Admin-Token": "t"})
+    third = client.get("/guide/g1", headers=auth_header)
+
+    assert first.json() == second.json() == {"_id": "g1", "title": "Week 12"}
+    assert refreshed.json()["documents"] == 1
+    assert refreshed.json()["other_workers_within_s"] == settings.guide_version_check_s
+    assert third.json() == {"_id": "g1", "title": "changed"}
+
+
+def test_guide_conditional_get(patch_collections, auth_header):
+    patch_collections.find_result = [{"_id": "g1", "title": "Week 12"}]
+
+    first = client.get("/guide/g1", headers=auth_header)
+    etag = first.headers["etag"]
+    second = client.get("/guide/g1", headers={**auth_header, "If-None-Match": etag})
+
+    assert first.headers["cache-control"] == settings.guide_cache_control
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["etag"] == etag
+
+
+def test_guide_listing_compressed_when_accepted(patch_collections, auth_header):
+    patch_collections.find_result = [{"_id": f"g{i}", "title": f"Week {i}", "body": "x" * 100} for i in range(40)]
+
+    r = client.get("/guide", headers={**auth_header, "Accept-Encoding": "gzip"})
+
+    assert r.status_code == 200
+    assert r.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in r.headers["vary"]
+    assert len(r.json()["documents"]) == 40
+
+
+def test_guide_refresh_requires_admin_token(monkeypatch):
+    r = client.post("/guide/refresh")
+    assert r.status_code == 403
+
+    monkeypatch.setattr("app.settings", replace(settings, admin_token="t"))
+    r = client.post("/guide/refresh", headers={"X-Admin-Token": "wrong"})
+    assert r.status_code == 403
+
+
+def test_guide_missing(patch_collections, auth_header):
+    patch_collections.find_result = [{"_id": "g1", "title": "Week 12"}]
+
+    r = client.get("/guide/nope", headers=auth_header)
+    assert r.status_code == 404
+
+
+def test_create_reminder_invalidates_cached_list(fake_reminders, auth_header):
+    fake_reminders.create.side_effect = lambda user_id, fields: {"id": "r1", **fields}
+    assert client.get("/getreminder?userId=u1", headers=auth_header).json() == {"reminders": []}
+
+    reminder = {"userId": "u1", "title": "Scan", "description": "", "date": "2025-06-02",
+                "time": "10:00", "category": "appointment", "repeat": "none"}
+    created = client.post("/createreminder", json=reminder, headers=auth_header).json()["reminders"]
+    fake_reminders.find_by_user.return_value = [created]
+
+    r = client.get("/getreminder?userId=u1", headers=auth_header)
+    assert r.json() == {"reminders": [created]}
+
+
+def test_user_profile_cached_until_update(monkeypatch, auth_header):
+    profile = {
+        "_id": "abc", "email": "ana@example.com", "name": "Ana", "pregnancyMonth": 5, "working": True,
+        "workHours": 8, "wakeTime": "07:00", "sleepTime": "22:00", "mealTime": "12:00",
+        "emergencyContact": "123", "dueDate": "2025-10-01", "height": 165.0, "weight": 60.0, "age": 30,
+    }
+    fake_repo = AsyncMock()
+    fake_repo.find_by_email.return_value = profile
+    monkeypatch.setattr("app.user_repository", fake_repo)
+
+    assert client.get("/user/ana@example.com", headers=auth_header).json()["userdata"]["name"] == "Ana"
+    assert client.get("/user/ana@example.com", headers=auth_header).status_code == 200
+    assert fake_repo.find_by_email.await_count == 1
+
+    update = {k: v for k, v in profile.items() if k != "_id"}
+    update["name"] = "Ana Maria"
+    assert client.put("/updateprofile", json=update, headers=auth_header).status_code == 200
+    fake_repo.find_by_email.return_value = {**profile, "name": "Ana Maria"}
+
+    r = client.get("/user/ana@example.com", headers=auth_header)
+    assert r.json()["userdata"]["name"] == "Ana Maria"
+
+
+def test_user_profile_missing(monkeypatch, auth_header):
+    fake_repo = AsyncMock()
+    fake_repo.find_by_email.return_value = None
+    monkeypatch.setattr("app.user_repository", fake_repo)
+
+    r = client.get("/user/nobody@example.com", headers=auth_header)
+    assert r.status_code == 404
+
+
+# DASHBOARD TESTS
+
+
+def test_dashboard_combines_day(monkeypatch, auth_header, fake_reminders):
+    tasks = AsyncMock()
+    tasks.find_one.return_value = {"tasks": [{"id": "t1", "title": "Walk"}]}
+    # the range query also returns repeating reminders that are not due today
+    fake_reminders.find_by_user.return_value = [
+        {"id": "r1", "date": "2025-06-02", "repeat": "none"},
+        {"id": "r2", "date": "2025-05-27", "repeat": "weekly"},
+        {"id": "r3", "date": "2025-05-26", "repeat": "weekly"},
+    ]
+    water = AsyncMock()
+    water.find_by_user_and_date.return_value = {"goalIntake": 2000, "currentIntake": 500}
+    mood = AsyncMock()
+    mood.find_by_user_and_date.return_value = {"mood": "calm"}
+    monkeypatch.setattr("app.tasks_collection", tasks)
+    monkeypatch.setattr("app.waterintake_repository", water)
+    monkeypatch.setattr("app.mood_repository", mood)
+
+    r = client.get("/dashboard?userId=u1&date=2025-06-02", headers=auth_header)
+
+    assert r.status_code == 200
+    fake_reminders.find_by_user.assert_awaited_once_with("u1", date_from="2025-06-02", date_to="2025-06-02")
+    body = r.json()
+    assert body["tasks"] == [{"id": "t1", "title": "Walk"}]
+    assert body["waterIntake"] == {"goalIntake": 2000, "currentIntake": 500}
+    assert body["mood"] == {"mood": "calm"}
+    assert [rem["id"] for rem in body["reminders"]] == ["r1", "r3"]
+    water.ensure_day.assert_not_awaited()
+
+
+def test_dashboard_empty_day_starts_water(monkeypatch, auth_header):
+    empty = AsyncMock()
+    empty.find_one.return_value = None
+    water = AsyncMock()
+    water.find_by_user_and_date.return_value = None
+    water.find_latest_goal.return_value = 2500
+    water.ensure_day.return_value = ({"goalIntake": 2500, "currentIntake": 0}, True)
+    mood = AsyncMock()
+    mood.find_by_user_and_date.return_value = None
+    monkeypatch.setattr("app.tasks_collection", empty)
+    monkeypatch.setattr("app.waterintake_repository", water)
+    monkeypatch.setattr("app.mood_repository", mood)
+
+    r = client.get("/dashboard?userId=u1&date=2025-06-02", headers=auth_header)
+
+    assert r.status_code == 200
+    assert r.json() == {
+        "tasks": [],
+        "waterIntake": {"goalIntake": 2500, "currentIntake": 0},
+        "mood": None,
+        "reminders": [],
+    }
+    water.ensure_day.assert_awaited_once_with("u1", "2025-06-02", 2500)
+
+
+def test_dashboard_lookups_run_concurrently(monkeypatch, auth_header, fake_reminders):
+    started = []
+
+    def lookup(result):
+        async def wait_for_all(*args, **kwargs):
+            started.append(1)
+            # only completes if all four lookups are in flight together
+            for _ in range(100):
+                if len(started) == 4:
+                    return result
+                await asyncio.sleep(0)
+            raise AssertionError("dashboard lookups ran one after another")
+        return wait_for_all
+
+    tasks = AsyncMock()
+    tasks.find_one.side_effect = lookup(None)
+    fake_reminders.find_by_user.side_effect = lookup([])
+    water = AsyncMock()
+    water.find_by_user_and_date.side_effect = lookup({"currentIntake": 0})
+    mood = AsyncMock()
+    mood.find_by_user_and_date.side_effect = lookup(None)
+    monkeypatch.setattr("app.tasks_collection", tasks)
+    monkeypatch.setattr("app.waterintake_repository", water)
+    monkeypatch.setattr("app.mood_repository", mood)
+
+    r = client.get("/dashboard?userId=u1&date=2025-06-02", headers=auth_header)
+
+    assert r.status_code == 200
+
+
+def test_dashboard_requires_token():
+    r = client.get("/dashboard?userId=u1&date=2025-06-02")
+    assert r.status_code == 401
+
+
+@pytest.mark.parametrize("reminder, day, due", [
+    ({"date": "2025-06-02", "repeat": "none"}, "2025-06-02", True),
+    ({"date": "2025-06-01", "repeat": "none"}, "2025-06-02", False),
+    ({"date": "2025-06-01", "repeat": "daily"}, "2025-06-02", True),
+    ({"date": "2025-06-03", "repeat": "daily"}, "2025-06-02", False),
+    ({"date": "2025-05-26", "repeat": "weekly"}, "2025-06-02", True),
+    ({"date": "2025-05-27", "repeat": "weekly"}, "2025-06-02", False),
+    ({"date": "2025-04-02", "repeat": "monthly"}, "2025-06-02", True),
+    ({"date": "", "repeat": "daily"}, "2025-06-02", False),
+])
+def test_reminder_due_on(reminder, day, due):
+    from app import reminder_due_on
+
+    assert reminder_due_on(reminder, day) is due
+
+
+# HEALTH TESTS
+
+
+def test_healthz():
+    r = client.get("/healthz")
+    assert r.status_code == 200
+    assert r.json() == {"status": "ok"}
+
+
+def test_readyz_ok(monkeypatch):
+    monkeypatch.setattr("app.mongo_db.ping", AsyncMock())
+
+    r = client.get("/readyz")
+
+    assert r.status_code == 200
+    assert r.json()["status"] == "ok"
+
+
+def test_readyz_mongo_unreachable(monkeypatch):
+    from pymongo.errors import ServerSelectionTimeoutError
+
+    monkeypatch.setattr("app.mongo_db.ping", AsyncMock(side_effect=ServerSelectionTimeoutError("no servers")))
+
+    r = client.get("/readyz")
+
+    assert r.status_code == 503
+    assert r.json()["status"] == "unavailable"
+
+
+def test_readyz_pool_saturated(monkeypatch):
+    ping = AsyncMock()
+    monkeypatch.setattr("app.mongo_db.ping", ping)
+    monkeypatch.setattr("app.pool_metrics.saturated", lambda max_pool_size: True)
+
+    r = client.get("/readyz")
+
+    assert r.status_code == 503
+    assert r.json()["status"] == "saturated"
+    ping.assert_not_awaited()
+
+
+# LIFESPAN TESTS
+
+
+@pytest.mark.anyio
+async def test_lifespan_sizes_threadpool_and_closes_client(monkeypatch):
+    from anyio import to_thread
+    from app import lifespan
+
+    ensure = AsyncMock()
+    fake_db = MagicMock()
+    fake_db.close = AsyncMock()
+    close = fake_db.close
+    monkeypatch.setattr("app.ensure_indexes", ensure)
+    monkeypatch.setattr("app.mongo_db", fake_db)
+    monkeypatch.setattr("app.guide_store", AsyncMock())
+    monkeypatch.setattr("app.settings", replace(settings, threadpool_size=7))
+    limiter = to_thread.current_default_thread_limiter()
+    original = limiter.total_tokens
+
+    try:
+        async with lifespan(app):
+            assert limiter.total_tokens == 7
+            # indexes are created in the background
+            for _ in range(5):
+                await asyncio.sleep(0)
+            ensure.assert_awaited_once_with(fake_db.db)
+        close.assert_awaited_once()
+    finally:
+        limiter.total_tokens = original
+
+
+@pytest.mark.anyio
+async def test_lifespan_boots_while_mongo_unreachable(monkeypatch):
+    from functools import partial
+
+    from pymongo.errors import ServerSelectionTimeoutError
+
+    from app import lifespan
+    from database import retry
+
+    ensure = AsyncMock(side_effect=[ServerSelectionTimeoutError("no servers"), None])
+    store = AsyncMock()
+    monkeypatch.setattr("app.ensure_indexes", ensure)
+    monkeypatch.setattr("app.mongo_db", MagicMock(close=AsyncMock()))
+    monkeypatch.setattr("app.guide_store", store)
+    monkeypatch.setattr("app.retry", partial(retry, first_delay_s=0))
+
+    async with lifespan(app):
+        assert client.get("/healthz").status_code == 200
+        for _ in range(10):
+            await asyncio.sleep(0)
+        assert ensure.await_count == 2
+        store.refresh.assert_awaited_once()
+
+
+@pytest.mark.anyio
+async def test_search_index_build_retried_after_mongo_error(monkeypatch, search_index):
+    from functools import partial
+
+    from pymongo.errors import NetworkTimeout
+
+    from app import build_search_index
+    from database import retry
+
+    attempts = []
+
+    async def build(sources):
+        attempts.append(sources)
+        if len(attempts) == 1:
+            raise NetworkTimeout("cursor timed out")
+        search_index.ready = True
+        return 0
+
+    monkeypatch.setattr(search_index, "build", build)
+    monkeypatch.setattr("app.retry", partial(retry, first_delay_s=0))
+
+    await build_search_index()
+
+    assert len(attempts) == 2
+    assert search_index.ready
+
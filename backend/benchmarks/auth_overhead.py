@@ -0,0 +1,60 @@
+"""Per-request cost of validate_token_manual with and without the token cache.
+
+Builds one bearer token and a request scope carrying it, then times
+validate_token_manual for repeated calls, the way a dashboard load repeats
+one token across many requests. Cold runs disable the cache so every call
+performs the full jwt.decode. No database is contacted, but importing app
+still needs MONGO_URI set.
+
+    MONGO_URI=mongodb://localhost:27017 python benchmarks/auth_overhead.py --calls 100000
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from starlette.requests import Request  # noqa: E402
+
+import app  # noqa: E402
+from tokencache import TokenCache  # noqa: E402
+
+
+def make_request(token):
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/tasks",
+        "headers": [(b"authorization", f"Bearer {token}".encode())],
+    }
+    return Request(scope)
+
+
+def time_validation(request, calls, repeat):
+    timer = timeit.Timer(lambda: app.validate_token_manual(request))
+    best = min(timer.repeat(repeat=repeat, number=calls))
+    return best / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    request = make_request(app.create_access_token("bench_user"))
+
+    app.token_cache = TokenCache(maxsize=0)
+    uncached = time_validation(request, args.calls, args.repeat)
+
+    app.token_cache = TokenCache()
+    cached = time_validation(request, args.calls, args.repeat)
+
+    print(f"jwt.decode every call : {uncached:8.2f} us/request")
+    print(f"token cache           : {cached:8.2f} us/request")
+    print(f"speedup               : {uncached / cached:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
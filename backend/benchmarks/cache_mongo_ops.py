@@ -0,0 +1,156 @@
+"""Mongo operations issued for a read-heavy request mix, with and without the cache.
+
+Drives the app in-process through httpx's ASGI transport. The guide,
+reminder and user collections are replaced by in-memory fakes that count
+every operation, so no mongod is needed. Guides come from the in-process
+index in every run, so they cost one ``find`` when the index is built. The mix is mostly GET /guide,
+/guide/{id}, /user/{id} and /getreminder, with a small share of reminder
+and profile writes that invalidate cached entries.
+
+    python benchmarks/cache_mongo_ops.py --requests 5000 --write-ratio 0.05
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+from bson import ObjectId  # noqa: E402
+
+import app as app_module  # noqa: E402
+from cache import Cache, MemoryCache, NullCache  # noqa: E402
+from guides import GuideStore  # noqa: E402
+from settings import settings  # noqa: E402
+from userrepository import UserRepository  # noqa: E402
+
+USERS = [f"user{i}@example.com" for i in range(50)]
+USER_IDS = {user: ObjectId() for user in USERS}
+GUIDES = [{"_id": f"week-{i}", "title": f"Week {i}", "body": "Guide text. " * 200} for i in range(40)]
+
+
+class Result:
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+
+class CountingCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length=None):
+        return list(self.docs)
+
+
+class CountingCollection:
+    """Dict-backed stand-in that counts operations by name."""
+
+    def __init__(self, ops, key, docs):
+        self.ops = ops
+        self.key = key
+        self.docs = {doc[key]: dict(doc) for doc in docs}
+
+    def _match(self, query):
+        return self.docs.get(query.get(self.key))
+
+    async def find_one(self, query, projection=None):
+        self.ops["find_one"] += 1
+        doc = self._match(query)
+        return dict(doc) if doc else None
+
+    def find(self, query=None, projection=None):
+        self.ops["find"] += 1
+        return CountingCursor([dict(d) for d in self.docs.values()])
+
+    async def insert_one(self, document):
+        self.ops["insert_one"] += 1
+        self.docs[document[self.key]] = document
+        return Result(inserted_id=document.get("_id"))
+
+    async def update_one(self, query, update, upsert=False):
+        self.ops["update_one"] += 1
+        doc = self._match(query)
+        if doc is None:
+            return Result(matched_count=0, modified_count=0)
+        doc.update(update.get("$set", {}))
+        for field, value in update.get("$push", {}).items():
+            doc.setdefault(field, []).append(value)
+        return Result(matched_count=1, modified_count=1)
+
+
+def profile(email):
+    return {
+        "_id": USER_IDS[email], "email": email, "name": "Bench", "password": "x", "pregnancyMonth": 5, "working": True,
+        "workHours": 8, "wakeTime": "07:00", "sleepTime": "22:00", "mealTime": "12:00",
+        "emergencyContact": "123", "dueDate": "2025-10-01", "height": 165.0, "weight": 60.0, "age": 30,
+    }
+
+
+def install_fakes(backend):
+    ops = Counter()
+    app_module.guide_collection = CountingCollection(ops, "_id", GUIDES)
+    app_module.guide_store = GuideStore()
+    app_module.reminder_collection = CountingCollection(
+        ops, "userId", [{"_id": u, "userId": u, "reminders": []} for u in USERS]
+    )
+    users = UserRepository()
+    users.collection = CountingCollection(ops, "email", [profile(u) for u in USERS])
+    app_module.user_repository = users
+    app_module.cache = Cache(backend, settings.cache_ttls)
+    return ops
+
+
+async def issue(client, rng, write_ratio):
+    user = rng.choice(USERS)
+    if rng.random() < write_ratio:
+        if rng.random() < 0.5:
+            reminder = {"userId": user, "title": "Scan", "description": "", "date": "2025-06-02",
+                        "time": "10:00", "category": "appointment", "repeat": "none"}
+            return await client.post("/createreminder", json=reminder)
+        update = {k: v for k, v in profile(user).items() if k not in ("_id", "password")}
+        return await client.put("/updateprofile", json=update)
+    path = rng.choice([
+        "/guide",
+        f"/guide/{rng.choice(GUIDES)['_id']}",
+        f"/user/{user}",
+        f"/getreminder?userId={user}",
+    ])
+    return await client.get(path)
+
+
+async def run(backend, args):
+    ops = install_fakes(backend)
+    rng = random.Random(args.seed)
+    token = app_module.create_access_token("bench")
+    transport = httpx.ASGITransport(app=app_module.app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", headers={"Authorization": f"Bearer {token}"}
+    ) as client:
+        start = time.perf_counter()
+        for _ in range(args.requests):
+            response = await issue(client, rng, args.write_ratio)
+            response.raise_for_status()
+        elapsed = time.perf_counter() - start
+    return ops, elapsed
+
+
+async def main(args):
+    for label, backend in (("no cache", NullCache()), ("memory cache", MemoryCache())):
+        ops, elapsed = await run(backend, args)
+        total = sum(ops.values())
+        print(
+            f"{label:<13} {total:>7} mongo ops ({total / args.requests:.2f}/request)  "
+            f"{args.requests / elapsed:>8.0f} req/s  {dict(ops)}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--write-ratio", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,76 @@
+"""CPU cost of CommandMetricsListener per Mongo command.
+
+Feeds the listener started/succeeded event pairs shaped like the app's
+commands, without a server, and reports the time per pair. That is the
+overhead the listener adds to each round trip. It is measured with and
+without ``measure_bytes``, for a small findAndModify reply and for find
+replies of ``--docs`` documents.
+
+    python benchmarks/command_metrics.py --pairs 20000 --docs 100
+"""
+import argparse
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId  # noqa: E402
+
+from mongometrics import CommandMetricsListener, count_commands  # noqa: E402
+
+
+def post(n):
+    return {
+        "_id": ObjectId(),
+        "userId": f"user{n}@example.com",
+        "title": "Sleeping positions in the third trimester",
+        "content": "A wedge pillow under the bump helped me more than anything else. " * 4,
+        "created_at": "2025-06-02T08:30:00.000+00:00",
+        "reply_count": n % 7,
+    }
+
+
+def events(command_name, command, reply):
+    started = SimpleNamespace(command_name=command_name, command=command, connection_id=("db", 27017), request_id=1)
+    succeeded = SimpleNamespace(command_name=command_name, reply=reply, connection_id=("db", 27017), request_id=1,
+                                duration_micros=800)
+    return started, succeeded
+
+
+def measure(listener, started, succeeded, pairs):
+    with count_commands():
+        begin = time.perf_counter()
+        for _ in range(pairs):
+            listener.started(started)
+            listener.succeeded(succeeded)
+        return (time.perf_counter() - begin) / pairs * 1e6
+
+
+def main(args):
+    shapes = {
+        "findAndModify, 1 doc": events(
+            "findAndModify",
+            {"findAndModify": "water_intake", "query": {"userId": "u1", "date": "2025-06-02"},
+             "update": {"$inc": {"currentIntake": 250}}},
+            {"lastErrorObject": {"n": 1, "updatedExisting": True}, "value": {"currentIntake": 1250}, "ok": 1},
+        ),
+        f"find, {args.docs} docs": events(
+            "find",
+            {"find": "forum_posts", "filter": {}, "sort": {"created_at": -1, "_id": -1}, "limit": args.docs},
+            {"cursor": {"firstBatch": [post(n) for n in range(args.docs)], "id": 0, "ns": "mamasync.forum_posts"},
+             "ok": 1},
+        ),
+    }
+    for label, (started, succeeded) in shapes.items():
+        with_bytes = measure(CommandMetricsListener(measure_bytes=True), started, succeeded, args.pairs)
+        without = measure(CommandMetricsListener(measure_bytes=False), started, succeeded, args.pairs)
+        print(f"{label:<22} {without:7.1f} us per command, {with_bytes:7.1f} us with byte sizes")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pairs", type=int, default=20000)
+    parser.add_argument("--docs", type=int, default=100)
+    main(parser.parse_args())
@@ -0,0 +1,91 @@
+"""Bytes on the wire and CPU cost of compressing /forum and /mood bodies.
+
+Builds realistic response bodies (a default 20-post and a full 100-post
+forum page, and the 30-day mood history) with the same serializer the app
+uses, then compresses each with the encoders CompressionMiddleware uses at
+several levels. CPU time is process time per response. No database is
+needed.
+
+    python benchmarks/compression.py --runs 500
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId  # noqa: E402
+
+from middleware import _BrotliEncoder, _GzipEncoder, brotli  # noqa: E402
+from responses import dumps  # noqa: E402
+
+
+def forum_page(count):
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    posts = [
+        {
+            "_id": ObjectId(),
+            "userId": f"user{i % 50}@example.com",
+            "name": f"User {i % 50}",
+            "title": f"Question number {i} about the third trimester",
+            "content": "Has anyone else had trouble sleeping this week? My back aches by evening. " * 3,
+            "created_at": (start + timedelta(minutes=i)).isoformat(timespec="milliseconds"),
+            "reply_count": i % 12,
+        }
+        for i in range(count)
+    ]
+    return {"posts": posts, "next_cursor": "NjdhMGJjZDEyMzQ1Njc4OWFiY2RlZjAxfDIwMjUtMDEtMDFUMDA6MDA6MDAuMDAwWg"}
+
+
+def mood_history(days):
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    moods = ["happy", "calm", "tired", "anxious", "unwell"]
+    return {
+        "data": [
+            {
+                "_id": ObjectId(),
+                "userId": "user1@example.com",
+                "date": (start - timedelta(days=i)).date().isoformat(),
+                "mood": moods[i % len(moods)],
+                "created_at": (start - timedelta(days=i)).isoformat(timespec="milliseconds"),
+                "updated_at": (start - timedelta(days=i)).isoformat(timespec="milliseconds"),
+            }
+            for i in range(days)
+        ]
+    }
+
+
+def encoders():
+    for level in (1, 6, 9):
+        yield f"gzip -{level}", lambda level=level: _GzipEncoder(level)
+    if brotli is not None:
+        for quality in (1, 4, 11):
+            yield f"br q{quality}", lambda quality=quality: _BrotliEncoder(quality)
+
+
+def measure(body, make_encoder, runs):
+    start = time.process_time()
+    for _ in range(runs):
+        compressed = make_encoder().finish(body)
+    return len(compressed), (time.process_time() - start) / runs * 1e6
+
+
+def main(args):
+    bodies = {
+        "/forum (20 posts)": dumps(forum_page(20)),
+        "/forum (100 posts)": dumps(forum_page(100)),
+        "/mood (30 days)": dumps(mood_history(30)),
+    }
+    for name, body in bodies.items():
+        print(f"{name}: {len(body)} bytes uncompressed")
+        for label, make_encoder in encoders():
+            size, cpu_us = measure(body, make_encoder, args.runs)
+            print(f"  {label:<8} {size:>7} bytes ({size / len(body):5.1%})  {cpu_us:8.1f} us CPU")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=500)
+    main(parser.parse_args())
@@ -0,0 +1,65 @@
+"""Dashboard page-load latency: four endpoint calls vs one GET /dashboard.
+
+A page load used to be GET /tasks, /waterintake, /mood and /getreminder,
+issued in parallel like the browser does. Each simulated client repeats
+that fan-out, or a single /dashboard call, and the script reports the
+latency of a whole page load. Start the API against a seeded local mongod
+first (see loadgen.py), then
+
+    JWT_SECRET_KEY=... python benchmarks/dashboard_latency.py --concurrency 50 --duration 20
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+from loadgen import make_token, percentile
+
+SEPARATE = [
+    "/tasks?userId={user}&date={date}",
+    "/waterintake?userId={user}&date={date}",
+    "/mood?userId={user}&date={date}",
+    "/getreminder?userId={user}",
+]
+COMBINED = ["/dashboard?userId={user}&date={date}"]
+
+
+async def page_loads(client, paths, deadline, latencies):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        responses = await asyncio.gather(*(client.get(path) for path in paths))
+        for response in responses:
+            response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+
+
+async def measure(args, headers, templates):
+    paths = [p.format(user=args.user, date=args.date) for p in templates]
+    latencies = []
+    limits = httpx.Limits(max_connections=args.concurrency * len(paths))
+    async with httpx.AsyncClient(base_url=args.url, headers=headers, limits=limits, timeout=30) as client:
+        deadline = time.perf_counter() + args.duration
+        await asyncio.gather(*(page_loads(client, paths, deadline, latencies) for _ in range(args.concurrency)))
+    return latencies
+
+
+async def main(args):
+    headers = {"Authorization": f"Bearer {make_token(args.user)}"}
+    for label, templates in (("4 requests / page", SEPARATE), ("/dashboard", COMBINED)):
+        latencies = await measure(args, headers, templates)
+        print(
+            f"{label:<18} {len(latencies):>7} pages  {len(latencies) / args.duration:>8.1f} pages/s  "
+            f"p50 {percentile(latencies, 50) * 1000:>7.1f} ms  p99 {percentile(latencies, 99) * 1000:>7.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--user", default="loadtest@example.com")
+    parser.add_argument("--date", default=datetime.now(timezone.utc).date().isoformat())
+    asyncio.run(main(parser.parse_args()))
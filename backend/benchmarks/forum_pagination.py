@@ -0,0 +1,85 @@
+"""Page-fetch latency for GET /forum at increasing depth.
+
+Seeds a scratch database with ``--posts`` forum posts (100k by default),
+then walks the whole listing with keyset cursors and reports the latency
+of pages at several depths next to the equivalent skip()-based query.
+Keyset pages should stay flat while skip() grows with depth.
+
+    MONGO_URI=mongodb://localhost:27017 MONGO_DB=mamasync_bench \\
+        python benchmarks/forum_pagination.py --posts 100000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import mongo_db  # noqa: E402
+from forumrepository import POST_PROJECTION, POST_SORT, ForumRepository  # noqa: E402
+from indexes import ensure_indexes  # noqa: E402
+
+DEPTHS = [1, 10, 100, 1000, 2500, 4999]
+
+
+async def seed(collection, total, batch=5000):
+    existing = await collection.count_documents({})
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for offset in range(existing, total, batch):
+        docs = []
+        for i in range(offset, min(offset + batch, total)):
+            created = start + timedelta(seconds=i)
+            docs.append({
+                "userId": f"user{i % 500}",
+                "title": f"Post {i}",
+                "content": "lorem ipsum " * 20,
+                "created_at": created.isoformat(timespec="milliseconds"),
+                "replies": [{"id": str(j), "userId": "u", "content": "reply " * 10} for j in range(i % 8)],
+            })
+        await collection.insert_many(docs, ordered=False)
+    return max(existing, total)
+
+
+async def timed(coro):
+    start = time.perf_counter()
+    result = await coro
+    return result, (time.perf_counter() - start) * 1000
+
+
+async def main(args):
+    repo = ForumRepository()
+    await ensure_indexes(mongo_db.db)
+    total = await seed(repo.collection, args.posts)
+    print(f"{total} posts, page size {args.limit}")
+
+    wanted = {d for d in DEPTHS if d * args.limit <= total}
+    keyset, after, page_no = {}, None, 0
+    while True:
+        page_no += 1
+        page, ms = await timed(repo.find_page(limit=args.limit, after=after))
+        if page_no in wanted:
+            keyset[page_no] = ms
+        after = page["next_cursor"]
+        if not after:
+            break
+
+    print(f"{'page':>6} {'keyset ms':>10} {'skip ms':>10}")
+    for depth in sorted(wanted):
+        cursor = (
+            repo.collection.find({}, POST_PROJECTION)
+            .sort(POST_SORT)
+            .skip((depth - 1) * args.limit)
+            .limit(args.limit)
+        )
+        _, skip_ms = await timed(cursor.to_list(None))
+        print(f"{depth:>6} {keyset[depth]:>10.2f} {skip_ms:>10.2f}")
+    await mongo_db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=100_000)
+    parser.add_argument("--limit", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,77 @@
+"""Fan-out cost of the /forum/stream broker.
+
+Connects ``--clients`` in-process subscribers to one ForumBroker and
+publishes ``--events`` posts through it, the way the change stream
+watcher does. It reports the publish rate, the time until every client
+has received every event, and the memory held per client. Nothing here
+touches Mongo. With streaming, one change stream per worker replaces the
+GET /forum reads that polling clients would make; the last line shows how
+many of those reads per second polling every ``--poll-s`` seconds would
+cost instead.
+
+    python benchmarks/forum_stream.py --clients 2000 --events 200
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId  # noqa: E402
+
+from forumstream import ForumBroker  # noqa: E402
+
+
+async def client(subscription, expected, done):
+    received = 0
+    async for message in subscription.messages(heartbeat_s=60):
+        if message.startswith(b"id:"):
+            received += 1
+            if received == expected:
+                break
+    done.append(received)
+
+
+async def main(args):
+    broker = ForumBroker(queue_size=args.events + 1, replay_size=512)
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    done = []
+    subscriptions = [broker.subscribe() for _ in range(args.clients)]
+    tasks = [asyncio.create_task(client(s, args.events, done)) for s in subscriptions]
+    await asyncio.sleep(0)
+    per_client = (tracemalloc.get_traced_memory()[0] - baseline) / args.clients
+    # tracing slows every allocation, so it is off while timing
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for n in range(args.events):
+        broker.publish("post", {
+            "_id": ObjectId(), "userId": f"user{n}", "title": "Sleep tips for the third trimester",
+            "content": "What helped you sleep better in the last few weeks?" * 4,
+            "created_at": "2025-06-02T08:00:00.000+00:00", "reply_count": 0,
+        }, event_id=f"{n:08d}")
+        # let clients run between events, as the change stream's awaits do
+        await asyncio.sleep(0)
+    published = time.perf_counter() - start
+    await asyncio.gather(*tasks)
+    delivered = time.perf_counter() - start
+
+    assert done == [args.events] * args.clients
+    deliveries = args.clients * args.events
+    print(f"{args.clients} clients x {args.events} events")
+    print(f"publish and deliver {published * 1000:8.1f} ms  ({args.events / published:,.0f} events/s)")
+    print(f"all delivered       {delivered * 1000:8.1f} ms  ({deliveries / delivered:,.0f} deliveries/s)")
+    print(f"memory per idle client {per_client / 1024:.1f} KiB")
+    print(f"polling every {args.poll_s:g} s instead: {args.clients / args.poll_s:,.0f} GET /forum reads/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=2000)
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--poll-s", type=float, default=10)
+    asyncio.run(main(parser.parse_args()))
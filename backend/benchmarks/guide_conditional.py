@@ -0,0 +1,66 @@
+"""Bytes on the wire and latency for guide reads.
+
+Serves a 40-guide corpus from the in-process index through httpx's ASGI
+transport and compares a plain read, gzip and brotli reads, and a
+revalidation with ``If-None-Match`` that answers 304. No database is
+needed.
+
+    python benchmarks/guide_conditional.py --requests 2000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+
+import app as app_module  # noqa: E402
+from guides import GuideIndex, GuideStore  # noqa: E402
+
+GUIDES = [
+    {"_id": f"week-{i}", "title": f"Week {i}", "body": f"What to expect in week {i}. " * 150}
+    for i in range(40)
+]
+
+
+async def measure(client, path, headers, count):
+    timings, sizes, statuses = [], [], set()
+    for _ in range(count):
+        start = time.perf_counter()
+        response = await client.get(path, headers=headers)
+        timings.append(time.perf_counter() - start)
+        sizes.append(int(response.headers.get("content-length", 0)))
+        statuses.add(response.status_code)
+    return statistics.median(timings) * 1e6, statistics.mean(sizes), statuses
+
+
+async def main(args):
+    store = GuideStore()
+    store.index = GuideIndex.build(GUIDES)
+    app_module.guide_store = store
+    auth = {"Authorization": f"Bearer {app_module.create_access_token('bench')}"}
+
+    transport = httpx.ASGITransport(app=app_module.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        path = f"/guide/{GUIDES[0]['_id']}"
+        # httpx would advertise and transparently decode encodings itself
+        etag = (await client.get(path, headers={**auth, "Accept-Encoding": "identity"})).headers["etag"]
+        cases = [
+            ("identity", {"Accept-Encoding": "identity"}),
+            ("gzip", {"Accept-Encoding": "gzip"}),
+            ("br", {"Accept-Encoding": "br"}),
+            ("304 revalidate", {"Accept-Encoding": "identity", "If-None-Match": etag}),
+        ]
+        for name, headers in cases:
+            median_us, size, statuses = await measure(client, path, {**auth, **headers}, args.requests)
+            print(f"{name:<16} {size:>8.0f} bytes  {median_us:>8.1f} us median  status={sorted(statuses)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,85 @@
+"""Cold-start cost of ``import app``.
+
+Runs ``python -X importtime -c "import app"`` in fresh interpreters and
+reports the median wall time together with the slowest modules by
+cumulative import time, first-party modules listed separately. MONGO_URI
+is removed from the child environment: importing the app must not need a
+database.
+
+    python benchmarks/import_time.py --runs 10 --top 15
+
+With ``--budget-ms`` the script exits with status 1 when the median
+exceeds the budget, so it can guard against import-time regressions in CI.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIRST_PARTY = {
+    os.path.splitext(name)[0] for name in os.listdir(BACKEND) if name.endswith(".py")
+} | {"migrations"}
+
+
+def run_once(module):
+    env = {k: v for k, v in os.environ.items() if k != "MONGO_URI"}
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND, env=env, capture_output=True, text=True, check=True,
+    )
+    return time.perf_counter() - start, result.stderr
+
+
+def parse_importtime(stderr):
+    """Return {module: cumulative_us} from -X importtime output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(cumulative_us)
+    return modules
+
+
+def print_table(title, rows):
+    print(title)
+    for name, cumulative_us in rows:
+        print(f"  {cumulative_us / 1000:9.1f} ms  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, help="fail if the median import exceeds this")
+    args = parser.parse_args()
+
+    # the first run warms the bytecode cache and is discarded
+    run_once(args.module)
+    runs = [run_once(args.module) for _ in range(args.runs)]
+    wall_ms = statistics.median(seconds for seconds, _ in runs) * 1000
+
+    # attribute time using the run closest to the median
+    _, stderr = min(runs, key=lambda run: abs(run[0] * 1000 - wall_ms))
+    modules = parse_importtime(stderr)
+    slowest = sorted(modules.items(), key=lambda item: item[1], reverse=True)
+
+    print(f"import {args.module}: median {wall_ms:.1f} ms over {args.runs} runs (interpreter start included)")
+    print_table("slowest modules (cumulative):", slowest[:args.top])
+    print_table(
+        "first-party modules (cumulative):",
+        [(name, us) for name, us in slowest if name.split(".")[0] in FIRST_PARTY],
+    )
+
+    if args.budget_ms is not None and wall_ms > args.budget_ms:
+        print(f"over budget: {wall_ms:.1f} ms > {args.budget_ms:.1f} ms")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""HTTP load generator for the MamaSync backend.
+
+Start the API against a local mongod first, e.g.
+
+    MONGO_URI=mongodb://localhost:27017 uvicorn app:app --port 8000
+
+then run
+
+    JWT_SECRET_KEY=... python benchmarks/loadgen.py --concurrency 200 --duration 30
+
+Run it once on the commit before the change and once after to compare
+requests/sec and tail latency. The script only issues reads so it can be
+pointed at a seeded database repeatedly.
+"""
+import argparse
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import jwt
+
+DEFAULT_PATHS = [
+    "/tasks?userId={user}&date={date}",
+    "/waterintake?userId={user}&date={date}",
+    "/mood?userId={user}&date={date}",
+    "/getreminder?userId={user}",
+]
+
+
+def make_token(user_id: str) -> str:
+    secret = os.getenv("JWT_SECRET_KEY", "dev_secret_key")
+    payload = {"user_id": user_id, "exp": datetime.now(timezone.utc) + timedelta(hours=1)}
+    return jwt.encode(payload, secret, algorithm="HS256")
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def _worker(client, paths, deadline, latencies, errors):
+    i = 0
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            response = await client.get(path)
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+        except httpx.HTTPError as exc:
+            errors.append(type(exc).__name__)
+        latencies.append(time.perf_counter() - start)
+
+
+async def run_load(base_url, paths, concurrency, duration, headers=None):
+    """Hammer ``paths`` with ``concurrency`` clients for ``duration`` seconds."""
+    latencies, errors = [], []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=30) as client:
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(*[
+            _worker(client, paths, deadline, latencies, errors) for _ in range(concurrency)
+        ])
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": len(latencies) / duration,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def print_report(label, stats):
+    print(
+        f"{label:<24} {stats['requests']:>8} req  {stats['rps']:>9.1f} req/s  "
+        f"p50 {stats['p50_ms']:>7.1f} ms  p99 {stats['p99_ms']:>7.1f} ms  errors {stats['errors']}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--user", default="loadtest@example.com")
+    parser.add_argument("--date", default=datetime.now(timezone.utc).date().isoformat())
+    parser.add_argument("--path", action="append", help="override the request mix (repeatable)")
+    args = parser.parse_args()
+
+    paths = [p.format(user=args.user, date=args.date) for p in (args.path or DEFAULT_PATHS)]
+    headers = {"Authorization": f"Bearer {make_token(args.user)}"}
+    stats = asyncio.run(run_load(args.url, paths, args.concurrency, args.duration, headers))
+    print_report(f"{args.concurrency} clients", stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Login throughput at a fixed p99, and what a login storm does to other routes.
+
+Drives POST /login in-process through httpx's ASGI transport against an
+in-memory user collection whose passwords are hashed with the configured
+argon2id cost. For each hashing pool size and client concurrency it
+reports logins per second, login p99, and the p99 of GET /guide requests
+issued alongside (served from memory, so any delay is time spent waiting
+for the event loop). The last line per pool size is the best throughput
+whose login p99 stays under ``--p99-ms``. No database is needed.
+
+    python benchmarks/login_throughput.py --workers 1 2 4 --concurrency 1 4 16 64
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+
+import app as app_module  # noqa: E402
+from guides import GuideIndex, GuideStore  # noqa: E402
+from passwords import Passwords  # noqa: E402
+from settings import settings  # noqa: E402
+from userrepository import user_repository  # noqa: E402
+
+USERS = 32
+
+
+class Result:
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+
+class UserCollection:
+    def __init__(self, docs):
+        self.docs = {doc["email"]: doc for doc in docs}
+
+    async def find_one(self, query):
+        doc = self.docs.get(query.get("email"))
+        return dict(doc) if doc else None
+
+    async def update_one(self, query, update):
+        return Result(matched_count=1, modified_count=1)
+
+
+def p99(samples):
+    return statistics.quantiles(samples, n=100)[98] * 1000 if len(samples) > 1 else samples[0] * 1000
+
+
+async def storm(client, auth, concurrency, total):
+    login_times, probe_times = [], []
+    remaining = total
+
+    async def login_worker(worker):
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            email = f"user{(remaining + worker) % USERS}@example.com"
+            start = time.perf_counter()
+            r = await client.post("/login", json={"email": email, "password": "correct horse"})
+            login_times.append(time.perf_counter() - start)
+            assert r.status_code == 200, r.text
+
+    async def probe():
+        while remaining > 0:
+            start = time.perf_counter()
+            await client.get("/guide", headers=auth)
+            probe_times.append(time.perf_counter() - start)
+            await asyncio.sleep(0.005)
+
+    start = time.perf_counter()
+    await asyncio.gather(probe(), *(login_worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return total / elapsed, p99(login_times), p99(probe_times) if probe_times else 0.0
+
+
+async def main(args):
+    store = GuideStore()
+    store.index = GuideIndex.build([{"_id": "week-1", "title": "Week 1"}])
+    app_module.guide_store = store
+    auth = {"Authorization": f"Bearer {app_module.create_access_token('bench')}"}
+
+    transport = httpx.ASGITransport(app=app_module.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for workers in args.workers:
+            passwords = Passwords(
+                time_cost=settings.password_time_cost,
+                memory_cost=settings.password_memory_cost_kib,
+                parallelism=settings.password_parallelism,
+                workers=workers,
+            )
+            stored = await passwords.hash("correct horse")
+            user_repository.passwords = passwords
+            user_repository.collection = UserCollection([
+                {"_id": "6568f0f0f0f0f0f0f0f0f0f0", "email": f"user{i}@example.com", "password": stored,
+                 "name": "Bench", "age": 30, "height": 165.0, "weight": 60.0, "working": True, "pregnancyMonth": 5}
+                for i in range(USERS)
+            ])
+
+            best = None
+            for concurrency in args.concurrency:
+                rate, login_p99, probe_p99 = await storm(client, auth, concurrency, args.logins)
+                print(f"workers={workers:<2} concurrency={concurrency:<3} {rate:7.1f} logins/s  "
+                      f"login p99 {login_p99:7.1f} ms  /guide p99 {probe_p99:6.1f} ms")
+                if login_p99 <= args.p99_ms and (best is None or rate > best[1]):
+                    best = (concurrency, rate)
+            if best:
+                print(f"workers={workers:<2} best under p99 {args.p99_ms:.0f} ms: {best[1]:.1f} logins/s at concurrency {best[0]}")
+            else:
+                print(f"workers={workers:<2} no concurrency kept p99 under {args.p99_ms:.0f} ms")
+            passwords.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--p99-ms", type=float, default=250.0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,91 @@
+"""GET /mood/summary's aggregation against pulling a year of raw entries.
+
+Seeds one year of daily moods (with a few skipped days) for ``--users``
+users into a scratch database. For each user it then times two things:
+the server-side ``MoodRepository.summarize`` pipeline, and fetching all
+raw entries with ``find_by_user`` and counting them client-side, which
+is what the Insights dashboard did. It reports the median latency and
+the BSON bytes each approach moves over the wire. It also checks that
+both arrive at the same counts.
+
+    MONGO_URI=mongodb://localhost:27017 MONGO_DB=mamasync_bench \\
+        python benchmarks/mood_summary.py --users 20 --runs 20
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bson  # noqa: E402
+
+from database import mongo_db  # noqa: E402
+from indexes import ensure_indexes  # noqa: E402
+from moodrepository import VALID_MOODS, MoodRepository  # noqa: E402
+
+END = date(2025, 12, 31)
+START = END - timedelta(days=364)
+
+
+async def seed(collection, users):
+    rng = random.Random(7)
+    for u in range(users):
+        user_id = f"bench{u}@example.com"
+        if await collection.count_documents({"userId": user_id}, limit=1):
+            continue
+        docs = [
+            {
+                "userId": user_id,
+                "date": (START + timedelta(days=i)).isoformat(),
+                "mood": rng.choice(VALID_MOODS),
+                "created_at": f"{(START + timedelta(days=i)).isoformat()}T08:00:00.000+00:00",
+            }
+            for i in range(365)
+            if rng.random() > 0.1
+        ]
+        await collection.insert_many(docs, ordered=False)
+
+
+async def timed(coro):
+    start = time.perf_counter()
+    result = await coro
+    return result, (time.perf_counter() - start) * 1000
+
+
+async def main(args):
+    repo = MoodRepository()
+    await ensure_indexes(mongo_db.db)
+    await seed(repo.collection, args.users)
+
+    summary_ms, raw_ms, summary_bytes, raw_bytes = [], [], [], []
+    for _ in range(args.runs):
+        for u in range(args.users):
+            user_id = f"bench{u}@example.com"
+            summary, ms = await timed(repo.summarize(user_id, START.isoformat(), END.isoformat(), "week"))
+            summary_ms.append(ms)
+            summary_bytes.append(len(bson.encode(summary)))
+
+            entries, ms = await timed(repo.find_by_user(user_id, limit=366, date_from=START.isoformat(), date_to=END.isoformat()))
+            counts = Counter(entry["mood"] for entry in entries)
+            raw_ms.append(ms)
+            raw_bytes.append(sum(len(bson.encode(entry)) for entry in entries))
+            assert all(summary["counts"][mood] == counts[mood] for mood in VALID_MOODS), (summary["counts"], counts)
+
+    print(f"{args.users} users x 1 year, {args.runs} runs")
+    print(f"summary pipeline  {statistics.median(summary_ms):7.2f} ms median  {statistics.mean(summary_bytes):8.0f} bytes")
+    print(f"raw entries       {statistics.median(raw_ms):7.2f} ms median  {statistics.mean(raw_bytes):8.0f} bytes"
+          "  (before any client-side trend work)")
+    await mongo_db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,148 @@
+"""Per-user reminder arrays against one document per reminder.
+
+Seeds ``--users`` users holding ``--reminders`` reminders each (2,000 by
+default) in the old layout: one document per user in a scratch ``reminder``
+collection. It times three operations on that layout, then runs
+migrations.reminders to split the arrays and times the same operations
+through ReminderRepository:
+
+* update one reminder. The old PUT did a positional $set, then reread the
+  whole array and scanned it for the reminder. The new one is a single
+  find_one_and_update.
+* fetch the next 7 days' reminders. The old way read the whole array and
+  filtered it in the client.
+* fetch one category, in the same two ways.
+
+It reports the median latency and the BSON bytes each read moves.
+
+    MONGO_URI=mongodb://localhost:27017 MONGO_DB=mamasync_bench \\
+        python benchmarks/reminder_layout.py --users 20 --reminders 2000 --runs 20
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bson  # noqa: E402
+from bson import ObjectId  # noqa: E402
+
+from database import mongo_db  # noqa: E402
+from indexes import ensure_indexes  # noqa: E402
+from migrations.reminders import migrate  # noqa: E402
+from reminderrepository import ReminderRepository  # noqa: E402
+
+TODAY = date(2025, 6, 2)
+WEEK_END = TODAY + timedelta(days=7)
+CATEGORIES = ["appointment", "medication", "exercise", "nutrition", "other"]
+REPEATS = ["none"] * 7 + ["daily", "weekly", "monthly"]
+
+
+def make_reminder(rng):
+    day = TODAY + timedelta(days=rng.randint(-365, 365))
+    return {
+        "id": str(ObjectId()),
+        "title": "Prenatal check-up",
+        "description": "Bring the test results and the list of questions",
+        "date": day.isoformat(),
+        "time": f"{rng.randint(6, 21):02d}:{rng.choice(['00', '15', '30', '45'])}",
+        "category": rng.choice(CATEGORIES),
+        "repeat": rng.choice(REPEATS),
+    }
+
+
+async def seed(db, users, per_user):
+    rng = random.Random(7)
+    await db["reminder"].delete_many({})
+    await db["reminders"].delete_many({})
+    ids = {}
+    for u in range(users):
+        user_id = f"bench{u}@example.com"
+        reminders = [make_reminder(rng) for _ in range(per_user)]
+        ids[user_id] = [r["id"] for r in reminders]
+        await db["reminder"].insert_one({"userId": user_id, "reminders": reminders})
+    return ids
+
+
+async def timed(coro):
+    start = time.perf_counter()
+    result = await coro
+    return result, (time.perf_counter() - start) * 1000
+
+
+def size(docs):
+    return sum(len(bson.encode(doc)) for doc in docs)
+
+
+async def old_update(collection, user_id, reminder_id):
+    await collection.update_one({"userId": user_id, "reminders.id": reminder_id}, {"$set": {"reminders.$.title": "Moved"}})
+    doc = await collection.find_one({"userId": user_id})
+    return [next(r for r in doc["reminders"] if r["id"] == reminder_id)], size([doc])
+
+
+async def old_filtered(collection, user_id, keep):
+    doc = await collection.find_one({"userId": user_id})
+    return [r for r in doc["reminders"] if keep(r)], size([doc])
+
+
+def upcoming(reminder):
+    return reminder["date"] <= WEEK_END.isoformat() and (
+        reminder["date"] >= TODAY.isoformat() or reminder["repeat"] != "none"
+    )
+
+
+async def measure(label, runs, users, operation):
+    latencies, moved = [], []
+    for _ in range(runs):
+        for user_id in users:
+            (_, nbytes), ms = await timed(operation(user_id))
+            latencies.append(ms)
+            moved.append(nbytes)
+    print(f"{label:<28} {statistics.median(latencies):8.2f} ms median  {statistics.mean(moved):10.0f} bytes")
+
+
+async def main(args):
+    db = mongo_db.db
+    await ensure_indexes(db)
+    ids = await seed(db, args.users, args.reminders)
+    old = db["reminder"]
+    rng = random.Random(11)
+
+    print(f"{args.users} users x {args.reminders} reminders, {args.runs} runs")
+    print("per-user array")
+    await measure("  update one", args.runs, ids, lambda u: old_update(old, u, rng.choice(ids[u])))
+    await measure("  next 7 days", args.runs, ids, lambda u: old_filtered(old, u, upcoming))
+    await measure("  one category", args.runs, ids, lambda u: old_filtered(old, u, lambda r: r["category"] == "medication"))
+
+    users, reminders = await migrate(db, batch_size=1000)
+    print(f"migrated {reminders} reminders from {users} users")
+
+    repo = ReminderRepository()
+
+    async def new_update(user_id):
+        reminder = await repo.update(user_id, rng.choice(ids[user_id]), {"title": "Moved"})
+        return [reminder], size([reminder])
+
+    async def new_find(user_id, **filters):
+        found = await repo.find_by_user(user_id, **filters)
+        return found, size(found)
+
+    print("document per reminder")
+    await measure("  update one", args.runs, ids, new_update)
+    await measure("  next 7 days", args.runs, ids,
+                  lambda u: new_find(u, date_from=TODAY.isoformat(), date_to=WEEK_END.isoformat()))
+    await measure("  one category", args.runs, ids, lambda u: new_find(u, category="medication"))
+    await mongo_db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--reminders", type=int, default=2000)
+    parser.add_argument("--runs", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
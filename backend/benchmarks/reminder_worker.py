@@ -0,0 +1,83 @@
+"""Drain rate and memory of the reminder worker over a large queue.
+
+Seeds ``--reminders`` occurrences (1M by default) into a scratch
+database's reminder_occurrences collection, spread over a day and mixing
+one-off and repeating rules. It then drives ReminderScheduler.run_once
+with a fake clock set to the end of that day until nothing is due. It
+reports batches per second, occurrences per second and peak RSS. RSS
+should stay flat as --reminders grows, since only one batch is in memory
+at a time.
+
+    MONGO_URI=mongodb://localhost:27017 MONGO_DB=mamasync_bench \\
+        python benchmarks/reminder_worker.py --reminders 1000000 --batch 500
+"""
+import argparse
+import asyncio
+import os
+import resource
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import mongo_db  # noqa: E402
+from indexes import ensure_indexes  # noqa: E402
+from reminderscheduler import EPOCH, ReminderScheduler  # noqa: E402
+
+DAY = datetime(2025, 6, 2, tzinfo=timezone.utc)
+REPEATS = ["none", "daily", "weekly", "monthly"]
+
+
+async def seed(collection, total, batch=10_000):
+    await collection.delete_many({})
+    for offset in range(0, total, batch):
+        docs = []
+        for i in range(offset, min(offset + batch, total)):
+            fire_at = DAY + timedelta(seconds=(i * 86_400) // total)
+            docs.append({
+                "_id": f"r{i}",
+                "userId": f"user{i % 50_000}",
+                "fire_at": fire_at,
+                "leased_until": EPOCH,
+                "lease": None,
+                "title": "Take vitamins",
+                "description": "",
+                "category": "health",
+                "date": fire_at.date().isoformat(),
+                "time": fire_at.strftime("%H:%M"),
+                "repeat": REPEATS[i % len(REPEATS)],
+            })
+        await collection.insert_many(docs, ordered=False)
+
+
+async def main(args):
+    async def discard(batch):
+        pass
+
+    end_of_day = DAY + timedelta(days=1)
+    scheduler = ReminderScheduler(clock=lambda: end_of_day, handler=discard, batch_size=args.batch)
+    await ensure_indexes(mongo_db.db)
+    await seed(scheduler.collection, args.reminders)
+
+    batches = handled = 0
+    start = time.perf_counter()
+    while True:
+        count = await scheduler.run_once()
+        if not count:
+            break
+        batches += 1
+        handled += count
+    elapsed = time.perf_counter() - start
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    print(f"{handled} occurrences in {batches} batches of {args.batch}, {elapsed:.1f} s")
+    print(f"{batches / elapsed:.1f} batches/s  {handled / elapsed:.0f} occurrences/s  peak RSS {peak_mb:.0f} MiB")
+    await mongo_db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reminders", type=int, default=1_000_000)
+    parser.add_argument("--batch", type=int, default=500)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,92 @@
+"""Indexing rate, memory and query latency of the in-process search index.
+
+Builds a SearchIndex over ``--docs`` synthetic documents (500k by
+default) in memory. Words are drawn from a Zipf-distributed vocabulary,
+so a few terms are very common and most are rare, as in real text.
+Titles are about 8 words and bodies about 60. It reports the indexing
+rate, the memory the index holds, and query latency percentiles for 1-,
+2- and 3-term queries. Query terms are drawn from the same distribution,
+so common terms are queried most. No Mongo is needed.
+
+    python benchmarks/search_index.py --docs 500000 --queries 300
+"""
+import argparse
+import itertools
+import os
+import random
+import resource
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from searchindex import Entry, SearchIndex  # noqa: E402
+
+
+def vocabulary(size):
+    rng = random.Random(1)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(letters) for _ in range(rng.randint(3, 10))))
+    return sorted(words)
+
+
+def zipf(words):
+    return list(itertools.accumulate(1 / (rank + 1) for rank in range(len(words))))
+
+
+def documents(count, words, rng):
+    cumulative = zipf(words)
+    for n in range(count):
+        title = " ".join(rng.choices(words, cum_weights=cumulative, k=rng.randint(4, 12)))
+        body = " ".join(rng.choices(words, cum_weights=cumulative, k=rng.randint(20, 100)))
+        yield Entry("post" if n % 4 else "reply", str(n), title if n % 4 else "", body)
+
+
+def percentile(values, pct):
+    return sorted(values)[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def main(args):
+    rng = random.Random(7)
+    words = vocabulary(args.vocabulary)
+    index = SearchIndex(champions=args.champions)
+
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    elapsed, batch = 0.0, []
+    for entry in documents(args.docs, words, rng):
+        batch.append(entry)
+        if len(batch) == args.batch:
+            # only indexing is timed, not generating the documents
+            start = time.perf_counter()
+            index.add_batch(batch)
+            elapsed += time.perf_counter() - start
+            batch = []
+    index.add_batch(batch)
+    grown = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before) / 1024
+    print(f"indexed {len(index)} documents in {elapsed:.1f} s ({len(index) / elapsed:,.0f} docs/s, "
+          f"{elapsed / len(index) * args.batch * 1000:.0f} ms per batch of {args.batch}), peak RSS grew {grown:,.0f} MiB")
+
+    cumulative = zipf(words)
+    for size in (1, 2, 3):
+        latencies = []
+        for _ in range(args.queries):
+            query = " ".join(rng.choices(words, cum_weights=cumulative, k=size))
+            start = time.perf_counter()
+            index.search(query, limit=20)
+            latencies.append((time.perf_counter() - start) * 1000)
+        print(f"{size}-term queries  p50 {statistics.median(latencies):6.2f} ms  "
+              f"p95 {percentile(latencies, 95):6.2f} ms  p99 {percentile(latencies, 99):6.2f} ms  "
+              f"max {max(latencies):6.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=500_000)
+    parser.add_argument("--vocabulary", type=int, default=50_000)
+    parser.add_argument("--champions", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--batch", type=int, default=200)
+    main(parser.parse_args())
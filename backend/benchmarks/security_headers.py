@@ -0,0 +1,88 @@
+"""Throughput of a trivial endpoint behind the old and new CSP middleware.
+
+The old implementation subclassed BaseHTTPMiddleware and rebuilt the CSP
+string per request; it is reproduced here as LegacyCSPMiddleware. Both
+apps are driven in-process through httpx's ASGI transport, so the numbers
+isolate middleware overhead from network and server costs.
+
+    python benchmarks/security_headers.py --requests 20000 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+from starlette.middleware.base import BaseHTTPMiddleware  # noqa: E402
+
+from middleware import SecurityHeadersMiddleware  # noqa: E402
+from settings import DEFAULT_CONTENT_SECURITY_POLICY  # noqa: E402
+
+
+class LegacyCSPMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        response = await call_next(request)
+        response.headers['Content-Security-Policy'] = (
+            "default-src 'self'; "
+            "script-src 'self' https://cdnjs.cloudflare.com; "
+            "style-src 'self' 'unsafe-inline' https://fonts.googleapis.com; "
+            "font-src 'self' https://fonts.gstatic.com; "
+            "img-src 'self' data: https://example.com; "
+            "connect-src 'self'; "
+            "frame-ancestors 'none'; "
+            "base-uri 'self';"
+        )
+        return response
+
+
+def make_app(middleware=None, **options):
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    if middleware:
+        app.add_middleware(middleware, **options)
+    return app
+
+
+async def throughput(app, requests, concurrency):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        queue = iter(range(requests))
+
+        async def worker():
+            for _ in queue:
+                r = await client.get("/ping")
+                assert r.status_code == 200
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return requests / (time.perf_counter() - start)
+
+
+async def main(args):
+    apps = {
+        "no middleware": make_app(),
+        "BaseHTTPMiddleware (old)": make_app(LegacyCSPMiddleware),
+        "pure ASGI (new)": make_app(
+            SecurityHeadersMiddleware, headers={"Content-Security-Policy": DEFAULT_CONTENT_SECURITY_POLICY}
+        ),
+    }
+    for name, app in apps.items():
+        # warm up routing and the transport before measuring
+        await throughput(app, 200, args.concurrency)
+        rps = await throughput(app, args.requests, args.concurrency)
+        print(f"{name:<26} {rps:10.0f} req/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
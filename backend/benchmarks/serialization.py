@@ -0,0 +1,80 @@
+"""Serialization cost of a 1,000-post forum listing.
+
+Compares the old response path, which rewrote each post's ``_id`` to
+``str``, ran the page through ``jsonable_encoder`` and rendered it with
+stdlib json, with MongoJSONResponse rendering the raw page through
+orjson. No database is needed.
+
+    python benchmarks/serialization.py --posts 1000 --runs 200
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from starlette.responses import JSONResponse  # noqa: E402
+
+from responses import MongoJSONResponse  # noqa: E402
+
+
+def make_page(count):
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return {
+        "posts": [
+            {
+                "_id": ObjectId(),
+                "userId": f"user{i % 50}@example.com",
+                "name": f"User {i % 50}",
+                "title": f"Question number {i} about the third trimester",
+                "content": "Has anyone else had trouble sleeping this week? " * 4,
+                "created_at": (start + timedelta(minutes=i)).isoformat(timespec="milliseconds"),
+                "reply_count": i % 12,
+            }
+            for i in range(count)
+        ],
+        "next_cursor": "WyIyMDI1LTAxLTAxVDAwOjAwOjAwLjAwMFoiLCAiNjU2OGYwZjBmMGYwIl0",
+    }
+
+
+def old_path(page):
+    for post in page["posts"]:
+        post["_id"] = str(post["_id"])
+    return JSONResponse(jsonable_encoder(page)).body
+
+
+def new_path(page):
+    return MongoJSONResponse(page).body
+
+
+def measure(render, count, runs):
+    samples = []
+    for _ in range(runs):
+        # fresh documents each run: the old path mutates them in place
+        page = make_page(count)
+        start = time.perf_counter()
+        render(page)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=1000)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    old = measure(old_path, args.posts, args.runs)
+    new = measure(new_path, args.posts, args.runs)
+    print(f"str(_id) + jsonable_encoder + json : {old:8.3f} ms")
+    print(f"MongoJSONResponse (orjson)         : {new:8.3f} ms")
+    print(f"speedup                            : {old / new:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
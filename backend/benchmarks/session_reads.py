@@ -0,0 +1,135 @@
+"""users-collection reads and password checks for active sessions.
+
+Simulates ``--users`` clients that stay active for ``--hours`` hours and
+renew their access token whenever it expires. It compares two ways of
+doing that. The old way logs in again every 5 minutes, which was the
+previous token lifetime. The new way logs in once and then calls
+/token/refresh every ACCESS_TOKEN_TTL_MINUTES. The users and
+refresh_tokens collections are in-memory fakes, so no mongod is needed.
+The counts come from the app_users_reads and auth_token_grants metrics.
+
+    python benchmarks/session_reads.py --users 50 --hours 8
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+from bson import ObjectId  # noqa: E402
+from prometheus_client import REGISTRY  # noqa: E402
+
+import app as app_module  # noqa: E402
+from passwords import Passwords  # noqa: E402
+from refreshtokenrepository import RefreshTokenRepository  # noqa: E402
+from settings import settings  # noqa: E402
+from userrepository import user_repository  # noqa: E402
+
+OLD_TOKEN_MINUTES = 5
+
+
+class Result:
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+
+class Collection:
+    """Just enough of a collection for users and refresh_tokens lookups.
+    Documents are keyed by ``key``; other single-field lookups scan."""
+
+    def __init__(self, key, docs=()):
+        self.key = key
+        self.docs = {doc[key]: doc for doc in docs}
+
+    async def find_one(self, query, projection=None):
+        (field, value), = query.items()
+        if field == self.key:
+            doc = self.docs.get(value)
+        else:
+            doc = next((d for d in self.docs.values() if d.get(field) == value), None)
+        return dict(doc) if doc else None
+
+    async def insert_one(self, doc):
+        self.docs[doc[self.key]] = doc
+        return Result(inserted_id=doc[self.key])
+
+    async def update_one(self, query, update):
+        return Result(matched_count=1, modified_count=1)
+
+    async def find_one_and_update(self, query, update, return_document=None):
+        doc = self.docs.get(query[self.key])
+        if doc is None or doc["revoked_at"] is not None:
+            return None
+        before = dict(doc)
+        doc.update(update["$set"])
+        return before
+
+
+def counter(name, **labels):
+    return REGISTRY.get_sample_value(f"{name}_total", labels) or 0.0
+
+
+def snapshot():
+    return {
+        "users reads": sum(counter("app_users_reads", method=m) for m in ("find_by_email", "find_by_id", "find_claims", "find_all")),
+        "password logins": counter("auth_token_grants", grant="password"),
+        "refreshes": counter("auth_token_grants", grant="refresh"),
+    }
+
+
+async def run(client, users, renewals, use_refresh):
+    before = snapshot()
+    start = time.perf_counter()
+    for i in range(users):
+        credentials = {"email": f"user{i}@example.com", "password": "correct horse"}
+        r = await client.post("/login", json=credentials)
+        refresh_token = r.json()["refresh_token"]
+        for _ in range(renewals):
+            if use_refresh:
+                r = await client.post("/token/refresh", json={"refresh_token": refresh_token})
+                refresh_token = r.json()["refresh_token"]
+            else:
+                r = await client.post("/login", json=credentials)
+            assert r.status_code == 200, r.text
+    elapsed = time.perf_counter() - start
+    after = snapshot()
+    return {name: after[name] - before[name] for name in after}, elapsed
+
+
+async def main(args):
+    passwords = Passwords(
+        time_cost=settings.password_time_cost,
+        memory_cost=settings.password_memory_cost_kib,
+        parallelism=settings.password_parallelism,
+    )
+    stored = await passwords.hash("correct horse")
+    user_repository.passwords = passwords
+    user_repository.collection = Collection("email", [
+        {"_id": ObjectId(f"6568f0f0f0f0f0f0f0f0{i:04x}"), "email": f"user{i}@example.com", "password": stored, "name": "Bench",
+         "age": 30, "height": 165.0, "weight": 60.0, "working": True, "pregnancyMonth": 5}
+        for i in range(args.users)
+    ])
+    refresh_tokens = RefreshTokenRepository()
+    refresh_tokens.collection = Collection("token_hash")
+    app_module.refresh_token_repository = refresh_tokens
+
+    minutes = args.hours * 60
+    transport = httpx.ASGITransport(app=app_module.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        old, old_s = await run(client, args.users, minutes // OLD_TOKEN_MINUTES - 1, use_refresh=False)
+        new, new_s = await run(client, args.users, minutes // settings.access_token_ttl_minutes - 1, use_refresh=True)
+    passwords.close()
+
+    print(f"{args.users} users active for {args.hours} h")
+    print(f"re-login every {OLD_TOKEN_MINUTES} min:      {old}  {old_s:.1f} s")
+    print(f"refresh every {settings.access_token_ttl_minutes} min:      {new}  {new_s:.1f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--hours", type=int, default=8)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,72 @@
+"""Latency of seeding a day of tasks: per-task round trips vs one upsert.
+
+Reproduces the old POST /tasks/{userId}/{date} write pattern (find_one,
+then update_one or insert_one, once per task) next to the single
+$push/$each upsert used now, for 50-task payloads like the preset day
+written at signup.
+
+    MONGO_URI=mongodb://localhost:27017 MONGO_DB=mamasync_bench \\
+        python benchmarks/task_bulk_insert.py --tasks 50 --requests 200
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId  # noqa: E402
+
+from database import mongo_db  # noqa: E402
+from dailytaskrepository import DailyTaskRepository  # noqa: E402
+from indexes import ensure_indexes  # noqa: E402
+
+
+def make_tasks(count):
+    return [
+        {"id": str(ObjectId()), "emoji": "💧", "title": f"Task {i}", "time": "10:00",
+         "completed": False, "isPreset": True}
+        for i in range(count)
+    ]
+
+
+async def per_task_round_trips(collection, user_id, date, tasks):
+    for task in tasks:
+        existing = await collection.find_one({"userId": user_id, "date": date})
+        if existing:
+            await collection.update_one({"_id": existing["_id"]}, {"$push": {"tasks": task}})
+        else:
+            await collection.insert_one({"userId": user_id, "date": date, "tasks": [task]})
+
+
+async def measure(label, write, repo, args):
+    samples = []
+    for i in range(args.requests):
+        tasks = make_tasks(args.tasks)
+        start = time.perf_counter()
+        await write(f"bench-{label}", f"day-{i}", tasks)
+        samples.append((time.perf_counter() - start) * 1000)
+    await repo.collection.delete_many({"userId": f"bench-{label}"})
+    samples.sort()
+    print(
+        f"{label:<12} mean {statistics.mean(samples):7.2f} ms  "
+        f"p50 {samples[len(samples) // 2]:7.2f} ms  p99 {samples[int(len(samples) * 0.99) - 1]:7.2f} ms"
+    )
+
+
+async def main(args):
+    repo = DailyTaskRepository()
+    await ensure_indexes(mongo_db.db)
+    print(f"{args.requests} requests x {args.tasks} tasks")
+    await measure("per-task", lambda u, d, t: per_task_round_trips(repo.collection, u, d, t), repo, args)
+    await measure("bulk-upsert", repo.add_tasks, repo, args)
+    await mongo_db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=200)
+    asyncio.run(main(parser.parse_args()))
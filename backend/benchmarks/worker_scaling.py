@@ -0,0 +1,91 @@
+"""Throughput of the production server profile with 1..N workers.
+
+Starts ``python serve.py`` once per worker count on the same machine,
+waits for /healthz, drives it with loadgen's client for a fixed time, and
+then sends SIGTERM, which also exercises the graceful shutdown path. The
+app needs a reachable mongod to finish its startup:
+
+    MONGO_URI=mongodb://localhost:27017 MONGO_DB=mamasync_bench JWT_SECRET_KEY=... \\
+        python benchmarks/worker_scaling.py --max-workers 8 --duration 15
+
+The default request mix is /healthz, which measures the framework's
+per-core throughput. Pass --path (repeatable) to load real endpoints such
+as "/dashboard?userId={user}&date={date}". The token loadgen signs is
+accepted by every worker.
+"""
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+from loadgen import make_token, print_report, run_load
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def start_server(workers, port):
+    env = {**os.environ, "WEB_WORKERS": str(workers), "PORT": str(port), "WEB_HOST": "127.0.0.1"}
+    return subprocess.Popen(
+        [sys.executable, "serve.py"], cwd=BACKEND, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_ready(url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{url}/healthz", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"server at {url} did not become healthy within {timeout}s")
+
+
+def stop_server(process, timeout=60):
+    process.send_signal(signal.SIGTERM)
+    try:
+        return process.wait(timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        raise
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--user", default="loadtest@example.com")
+    parser.add_argument("--date", default=datetime.now(timezone.utc).date().isoformat())
+    parser.add_argument("--path", action="append", help="request path (repeatable), default /healthz")
+    args = parser.parse_args()
+
+    url = f"http://127.0.0.1:{args.port}"
+    paths = [p.format(user=args.user, date=args.date) for p in (args.path or ["/healthz"])]
+    headers = {"Authorization": f"Bearer {make_token(args.user)}"}
+
+    counts = sorted({1, *(n for n in (2, 4, 8, 16, 32) if n < args.max_workers), args.max_workers})
+    baseline = None
+    for workers in counts:
+        process = start_server(workers, args.port)
+        try:
+            wait_ready(url)
+            stats = asyncio.run(run_load(url, paths, args.concurrency, args.duration, headers))
+        finally:
+            code = stop_server(process)
+        baseline = baseline or stats["rps"]
+        print_report(f"{workers} worker(s)", stats)
+        print(f"{'':<24} {stats['rps'] / baseline:>5.2f}x vs 1 worker, exit code {code} after SIGTERM")
+
+
+if __name__ == "__main__":
+    main()
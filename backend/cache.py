@@ -0,0 +1,155 @@
+"""Shared cache for read-heavy endpoints.
+
+Values are stored as pre-serialized JSON bodies under
+``<prefix>:<namespace>:<key>``, so a hit is returned to the client without
+touching Mongo or re-encoding anything. Each namespace has its own TTL,
+and writers call ``invalidate`` for the keys they change.
+
+Backends:
+
+* ``memory`` (default): a bounded per-process LRU. With several workers an
+  invalidation only reaches the worker that handled the write, so other
+  workers may serve stale data until the TTL expires. Keep TTLs short, or
+  use Redis when that matters.
+* ``redis``: any Redis-compatible server via ``redis.asyncio``. This needs
+  the ``redis`` package, which is only imported when the backend is used.
+* ``none``: caching disabled.
+"""
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+from prometheus_client import Counter
+
+from responses import dumps
+
+CACHE_REQUESTS = Counter("app_cache_requests", "Cache lookups by namespace and result", ["namespace", "result"])
+CACHE_INVALIDATIONS = Counter("app_cache_invalidations", "Explicit cache invalidations", ["namespace"])
+
+
+class MemoryCache:
+    def __init__(self, maxsize: int = 10_000, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.clock = clock
+        self._entries = OrderedDict()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if self.clock() >= expires_at:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._entries[key] = (self.clock() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    async def clear(self, prefix: str) -> None:
+        for key in [k for k in self._entries if k.startswith(prefix)]:
+            del self._entries[key]
+
+
+class RedisCache:
+    def __init__(self, client):
+        self.client = client
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisCache":
+        from redis.asyncio import Redis
+
+        return cls(Redis.from_url(url))
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self.client.set(key, value, px=int(ttl * 1000))
+
+    async def delete(self, key: str) -> None:
+        await self.client.delete(key)
+
+    async def clear(self, prefix: str) -> None:
+        # the server may be shared, so only our own keys go
+        async for key in self.client.scan_iter(match=f"{prefix}*"):
+            await self.client.delete(key)
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+class NullCache:
+    async def get(self, key: str) -> Optional[bytes]:
+        return None
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        pass
+
+    async def delete(self, key: str) -> None:
+        pass
+
+    async def clear(self, prefix: str) -> None:
+        pass
+
+
+class Cache:
+    def __init__(self, backend, ttls: dict, prefix: str = "mamasync", default_ttl: float = 60):
+        self.backend = backend
+        self.ttls = ttls
+        self.prefix = prefix
+        self.default_ttl = default_ttl
+
+    def _key(self, namespace: str, key: str) -> str:
+        return f"{self.prefix}:{namespace}:{key}"
+
+    async def get_or_load(self, namespace: str, key: str, load: Callable[[], Awaitable]) -> Optional[bytes]:
+        """Return the cached JSON body, or call ``load`` and cache its result.
+
+        A ``None`` result is returned as None and not cached, so a missing
+        document shows up as soon as it is created.
+        """
+        full_key = self._key(namespace, key)
+        body = await self.backend.get(full_key)
+        if body is not None:
+            CACHE_REQUESTS.labels(namespace, "hit").inc()
+            return body
+
+        CACHE_REQUESTS.labels(namespace, "miss").inc()
+        value = await load()
+        if value is None:
+            return None
+        body = dumps(value)
+        await self.backend.set(full_key, body, self.ttls.get(namespace, self.default_ttl))
+        return body
+
+    async def invalidate(self, namespace: str, key: str) -> None:
+        CACHE_INVALIDATIONS.labels(namespace).inc()
+        await self.backend.delete(self._key(namespace, key))
+
+    async def clear(self) -> None:
+        await self.backend.clear(f"{self.prefix}:")
+
+    async def close(self) -> None:
+        close = getattr(self.backend, "close", None)
+        if close:
+            await close()
+
+
+def make_backend(name: str, redis_url: Optional[str] = None):
+    if name == "memory":
+        return MemoryCache()
+    if name == "redis":
+        if not redis_url:
+            raise ValueError("CACHE_BACKEND=redis needs REDIS_URL")
+        return RedisCache.from_url(redis_url)
+    if name == "none":
+        return NullCache()
+    raise ValueError(f"Unknown cache backend: {name}")
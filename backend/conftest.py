@@ -0,0 +1,22 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+
+@pytest.fixture
+def anyio_backend():
+    # PyMongo's async client only runs on asyncio
+    return "asyncio"
+
+
+def mock_find(mock_mongo, documents):
+    """Point the patched ``mongo_db`` at a collection whose find() returns
+    ``documents`` through a sort/limit cursor. Returns (collection, cursor)."""
+    mock_collection = MagicMock()
+    mock_mongo.get_collection.return_value = mock_collection
+    mock_cursor = MagicMock()
+    mock_cursor.sort.return_value = mock_cursor
+    mock_cursor.limit.return_value = mock_cursor
+    mock_cursor.to_list = AsyncMock(return_value=documents)
+    mock_collection.find.return_value = mock_cursor
+    return mock_collection, mock_cursor
@@ -1,31 +1,58 @@
 from bson.objectid import ObjectId
+from pymongo import ASCENDING, IndexModel, ReturnDocument
 from database import mongo_db
+from mongometrics import instrument_repository
 
+@instrument_repository
 class DailyTaskRepository:
+    # one document per user per day holding that day's task array
+    indexes = [
+        IndexModel([("userId", ASCENDING), ("date", ASCENDING)], unique=True, name="userId_date_unique"),
+    ]
+
     def __init__(self):
         self.collection = mongo_db.get_collection('daily_tasks')
 
-    def find_all(self):
-        return [self.serialize_object_id(p) for p in self.collection.find()]
+    async def find_all(self):
+        return [self.serialize_object_id(p) for p in await self.collection.find().to_list(None)]
 
-    def find_by_id(self, user_id):
-        data = self.collection.find_one({"_id": ObjectId(user_id)})
+    async def find_by_id(self, user_id):
+        data = await self.collection.find_one({"_id": ObjectId(user_id)})
         return self.serialize_object_id(data) if data else None
     
-    def find_by_id_date(self, user_id,date):
-        data = self.collection.find_one({"name": user_id,"date":date})
+    async def find_by_id_date(self, user_id,date):
+        data = await self.collection.find_one({"name": user_id,"date":date})
         return self.serialize_object_id(data) if data else None
 
-    def create(self, user_data):
-        result = self.collection.insert_one(user_data)
+    async def create(self, user_data):
+        result = await self.collection.insert_one(user_data)
         return str(result.inserted_id)
 
-    def update(self, user_id, data):
-        result = self.collection.update_one({"_id": ObjectId(user_id)}, {"$set": data})
+    async def add_tasks(self, user_id, date, tasks):
+        """Append tasks to the user's day in one round trip, creating the day if needed."""
+        result = await self.collection.update_one(
+            {"userId": user_id, "date": date},
+            {"$push": {"tasks": {"$each": tasks}}},
+            upsert=True
+        )
+        return result.upserted_id is not None or result.modified_count > 0
+
+    async def update_task_and_get(self, user_id, date, task_id, fields):
+        """Set fields on one task of the user's day and return the updated task, or None."""
+        doc = await self.collection.find_one_and_update(
+            {"userId": user_id, "date": date, "tasks.id": task_id},
+            {"$set": {f"tasks.$.{key}": value for key, value in fields.items()}},
+            projection={"_id": 0, "tasks": {"$elemMatch": {"id": task_id}}},
+            return_document=ReturnDocument.AFTER
+        )
+        return doc["tasks"][0] if doc and doc.get("tasks") else None
+
+    async def update(self, user_id, data):
+        result = await self.collection.update_one({"_id": ObjectId(user_id)}, {"$set": data})
         return result.modified_count > 0
 
-    def delete(self, user_id):
-        result = self.collection.delete_one({"_id": ObjectId(user_id)})
+    async def delete(self, user_id):
+        result = await self.collection.delete_one({"_id": ObjectId(user_id)})
         return result.deleted_count > 0
     
     def serialize_object_id(self, document):
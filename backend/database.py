@@ -1,22 +1,151 @@
-from pymongo import MongoClient
-import os
+import asyncio
+import logging
 
-#  Load production secrets from environment variables
-MONGO_URI = os.getenv("MONGO_URI")
-MONGO_DB = os.getenv("MONGO_DB", "mamasync")
+from pymongo import AsyncMongoClient
+from pymongo.errors import OperationFailure, PyMongoError
+
+from mongometrics import CommandMetricsListener, PoolMetricsListener
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LazyCollection:
+    """Stands in for a collection until it is first used.
+
+    Repositories and app.py grab their collections at import time; handing
+    out this proxy instead lets ``import app`` finish without building a
+    Mongo client or needing MONGO_URI at all.
+    """
+
+    def __init__(self, instance, name):
+        self._instance = instance
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(self._instance.resolve_collection(self._name), attr)
+
+    def __repr__(self):
+        return f"LazyCollection({self._name!r})"
 
-if not MONGO_URI:
-    raise ValueError(" MONGO_URI is not set. Add it to your environment variables.")
 
 class MongoInstance:
-    def __init__(self):
-        #  Use the full MongoDB URI (Atlas-compatible)
-        self.client = MongoClient(MONGO_URI)
-        self.db = self.client[MONGO_DB]
-        print(f" Connected to MongoDB: {MONGO_URI}, Database: {MONGO_DB}")
+    def __init__(self, settings, event_listeners=()):
+        self.settings = settings
+        self.event_listeners = list(event_listeners)
+        self._client = None
+        self._collections = {}
+
+    @property
+    def client(self):
+        """The AsyncMongoClient, created on first access."""
+        if self._client is None:
+            #  Load production secrets from environment variables
+            if not self.settings.mongo_uri:
+                raise ValueError(" MONGO_URI is not set. Add it to your environment variables.")
+            #  Use the full MongoDB URI (Atlas-compatible). The async client does
+            #  not open sockets until the first operation runs on the event loop.
+            self._client = AsyncMongoClient(
+                self.settings.mongo_uri,
+                event_listeners=self.event_listeners,
+                **self.settings.mongo_client_options(),
+            )
+            # never log the URI, it carries the credentials
+            logger.info("MongoDB client created for database %s", self.settings.mongo_db)
+        return self._client
+
+    @property
+    def db(self):
+        return self.client[self.settings.mongo_db]
+
+    @property
+    def connected(self) -> bool:
+        return self._client is not None
 
     def get_collection(self, collection_name):
-        return self.db[collection_name]
+        return LazyCollection(self, collection_name)
+
+    def resolve_collection(self, collection_name):
+        """The real collection behind a LazyCollection, cached per client."""
+        collection = self._collections.get(collection_name)
+        if collection is None:
+            collection = self._collections[collection_name] = self.db[collection_name]
+        return collection
+
+    async def ping(self):
+        """Round trip to the server through the pool."""
+        await self.client.admin.command("ping")
+
+    async def close(self):
+        if self._client is not None:
+            client, self._client = self._client, None
+            self._collections.clear()
+            await client.close()
+
+async def retry(operation, description, first_delay_s=1.0, max_delay_s=60.0):
+    """Await ``operation()`` until it succeeds, backing off while Mongo fails.
+
+    For startup work run as a background task, so that a worker boots and
+    answers /healthz while the database is still unreachable.
+    """
+    delay = first_delay_s
+    while True:
+        try:
+            return await operation()
+        except PyMongoError as exc:
+            logger.warning("%s failed, retrying in %.0fs: %s", description, delay, exc)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, max_delay_s)
+
+# $changeStream on a standalone server
+CHANGE_STREAMS_UNSUPPORTED = 40573
+# InvalidResumeToken, ChangeStreamFatalError, ChangeStreamHistoryLost: the
+# server cannot resume from the token any more
+RESUME_FAILED = frozenset({260, 280, 286})
+
+
+async def follow_changes(collection, pipeline, handle, on_open=None, on_close=None, first_delay_s=1.0) -> bool:
+    """Pass every change on ``collection`` to ``handle`` until cancelled.
+
+    After an error the stream is reopened through ``retry``, resuming after
+    the last change handled. If the server cannot resume from there, a new
+    stream starts from the present. ``await on_open(lost)`` runs each time
+    a stream opens, with ``lost`` true when changes may have been missed.
+    ``on_close()`` runs each time a stream stops.
+
+    Returns False right away on a deployment without change streams (a
+    standalone server).
+    """
+    state = {"resume_after": None, "lost": False}
+
+    async def follow():
+        try:
+            async with await collection.watch(pipeline, resume_after=state["resume_after"]) as stream:
+                try:
+                    if on_open:
+                        await on_open(state["lost"])
+                    state["lost"] = False
+                    async for change in stream:
+                        handle(change)
+                        state["resume_after"] = change["_id"]
+                finally:
+                    if on_close:
+                        on_close()
+        except OperationFailure as exc:
+            if exc.code == CHANGE_STREAMS_UNSUPPORTED:
+                return False
+            if exc.code in RESUME_FAILED:
+                state["resume_after"], state["lost"] = None, True
+            raise
+        # the stream was invalidated, e.g. by a dropped collection; start a new one
+        state["resume_after"] = None
+        return True
+
+    while await retry(follow, f"Change stream on {collection.name}", first_delay_s=first_delay_s):
+        pass
+    return False
 
-#  Create a single global instance
-mongo_db = MongoInstance()
+#  Create a single global instance; no client exists until first use
+pool_metrics = PoolMetricsListener()
+command_metrics = CommandMetricsListener(measure_bytes=settings.mongo_command_bytes)
+mongo_db = MongoInstance(settings, event_listeners=[pool_metrics, command_metrics])
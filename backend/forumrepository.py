@@ -0,0 +1,165 @@
+import base64
+import json
+from typing import Optional
+
+from bson.objectid import ObjectId
+from bson.errors import InvalidId
+from pymongo import ASCENDING, DESCENDING, IndexModel, ReturnDocument
+from database import mongo_db
+from mongometrics import instrument_repository
+
+# newest first; _id breaks ties between posts created in the same millisecond
+POST_SORT = [("created_at", DESCENDING), ("_id", DESCENDING)]
+
+# replies read top to bottom, oldest first
+REPLY_SORT = [("created_at", ASCENDING), ("_id", ASCENDING)]
+
+# replies live in their own collection; reply_count is kept on the post
+POST_PROJECTION = {"replies": 0}
+
+REPLY_PROJECTION = {"postId": 0}
+
+
+def encode_cursor(doc: dict) -> str:
+    """Opaque keyset cursor pointing just past ``doc`` in (created_at, _id) order."""
+    raw = json.dumps([doc["created_at"], str(doc["_id"])]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """Inverse of encode_cursor. Raises ValueError for anything malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, doc_id = json.loads(base64.urlsafe_b64decode(padded))
+        return str(created_at), ObjectId(doc_id)
+    except (ValueError, TypeError, InvalidId) as exc:
+        raise ValueError("Invalid pagination cursor") from exc
+
+
+def keyset_filter(cursor: str, direction: int) -> dict:
+    """Filter selecting documents strictly after ``cursor`` in a
+    (created_at, _id) sort running in ``direction``.
+
+    The created_at bound keeps this a single index range scan; the $or only
+    drops created_at ties that were already on the previous page.
+    """
+    created_at, doc_id = decode_cursor(cursor)
+    inclusive, strict = ("$gte", "$gt") if direction == ASCENDING else ("$lte", "$lt")
+    return {
+        "created_at": {inclusive: created_at},
+        "$or": [
+            {"created_at": {strict: created_at}},
+            {"_id": {strict: doc_id}},
+        ],
+    }
+
+
+def to_object_id(value: str) -> Optional[ObjectId]:
+    try:
+        return ObjectId(value)
+    except (InvalidId, TypeError):
+        return None
+
+
+async def fetch_page(collection, query: dict, projection: dict, sort: list, limit: int, after: Optional[str]) -> tuple:
+    """Run a keyset-paginated find and return (documents, next_cursor)."""
+    if after:
+        query = {**query, **keyset_filter(after, sort[0][1])}
+
+    # fetch one extra row to learn whether another page exists
+    docs = await (
+        collection.find(query, projection)
+        .sort(sort)
+        .limit(limit + 1)
+        .to_list(None)
+    )
+    next_cursor = encode_cursor(docs[limit - 1]) if len(docs) > limit else None
+    return docs[:limit], next_cursor
+
+
+@instrument_repository
+class ForumRepository:
+    indexes = [
+        IndexModel(POST_SORT, name="created_at_id"),
+        IndexModel([("userId", ASCENDING)] + POST_SORT, name="userId_created_at_id"),
+    ]
+
+    def __init__(self):
+        self.collection = mongo_db.get_collection("forum_posts")
+
+    async def create(self, post_data: dict) -> str:
+        """Create a new forum post."""
+        result = await self.collection.insert_one(post_data)
+        return str(result.inserted_id)
+
+    async def find_by_id(self, post_id: str) -> Optional[dict]:
+        """Find a post by id, without any embedded replies."""
+        oid = to_object_id(post_id)
+        return await self.collection.find_one({"_id": oid}, POST_PROJECTION) if oid else None
+
+    async def find_by_ids(self, post_ids: list) -> list:
+        """The posts with these ids that exist, in no particular order."""
+        oids = [oid for oid in map(to_object_id, post_ids) if oid]
+        return await self.collection.find({"_id": {"$in": oids}}, POST_PROJECTION).to_list(None)
+
+    async def increment_reply_count(self, post_id: str, amount: int = 1) -> Optional[int]:
+        """Atomically bump reply_count. Returns the new count, or None if the post does not exist."""
+        oid = to_object_id(post_id)
+        if not oid:
+            return None
+        post = await self.collection.find_one_and_update(
+            {"_id": oid},
+            {"$inc": {"reply_count": amount}},
+            projection={"_id": 0, "reply_count": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        return post["reply_count"] if post else None
+
+    async def find_page(self, user_id: Optional[str] = None, limit: int = 20, after: Optional[str] = None) -> dict:
+        """Return one page of posts (newest first) and the cursor for the next page.
+
+        Uses keyset pagination on (created_at, _id) so every page is a
+        bounded index range scan regardless of how deep the client pages.
+        Post _ids stay ObjectIds; MongoJSONResponse renders them.
+        """
+        query = {"userId": user_id} if user_id else {}
+        posts, next_cursor = await fetch_page(self.collection, query, POST_PROJECTION, POST_SORT, limit, after)
+        return {"posts": posts, "next_cursor": next_cursor}
+
+
+@instrument_repository
+class ForumReplyRepository:
+    indexes = [
+        IndexModel([("postId", ASCENDING)] + REPLY_SORT, name="postId_created_at_id"),
+    ]
+
+    def __init__(self):
+        self.collection = mongo_db.get_collection("forum_replies")
+
+    async def create(self, post_id: str, reply_data: dict) -> str:
+        """Store a reply for a post. ``reply_data["id"]`` doubles as its _id."""
+        document = {**reply_data, "_id": ObjectId(reply_data["id"]), "postId": ObjectId(post_id)}
+        result = await self.collection.insert_one(document)
+        return str(result.inserted_id)
+
+    async def find_by_ids(self, reply_ids: list) -> list:
+        """The replies with these ids that exist, with their postId, in no particular order."""
+        oids = [oid for oid in map(to_object_id, reply_ids) if oid]
+        return await self.collection.find({"_id": {"$in": oids}}).to_list(None)
+
+    async def find_page(self, post_id: str, limit: int = 50, after: Optional[str] = None) -> dict:
+        """Return one page of a post's replies (oldest first) and the next cursor."""
+        oid = to_object_id(post_id)
+        if not oid:
+            return {"replies": [], "next_cursor": None}
+        replies, next_cursor = await fetch_page(
+            self.collection, {"postId": oid}, REPLY_PROJECTION, REPLY_SORT, limit, after
+        )
+        for reply in replies:
+            reply.pop("_id", None)
+        return {"replies": replies, "next_cursor": next_cursor}
+
+
+# Create singleton instances
+forum_repository = ForumRepository()
+forum_reply_repository = ForumReplyRepository()
@@ -0,0 +1,229 @@
+"""Live forum activity for GET /forum/stream (Server-Sent Events).
+
+Each web worker runs one ForumBroker. The broker fans every event out to
+all of the worker's connected clients, so one change stream on
+``forum_posts`` serves all of them, however many there are. Events are
+serialized once, when they are published.
+
+These event types are sent:
+
+* ``post``: a new post, shaped like an item of GET /forum.
+* ``reply_count``: ``{"postId", "reply_count"}`` after a reply is added.
+* ``reset``: events may have been missed; reload the first page.
+* ``mode``: ``{"live": bool}``, on connect and whenever it changes. While
+  ``live`` is false the stream only carries this worker's writes, and
+  clients should poll GET /forum as well. ``mode`` has no id.
+
+With a change stream, event ids are the stream's resume tokens. These
+mean the same on every worker, so a client that reconnects with
+Last-Event-ID resumes from the broker's recent events on whichever
+worker it reaches. If the id is no longer in that window, the client gets
+a ``reset`` event and should reload the first page of GET /forum.
+
+The change stream is on by default. It is reopened after errors and
+resumes from the last event (see database.follow_changes); if it cannot
+resume, clients get a ``reset``. Change streams need a replica set.
+Without one, with FORUM_STREAM_WATCH=false, or while the stream is
+reconnecting, the broker runs in local mode: the app publishes its own
+writes, numbered by a per-process counter, and they reach only the
+clients of the worker that made them. Tests drive the broker the same
+way.
+"""
+import asyncio
+import itertools
+import logging
+import secrets
+from collections import deque
+from typing import AsyncIterator, Deque, NamedTuple, Optional, Set
+
+from prometheus_client import Counter, Gauge
+from database import follow_changes
+from responses import dumps
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+FORUM_STREAM_CLIENTS = Gauge("forum_stream_clients", "Clients connected to /forum/stream")
+FORUM_STREAM_EVENTS = Counter("forum_stream_events", "Events published to /forum/stream", ["event"])
+FORUM_STREAM_DROPPED = Counter("forum_stream_dropped", "Clients disconnected for falling behind")
+
+# only inserts and reply counter bumps are forum activity
+CHANGE_PIPELINE = [
+    {"$match": {"$or": [
+        {"operationType": "insert"},
+        {"operationType": "update", "updateDescription.updatedFields.reply_count": {"$exists": True}},
+    ]}},
+]
+
+# tells EventSource-style clients how long to wait before reconnecting
+RETRY_MS = 3000
+KEEPALIVE = b": keepalive\n\n"
+
+
+class Event(NamedTuple):
+    id: str
+    message: bytes
+
+
+def format_event(event_id: str, event: str, data) -> bytes:
+    return b"id: %s\nevent: %s\ndata: %s\n\n" % (event_id.encode(), event.encode(), dumps(data))
+
+
+def format_mode(live: bool) -> bytes:
+    # no id: resuming after it would skip nothing
+    return b"event: mode\ndata: %s\n\n" % dumps({"live": live})
+
+
+def change_to_event(change: dict) -> Optional[tuple]:
+    """(event, data) for a change stream document, or None if it is not forum activity."""
+    if change["operationType"] == "insert":
+        post = dict(change["fullDocument"])
+        post.pop("replies", None)
+        return "post", post
+    updated = change.get("updateDescription", {}).get("updatedFields", {})
+    if "reply_count" in updated:
+        return "reply_count", {"postId": str(change["documentKey"]["_id"]), "reply_count": updated["reply_count"]}
+    return None
+
+
+class Subscription:
+    """One client's queue. A client that falls more than ``queue_size``
+    events behind is closed; it reconnects with Last-Event-ID and catches
+    up from the broker's recent events instead of holding memory here."""
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self.pending: Deque[bytes] = deque()
+        self.closed = False
+        self._wake = asyncio.Event()
+
+    def put(self, message: bytes) -> bool:
+        if len(self.pending) >= self.queue_size:
+            self.close()
+            return False
+        self.pending.append(message)
+        self._wake.set()
+        return True
+
+    def close(self) -> None:
+        self.closed = True
+        self._wake.set()
+
+    async def messages(self, heartbeat_s: float) -> AsyncIterator[bytes]:
+        """Queued messages as they arrive, with a keepalive comment after
+        ``heartbeat_s`` of silence. Ends once the subscription is closed
+        and drained."""
+        while True:
+            while self.pending:
+                yield self.pending.popleft()
+            if self.closed:
+                return
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), heartbeat_s)
+            except asyncio.TimeoutError:
+                yield KEEPALIVE
+
+
+class ForumBroker:
+    def __init__(
+        self,
+        queue_size: int = settings.forum_stream_queue_size,
+        replay_size: int = settings.forum_stream_replay,
+    ):
+        self.queue_size = queue_size
+        self.subscribers: Set[Subscription] = set()
+        self.recent: Deque[Event] = deque(maxlen=replay_size)
+        # True while no change stream feeds the broker; the app then publishes its own writes
+        self._local = True
+        # local ids are unique to this broker, so a restarted worker cannot match a stale Last-Event-ID
+        self._epoch = secrets.token_hex(4)
+        self._sequence = itertools.count(1)
+
+    @property
+    def local(self) -> bool:
+        return self._local
+
+    @local.setter
+    def local(self, local: bool) -> None:
+        if local != self._local:
+            self._local = local
+            self._broadcast(format_mode(not local))
+
+    def _broadcast(self, message: bytes) -> None:
+        for subscription in list(self.subscribers):
+            if not subscription.put(message):
+                self.subscribers.discard(subscription)
+                FORUM_STREAM_DROPPED.inc()
+
+    def publish(self, event: str, data, event_id: Optional[str] = None) -> str:
+        """Send an event to every subscriber. Returns its id."""
+        event_id = event_id or f"{self._epoch}-{next(self._sequence)}"
+        message = format_event(event_id, event, data)
+        self.recent.append(Event(event_id, message))
+        FORUM_STREAM_EVENTS.labels(event).inc()
+        self._broadcast(message)
+        return event_id
+
+    def publish_local(self, event: str, data) -> None:
+        """Publish a write made by this worker, unless a change stream will
+        deliver it anyway."""
+        if self.local:
+            self.publish(event, data)
+
+    def subscribe(self, last_event_id: Optional[str] = None) -> Subscription:
+        """Register a client, first queueing whatever it missed after
+        ``last_event_id``. Unsubscribe it when done."""
+        subscription = Subscription(self.queue_size)
+        # the catch-up is queued in full, even past the limit for live events
+        subscription.pending.append(b"retry: %d\n\n" % RETRY_MS)
+        subscription.pending.append(format_mode(not self.local))
+        if last_event_id:
+            ids = [event.id for event in self.recent]
+            if last_event_id in ids:
+                subscription.pending.extend(event.message for event in list(self.recent)[ids.index(last_event_id) + 1:])
+            else:
+                subscription.pending.append(format_event(last_event_id, "reset", {}))
+        self.subscribers.add(subscription)
+        FORUM_STREAM_CLIENTS.set(len(self.subscribers))
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self.subscribers.discard(subscription)
+        FORUM_STREAM_CLIENTS.set(len(self.subscribers))
+
+    def close(self) -> None:
+        """End every open stream, e.g. at shutdown."""
+        for subscription in self.subscribers:
+            subscription.close()
+        self.subscribers.clear()
+        FORUM_STREAM_CLIENTS.set(0)
+
+    async def watch(self, collection) -> None:
+        """Publish forum activity from a change stream on ``collection``.
+
+        Runs until cancelled. The broker is in local mode while the stream
+        is reconnecting, and for good if change streams are unavailable (a
+        standalone server).
+        """
+        async def opened(lost):
+            self.local = False
+            if lost:
+                self.publish("reset", {})
+
+        def closed():
+            self.local = True
+
+        def handle(change):
+            activity = change_to_event(change)
+            if activity:
+                self.publish(*activity, event_id=change["_id"]["_data"])
+
+        if not await follow_changes(collection, CHANGE_PIPELINE, handle, on_open=opened, on_close=closed):
+            logger.warning(
+                "Change streams are not supported by this deployment; /forum/stream only "
+                "delivers each worker's own writes and clients fall back to polling"
+            )
+
+
+forum_broker = ForumBroker()
@@ -0,0 +1,198 @@
+"""In-process index of the pregnancy guide corpus.
+
+Guides are static editorial content, so the whole collection is read into
+an immutable GuideIndex at startup. Every listing and document body is
+pre-serialized once, with a strong ETag and, when worth it, gzip and
+brotli variants. Requests are then answered from memory, and clients that
+send ``If-None-Match`` get a 304 without a body.
+
+The index is swapped as a whole on refresh. Each web worker holds its
+own copy, so a refresh has to reach all of them:
+
+* ``POST /guide/refresh`` rebuilds the index of the worker that serves it
+  and bumps a version number in ``guide_meta``. Every other worker reads
+  that number at most once per ``check_interval_s`` (GUIDE_VERSION_CHECK_S)
+  when it serves a guide, and rebuilds when it has moved. Edited guides
+  are therefore served everywhere within that interval.
+* ``GuideStore.watch`` rebuilds on every change to the collection when
+  the deployment runs on a replica set (change streams need one).
+"""
+import asyncio
+import gzip
+import hashlib
+import logging
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from pymongo.errors import PyMongoError
+from starlette.requests import Request
+from starlette.responses import Response
+
+from responses import accepted_encodings, dumps
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# bodies smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 512
+
+# _id of the guide_meta document holding the guide corpus version
+GUIDE_VERSION_ID = "guides"
+
+
+@dataclass(frozen=True)
+class Representation:
+    body: bytes
+    etag: str
+    gzip: Optional[bytes] = None
+    br: Optional[bytes] = None
+
+    @classmethod
+    def build(cls, payload) -> "Representation":
+        body = dumps(payload)
+        etag = hashlib.sha256(body).hexdigest()[:32]
+        compressed = {}
+        if len(body) >= MIN_COMPRESS_SIZE:
+            compressed["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+            if brotli is not None:
+                compressed["br"] = brotli.compress(body, quality=11)
+        return cls(body=body, etag=etag, **compressed)
+
+    def etags(self) -> set:
+        """Every ETag handed out for this content, one per encoding."""
+        return {f'"{self.etag}"', f'"{self.etag}-gzip"', f'"{self.etag}-br"'}
+
+
+class GuideIndex:
+    def __init__(self, listing: Representation, documents: dict, sources: Optional[dict] = None):
+        self.listing = listing
+        self.documents = documents
+        # the raw guide documents by string _id, e.g. for search snippets
+        self.sources = sources or {}
+
+    @classmethod
+    def build(cls, docs: list) -> "GuideIndex":
+        listing = Representation.build(
+            {"documents": [{"_id": doc["_id"], "title": doc.get("title")} for doc in docs]}
+        )
+        documents = {str(doc["_id"]): Representation.build(doc) for doc in docs}
+        return cls(listing, documents, {str(doc["_id"]): doc for doc in docs})
+
+    def get(self, doc_id: str) -> Optional[Representation]:
+        return self.documents.get(doc_id)
+
+
+class GuideStore:
+    def __init__(
+        self,
+        on_refresh: Optional[Callable[[list], None]] = None,
+        meta=None,
+        check_interval_s: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.index: Optional[GuideIndex] = None
+        # called with the raw guide documents after every rebuild
+        self.on_refresh = on_refresh
+        # guide_meta collection; without it the version is never checked
+        self.meta = meta
+        self.check_interval_s = check_interval_s
+        self.clock = clock
+        # guide_meta version the index was built from
+        self.version = 0
+        self._checked_at = clock()
+        self._lock = asyncio.Lock()
+
+    async def _read_version(self) -> int:
+        doc = await self.meta.find_one({"_id": GUIDE_VERSION_ID})
+        return doc["version"] if doc else 0
+
+    async def refresh(self, collection) -> GuideIndex:
+        if self.meta is not None:
+            # read before the guides, so an edit racing this rebuild triggers another
+            self.version = await self._read_version()
+            self._checked_at = self.clock()
+        docs = await collection.find({}).to_list(None)
+        self.index = GuideIndex.build(docs)
+        if self.on_refresh:
+            self.on_refresh(docs)
+        logger.info("Guide index built with %d documents", len(docs))
+        return self.index
+
+    async def publish(self, collection) -> GuideIndex:
+        """Bump the shared version so every worker reloads, and rebuild this
+        worker's index now."""
+        if self.meta is not None:
+            await self.meta.update_one({"_id": GUIDE_VERSION_ID}, {"$inc": {"version": 1}}, upsert=True)
+        return await self.refresh(collection)
+
+    def _check_due(self) -> bool:
+        return self.meta is not None and self.clock() - self._checked_at >= self.check_interval_s
+
+    async def get_index(self, collection) -> GuideIndex:
+        """The current index, built on first use if startup did not build it,
+        and rebuilt when another worker has published a newer version."""
+        if self.index is None or self._check_due():
+            async with self._lock:
+                if self.index is None:
+                    await self.refresh(collection)
+                elif self._check_due():
+                    await self._reload_if_stale(collection)
+        return self.index
+
+    async def _reload_if_stale(self, collection) -> None:
+        self._checked_at = self.clock()
+        try:
+            if await self._read_version() != self.version:
+                await self.refresh(collection)
+        except PyMongoError as exc:
+            # keep serving the guides we have; the next check tries again
+            logger.warning("Guide version check failed: %s", exc)
+
+    async def watch(self, collection):
+        """Rebuild the index whenever the guide collection changes.
+
+        Runs until cancelled. If change streams are unavailable (a
+        standalone server), the error is logged and the admin refresh
+        endpoint remains the only way to reload.
+        """
+        try:
+            async with await collection.watch() as stream:
+                async for _ in stream:
+                    await self.refresh(collection)
+        except PyMongoError as exc:
+            logger.warning("Guide change stream stopped: %s", exc)
+
+
+def _not_modified(request: Request, representation: Representation) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison, so W/ prefixes are ignored
+    tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return bool(tags & representation.etags())
+
+
+def serve(request: Request, representation: Representation, cache_control: str) -> Response:
+    """Answer with the best encoding the client accepts, or 304 if it
+    already holds the current version."""
+    headers = {"Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    accepted = accepted_encodings(request.headers.get("accept-encoding", ""))
+    if representation.br is not None and "br" in accepted:
+        body, etag, headers["Content-Encoding"] = representation.br, f'"{representation.etag}-br"', "br"
+    elif representation.gzip is not None and "gzip" in accepted:
+        body, etag, headers["Content-Encoding"] = representation.gzip, f'"{representation.etag}-gzip"', "gzip"
+    else:
+        body, etag = representation.body, f'"{representation.etag}"'
+    headers["ETag"] = etag
+
+    if _not_modified(request, representation):
+        headers.pop("Content-Encoding", None)
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
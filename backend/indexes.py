@@ -0,0 +1,157 @@
+"""Index declarations, idempotent bootstrap and a query-plan report.
+
+Repositories declare their own indexes as an ``indexes`` class attribute;
+collections that app.py still talks to directly are declared here. At
+startup ``ensure_indexes`` creates everything (``createIndexes`` is a no-op
+for indexes that already exist with the same spec).
+
+Run ``python indexes.py --explain`` against a database to print the
+winning plan for every query shape the app issues. The command exits with
+status 1 if any shape that is expected to use an index falls back to a
+collection scan.
+"""
+import argparse
+import asyncio
+import logging
+from typing import NamedTuple, Optional
+
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+from dailytaskrepository import DailyTaskRepository
+from forumrepository import POST_SORT, REPLY_SORT, ForumReplyRepository, ForumRepository
+from moodrepository import MoodRepository
+from refreshtokenrepository import RefreshTokenRepository
+from reminderrepository import REMINDER_SORT, ReminderRepository
+from reminderscheduler import ReminderScheduler
+from userrepository import UserRepository
+from waterintakerepository import WaterIntakeRepository
+
+logger = logging.getLogger(__name__)
+
+COLLECTION_INDEXES = {
+    "users": UserRepository.indexes,
+    "daily_tasks": DailyTaskRepository.indexes,
+    "water_intake": WaterIntakeRepository.indexes,
+    "mood_tracking": MoodRepository.indexes,
+    "reminders": ReminderRepository.indexes,
+    "forum_posts": ForumRepository.indexes,
+    "forum_replies": ForumReplyRepository.indexes,
+    "refresh_tokens": RefreshTokenRepository.indexes,
+    "reminder_occurrences": ReminderScheduler.indexes,
+}
+
+
+class QueryShape(NamedTuple):
+    collection: str
+    filter: dict
+    sort: Optional[list] = None
+    # small, unfiltered listings where a scan is the right plan
+    allow_collscan: bool = False
+
+
+# Every query shape issued by the repositories and app.py. Values are
+# placeholders; only the field names matter to the planner.
+QUERY_SHAPES = [
+    QueryShape("users", {"email": "x@example.com"}),
+    QueryShape("daily_tasks", {"userId": "u", "date": "2025-01-01"}),
+    QueryShape("daily_tasks", {"userId": "u", "date": "2025-01-01", "tasks.id": "t"}),
+    QueryShape("water_intake", {"userId": "u", "date": "2025-01-01"}),
+    QueryShape("water_intake", {"userId": "u"}, sort=[("date", DESCENDING)]),
+    QueryShape("mood_tracking", {"userId": "u", "date": "2025-01-01"}),
+    QueryShape("mood_tracking", {"userId": "u"}, sort=[("date", DESCENDING)]),
+    QueryShape("mood_tracking", {"userId": "u", "date": {"$gte": "2025-01-01", "$lte": "2025-12-31"}}, sort=[("date", DESCENDING)]),
+    QueryShape("reminders", {"userId": "u"}, sort=REMINDER_SORT),
+    QueryShape("reminders", {"userId": "u", "date": {"$lte": "2025-01-31"}, "$or": [{"date": {"$gte": "2025-01-01"}}, {"repeat": {"$in": ["daily"]}}]}, sort=REMINDER_SORT),
+    QueryShape("reminders", {"userId": "u", "category": "c"}, sort=REMINDER_SORT),
+    QueryShape("reminders", {"id": "r", "userId": "u"}),
+    QueryShape("forum_posts", {}, sort=POST_SORT),
+    QueryShape("forum_posts", {"created_at": {"$lte": "t"}, "$or": [{"created_at": {"$lt": "t"}}, {"_id": {"$lt": "i"}}]}, sort=POST_SORT),
+    QueryShape("forum_posts", {"userId": "u"}, sort=POST_SORT),
+    QueryShape("forum_replies", {"postId": "p"}, sort=REPLY_SORT),
+    QueryShape("forum_posts", {"_id": {"$in": ["i"]}}),
+    QueryShape("forum_replies", {"_id": {"$in": ["i"]}}),
+    QueryShape("guide", {}, allow_collscan=True),
+    QueryShape("refresh_tokens", {"token_hash": "h", "revoked_at": None, "expires_at": {"$gt": "t"}}),
+    QueryShape("refresh_tokens", {"family": "f", "revoked_at": None}),
+    QueryShape("refresh_tokens", {"userId": "u", "revoked_at": None}),
+    QueryShape("reminder_occurrences", {"fire_at": {"$lte": "t"}, "leased_until": {"$lte": "t"}}, sort=[("fire_at", ASCENDING)]),
+    QueryShape("reminder_occurrences", {"userId": "u", "fire_at": {"$lte": "t"}}, sort=[("fire_at", ASCENDING)]),
+]
+
+
+async def ensure_indexes(db, collection_indexes=None):
+    """Create all declared indexes. Failures are logged, not raised, so a
+    collection with pre-existing duplicates cannot stop the app from booting."""
+    collection_indexes = collection_indexes or COLLECTION_INDEXES
+    created = {}
+    for name, models in collection_indexes.items():
+        try:
+            created[name] = await db[name].create_indexes(models)
+        except OperationFailure as exc:
+            logger.error("Could not create indexes on %s: %s", name, exc)
+    return created
+
+
+def plan_stages(plan):
+    """Flatten a (classic or slot-based) explain plan into its stage names."""
+    if not isinstance(plan, dict):
+        return []
+    stages = [plan["stage"]] if "stage" in plan else []
+    for key in ("queryPlan", "inputStage"):
+        stages += plan_stages(plan.get(key))
+    for child in plan.get("inputStages", []):
+        stages += plan_stages(child)
+    return stages
+
+
+async def explain_shape(db, shape):
+    cursor = db[shape.collection].find(shape.filter)
+    if shape.sort:
+        cursor = cursor.sort(shape.sort)
+    explain = await cursor.limit(1).explain()
+    stages = plan_stages(explain.get("queryPlanner", {}).get("winningPlan", {}))
+    return {
+        "collection": shape.collection,
+        "filter": sorted(shape.filter),
+        "sort": [field for field, _ in shape.sort or []],
+        "stages": stages,
+        "collscan": "COLLSCAN" in stages and not shape.allow_collscan,
+    }
+
+
+async def explain_report(db, shapes=None):
+    return [await explain_shape(db, shape) for shape in shapes or QUERY_SHAPES]
+
+
+def format_report(rows):
+    lines = []
+    for row in rows:
+        flag = "COLLSCAN" if row["collscan"] else "ok"
+        sort = f" sort={row['sort']}" if row["sort"] else ""
+        lines.append(
+            f"[{flag:>8}] {row['collection']:<14} filter={row['filter']}{sort} -> {' > '.join(row['stages'])}"
+        )
+    return "\n".join(lines)
+
+
+async def _main(args):
+    from database import mongo_db
+
+    try:
+        if args.ensure:
+            await ensure_indexes(mongo_db.db)
+        if args.explain:
+            rows = await explain_report(mongo_db.db)
+            print(format_report(rows))
+            return 1 if any(row["collscan"] for row in rows) else 0
+        return 0
+    finally:
+        await mongo_db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create indexes and report query plans.")
+    parser.add_argument("--ensure", action="store_true", help="create all declared indexes")
+    parser.add_argument("--explain", action="store_true", help="explain every query shape and flag COLLSCANs")
+    raise SystemExit(asyncio.run(_main(parser.parse_args())))
@@ -0,0 +1,194 @@
+"""Pure ASGI middleware.
+
+These wrap the ``send`` callable directly instead of subclassing
+BaseHTTPMiddleware, which runs every request in an extra task with a
+memory stream between app and server and buffers streaming responses.
+"""
+import zlib
+
+from mongometrics import REQUEST_ROUND_TRIPS, count_commands
+from responses import accepted_encodings
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+
+class SecurityHeadersMiddleware:
+    """Add a fixed set of headers to every HTTP response.
+
+    Header names and values are encoded once, at construction; per request
+    the middleware only splices them into the ``http.response.start``
+    message. A configured header replaces one the route already set.
+    """
+
+    def __init__(self, app, headers: dict):
+        self.app = app
+        self.raw_headers = [
+            (name.lower().encode("latin-1"), value.encode("latin-1"))
+            for name, value in headers.items()
+        ]
+        self.names = {name for name, _ in self.raw_headers}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                headers = [h for h in message.get("headers", ()) if h[0].lower() not in self.names]
+                message["headers"] = headers + self.raw_headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+class RoundTripMiddleware:
+    """Record how many Mongo commands each HTTP request sent, by route.
+
+    The handler label is the route's path template, as the Instrumentator
+    uses, so the metric stays low-cardinality; unmatched paths count as
+    "none". A stream is recorded once it ends.
+    """
+
+    def __init__(self, app, excluded_handlers=()):
+        self.app = app
+        self.excluded_handlers = set(excluded_handlers)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with count_commands() as commands:
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                # the router stores the matched route in the shared scope
+                handler = getattr(scope.get("route"), "path", "none")
+                if handler not in self.excluded_handlers:
+                    REQUEST_ROUND_TRIPS.labels(scope["method"], handler).observe(commands.value)
+
+
+class _GzipEncoder:
+    name = b"gzip"
+
+    def __init__(self, level: int):
+        # wbits=31 writes the gzip header and trailer
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_FINISH)
+
+
+class _BrotliEncoder:
+    name = b"br"
+
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.process(data) + self._compressor.finish()
+
+
+class CompressionMiddleware:
+    """Compress responses with brotli or gzip, as the client accepts.
+
+    Bodies sent in one message are compressed only from ``minimum_size``
+    bytes up; small JSON gains nothing and costs CPU. Streaming bodies are
+    compressed chunk by chunk with a flush after each, so every chunk
+    reaches the client as soon as the app yields it.
+
+    Responses that already carry a Content-Encoding (the precompressed
+    guides), an ETag (which names the bytes as sent, so must not change
+    under it) and server-sent event streams are passed through untouched.
+    """
+
+    def __init__(self, app, minimum_size: int = 500, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _encoder(self, scope):
+        header = b""
+        for name, value in scope.get("headers", ()):
+            if name == b"accept-encoding":
+                header = value
+                break
+        accepted = accepted_encodings(header.decode("latin-1"))
+        if brotli is not None and "br" in accepted:
+            return _BrotliEncoder(self.brotli_quality)
+        if "gzip" in accepted:
+            return _GzipEncoder(self.gzip_level)
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoder = self._encoder(scope)
+        if encoder is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        # None until the first body message decides; then True or False
+        compressing = None
+
+        async def send_compressed(message):
+            nonlocal start, compressing
+            if message["type"] == "http.response.start":
+                start = message
+                headers = {name.lower(): value for name, value in message.get("headers", ())}
+                if (
+                    b"content-encoding" in headers
+                    or b"etag" in headers
+                    or headers.get(b"content-type", b"").startswith(b"text/event-stream")
+                ):
+                    compressing = False
+                    await send(start)
+                return
+            if message["type"] != "http.response.body" or compressing is False:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressing is None:
+                if not more_body and len(body) < self.minimum_size:
+                    compressing = False
+                    await send(start)
+                    await send(message)
+                    return
+                compressing = True
+                headers = [
+                    (name, value) for name, value in start.get("headers", ())
+                    if name.lower() not in (b"content-length", b"vary")
+                ]
+                vary = [value for name, value in start.get("headers", ()) if name.lower() == b"vary"]
+                if not any(b"accept-encoding" in value.lower() for value in vary):
+                    vary.append(b"Accept-Encoding")
+                headers.append((b"vary", b", ".join(vary)))
+                headers.append((b"content-encoding", encoder.name))
+                if not more_body:
+                    body = encoder.finish(body)
+                    headers.append((b"content-length", str(len(body)).encode("latin-1")))
+                    start["headers"] = headers
+                    await send(start)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                start["headers"] = headers
+                await send(start)
+
+            chunk = encoder.compress(body) if more_body else encoder.finish(body)
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
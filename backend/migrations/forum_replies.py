@@ -0,0 +1,113 @@
+"""One-shot migration: move replies embedded in forum_posts into forum_replies.
+
+    MONGO_URI=... python -m migrations.forum_replies [--batch-size 1000] [--dry-run]
+
+Posts are read in _id order with only their replies projected. Replies are
+written with insert_many in batches and each post is then updated with
+$inc reply_count / $unset replies in a bulk_write, so the embedded array
+disappears only after its replies are stored.
+
+The migration is safe to re-run and to run while the new code is serving
+traffic: replies keep their original id as _id (duplicates from a previous
+partial run are skipped), posts are only touched while they still have a
+replies field, and reply_count is incremented rather than overwritten so
+replies added through the new endpoint are not lost.
+"""
+import argparse
+import asyncio
+import logging
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY = 11000
+
+
+def reply_documents(post_id, replies):
+    """Convert a post's embedded replies into forum_replies documents."""
+    documents = []
+    for reply in replies:
+        try:
+            reply_id = ObjectId(reply.get("id"))
+        except (InvalidId, TypeError):
+            reply_id = ObjectId()
+        documents.append({**reply, "_id": reply_id, "id": str(reply_id), "postId": post_id})
+    return documents
+
+
+async def insert_ignoring_duplicates(collection, documents):
+    if not documents:
+        return 0
+    try:
+        result = await collection.insert_many(documents, ordered=False)
+        return len(result.inserted_ids)
+    except BulkWriteError as exc:
+        errors = exc.details.get("writeErrors", [])
+        if any(error["code"] != DUPLICATE_KEY for error in errors):
+            raise
+        return exc.details.get("nInserted", 0)
+
+
+async def flush(posts, replies, pending_replies, pending_updates):
+    inserted = await insert_ignoring_duplicates(replies, pending_replies)
+    if pending_updates:
+        await posts.bulk_write(pending_updates, ordered=False)
+    return inserted
+
+
+async def migrate(db, batch_size=1000, dry_run=False):
+    """Move every embedded reply out of forum_posts. Returns (posts, replies) counts."""
+    posts = db["forum_posts"]
+    replies = db["forum_replies"]
+    pending_replies, pending_updates = [], []
+    migrated_posts = migrated_replies = 0
+
+    cursor = posts.find({"replies": {"$exists": True}}, {"replies": 1}).sort("_id", 1).batch_size(batch_size)
+    async for post in cursor:
+        embedded = post.get("replies") or []
+        pending_replies += reply_documents(post["_id"], embedded)
+        pending_updates.append(UpdateOne(
+            {"_id": post["_id"], "replies": {"$exists": True}},
+            {"$inc": {"reply_count": len(embedded)}, "$unset": {"replies": ""}},
+        ))
+        migrated_posts += 1
+
+        if len(pending_replies) >= batch_size or len(pending_updates) >= batch_size:
+            if not dry_run:
+                migrated_replies += await flush(posts, replies, pending_replies, pending_updates)
+            else:
+                migrated_replies += len(pending_replies)
+            pending_replies, pending_updates = [], []
+            logger.info("migrated %d posts / %d replies", migrated_posts, migrated_replies)
+
+    if not dry_run:
+        migrated_replies += await flush(posts, replies, pending_replies, pending_updates)
+    else:
+        migrated_replies += len(pending_replies)
+    return migrated_posts, migrated_replies
+
+
+async def _main(args):
+    from database import mongo_db
+    from indexes import ensure_indexes
+
+    try:
+        if not args.dry_run:
+            await ensure_indexes(mongo_db.db)
+        posts, replies = await migrate(mongo_db.db, args.batch_size, args.dry_run)
+        action = "would migrate" if args.dry_run else "migrated"
+        print(f"{action} {replies} replies from {posts} posts")
+    finally:
+        await mongo_db.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Move embedded forum replies into forum_replies.")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true")
+    asyncio.run(_main(parser.parse_args()))
@@ -0,0 +1,102 @@
+"""One-shot migration: split the per-user reminder arrays into one document per reminder.
+
+    MONGO_URI=... python -m migrations.reminders [--batch-size 1000] [--dry-run]
+
+The old layout keeps all of a user's reminders in a ``reminders`` array on
+one document in ``reminder``. The migration reads those documents in _id
+order and writes their reminders to ``reminders`` with insert_many in
+batches. Each source document is deleted with a bulk_write only after its
+reminders are stored.
+
+The migration is safe to re-run and to run while the new code is serving
+traffic. Reminders keep their original id, so duplicates from a previous
+partial run are skipped by the unique id index. A source document is only
+deleted while its array still has the length that was copied. If an old
+instance appended to it mid-run, the document stays and the next run
+copies the rest.
+
+Run ``python reminderscheduler.py --backfill`` afterwards to schedule the
+migrated reminders.
+"""
+import argparse
+import asyncio
+import logging
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import DeleteOne
+
+from migrations.forum_replies import insert_ignoring_duplicates
+
+logger = logging.getLogger(__name__)
+
+
+def reminder_documents(user_id, reminders):
+    """Convert a user's embedded reminders into ``reminders`` documents."""
+    documents = []
+    for reminder in reminders:
+        try:
+            reminder_id = ObjectId(reminder.get("id"))
+        except (InvalidId, TypeError):
+            reminder_id = ObjectId()
+        # the string id is what clients and the scheduler know, keep it as is
+        documents.append({**reminder, "_id": reminder_id, "id": reminder.get("id") or str(reminder_id), "userId": user_id})
+    return documents
+
+
+async def flush(source, reminders, pending_reminders, pending_deletes):
+    inserted = await insert_ignoring_duplicates(reminders, pending_reminders)
+    if pending_deletes:
+        await source.bulk_write(pending_deletes, ordered=False)
+    return inserted
+
+
+async def migrate(db, batch_size=1000, dry_run=False):
+    """Move every embedded reminder out of ``reminder``. Returns (users, reminders) counts."""
+    source = db["reminder"]
+    reminders = db["reminders"]
+    pending_reminders, pending_deletes = [], []
+    migrated_users = migrated_reminders = 0
+
+    cursor = source.find({}, {"userId": 1, "reminders": 1}).sort("_id", 1).batch_size(batch_size)
+    async for doc in cursor:
+        embedded = doc.get("reminders") or []
+        pending_reminders += reminder_documents(doc["userId"], embedded)
+        pending_deletes.append(DeleteOne({"_id": doc["_id"], "reminders": {"$size": len(embedded)}}))
+        migrated_users += 1
+
+        if len(pending_reminders) >= batch_size or len(pending_deletes) >= batch_size:
+            if not dry_run:
+                migrated_reminders += await flush(source, reminders, pending_reminders, pending_deletes)
+            else:
+                migrated_reminders += len(pending_reminders)
+            pending_reminders, pending_deletes = [], []
+            logger.info("migrated %d users / %d reminders", migrated_users, migrated_reminders)
+
+    if not dry_run:
+        migrated_reminders += await flush(source, reminders, pending_reminders, pending_deletes)
+    else:
+        migrated_reminders += len(pending_reminders)
+    return migrated_users, migrated_reminders
+
+
+async def _main(args):
+    from database import mongo_db
+    from indexes import ensure_indexes
+
+    try:
+        if not args.dry_run:
+            await ensure_indexes(mongo_db.db)
+        users, reminders = await migrate(mongo_db.db, args.batch_size, args.dry_run)
+        action = "would migrate" if args.dry_run else "migrated"
+        print(f"{action} {reminders} reminders from {users} users")
+    finally:
+        await mongo_db.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Split per-user reminder arrays into one document per reminder.")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true")
+    asyncio.run(_main(parser.parse_args()))
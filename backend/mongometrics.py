@@ -0,0 +1,238 @@
+"""Connection pool, command and repository metrics for the Mongo client.
+
+PoolMetricsListener is registered on AsyncMongoClient and mirrors pool
+events into Prometheus metrics on the default registry, which the
+Instrumentator already serves on /metrics. It also keeps process-wide
+totals that /readyz uses to report a saturated pool.
+
+CommandMetricsListener records every command the client sends: its
+latency, the documents it returned or wrote and its size on the wire,
+labelled by collection and command name. These labels are bounded by
+the app's own collections. It also counts commands against the HTTP
+request they were sent for (see ``count_commands`` and
+middleware.RoundTripMiddleware), which is how N+1 query patterns show up
+per route.
+
+``instrument_repository`` times each public method of a repository class,
+so a slow endpoint can be traced to the repository call behind it.
+"""
+import functools
+import inspect
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+import bson
+from prometheus_client import Counter, Gauge, Histogram
+from pymongo import monitoring
+
+CHECKED_OUT = Gauge(
+    "mongo_pool_checked_out_connections", "Connections currently checked out of the pool", ["address"]
+)
+OPEN = Gauge("mongo_pool_open_connections", "Connections currently open in the pool", ["address"])
+WAITING = Gauge("mongo_pool_waiting_checkouts", "Operations waiting to check out a connection", ["address"])
+CHECKOUT_WAIT = Histogram(
+    "mongo_pool_checkout_wait_seconds",
+    "Time from requesting a connection to getting one",
+    ["address"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+CHECKOUT_FAILURES = Counter(
+    "mongo_pool_checkout_failures", "Connection checkouts that failed", ["address", "reason"]
+)
+POOL_CLEARED = Counter("mongo_pool_cleared", "Times the pool was cleared after an error", ["address"])
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+COMMAND_DURATION = Histogram(
+    "mongo_command_duration_seconds",
+    "Round-trip time of Mongo commands",
+    ["collection", "command"],
+    buckets=LATENCY_BUCKETS,
+)
+COMMAND_FAILURES = Counter("mongo_command_failures", "Mongo commands that failed", ["collection", "command"])
+COMMAND_DOCUMENTS = Histogram(
+    "mongo_command_documents",
+    "Documents returned by reads, or matched by writes, per Mongo command",
+    ["collection", "command"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+)
+COMMAND_REPLY_BYTES = Histogram(
+    "mongo_command_reply_bytes",
+    "BSON size of Mongo command replies",
+    ["collection", "command"],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216),
+)
+COMMAND_SENT_BYTES = Counter("mongo_command_sent_bytes", "BSON bytes of Mongo commands sent", ["collection", "command"])
+REQUEST_ROUND_TRIPS = Histogram(
+    "http_request_mongo_round_trips",
+    "Mongo commands sent while serving one HTTP request",
+    ["method", "handler"],
+    buckets=(0, 1, 2, 3, 4, 6, 8, 12, 16, 25, 50),
+)
+REPOSITORY_DURATION = Histogram(
+    "repository_call_duration_seconds",
+    "Time spent in repository methods, Mongo round trips included",
+    ["repository", "method"],
+    buckets=LATENCY_BUCKETS,
+)
+
+
+def _address(event) -> str:
+    host, port = event.address
+    return f"{host}:{port}"
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    def __init__(self):
+        self.checked_out = 0
+        self.waiting = 0
+
+    def snapshot(self) -> dict:
+        return {"checked_out": self.checked_out, "waiting": self.waiting}
+
+    def saturated(self, max_pool_size: int) -> bool:
+        """Every connection is in use and operations are queueing for one."""
+        return self.checked_out >= max_pool_size and self.waiting > 0
+
+    def connection_check_out_started(self, event):
+        self.waiting += 1
+        WAITING.labels(_address(event)).inc()
+
+    def connection_checked_out(self, event):
+        address = _address(event)
+        self.waiting -= 1
+        self.checked_out += 1
+        WAITING.labels(address).dec()
+        CHECKED_OUT.labels(address).inc()
+        CHECKOUT_WAIT.labels(address).observe(event.duration)
+
+    def connection_check_out_failed(self, event):
+        address = _address(event)
+        self.waiting -= 1
+        WAITING.labels(address).dec()
+        CHECKOUT_WAIT.labels(address).observe(event.duration)
+        CHECKOUT_FAILURES.labels(address, str(event.reason)).inc()
+
+    def connection_checked_in(self, event):
+        self.checked_out -= 1
+        CHECKED_OUT.labels(_address(event)).dec()
+
+    def connection_created(self, event):
+        OPEN.labels(_address(event)).inc()
+
+    def connection_closed(self, event):
+        OPEN.labels(_address(event)).dec()
+
+    def pool_cleared(self, event):
+        POOL_CLEARED.labels(_address(event)).inc()
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+
+class CommandCount:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+
+# the count for the request being served; tasks it spawns share the same object
+_request_commands: ContextVar[Optional[CommandCount]] = ContextVar("request_commands", default=None)
+
+
+@contextmanager
+def count_commands() -> Iterator[CommandCount]:
+    """Count the Mongo commands sent from this context until the block exits."""
+    count = CommandCount()
+    token = _request_commands.set(count)
+    try:
+        yield count
+    finally:
+        _request_commands.reset(token)
+
+
+def _target(event) -> str:
+    """The collection a command runs on, or "" for database and admin commands."""
+    if event.command_name == "getMore":
+        target = event.command.get("collection")
+    else:
+        target = event.command.get(event.command_name)
+    return target if isinstance(target, str) else ""
+
+
+def _documents(reply: dict) -> Optional[int]:
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch", cursor.get("nextBatch", ())))
+    if "value" in reply:
+        # findAndModify
+        return 0 if reply["value"] is None else 1
+    return reply.get("n")
+
+
+class CommandMetricsListener(monitoring.CommandListener):
+    """Latency, documents and bytes per Mongo command.
+
+    ``measure_bytes`` re-encodes each command and reply to size it; that is
+    the costly part, so it can be switched off (MONGO_COMMAND_BYTES=false).
+    """
+
+    def __init__(self, measure_bytes: bool = True):
+        self.measure_bytes = measure_bytes
+        # (connection, request id) -> collection of the commands in flight
+        self._targets = {}
+
+    def started(self, event):
+        collection = _target(event)
+        self._targets[event.connection_id, event.request_id] = collection
+        count = _request_commands.get()
+        if count is not None:
+            count.value += 1
+        if self.measure_bytes:
+            COMMAND_SENT_BYTES.labels(collection, event.command_name).inc(len(bson.encode(event.command)))
+
+    def succeeded(self, event):
+        collection = self._targets.pop((event.connection_id, event.request_id), "")
+        COMMAND_DURATION.labels(collection, event.command_name).observe(event.duration_micros / 1e6)
+        documents = _documents(event.reply)
+        if documents is not None:
+            COMMAND_DOCUMENTS.labels(collection, event.command_name).observe(documents)
+        if self.measure_bytes:
+            COMMAND_REPLY_BYTES.labels(collection, event.command_name).observe(len(bson.encode(event.reply)))
+
+    def failed(self, event):
+        collection = self._targets.pop((event.connection_id, event.request_id), "")
+        COMMAND_DURATION.labels(collection, event.command_name).observe(event.duration_micros / 1e6)
+        COMMAND_FAILURES.labels(collection, event.command_name).inc()
+
+
+def _timed(method, histogram):
+    @functools.wraps(method)
+    async def timed(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await method(*args, **kwargs)
+        finally:
+            histogram.observe(time.perf_counter() - start)
+
+    return timed
+
+
+def instrument_repository(cls):
+    """Class decorator: record the duration of every public coroutine
+    method in repository_call_duration_seconds."""
+    for name, method in list(vars(cls).items()):
+        if not name.startswith("_") and inspect.iscoroutinefunction(method):
+            setattr(cls, name, _timed(method, REPOSITORY_DURATION.labels(cls.__name__, name)))
+    return cls
@@ -1,38 +1,77 @@
 from database import mongo_db
-from datetime import datetime, timezone
+from mongometrics import instrument_repository
+from datetime import date as Date, datetime, timezone
 from typing import Optional
+from pymongo import ASCENDING, IndexModel, ReturnDocument
 
+VALID_MOODS = ["happy", "calm", "tired", "anxious", "unwell"]
+
+# $dateToString formats for the summary buckets; %G-W%V is the ISO week
+PERIOD_FORMATS = {"week": "%G-W%V", "month": "%Y-%m"}
+
+
+def date_range_filter(date_from: Optional[str] = None, date_to: Optional[str] = None) -> dict:
+    """Filter on the ``date`` field (YYYY-MM-DD strings sort by date), both ends inclusive."""
+    bounds = {}
+    if date_from:
+        bounds["$gte"] = date_from
+    if date_to:
+        bounds["$lte"] = date_to
+    return {"date": bounds} if bounds else {}
+
+
+def current_streak(last_run: Optional[dict], today: str) -> int:
+    """Length of the latest run of logged days if it reaches ``today`` or
+    the day before, so the streak is not broken before today's mood is in."""
+    if not last_run:
+        return 0
+    gap = (Date.fromisoformat(today) - Date.fromisoformat(last_run["end"])).days
+    return last_run["days"] if gap in (0, 1) else 0
+
+
+@instrument_repository
 class MoodRepository:
+    # also serves find_by_user and summarize: equality on userId, range/sort on date
+    indexes = [
+        IndexModel([("userId", ASCENDING), ("date", ASCENDING)], unique=True, name="userId_date_unique"),
+    ]
+
+    projection = {"userId": 1, "date": 1, "mood": 1, "created_at": 1, "updated_at": 1}
+
     def __init__(self):
         self.collection = mongo_db.get_collection("mood_tracking")
 
-    def create(self, mood_data: dict) -> str:
+    async def create(self, mood_data: dict) -> str:
         """Create a new mood entry."""
         mood_data["created_at"] = datetime.now(timezone.utc).isoformat(timespec="milliseconds")
-        result = self.collection.insert_one(mood_data)
+        result = await self.collection.insert_one(mood_data)
         return str(result.inserted_id)
 
-    def find_by_user_and_date(self, user_id: str, date: str) -> Optional[dict]:
+    async def find_by_user_and_date(self, user_id: str, date: str) -> Optional[dict]:
         """Find mood entry for a specific user and date."""
-        mood = self.collection.find_one({"userId": user_id, "date": date})
+        mood = await self.collection.find_one({"userId": user_id, "date": date})
         if mood:
             mood["_id"] = str(mood["_id"])
         return mood
 
-    def find_by_user(self, user_id: str, limit: int = 30) -> list:
-        """Find all mood entries for a user, sorted by date (most recent first)."""
-        moods = list(
-            self.collection.find({"userId": user_id})
+    async def find_by_user(
+        self, user_id: str, limit: int = 30, date_from: Optional[str] = None, date_to: Optional[str] = None
+    ) -> list:
+        """Find mood entries for a user, sorted by date (most recent first),
+        optionally limited to the dates from ``date_from`` to ``date_to``.
+
+        _id values stay ObjectIds; MongoJSONResponse renders them.
+        """
+        return await (
+            self.collection.find({"userId": user_id, **date_range_filter(date_from, date_to)})
             .sort("date", -1)
             .limit(limit)
+            .to_list(None)
         )
-        for mood in moods:
-            mood["_id"] = str(mood["_id"])
-        return moods
 
-    def update(self, user_id: str, date: str, mood_value: str) -> bool:
+    async def update(self, user_id: str, date: str, mood_value: str) -> bool:
         """Update mood value for a specific user and date."""
-        result = self.collection.update_one(
+        result = await self.collection.update_one(
             {"userId": user_id, "date": date},
             {"$set": {
                 "mood": mood_value,
@@ -41,17 +80,117 @@ class MoodRepository:
         )
         return result.modified_count > 0
 
-    def delete(self, user_id: str, date: str) -> bool:
+    async def update_and_get(self, user_id: str, date: str, mood_value: str) -> Optional[dict]:
+        """Update mood value and return the updated entry in one round trip, or None if missing."""
+        mood = await self.collection.find_one_and_update(
+            {"userId": user_id, "date": date},
+            {"$set": {
+                "mood": mood_value,
+                "updated_at": datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+            }},
+            projection=self.projection,
+            return_document=ReturnDocument.AFTER
+        )
+        if mood:
+            mood["_id"] = str(mood["_id"])
+        return mood
+
+    def summary_pipeline(self, user_id: str, date_from: str, date_to: str, period: str) -> list:
+        """Aggregation behind summarize.
+
+        The leading $match and $sort run on the (userId, date) index. Runs
+        of consecutive days are found by numbering the entries in date
+        order: within a run, day number minus entry number is constant.
+        Needs MongoDB 5.0+ for $setWindowFields.
+        """
+        return [
+            {"$match": {"userId": user_id, **date_range_filter(date_from, date_to)}},
+            {"$sort": {"date": 1}},
+            {"$project": {"_id": 0, "date": 1, "mood": 1, "day": {"$dateFromString": {"dateString": "$date"}}}},
+            {"$addFields": {"day_number": {"$divide": [{"$toLong": "$day"}, 86_400_000]}}},
+            {"$facet": {
+                "periods": [
+                    {"$group": {
+                        "_id": {"period": {"$dateToString": {"format": PERIOD_FORMATS[period], "date": "$day"}}, "mood": "$mood"},
+                        "count": {"$sum": 1},
+                    }},
+                    {"$group": {
+                        "_id": "$_id.period",
+                        "counts": {"$push": {"mood": "$_id.mood", "count": "$count"}},
+                        "total": {"$sum": "$count"},
+                    }},
+                    {"$sort": {"_id": 1}},
+                ],
+                "counts": [{"$group": {"_id": "$mood", "count": {"$sum": 1}}}],
+                "streaks": [
+                    {"$setWindowFields": {"sortBy": {"date": 1}, "output": {"n": {"$documentNumber": {}}}}},
+                    {"$group": {
+                        "_id": {"$subtract": ["$day_number", "$n"]},
+                        "end": {"$max": "$date"},
+                        "days": {"$sum": 1},
+                    }},
+                    {"$sort": {"end": -1}},
+                    {"$group": {
+                        "_id": None,
+                        "longest": {"$max": "$days"},
+                        "last": {"$first": {"end": "$end", "days": "$days"}},
+                    }},
+                ],
+                "mood_streaks": [
+                    {"$setWindowFields": {
+                        "partitionBy": "$mood", "sortBy": {"date": 1}, "output": {"n": {"$documentNumber": {}}},
+                    }},
+                    {"$group": {"_id": {"mood": "$mood", "run": {"$subtract": ["$day_number", "$n"]}}, "days": {"$sum": 1}}},
+                    {"$group": {"_id": "$_id.mood", "longest": {"$max": "$days"}}},
+                ],
+            }},
+        ]
+
+    async def summarize(self, user_id: str, date_from: str, date_to: str, period: str = "week") -> dict:
+        """Mood counts per week or month, overall counts, the most common
+        mood and streaks for the dates from ``date_from`` to ``date_to``."""
+        cursor = await self.collection.aggregate(self.summary_pipeline(user_id, date_from, date_to, period))
+        facets = (await cursor.to_list(None))[0]
+
+        def by_mood(rows, value):
+            counts = dict.fromkeys(VALID_MOODS, 0)
+            for row in rows:
+                if row["mood"] in counts:
+                    counts[row["mood"]] = row[value]
+            return counts
+
+        counts = by_mood(({"mood": row["_id"], "count": row["count"]} for row in facets["counts"]), "count")
+        # ties go to the mood listed first in VALID_MOODS
+        most_common = max(VALID_MOODS, key=lambda mood: counts[mood]) if any(counts.values()) else None
+        streaks = facets["streaks"][0] if facets["streaks"] else {"longest": 0, "last": None}
+        return {
+            "from": date_from,
+            "to": date_to,
+            "period": period,
+            "total": sum(counts.values()),
+            "counts": counts,
+            "most_common": most_common,
+            "periods": [
+                {"period": row["_id"], "total": row["total"], "counts": by_mood(row["counts"], "count")}
+                for row in facets["periods"]
+            ],
+            "streaks": {
+                "current": current_streak(streaks["last"], date_to),
+                "longest": streaks["longest"],
+                "by_mood": by_mood(
+                    ({"mood": row["_id"], "longest": row["longest"]} for row in facets["mood_streaks"]), "longest"
+                ),
+            },
+        }
+
+    async def delete(self, user_id: str, date: str) -> bool:
         """Delete a mood entry."""
-        result = self.collection.delete_one({"userId": user_id, "date": date})
+        result = await self.collection.delete_one({"userId": user_id, "date": date})
         return result.deleted_count > 0
 
-    def find_all(self) -> list:
+    async def find_all(self) -> list:
         """Find all mood entries (for testing/admin purposes)."""
-        moods = list(self.collection.find({}))
-        for mood in moods:
-            mood["_id"] = str(mood["_id"])
-        return moods
+        return await self.collection.find({}).to_list(None)
 
 # Create a singleton instance
 mood_repository = MoodRepository()
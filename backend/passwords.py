@@ -0,0 +1,94 @@
+"""Password hashing with argon2id, kept off the event loop.
+
+An argon2 hash or verify takes tens of milliseconds of CPU and, with the
+default cost, 64 MiB of memory. Running it inline would stall the event
+loop. Running it in anyio's default threadpool would let a login storm
+take every thread the other endpoints need. So hashing runs in its own
+small ThreadPoolExecutor: argon2-cffi releases the GIL while it works,
+and the pool size caps both CPU and memory spent on passwords. Excess
+logins wait as futures on the loop and cost nothing while they wait.
+
+Stored values that do not look like an argon2 hash are legacy plaintext
+passwords from before hashing. They are compared in constant time and
+handed back as a new hash on success, as are hashes made with older cost
+parameters, so accounts upgrade on their next login.
+"""
+import asyncio
+import hmac
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from argon2 import PasswordHasher, Type
+from argon2.exceptions import InvalidHashError, VerificationError
+
+from settings import settings
+
+ARGON2_PREFIX = "$argon2"
+
+
+class Passwords:
+    def __init__(self, time_cost: int = 3, memory_cost: int = 65536, parallelism: int = 4, workers: int = 2):
+        self.hasher = PasswordHasher(
+            time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism, type=Type.ID
+        )
+        self.workers = workers
+        self._executor = None
+        self._dummy_hash = None
+
+    @classmethod
+    def from_settings(cls, settings) -> "Passwords":
+        return cls(
+            time_cost=settings.password_time_cost,
+            memory_cost=settings.password_memory_cost_kib,
+            parallelism=settings.password_parallelism,
+            workers=settings.password_hash_workers,
+        )
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        return self._executor
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.hasher.hash, password)
+
+    def _verify(self, stored: Optional[str], password: str) -> Tuple[bool, Optional[str]]:
+        if stored is None:
+            # unknown account: burn the same work so timing does not reveal it
+            if self._dummy_hash is None:
+                self._dummy_hash = self.hasher.hash("unknown account")
+            stored = self._dummy_hash
+            password = "\0" + password
+        if not stored.startswith(ARGON2_PREFIX):
+            if not hmac.compare_digest(stored.encode(), password.encode()):
+                return False, None
+            return True, self.hasher.hash(password)
+        try:
+            self.hasher.verify(stored, password)
+        except (VerificationError, InvalidHashError):
+            return False, None
+        if self.hasher.check_needs_rehash(stored):
+            return True, self.hasher.hash(password)
+        return True, None
+
+    async def verify(self, stored: Optional[str], password: str) -> Tuple[bool, Optional[str]]:
+        """Check ``password`` against a stored hash.
+
+        Returns ``(ok, new_hash)``. ``new_hash`` is set when the stored value
+        should be replaced: a legacy plaintext password or outdated cost
+        parameters. Pass ``stored=None`` for an unknown account; the result
+        is always a failure, after the same amount of work.
+        """
+        return await self._run(self._verify, stored, password)
+
+    def close(self) -> None:
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            executor.shutdown(wait=False)
+
+
+passwords = Passwords.from_settings(settings)
@@ -0,0 +1,117 @@
+"""Server-side store of refresh tokens.
+
+A refresh token is an opaque random string; only its SHA-256 is stored,
+with the user's id. Profile fields are not copied here: the app reads
+the current email and name when it issues the new access token, so
+profile edits show up at the next refresh.
+
+Tokens rotate: every successful refresh revokes the presented token and
+issues a new one in the same family. Presenting a revoked token again
+means it was copied, so the whole family is revoked and the user has to
+log in again. Expired documents are removed by a TTL index.
+"""
+import hashlib
+import logging
+import secrets
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+from prometheus_client import Counter
+from pymongo import ASCENDING, IndexModel, ReturnDocument
+
+from database import mongo_db
+from mongometrics import instrument_repository
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+TOKEN_GRANTS = Counter("auth_token_grants", "Access tokens issued, by grant type", ["grant"])
+REFRESH_REJECTED = Counter("auth_refresh_rejected", "Refresh tokens refused, by reason", ["reason"])
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+@instrument_repository
+class RefreshTokenRepository:
+    indexes = [
+        IndexModel([("token_hash", ASCENDING)], unique=True, name="token_hash_unique"),
+        IndexModel([("userId", ASCENDING)], name="userId"),
+        IndexModel([("family", ASCENDING)], name="family"),
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0, name="expires_at_ttl"),
+    ]
+
+    def __init__(self):
+        self.collection = mongo_db.get_collection("refresh_tokens")
+        self.ttl = timedelta(days=settings.refresh_token_ttl_days)
+
+    async def _insert(self, session: dict, family: str) -> str:
+        token = secrets.token_urlsafe(32)
+        now = datetime.now(timezone.utc)
+        await self.collection.insert_one({
+            "token_hash": hash_token(token),
+            "family": family,
+            "userId": session["userId"],
+            "created_at": now,
+            "expires_at": now + self.ttl,
+            "revoked_at": None,
+        })
+        return token
+
+    async def issue(self, user: dict) -> str:
+        """Start a new session for a user who just logged in with a password."""
+        TOKEN_GRANTS.labels("password").inc()
+        return await self._insert({"userId": str(user["_id"])}, family=secrets.token_hex(16))
+
+    async def rotate(self, token: str) -> Optional[Tuple[dict, str]]:
+        """Exchange a refresh token for a new one.
+
+        Returns the session (userId, family) and the new token, or
+        None if the token is unknown, expired or already used.
+        """
+        now = datetime.now(timezone.utc)
+        session = await self.collection.find_one_and_update(
+            {"token_hash": hash_token(token), "revoked_at": None, "expires_at": {"$gt": now}},
+            {"$set": {"revoked_at": now}},
+            return_document=ReturnDocument.BEFORE,
+        )
+        if session is None:
+            await self._reject(token)
+            return None
+
+        TOKEN_GRANTS.labels("refresh").inc()
+        return session, await self._insert(session, family=session["family"])
+
+    async def _reject(self, token: str) -> None:
+        stale = await self.collection.find_one({"token_hash": hash_token(token)})
+        if stale is None or stale.get("revoked_at") is None:
+            REFRESH_REJECTED.labels("invalid").inc()
+            return
+        # a rotated token came back: someone else holds a copy
+        REFRESH_REJECTED.labels("reused").inc()
+        logger.warning("Refresh token reuse for user %s; revoking its session", stale["userId"])
+        await self.revoke_family(stale["family"])
+
+    async def revoke(self, token: str) -> Optional[dict]:
+        """Revoke one token (logout). Returns its session, or None if it was not live."""
+        return await self.collection.find_one_and_update(
+            {"token_hash": hash_token(token), "revoked_at": None},
+            {"$set": {"revoked_at": datetime.now(timezone.utc)}},
+        )
+
+    async def revoke_family(self, family: str) -> int:
+        result = await self.collection.update_many(
+            {"family": family, "revoked_at": None}, {"$set": {"revoked_at": datetime.now(timezone.utc)}}
+        )
+        return result.modified_count
+
+    async def revoke_user(self, user_id: str) -> int:
+        """Revoke every session of a user (logout everywhere)."""
+        result = await self.collection.update_many(
+            {"userId": user_id, "revoked_at": None}, {"$set": {"revoked_at": datetime.now(timezone.utc)}}
+        )
+        return result.modified_count
+
+
+refresh_token_repository = RefreshTokenRepository()
@@ -0,0 +1,86 @@
+from typing import List, Optional
+
+from bson.objectid import ObjectId
+from pymongo import ASCENDING, IndexModel, ReturnDocument
+
+from database import mongo_db
+from mongometrics import instrument_repository
+from reminderscheduler import REPEAT_RULES
+
+# reminders read in the order they happen
+REMINDER_SORT = [("date", ASCENDING), ("time", ASCENDING)]
+
+# callers address reminders by their string id; _id and userId stay internal
+REMINDER_PROJECTION = {"_id": 0, "userId": 0}
+
+
+def active_range_filter(date_from: Optional[str] = None, date_to: Optional[str] = None) -> dict:
+    """Filter for reminders that can fire from ``date_from`` to ``date_to``
+    (YYYY-MM-DD, both inclusive).
+
+    A reminder starts on its ``date``; one that repeats stays active after
+    that, so it matches any range ending on or after its start.
+    """
+    query = {}
+    if date_to:
+        query["date"] = {"$lte": date_to}
+    if date_from:
+        query["$or"] = [{"date": {"$gte": date_from}}, {"repeat": {"$in": list(REPEAT_RULES)}}]
+    return query
+
+
+@instrument_repository
+class ReminderRepository:
+    # one document per reminder
+    indexes = [
+        IndexModel([("userId", ASCENDING)] + REMINDER_SORT, name="userId_date_time"),
+        IndexModel([("userId", ASCENDING), ("category", ASCENDING)] + REMINDER_SORT, name="userId_category_date_time"),
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+    ]
+
+    def __init__(self):
+        self.collection = mongo_db.get_collection("reminders")
+
+    async def create(self, user_id: str, fields: dict) -> dict:
+        """Store a new reminder and return it with its generated id."""
+        oid = ObjectId()
+        reminder = {"id": str(oid), **fields}
+        await self.collection.insert_one({"_id": oid, "userId": user_id, **reminder})
+        return reminder
+
+    async def find_by_user(
+        self,
+        user_id: str,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        category: Optional[str] = None,
+        limit: int = 0,
+    ) -> List[dict]:
+        """A user's reminders by date and time, optionally only those active
+        from ``date_from`` to ``date_to`` and/or in one category.
+        ``limit`` 0 means no limit."""
+        query = {"userId": user_id, **active_range_filter(date_from, date_to)}
+        if category:
+            query["category"] = category
+        return await (
+            self.collection.find(query, REMINDER_PROJECTION)
+            .sort(REMINDER_SORT)
+            .limit(limit)
+            .to_list(None)
+        )
+
+    async def update(self, user_id: str, reminder_id: str, fields: dict) -> Optional[dict]:
+        """Set fields on one of the user's reminders and return it, or None."""
+        return await self.collection.find_one_and_update(
+            {"id": reminder_id, "userId": user_id},
+            {"$set": fields},
+            projection=REMINDER_PROJECTION,
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def delete(self, user_id: str, reminder_id: str) -> bool:
+        result = await self.collection.delete_one({"id": reminder_id, "userId": user_id})
+        return result.deleted_count > 0
+
+
+reminder_repository = ReminderRepository()
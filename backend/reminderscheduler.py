@@ -0,0 +1,297 @@
+"""Reminder scheduling.
+
+Reminders are stored as a date, a wall-clock time and a repeat rule
+(``none``, ``daily``, ``weekly`` or ``monthly``). The scheduler keeps one
+document per active reminder in ``reminder_occurrences`` holding only its
+next fire time, so the collection grows with the number of reminders, not
+with how far ahead they repeat. A worker pops due documents in batches,
+oldest ``fire_at`` first on the ``fire_at`` index, hands them to a
+handler and moves each one to its next fire time (or deletes it when the
+rule has no more).
+
+Several workers can run at once. A batch is claimed with a lease token
+and ``leased_until``; a worker that dies mid-batch loses its claim when
+the lease runs out and another worker picks the batch up. Every write
+that finishes a batch is conditioned on the lease token and the claimed
+``fire_at``, so an edit made while a batch was in flight wins.
+
+Wall-clock times are interpreted in REMINDER_TIMEZONE (default UTC);
+fire times are stored in UTC. Time comes from an injectable clock so the
+whole cycle can be driven by a fake one in tests.
+
+    python reminderscheduler.py --backfill   # schedule existing reminders
+    python reminderscheduler.py              # run a worker
+"""
+import argparse
+import asyncio
+import logging
+import secrets
+from datetime import date as Date, datetime, time as Time, timedelta, timezone
+from typing import Awaitable, Callable, Iterator, List, Optional
+from zoneinfo import ZoneInfo
+
+from prometheus_client import Counter, Histogram
+from pymongo import ASCENDING, DeleteOne, IndexModel, UpdateOne
+from pymongo.errors import PyMongoError
+
+from database import mongo_db
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+REMINDERS_FIRED = Counter("reminders_fired", "Reminder occurrences handed to the handler")
+REMINDER_FIRE_LAG = Histogram(
+    "reminder_fire_lag_seconds", "Delay between a reminder's fire time and its dispatch",
+    buckets=(0.5, 1, 2, 5, 10, 30, 60, 300, 900),
+)
+
+REPEAT_DAYS = {"daily": 1, "weekly": 7}
+REPEAT_RULES = ("daily", "weekly", "monthly")
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+# fields copied from the reminder so due lookups and the handler need nothing else
+REMINDER_FIELDS = ("title", "description", "category", "date", "time", "repeat")
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def as_utc(value: datetime) -> datetime:
+    """Mongo hands datetimes back naive; they are always UTC."""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def fire_dates(start: Date, repeat: Optional[str], from_date: Date) -> Iterator[Date]:
+    """Days on or after ``from_date`` on which a reminder starting on
+    ``start`` fires, in order. Endless for repeating rules.
+
+    Monthly reminders fire on the start's day of the month and skip months
+    that do not have that day. Unknown rules fire once, like ``none``.
+    """
+    if repeat in REPEAT_DAYS:
+        step = REPEAT_DAYS[repeat]
+        skip = max(0, (from_date - start).days)
+        day = start + timedelta(days=-(-skip // step) * step)
+        while True:
+            yield day
+            day += timedelta(days=step)
+    elif repeat == "monthly":
+        first = max(start, from_date)
+        year, month = first.year, first.month
+        while True:
+            try:
+                day = Date(year, month, start.day)
+            except ValueError:
+                day = None
+            if day is not None and day >= first:
+                yield day
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    elif start >= from_date:
+        yield start
+
+
+def fire_times(reminder: dict, after: datetime, tz) -> Iterator[datetime]:
+    """UTC fire times strictly after ``after``, in order. Nothing for a
+    reminder whose date or time does not parse."""
+    try:
+        start = Date.fromisoformat(reminder["date"])
+        at = Time.fromisoformat(reminder["time"])
+    except (KeyError, TypeError, ValueError):
+        return
+    for day in fire_dates(start, reminder.get("repeat"), after.astimezone(tz).date()):
+        fire = datetime.combine(day, at, tzinfo=tz).astimezone(timezone.utc)
+        if fire > after:
+            yield fire
+
+
+def next_fire(reminder: dict, after: datetime, tz) -> Optional[datetime]:
+    return next(fire_times(reminder, after, tz), None)
+
+
+def occurrences_between(reminder: dict, start: datetime, end: datetime, tz) -> Iterator[datetime]:
+    """Fire times from ``start`` to ``end``, both inclusive."""
+    for fire in fire_times(reminder, start - timedelta(microseconds=1), tz):
+        if fire > end:
+            return
+        yield fire
+
+
+async def log_fired(occurrences: List[dict]) -> None:
+    """Default handler. There is no push channel yet, so firing is logged
+    and counted; the app shows due reminders through /reminders/due."""
+    for occurrence in occurrences:
+        logger.info("Reminder %s due for user %s at %s", occurrence["_id"], occurrence["userId"], occurrence["fire_at"])
+
+
+class ReminderScheduler:
+    indexes = [
+        # the worker's queue: due documents, oldest first
+        IndexModel([("fire_at", ASCENDING)], name="fire_at"),
+        # due lookups for one user
+        IndexModel([("userId", ASCENDING), ("fire_at", ASCENDING)], name="userId_fire_at"),
+    ]
+
+    def __init__(
+        self,
+        clock: Callable[[], datetime] = utcnow,
+        handler: Callable[[List[dict]], Awaitable[None]] = log_fired,
+        batch_size: int = settings.reminder_batch_size,
+        lease_s: float = settings.reminder_lease_s,
+        poll_interval_s: float = settings.reminder_poll_interval_s,
+        timezone_name: str = settings.reminder_timezone,
+    ):
+        self.collection = mongo_db.get_collection("reminder_occurrences")
+        self.clock = clock
+        self.handler = handler
+        self.batch_size = batch_size
+        self.lease = timedelta(seconds=lease_s)
+        self.poll_interval_s = poll_interval_s
+        self.tz = ZoneInfo(timezone_name)
+
+    def _schedule_op(self, user_id: str, reminder: dict, now: datetime):
+        """The write that (re)schedules a reminder, and its next fire time."""
+        fire_at = next_fire(reminder, now, self.tz)
+        if fire_at is None:
+            return DeleteOne({"_id": reminder["id"]}), None
+        fields = {name: reminder.get(name) for name in REMINDER_FIELDS}
+        op = UpdateOne(
+            {"_id": reminder["id"]},
+            # a reschedule also drops any claim on the old fire time
+            {"$set": {"userId": user_id, "fire_at": fire_at, "leased_until": EPOCH, "lease": None, **fields}},
+            upsert=True,
+        )
+        return op, fire_at
+
+    async def schedule(self, user_id: str, reminder: dict) -> Optional[datetime]:
+        """Insert or move a reminder's next occurrence. Returns the fire time,
+        or None if the reminder will not fire again (and was removed)."""
+        op, fire_at = self._schedule_op(user_id, reminder, self.clock())
+        await self.collection.bulk_write([op])
+        return fire_at
+
+    async def unschedule(self, reminder_id: str) -> None:
+        await self.collection.delete_one({"_id": reminder_id})
+
+    async def due(self, user_id: str, start: datetime, end: datetime) -> List[dict]:
+        """Occurrences of the user's scheduled reminders from ``start`` to
+        ``end``, in fire order. One-off reminders that already fired are
+        no longer scheduled and are not listed."""
+        cursor = self.collection.find({"userId": user_id, "fire_at": {"$lte": end}}).sort("fire_at", ASCENDING)
+        due = []
+        async for doc in cursor:
+            for fire_at in occurrences_between(doc, start, end, self.tz):
+                due.append({
+                    "reminderId": doc["_id"],
+                    "fire_at": fire_at,
+                    **{name: doc.get(name) for name in REMINDER_FIELDS},
+                })
+        due.sort(key=lambda occurrence: occurrence["fire_at"])
+        return due
+
+    async def claim_batch(self, now: datetime):
+        """Lease up to batch_size due occurrences. Returns (token, docs)."""
+        query = {"fire_at": {"$lte": now}, "leased_until": {"$lte": now}}
+        candidates = await (
+            self.collection.find(query, {"_id": 1}).sort("fire_at", ASCENDING).limit(self.batch_size).to_list(None)
+        )
+        if not candidates:
+            return None, []
+        token = secrets.token_hex(8)
+        ids = [doc["_id"] for doc in candidates]
+        # only documents nobody else claimed in between are taken
+        await self.collection.update_many(
+            {"_id": {"$in": ids}, **query}, {"$set": {"lease": token, "leased_until": now + self.lease}}
+        )
+        claimed = await (
+            self.collection.find({"_id": {"$in": ids}, "lease": token}).sort("fire_at", ASCENDING).to_list(None)
+        )
+        return token, claimed
+
+    async def complete(self, token: str, claimed: List[dict], now: datetime) -> None:
+        """Move each claimed occurrence to its next fire time, or drop it.
+
+        Missed occurrences are not replayed: after downtime a daily reminder
+        fires once, then continues from now.
+        """
+        ops = []
+        for doc in claimed:
+            fire_at = as_utc(doc["fire_at"])
+            claim = {"_id": doc["_id"], "lease": token, "fire_at": doc["fire_at"]}
+            following = next_fire(doc, max(fire_at, now), self.tz)
+            if following is None:
+                ops.append(DeleteOne(claim))
+            else:
+                ops.append(UpdateOne(claim, {"$set": {"fire_at": following, "leased_until": EPOCH, "lease": None}}))
+        if ops:
+            await self.collection.bulk_write(ops, ordered=False)
+
+    async def run_once(self) -> int:
+        """Claim, handle and complete one batch. Returns its size."""
+        now = self.clock()
+        token, claimed = await self.claim_batch(now)
+        if not claimed:
+            return 0
+        for doc in claimed:
+            REMINDER_FIRE_LAG.observe((now - as_utc(doc["fire_at"])).total_seconds())
+        # if the handler raises, the batch is retried once the lease runs out
+        await self.handler(claimed)
+        REMINDERS_FIRED.inc(len(claimed))
+        await self.complete(token, claimed, now)
+        return len(claimed)
+
+    async def run(self, stop: Optional[asyncio.Event] = None) -> None:
+        """Work until ``stop`` is set. Full batches are followed immediately
+        by the next one; otherwise the worker waits poll_interval_s."""
+        stop = stop or asyncio.Event()
+        while not stop.is_set():
+            try:
+                handled = await self.run_once()
+            except PyMongoError as exc:
+                logger.warning("Reminder worker batch failed: %s", exc)
+                handled = 0
+            if handled >= self.batch_size:
+                continue
+            try:
+                await asyncio.wait_for(stop.wait(), self.poll_interval_s)
+            except asyncio.TimeoutError:
+                pass
+
+    async def backfill(self, reminder_collection) -> int:
+        """Schedule every reminder in ``reminder_collection`` (one document
+        per reminder, see ReminderRepository).
+
+        Streams the source collection and writes in batch_size chunks, so
+        memory stays bounded however many reminders there are.
+        """
+        now, ops, total = self.clock(), [], 0
+        projection = {"_id": 0, "id": 1, "userId": 1, **{name: 1 for name in REMINDER_FIELDS}}
+        async for reminder in reminder_collection.find({}, projection, batch_size=self.batch_size):
+            ops.append(self._schedule_op(reminder["userId"], reminder, now)[0])
+            if len(ops) >= self.batch_size:
+                await self.collection.bulk_write(ops, ordered=False)
+                total, ops = total + len(ops), []
+        if ops:
+            await self.collection.bulk_write(ops, ordered=False)
+            total += len(ops)
+        return total
+
+
+reminder_scheduler = ReminderScheduler()
+
+
+async def _main(args):
+    try:
+        if args.backfill:
+            total = await reminder_scheduler.backfill(mongo_db.get_collection("reminders"))
+            print(f"Scheduled {total} reminders")
+            return
+        await reminder_scheduler.run()
+    finally:
+        await mongo_db.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Run the reminder worker.")
+    parser.add_argument("--backfill", action="store_true", help="schedule all existing reminders and exit")
+    asyncio.run(_main(parser.parse_args()))
@@ -0,0 +1,50 @@
+"""orjson-backed JSON responses that understand Mongo documents.
+
+MongoJSONResponse renders ObjectId as its hex string and datetimes as
+RFC 3339 (naive values, as PyMongo returns them, are marked UTC), so
+repository results can go out as-is instead of having every ``_id``
+rewritten to ``str`` first.
+
+FastAPI still runs a returned dict through ``jsonable_encoder`` before the
+response class sees it, even with ``default_response_class``. Listing
+routes therefore return ``MongoJSONResponse(...)`` directly, which skips
+that walk over every document.
+"""
+from typing import Any
+
+import orjson
+from bson import ObjectId
+from starlette.responses import JSONResponse
+
+
+def _default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def accepted_encodings(header: str) -> set:
+    """Content codings an Accept-Encoding header allows (q > 0), lower-cased."""
+    accepted = set()
+    for part in header.split(","):
+        coding, *params = [piece.strip() for piece in part.split(";")]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding and quality > 0:
+            accepted.add(coding.lower())
+    return accepted
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NAIVE_UTC)
+
+
+class MongoJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
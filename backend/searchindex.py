@@ -0,0 +1,349 @@
+"""In-process BM25 search over forum posts, replies and guides.
+
+Each web worker keeps an inverted index. It is built at startup by
+streaming the collections, then kept current by change streams on
+forum_posts and forum_replies, so it sees the writes of every worker.
+The app also adds its own writes directly, which makes them searchable
+at once. Deployments without change streams (a standalone server), or
+with SEARCH_WATCH=false, only index each worker's own writes; the watch
+logs a warning when that happens. Re-adding a document whose title and text are unchanged does
+nothing, so the same write may arrive both ways, and the startup build
+may overlap with live writes. Guides are replaced whenever the guide
+store refreshes.
+
+Only postings are kept in memory, not document text. Snippets are cut
+from the page of hits fetched from Mongo afterwards.
+
+Scoring is BM25. Title terms count ``title_weight`` times. A posting's
+term-frequency part is computed once, when the document is added, using
+the average document length at that moment.
+
+To keep queries fast on large corpora, each term keeps only its
+``champions`` highest-weighted postings, in weight order, plus its
+document frequency. These are called champion lists. A term that
+appears in fewer documents than that is exact. For very common terms,
+only the strongest matches can rank, and those terms contribute little
+to the score anyway. A query therefore touches at most ``champions``
+postings per term, however large the index grows. Removing a document
+takes its postings out of the lists and its length out of the average,
+and lowers the document frequency of its terms. A posting that was
+evicted from a full list does not come back when a stronger one is
+removed; the list refills from new documents.
+"""
+import asyncio
+import bisect
+import heapq
+import html
+import logging
+import math
+import re
+from array import array
+from collections import Counter
+from operator import itemgetter
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from prometheus_client import Gauge
+from database import follow_changes
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+SEARCH_DOCUMENTS = Gauge("search_index_documents", "Documents in the search index")
+
+TOKEN = re.compile(r"\w+")
+TAG = re.compile(r"<[^>]+>")
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have how i if in is it its my of on or so that the this to was "
+    "we what when with you your".split()
+)
+# longer queries are cut to their first terms
+MAX_QUERY_TERMS = 10
+
+
+class Entry(NamedTuple):
+    kind: str
+    id: str
+    title: str
+    text: str
+
+
+class _Document(NamedTuple):
+    number: int
+    length: int
+    # hash of title and text; re-adding the same content is a no-op
+    fingerprint: int
+    # ids of the document's terms, for taking it out of their postings
+    terms: array
+
+
+class Hit(NamedTuple):
+    kind: str
+    id: str
+    score: float
+
+
+def plain_text(value: Optional[str]) -> str:
+    """Guide bodies are HTML; index and quote their text only."""
+    return html.unescape(TAG.sub(" ", value or ""))
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def query_terms(query: str) -> List[str]:
+    return list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+
+
+def post_entry(post: dict) -> Entry:
+    return Entry("post", str(post["_id"]), post.get("title") or "", post.get("content") or "")
+
+
+def reply_entry(reply: dict) -> Entry:
+    return Entry("reply", str(reply.get("id") or reply["_id"]), "", reply.get("content") or "")
+
+
+def guide_entry(guide: dict) -> Entry:
+    return Entry("guide", str(guide["_id"]), guide.get("title") or "", plain_text(guide.get("content")))
+
+
+def highlight(text: str, terms: Iterable[str], width: int = 160) -> dict:
+    """A window of ``text`` around the first matching term, with the
+    [start, end) offsets of every match inside it."""
+    wanted = set(terms)
+    matches = [m.span() for m in TOKEN.finditer(text) if m.group().lower() in wanted]
+    start = 0
+    if matches and matches[0][1] > width:
+        # a little context before the first match, starting on a word
+        start = text.rfind(" ", 0, max(0, matches[0][0] - width // 4)) + 1
+    end = min(len(text), start + width)
+    if end < len(text) and " " in text[start:end]:
+        end = text.rfind(" ", start, end)
+    return {
+        "snippet": text[start:end],
+        "highlights": [[s - start, e - start] for s, e in matches if s >= start and e <= end],
+    }
+
+
+def search_result(hit: Hit, doc: dict, terms: List[str]) -> dict:
+    """A hit as GET /search returns it, with a highlighted snippet."""
+    result = {"type": hit.kind, "id": hit.id, "score": hit.score}
+    if hit.kind == "reply":
+        result["postId"] = str(doc["postId"])
+    else:
+        title = doc.get("title") or ""
+        result["title"] = title
+        result["title_highlights"] = highlight(title, terms, width=len(title))["highlights"]
+    text = plain_text(doc.get("content")) if hit.kind == "guide" else doc.get("content") or ""
+    result.update(highlight(text, terms))
+    return result
+
+
+class _Postings:
+    """A term's document frequency and its highest-weighted postings.
+
+    Postings are appended as they come until there are ``limit`` of them.
+    From then on they are kept sorted by weight, ascending, so the weakest
+    one is first and ready to be evicted.
+    """
+
+    __slots__ = ("df", "docs", "weights")
+
+    def __init__(self):
+        self.df = 0
+        self.docs = array("i")
+        self.weights = array("f")
+
+    def add(self, doc: int, weight: float, limit: int) -> None:
+        self.df += 1
+        docs, weights = self.docs, self.weights
+        if len(docs) < limit:
+            docs.append(doc)
+            weights.append(weight)
+            if len(docs) == limit:
+                order = sorted(range(limit), key=weights.__getitem__)
+                self.docs = array("i", [docs[i] for i in order])
+                self.weights = array("f", [weights[i] for i in order])
+        elif weight >= weights[0]:
+            # on a tie the newer document wins; bisect places it after equal weights
+            del docs[0]
+            del weights[0]
+            at = bisect.bisect(weights, weight)
+            docs.insert(at, doc)
+            weights.insert(at, weight)
+
+    def remove(self, doc: int) -> None:
+        self.df -= 1
+        try:
+            at = self.docs.index(doc)
+        except ValueError:
+            # evicted earlier
+            return
+        del self.docs[at]
+        del self.weights[at]
+
+
+class SearchIndex:
+    def __init__(
+        self,
+        champions: int = settings.search_champions,
+        k1: float = 1.2,
+        b: float = 0.75,
+        title_weight: float = 2.0,
+    ):
+        self.champions = champions
+        self.k1 = k1
+        self.b = b
+        self.title_weight = title_weight
+        self.ready = False
+        self._terms = {}
+        # term id -> postings; documents keep ids, which take 4 bytes each
+        self._postings: List[_Postings] = []
+        self._term_ids = {}
+        # document number -> (kind, id); None once deleted or replaced
+        self._keys: List[Optional[Tuple[str, str]]] = []
+        # numbers of deleted documents, handed out again so _keys stays as
+        # long as the most documents ever indexed at once
+        self._free: List[int] = []
+        self._documents = {}
+        self._total_length = 0
+        self._length_count = 0
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def add_batch(self, entries: Iterable[Entry]) -> None:
+        """Index (or re-index) documents. The batch's own lengths count
+        towards the average used to weight it. Documents already indexed
+        with the same title and text are skipped."""
+        prepared = []
+        for entry in entries:
+            key = (entry.kind, entry.id)
+            fingerprint = hash((entry.title, entry.text))
+            current = self._documents.get(key)
+            if current is not None:
+                if current.fingerprint == fingerprint:
+                    continue
+                self.remove(*key)
+            body, title = tokenize(entry.text), tokenize(entry.title)
+            frequencies = Counter(body)
+            for token in title:
+                frequencies[token] += self.title_weight
+            length = len(body) + len(title)
+            prepared.append((key, fingerprint, frequencies, length))
+            self._total_length += length
+            self._length_count += 1
+        average = self._total_length / self._length_count if self._length_count else 1.0
+
+        k1, b = self.k1, self.b
+        for key, fingerprint, frequencies, length in prepared:
+            # a batch may carry the same document twice; the last copy wins
+            if key in self._documents:
+                self.remove(*key)
+            if self._free:
+                doc = self._free.pop()
+                self._keys[doc] = key
+            else:
+                doc = len(self._keys)
+                self._keys.append(key)
+            norm = k1 * (1 - b + b * length / (average or 1.0))
+            terms = array("i")
+            for term, tf in frequencies.items():
+                term_id = self._term_ids.get(term)
+                if term_id is None:
+                    term_id = self._term_ids[term] = len(self._postings)
+                    self._postings.append(_Postings())
+                    self._terms[term] = self._postings[term_id]
+                self._postings[term_id].add(doc, tf * (k1 + 1) / (tf + norm), self.champions)
+                terms.append(term_id)
+            self._documents[key] = _Document(doc, length, fingerprint, terms)
+        SEARCH_DOCUMENTS.set(len(self._documents))
+
+    def add(self, entry: Entry) -> None:
+        self.add_batch([entry])
+
+    def remove(self, kind: str, doc_id: str) -> bool:
+        document = self._documents.pop((kind, doc_id), None)
+        if document is None:
+            return False
+        self._keys[document.number] = None
+        for term_id in document.terms:
+            self._postings[term_id].remove(document.number)
+        # no posting refers to the number any more, so it can be reused
+        self._free.append(document.number)
+        self._total_length -= document.length
+        self._length_count -= 1
+        SEARCH_DOCUMENTS.set(len(self._documents))
+        return True
+
+    def replace(self, kind: str, entries: Iterable[Entry]) -> None:
+        """Make ``entries`` the only documents of ``kind``, e.g. after the
+        guides are reloaded. Unchanged documents are left as they are."""
+        entries = list(entries)
+        keep = {(entry.kind, entry.id) for entry in entries}
+        for key in [key for key in self._documents if key[0] == kind and key not in keep]:
+            self.remove(*key)
+        self.add_batch(entries)
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> Tuple[List[Hit], bool]:
+        """Hits ranked by BM25, and whether there are more after this page."""
+        total = len(self._documents) or 1
+        scores = {}
+        for term in query_terms(query):
+            postings = self._terms.get(term)
+            if postings is None:
+                continue
+            idf = math.log(1 + (total - postings.df + 0.5) / (postings.df + 0.5))
+            get = scores.get
+            for doc, weight in zip(postings.docs, postings.weights):
+                scores[doc] = get(doc, 0.0) + idf * weight
+
+        keys = self._keys
+        ranked = heapq.nlargest(offset + limit + 1, scores.items(), key=itemgetter(1))
+        page = [Hit(*keys[doc], round(score, 4)) for doc, score in ranked[offset:offset + limit]]
+        return page, len(ranked) > offset + limit
+
+    async def build(self, sources, batch_size: int = settings.search_build_batch) -> int:
+        """Index every document of ``sources``, a list of (collection,
+        projection, to_entry) triples, streaming in batches."""
+        count = 0
+        for collection, projection, to_entry in sources:
+            batch = []
+            async for doc in collection.find({}, projection, batch_size=batch_size):
+                batch.append(to_entry(doc))
+                if len(batch) >= batch_size:
+                    self.add_batch(batch)
+                    count, batch = count + len(batch), []
+                    # let requests run between batches
+                    await asyncio.sleep(0)
+            self.add_batch(batch)
+            count += len(batch)
+        self.ready = True
+        logger.info("Search index built with %d documents", count)
+        return count
+
+    async def watch(self, collection, to_entry, rebuild=None) -> None:
+        """Index documents inserted into ``collection`` as they arrive.
+
+        Runs until cancelled, reopening the stream after errors (see
+        database.follow_changes). If the server cannot resume the stream,
+        inserts may have been missed, so ``await rebuild()`` re-indexes
+        everything.
+        """
+        async def opened(lost):
+            if lost and rebuild:
+                logger.warning("Search change stream on %s could not resume; rebuilding the index", collection.name)
+                await rebuild()
+
+        pipeline = [{"$match": {"operationType": "insert"}}]
+        supported = await follow_changes(
+            collection, pipeline, lambda change: self.add(to_entry(change["fullDocument"])), on_open=opened
+        )
+        if not supported:
+            logger.warning(
+                "Change streams are not supported by this deployment; search on this worker "
+                "only indexes its own writes to %s", collection.name,
+            )
+
+
+search_index = SearchIndex()
@@ -0,0 +1,54 @@
+"""Production entry point: ``python serve.py``.
+
+Runs the app under uvicorn's multi-process supervisor with one worker per
+available CPU (WEB_WORKERS overrides), using uvloop and httptools when
+they are installed. On SIGTERM uvicorn stops accepting connections, lets
+in-flight requests finish for up to GRACEFUL_TIMEOUT_S seconds, then runs
+the lifespan shutdown, which closes the Mongo client.
+
+Every worker is a separate process with its own Mongo connection pool, so
+the total number of connections can reach WEB_WORKERS x MONGO_MAX_POOL_SIZE.
+"""
+import importlib.util
+import os
+
+import uvicorn
+
+from settings import Settings, settings as default_settings
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on, which respects container CPU sets."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def worker_count(settings: Settings) -> int:
+    return settings.web_workers if settings.web_workers > 0 else available_cpus()
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def uvicorn_options(settings: Settings) -> dict:
+    """Keyword arguments for uvicorn.run."""
+    loop = settings.web_loop
+    if loop == "auto":
+        loop = "uvloop" if _installed("uvloop") else "asyncio"
+    http = settings.web_http
+    if http == "auto":
+        http = "httptools" if _installed("httptools") else "h11"
+    return {
+        "host": settings.web_host,
+        "port": settings.web_port,
+        "workers": worker_count(settings),
+        "loop": loop,
+        "http": http,
+        "timeout_graceful_shutdown": settings.graceful_timeout_s,
+    }
+
+
+if __name__ == "__main__":
+    uvicorn.run("app:app", **uvicorn_options(default_settings))
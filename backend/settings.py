@@ -0,0 +1,208 @@
+"""Process-wide settings read once from the environment at import."""
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Optional
+
+DEFAULT_CONTENT_SECURITY_POLICY = (
+    "default-src 'self'; "
+    "script-src 'self' https://cdnjs.cloudflare.com; "
+    "style-src 'self' 'unsafe-inline' https://fonts.googleapis.com; "
+    "font-src 'self' https://fonts.gstatic.com; "
+    "img-src 'self' data: https://example.com; "
+    "connect-src 'self'; "
+    "frame-ancestors 'none'; "
+    "base-uri 'self';"
+)
+
+
+# seconds a cached response body may be served, per cache namespace
+DEFAULT_CACHE_TTLS = {"user": 300, "reminders": 60}
+
+
+def _optional_int(value: Optional[str]) -> Optional[int]:
+    return int(value) if value not in (None, "") else None
+
+
+@dataclass(frozen=True)
+class Settings:
+    content_security_policy: str = DEFAULT_CONTENT_SECURITY_POLICY
+    # any further response headers, e.g. {"X-Content-Type-Options": "nosniff"}
+    extra_security_headers: dict = field(default_factory=dict)
+
+    mongo_uri: Optional[str] = None
+    mongo_db: str = "mamasync"
+    # pool defaults match PyMongo's own
+    mongo_max_pool_size: int = 100
+    mongo_min_pool_size: int = 0
+    # how long an operation may wait for a free connection; None waits forever
+    mongo_wait_queue_timeout_ms: Optional[int] = None
+    mongo_server_selection_timeout_ms: int = 30000
+    # e.g. "zstd,snappy"; needs the zstandard / python-snappy packages, and
+    # PyMongo warns and skips any compressor whose package is missing
+    mongo_compressors: str = ""
+    mongo_read_preference: str = "primary"
+    # size every command and reply for the mongo_command_*_bytes metrics;
+    # this re-encodes them, so large reads cost some CPU
+    mongo_command_bytes: bool = True
+    # upper bound on the Mongo ping behind /readyz
+    readiness_timeout_s: float = 2.0
+
+    # production server, see serve.py; 0 workers means one per available CPU
+    web_host: str = "0.0.0.0"
+    web_port: int = 8000
+    web_workers: int = 0
+    web_loop: str = "auto"
+    web_http: str = "auto"
+    # threads for sync handlers and dependencies (AnyIO's default is 40)
+    threadpool_size: int = 40
+    # seconds in-flight requests get to finish after SIGTERM; stays under
+    # the 10s Docker waits before it sends SIGKILL
+    graceful_timeout_s: int = 8
+
+    # argon2id cost; existing hashes are upgraded on login when these change
+    password_time_cost: int = 3
+    password_memory_cost_kib: int = 65536
+    password_parallelism: int = 4
+    # threads per worker for hashing; bounds CPU and memory spent on logins
+    password_hash_workers: int = 2
+
+    # access tokens are short-lived; clients renew them with a refresh token
+    access_token_ttl_minutes: int = 15
+    refresh_token_ttl_days: int = 30
+    # verified access tokens kept so repeat requests skip the signature check
+    jwt_cache_size: int = 1024
+
+    # reminder scheduling, see reminderscheduler.py; wall-clock reminder
+    # times are read in this zone
+    reminder_timezone: str = "UTC"
+    reminder_batch_size: int = 500
+    reminder_lease_s: float = 60.0
+    reminder_poll_interval_s: float = 5.0
+    # run the reminder worker inside the web process (one per web worker;
+    # leases keep them from firing a reminder twice)
+    reminder_worker: bool = False
+
+    # "memory", "redis" or "none"; see cache.py
+    cache_backend: str = "memory"
+    redis_url: Optional[str] = None
+    cache_ttls: dict = field(default_factory=lambda: dict(DEFAULT_CACHE_TTLS))
+
+    # guide responses may be reused for 5 minutes, then revalidated by ETag
+    guide_cache_control: str = "private, max-age=300"
+    # rebuild the guide index from a change stream (needs a replica set)
+    guide_watch: bool = False
+    # how often a worker checks whether POST /guide/refresh ran on another worker
+    guide_version_check_s: float = 30.0
+    # GET /forum/stream, see forumstream.py; fed from a change stream (needs a
+    # replica set), otherwise, or when false, from this worker's own writes
+    forum_stream_watch: bool = True
+    forum_stream_heartbeat_s: float = 15.0
+    # live events a client may fall behind before it is dropped to reconnect
+    forum_stream_queue_size: int = 256
+    # recent events kept for Last-Event-ID resume
+    forum_stream_replay: int = 512
+    # GET /search, see searchindex.py; postings kept per term
+    search_champions: int = 2000
+    # documents indexed between yields to the event loop while building
+    search_build_batch: int = 200
+    # index every worker's forum writes from change streams; without a replica
+    # set, or when false, each worker only indexes its own writes
+    search_watch: bool = True
+    # shared secret for admin endpoints (X-Admin-Token); unset disables them
+    admin_token: Optional[str] = None
+
+    # response compression; smaller bodies are sent as they are
+    compression_minimum_size: int = 500
+    compression_gzip_level: int = 6
+    # brotli 11 is for precompressed content; 4 is about gzip -6 speed with smaller output
+    compression_brotli_quality: int = 4
+
+    def mongo_client_options(self) -> dict:
+        """Keyword arguments for AsyncMongoClient."""
+        options = {
+            "maxPoolSize": self.mongo_max_pool_size,
+            "minPoolSize": self.mongo_min_pool_size,
+            "waitQueueTimeoutMS": self.mongo_wait_queue_timeout_ms,
+            "serverSelectionTimeoutMS": self.mongo_server_selection_timeout_ms,
+            "readPreference": self.mongo_read_preference,
+        }
+        if self.mongo_compressors:
+            options["compressors"] = self.mongo_compressors
+        return options
+
+    @property
+    def security_headers(self) -> dict:
+        """Headers added to every HTTP response, in order."""
+        headers = {"Content-Security-Policy": self.content_security_policy}
+        headers.update(self.extra_security_headers)
+        return headers
+
+    @classmethod
+    def from_env(cls, environ=None) -> "Settings":
+        """Build settings from ``environ`` (defaults to ``os.environ``).
+
+        CONTENT_SECURITY_POLICY replaces the default policy and
+        SECURITY_HEADERS takes a JSON object of extra headers. Mongo
+        settings use the MONGO_ prefix, e.g. MONGO_MAX_POOL_SIZE.
+        """
+        environ = os.environ if environ is None else environ
+        defaults = cls()
+        return cls(
+            content_security_policy=environ.get("CONTENT_SECURITY_POLICY", DEFAULT_CONTENT_SECURITY_POLICY),
+            extra_security_headers=json.loads(environ.get("SECURITY_HEADERS", "{}")),
+            mongo_uri=environ.get("MONGO_URI") or None,
+            mongo_db=environ.get("MONGO_DB", defaults.mongo_db),
+            mongo_max_pool_size=int(environ.get("MONGO_MAX_POOL_SIZE", defaults.mongo_max_pool_size)),
+            mongo_min_pool_size=int(environ.get("MONGO_MIN_POOL_SIZE", defaults.mongo_min_pool_size)),
+            mongo_wait_queue_timeout_ms=_optional_int(environ.get("MONGO_WAIT_QUEUE_TIMEOUT_MS")),
+            mongo_server_selection_timeout_ms=int(
+                environ.get("MONGO_SERVER_SELECTION_TIMEOUT_MS", defaults.mongo_server_selection_timeout_ms)
+            ),
+            mongo_compressors=environ.get("MONGO_COMPRESSORS", defaults.mongo_compressors),
+            mongo_read_preference=environ.get("MONGO_READ_PREFERENCE", defaults.mongo_read_preference),
+            mongo_command_bytes=environ.get("MONGO_COMMAND_BYTES", "true").lower() in ("1", "true", "yes"),
+            readiness_timeout_s=float(environ.get("READINESS_TIMEOUT_S", defaults.readiness_timeout_s)),
+            web_host=environ.get("WEB_HOST", defaults.web_host),
+            web_port=int(environ.get("PORT", defaults.web_port)),
+            web_workers=int(environ.get("WEB_WORKERS", defaults.web_workers)),
+            web_loop=environ.get("WEB_LOOP", defaults.web_loop),
+            web_http=environ.get("WEB_HTTP", defaults.web_http),
+            threadpool_size=int(environ.get("THREADPOOL_SIZE", defaults.threadpool_size)),
+            graceful_timeout_s=int(environ.get("GRACEFUL_TIMEOUT_S", defaults.graceful_timeout_s)),
+            password_time_cost=int(environ.get("PASSWORD_TIME_COST", defaults.password_time_cost)),
+            password_memory_cost_kib=int(environ.get("PASSWORD_MEMORY_COST_KIB", defaults.password_memory_cost_kib)),
+            password_parallelism=int(environ.get("PASSWORD_PARALLELISM", defaults.password_parallelism)),
+            password_hash_workers=int(environ.get("PASSWORD_HASH_WORKERS", defaults.password_hash_workers)),
+            access_token_ttl_minutes=int(environ.get("ACCESS_TOKEN_TTL_MINUTES", defaults.access_token_ttl_minutes)),
+            refresh_token_ttl_days=int(environ.get("REFRESH_TOKEN_TTL_DAYS", defaults.refresh_token_ttl_days)),
+            jwt_cache_size=int(environ.get("JWT_CACHE_SIZE", defaults.jwt_cache_size)),
+            reminder_timezone=environ.get("REMINDER_TIMEZONE", defaults.reminder_timezone),
+            reminder_batch_size=int(environ.get("REMINDER_BATCH_SIZE", defaults.reminder_batch_size)),
+            reminder_lease_s=float(environ.get("REMINDER_LEASE_S", defaults.reminder_lease_s)),
+            reminder_poll_interval_s=float(environ.get("REMINDER_POLL_INTERVAL_S", defaults.reminder_poll_interval_s)),
+            reminder_worker=environ.get("REMINDER_WORKER", "").lower() in ("1", "true", "yes"),
+            cache_backend=environ.get("CACHE_BACKEND", defaults.cache_backend),
+            redis_url=environ.get("REDIS_URL") or None,
+            # CACHE_TTLS='{"user": 60}' overrides individual namespaces
+            cache_ttls={**DEFAULT_CACHE_TTLS, **json.loads(environ.get("CACHE_TTLS", "{}"))},
+            guide_cache_control=environ.get("GUIDE_CACHE_CONTROL", defaults.guide_cache_control),
+            guide_watch=environ.get("GUIDE_WATCH", "").lower() in ("1", "true", "yes"),
+            guide_version_check_s=float(environ.get("GUIDE_VERSION_CHECK_S", defaults.guide_version_check_s)),
+            forum_stream_watch=environ.get("FORUM_STREAM_WATCH", "true").lower() in ("1", "true", "yes"),
+            forum_stream_heartbeat_s=float(environ.get("FORUM_STREAM_HEARTBEAT_S", defaults.forum_stream_heartbeat_s)),
+            forum_stream_queue_size=int(environ.get("FORUM_STREAM_QUEUE_SIZE", defaults.forum_stream_queue_size)),
+            forum_stream_replay=int(environ.get("FORUM_STREAM_REPLAY", defaults.forum_stream_replay)),
+            search_champions=int(environ.get("SEARCH_CHAMPIONS", defaults.search_champions)),
+            search_build_batch=int(environ.get("SEARCH_BUILD_BATCH", defaults.search_build_batch)),
+            search_watch=environ.get("SEARCH_WATCH", "true").lower() in ("1", "true", "yes"),
+            admin_token=environ.get("ADMIN_TOKEN") or None,
+            compression_minimum_size=int(environ.get("COMPRESSION_MINIMUM_SIZE", defaults.compression_minimum_size)),
+            compression_gzip_level=int(environ.get("COMPRESSION_GZIP_LEVEL", defaults.compression_gzip_level)),
+            compression_brotli_quality=int(
+                environ.get("COMPRESSION_BROTLI_QUALITY", defaults.compression_brotli_quality)
+            ),
+        )
+
+
+settings = Settings.from_env()
@@ -0,0 +1,153 @@
+import orjson
+import pytest
+from bson import ObjectId
+from prometheus_client import REGISTRY
+
+from cache import Cache, MemoryCache, NullCache, RedisCache, make_backend
+
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def requests(namespace, result):
+    return REGISTRY.get_sample_value("app_cache_requests_total", {"namespace": namespace, "result": result}) or 0
+
+
+@pytest.mark.anyio
+async def test_memory_cache_expires_entries():
+    clock = FakeClock()
+    backend = MemoryCache(clock=clock)
+    await backend.set("k", b"v", ttl=10)
+
+    clock.now = 9.9
+    assert await backend.get("k") == b"v"
+    clock.now = 10
+    assert await backend.get("k") is None
+
+
+@pytest.mark.anyio
+async def test_memory_cache_evicts_least_recently_used():
+    backend = MemoryCache(maxsize=2)
+    await backend.set("a", b"1", ttl=60)
+    await backend.set("b", b"2", ttl=60)
+    await backend.get("a")
+    await backend.set("c", b"3", ttl=60)
+
+    assert await backend.get("b") is None
+    assert await backend.get("a") == b"1"
+
+
+@pytest.mark.anyio
+async def test_get_or_load_caches_serialized_body():
+    cache = Cache(MemoryCache(), {"guide": 60})
+    oid = ObjectId()
+    calls = []
+
+    async def load():
+        calls.append(1)
+        return {"_id": oid, "title": "Week 12"}
+
+    hits, misses = requests("guide", "hit"), requests("guide", "miss")
+    first = await cache.get_or_load("guide", "g1", load)
+    second = await cache.get_or_load("guide", "g1", load)
+
+    assert first == second
+    assert orjson.loads(first) == {"_id": str(oid), "title": "Week 12"}
+    assert len(calls) == 1
+    assert requests("guide", "hit") == hits + 1
+    assert requests("guide", "miss") == misses + 1
+
+
+@pytest.mark.anyio
+async def test_missing_documents_not_cached():
+    cache = Cache(MemoryCache(), {})
+    results = [None, {"name": "Ana"}]
+
+    async def load():
+        return results.pop(0)
+
+    assert await cache.get_or_load("user", "ana@example.com", load) is None
+    assert orjson.loads(await cache.get_or_load("user", "ana@example.com", load)) == {"name": "Ana"}
+
+
+@pytest.mark.anyio
+async def test_invalidate_forces_reload():
+    cache = Cache(MemoryCache(), {})
+    versions = iter([{"v": 1}, {"v": 2}])
+
+    async def load():
+        return next(versions)
+
+    await cache.get_or_load("reminders", "u1", load)
+    await cache.invalidate("reminders", "u1")
+
+    assert orjson.loads(await cache.get_or_load("reminders", "u1", load)) == {"v": 2}
+
+
+@pytest.mark.anyio
+async def test_ttl_per_namespace():
+    clock = FakeClock()
+    cache = Cache(MemoryCache(clock=clock), {"user": 5}, default_ttl=100)
+
+    async def load():
+        return {"ok": True}
+
+    await cache.get_or_load("user", "u1", load)
+    await cache.get_or_load("guide", "g1", load)
+    clock.now = 6
+
+    assert await cache.backend.get("mamasync:user:u1") is None
+    assert await cache.backend.get("mamasync:guide:g1") is not None
+
+
+@pytest.mark.anyio
+async def test_null_cache_always_loads():
+    cache = Cache(NullCache(), {})
+    calls = []
+
+    async def load():
+        calls.append(1)
+        return {"ok": True}
+
+    await cache.get_or_load("guides", "all", load)
+    await cache.get_or_load("guides", "all", load)
+
+    assert len(calls) == 2
+
+
+@pytest.mark.anyio
+async def test_redis_backend():
+    fakeredis = pytest.importorskip("fakeredis")
+    client = fakeredis.FakeAsyncRedis()
+    await client.set("other-app:key", b"keep")
+    cache = Cache(RedisCache(client), {"guide": 60})
+
+    async def load():
+        return {"title": "Week 12"}
+
+    body = await cache.get_or_load("guide", "g1", load)
+
+    assert await client.get("mamasync:guide:g1") == body
+    assert 0 < await client.pttl("mamasync:guide:g1") <= 60_000
+
+    await cache.invalidate("guide", "g1")
+    assert await client.get("mamasync:guide:g1") is None
+
+    await cache.get_or_load("guide", "g1", load)
+    await cache.clear()
+    assert await client.get("mamasync:guide:g1") is None
+    assert await client.get("other-app:key") == b"keep"
+
+
+def test_make_backend():
+    assert isinstance(make_backend("memory"), MemoryCache)
+    assert isinstance(make_backend("none"), NullCache)
+    with pytest.raises(ValueError):
+        make_backend("redis")
+    with pytest.raises(ValueError):
+        make_backend("memcached")
@@ -8,6 +8,14 @@ from dailytaskrepository import DailyTaskRepository
 # ------------------------------------------------
 # Sample Mongo Collection 
 # ------------------------------------------------
+class SampleCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    async def to_list(self, length=None):
+        return list(self.documents)
+
+
 class SampleCollection:
     def __init__(self):
         self.find_result = []
@@ -17,18 +25,23 @@ class SampleCollection:
         self.delete_result = MagicMock(deleted_count=1)
 
     def find(self):
-        return self.find_result
+        return SampleCursor(self.find_result)
 
-    def find_one(self, query):
+    async def find_one(self, query):
         return self.find_one_result
 
-    def insert_one(self, data):
+    async def insert_one(self, data):
         return self.insert_result
 
-    def update_one(self, q, u):
+    async def update_one(self, q, u, upsert=False):
+        self.last_update = (q, u, upsert)
         return self.update_result
 
-    def delete_one(self, q):
+    async def find_one_and_update(self, q, u, projection=None, return_document=None):
+        self.last_update = (q, u, projection)
+        return self.find_one_result
+
+    async def delete_one(self, q):
         return self.delete_result
 
 
@@ -49,31 +62,34 @@ def repo(monkeypatch):
 # TESTS (full coverage)
 # ------------------------------------------------
 
-def test_find_all(repo):
+@pytest.mark.anyio
+async def test_find_all(repo):
     repo_obj, fake = repo
     fake.find_result = [
         {"_id": ObjectId("6568f0f0f0f0f0f0f0f0f0f0"), "task": "A"}
     ]
 
-    res = repo_obj.find_all()
+    res = await repo_obj.find_all()
     assert len(res) == 1
     assert res[0]["task"] == "A"
     assert res[0]["_id"] == "6568f0f0f0f0f0f0f0f0f0f0"
 
 
-def test_find_by_id(repo):
+@pytest.mark.anyio
+async def test_find_by_id(repo):
     repo_obj, fake = repo
     fake.find_one_result = {
         "_id": ObjectId("6568f0f0f0f0f0f0f0f0f0f0"),
         "task": "B"
     }
 
-    res = repo_obj.find_by_id("6568f0f0f0f0f0f0f0f0f0f0")
+    res = await repo_obj.find_by_id("6568f0f0f0f0f0f0f0f0f0f0")
     assert res["task"] == "B"
     assert res["_id"] == "6568f0f0f0f0f0f0f0f0f0f0"
 
 
-def test_find_by_id_date(repo):
+@pytest.mark.anyio
+async def test_find_by_id_date(repo):
     repo_obj, fake = repo
     fake.find_one_result = {
         "_id": ObjectId("6568f0f0f0f0f0f0f0f0f0f0"),
@@ -82,30 +98,70 @@ def test_find_by_id_date(repo):
         "task": "C"
     }
 
-    res = repo_obj.find_by_id_date("u1", "2025-01-01")
+    res = await repo_obj.find_by_id_date("u1", "2025-01-01")
     assert res["task"] == "C"
     assert res["_id"] == "6568f0f0f0f0f0f0f0f0f0f0"
 
 
-def test_create(repo):
+@pytest.mark.anyio
+async def test_create(repo):
     repo_obj, fake = repo
-    result = repo_obj.create({"task": "New"})
+    result = await repo_obj.create({"task": "New"})
     assert result == "6568f0f0f0f0f0f0f0f0f0f0"
 
 
-def test_update(repo):
+@pytest.mark.anyio
+async def test_add_tasks_single_upsert(repo):
+    repo_obj, fake = repo
+    fake.update_result = MagicMock(upserted_id=ObjectId(), modified_count=0)
+    tasks = [{"id": "t1"}, {"id": "t2"}]
+
+    result = await repo_obj.add_tasks("u1", "2025-01-01", tasks)
+
+    assert result is True
+    query, update, upsert = fake.last_update
+    assert query == {"userId": "u1", "date": "2025-01-01"}
+    assert update == {"$push": {"tasks": {"$each": tasks}}}
+    assert upsert is True
+
+
+@pytest.mark.anyio
+async def test_update_task_and_get(repo):
+    repo_obj, fake = repo
+    fake.find_one_result = {"tasks": [{"id": "t2", "completed": True}]}
+
+    task = await repo_obj.update_task_and_get("u1", "2025-01-01", "t2", {"completed": True})
+
+    assert task == {"id": "t2", "completed": True}
+    query, update, projection = fake.last_update
+    assert query == {"userId": "u1", "date": "2025-01-01", "tasks.id": "t2"}
+    assert update == {"$set": {"tasks.$.completed": True}}
+    assert projection["tasks"] == {"$elemMatch": {"id": "t2"}}
+
+
+@pytest.mark.anyio
+async def test_update_task_and_get_missing(repo):
+    repo_obj, fake = repo
+    fake.find_one_result = None
+
+    assert await repo_obj.update_task_and_get("u1", "2025-01-01", "t9", {"completed": True}) is None
+
+
+@pytest.mark.anyio
+async def test_update(repo):
     repo_obj, fake = repo
     fake.update_result.modified_count = 1
 
-    result = repo_obj.update("6568f0f0f0f0f0f0f0f0f0f0", {"x": 1})
+    result = await repo_obj.update("6568f0f0f0f0f0f0f0f0f0f0", {"x": 1})
     assert result is True
 
 
-def test_delete(repo):
+@pytest.mark.anyio
+async def test_delete(repo):
     repo_obj, fake = repo
     fake.delete_result.deleted_count = 1
 
-    result = repo_obj.delete("6568f0f0f0f0f0f0f0f0f0f0")
+    result = await repo_obj.delete("6568f0f0f0f0f0f0f0f0f0f0")
     assert result is True
 
 
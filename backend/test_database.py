@@ -0,0 +1,190 @@
+import asyncio
+import os
+import subprocess
+import sys
+
+import pytest
+from pymongo import ReadPreference
+from pymongo.errors import AutoReconnect, OperationFailure
+
+from database import MongoInstance, follow_changes, retry
+from mongometrics import PoolMetricsListener
+from settings import Settings
+
+
+def test_client_built_from_settings():
+    settings = Settings(
+        mongo_uri="mongodb://localhost:27017",
+        mongo_db="pool_test",
+        mongo_max_pool_size=7,
+        mongo_min_pool_size=2,
+        mongo_wait_queue_timeout_ms=500,
+        mongo_server_selection_timeout_ms=1500,
+        mongo_read_preference="secondaryPreferred",
+    )
+    listener = PoolMetricsListener()
+
+    instance = MongoInstance(settings, event_listeners=[listener])
+
+    options = instance.client.options
+    assert options.pool_options.max_pool_size == 7
+    assert options.pool_options.min_pool_size == 2
+    assert options.pool_options.wait_queue_timeout == 0.5
+    assert options.server_selection_timeout == 1.5
+    assert options.read_preference == ReadPreference.SECONDARY_PREFERRED
+    assert listener in options.event_listeners
+    assert instance.db.name == "pool_test"
+
+
+def test_client_not_created_until_first_use():
+    instance = MongoInstance(Settings(mongo_uri="mongodb://localhost:27017"))
+    users = instance.get_collection("users")
+
+    assert not instance.connected
+
+    assert users.name == "users"
+    assert instance.connected
+    assert instance.resolve_collection("users") is instance.resolve_collection("users")
+
+
+def test_missing_uri_raises_on_first_use():
+    instance = MongoInstance(Settings(mongo_uri=None))
+    users = instance.get_collection("users")
+
+    with pytest.raises(ValueError):
+        users.find_one
+
+
+@pytest.mark.anyio
+async def test_close_drops_client():
+    instance = MongoInstance(Settings(mongo_uri="mongodb://localhost:27017"))
+    first = instance.client
+
+    await instance.close()
+    await instance.close()
+
+    assert not instance.connected
+    assert instance.client is not first
+    await instance.close()
+
+
+def test_import_app_does_not_build_client():
+    env = {k: v for k, v in os.environ.items() if k != "MONGO_URI"}
+    code = "import app, database; assert not database.mongo_db.connected"
+
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env, capture_output=True, text=True, timeout=60,
+    )
+
+    assert result.returncode == 0, result.stderr
+
+
+@pytest.mark.anyio
+async def test_retry_until_success():
+    attempts = []
+
+    async def operation():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise AutoReconnect("connection refused")
+        return "done"
+
+    assert await retry(operation, "Test", first_delay_s=0) == "done"
+    assert len(attempts) == 3
+
+
+@pytest.mark.anyio
+async def test_retry_only_catches_mongo_errors():
+    async def operation():
+        raise ValueError("bug")
+
+    with pytest.raises(ValueError):
+        await retry(operation, "Test", first_delay_s=0)
+
+
+class ChangeSessions:
+    """A collection whose successive watch() calls play ``sessions``: a
+    list of changes to deliver, or an exception to raise. Once they run
+    out, watching is cancelled, as at shutdown."""
+
+    name = "things"
+
+    def __init__(self, *sessions):
+        self.sessions = list(sessions)
+        self.resumed_after = []
+
+    async def watch(self, pipeline, resume_after=None):
+        self.resumed_after.append(resume_after)
+        if not self.sessions:
+            raise asyncio.CancelledError
+        session = self.sessions.pop(0)
+        if isinstance(session, Exception):
+            raise session
+        return FakeStream(session)
+
+
+class FakeStream:
+    def __init__(self, items):
+        self.items = items
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def __aiter__(self):
+        for item in self.items:
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+
+def change(token):
+    return {"_id": {"_data": token}, "operationType": "insert"}
+
+
+@pytest.mark.anyio
+async def test_follow_changes_resumes_after_errors():
+    collection = ChangeSessions(
+        [change("a"), AutoReconnect("primary stepped down")],
+        AutoReconnect("no primary yet"),
+        [change("b")],
+    )
+    seen, opened, closed = [], [], []
+
+    async def on_open(lost):
+        opened.append(lost)
+
+    with pytest.raises(asyncio.CancelledError):
+        await follow_changes(collection, [], seen.append, on_open, lambda: closed.append(1), first_delay_s=0)
+
+    assert [c["_id"]["_data"] for c in seen] == ["a", "b"]
+    assert collection.resumed_after == [None, {"_data": "a"}, {"_data": "a"}, None]
+    assert opened == [False, False] and len(closed) == 2
+
+
+@pytest.mark.anyio
+async def test_follow_changes_starts_over_when_history_is_lost():
+    collection = ChangeSessions(
+        [change("a"), OperationFailure("history lost", code=286)],
+        [change("b")],
+    )
+    opened = []
+
+    async def on_open(lost):
+        opened.append(lost)
+
+    with pytest.raises(asyncio.CancelledError):
+        await follow_changes(collection, [], lambda c: None, on_open, first_delay_s=0)
+
+    assert collection.resumed_after[:2] == [None, None]
+    assert opened == [False, True]
+
+
+@pytest.mark.anyio
+async def test_follow_changes_unsupported():
+    collection = ChangeSessions(OperationFailure("only supported on replica sets", code=40573))
+
+    assert await follow_changes(collection, [], lambda c: None, first_delay_s=0) is False
@@ -0,0 +1,94 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from migrations.forum_replies import insert_ignoring_duplicates, migrate, reply_documents
+
+
+class AsyncCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def sort(self, *args):
+        return self
+
+    def batch_size(self, size):
+        return self
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for document in self.documents:
+            yield document
+
+
+def make_db(posts):
+    posts_collection = MagicMock()
+    posts_collection.find.return_value = AsyncCursor(posts)
+    posts_collection.bulk_write = AsyncMock()
+    replies_collection = MagicMock()
+    replies_collection.insert_many = AsyncMock(
+        side_effect=lambda docs, ordered: MagicMock(inserted_ids=[d["_id"] for d in docs])
+    )
+    return {"forum_posts": posts_collection, "forum_replies": replies_collection}
+
+
+def test_reply_documents_keep_original_id():
+    post_id, reply_id = ObjectId(), ObjectId()
+
+    docs = reply_documents(post_id, [{"id": str(reply_id), "content": "Hi"}, {"id": "legacy", "content": "Yo"}])
+
+    assert docs[0]["_id"] == reply_id
+    assert docs[0]["postId"] == post_id
+    assert docs[1]["id"] == str(docs[1]["_id"])
+
+
+@pytest.mark.anyio
+async def test_migrate_moves_replies_in_batches():
+    posts = [
+        {"_id": ObjectId(), "replies": [{"id": str(ObjectId()), "content": "a"} for _ in range(3)]},
+        {"_id": ObjectId(), "replies": [{"id": str(ObjectId()), "content": "b"}]},
+        {"_id": ObjectId(), "replies": []},
+    ]
+    db = make_db(posts)
+
+    migrated_posts, migrated_replies = await migrate(db, batch_size=2)
+
+    assert (migrated_posts, migrated_replies) == (3, 4)
+    assert db["forum_replies"].insert_many.await_count == 2
+    updates = [op for call in db["forum_posts"].bulk_write.await_args_list for op in call.args[0]]
+    assert len(updates) == 3
+    first = updates[0]._doc
+    assert first == {"$inc": {"reply_count": 3}, "$unset": {"replies": ""}}
+
+
+@pytest.mark.anyio
+async def test_migrate_dry_run_writes_nothing():
+    db = make_db([{"_id": ObjectId(), "replies": [{"id": str(ObjectId())}]}])
+
+    assert await migrate(db, dry_run=True) == (1, 1)
+    db["forum_replies"].insert_many.assert_not_awaited()
+    db["forum_posts"].bulk_write.assert_not_awaited()
+
+
+@pytest.mark.anyio
+async def test_insert_ignores_duplicates_from_previous_run():
+    collection = MagicMock()
+    collection.insert_many = AsyncMock(side_effect=BulkWriteError(
+        {"writeErrors": [{"code": 11000}], "nInserted": 1}
+    ))
+
+    assert await insert_ignoring_duplicates(collection, [{"_id": 1}, {"_id": 2}]) == 1
+
+
+@pytest.mark.anyio
+async def test_insert_reraises_other_errors():
+    collection = MagicMock()
+    collection.insert_many = AsyncMock(side_effect=BulkWriteError(
+        {"writeErrors": [{"code": 121}], "nInserted": 0}
+    ))
+
+    with pytest.raises(BulkWriteError):
+        await insert_ignoring_duplicates(collection, [{"_id": 1}])
@@ -0,0 +1,188 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+from bson import ObjectId
+
+from conftest import mock_find
+from forumrepository import (
+    POST_SORT,
+    REPLY_SORT,
+    ForumReplyRepository,
+    ForumRepository,
+    decode_cursor,
+    encode_cursor,
+)
+
+
+def make_posts(count):
+    return [
+        {"_id": ObjectId(), "title": f"Post {i}", "created_at": f"2025-01-01T00:00:{59 - i:02d}.000+00:00", "reply_count": 0}
+        for i in range(count)
+    ]
+
+
+def test_cursor_round_trip():
+    post = {"_id": ObjectId(), "created_at": "2025-01-01T10:00:00.000+00:00"}
+
+    created_at, post_id = decode_cursor(encode_cursor(post))
+
+    assert created_at == post["created_at"]
+    assert post_id == post["_id"]
+
+
+@pytest.mark.parametrize("cursor", ["garbage", "", "W10", encode_cursor({"_id": "nope", "created_at": "x"})])
+def test_decode_cursor_rejects_malformed(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+@pytest.mark.anyio
+@patch("forumrepository.mongo_db")
+async def test_find_page_first_page(mock_mongo):
+    posts = make_posts(3)
+    second_id = posts[1]["_id"]
+    mock_collection, mock_cursor = mock_find(mock_mongo, posts)
+
+    repo = ForumRepository()
+    page = await repo.find_page(limit=2)
+
+    assert [p["title"] for p in page["posts"]] == ["Post 0", "Post 1"]
+    # left as ObjectId for MongoJSONResponse to render
+    assert isinstance(page["posts"][0]["_id"], ObjectId)
+    assert decode_cursor(page["next_cursor"])[1] == second_id
+    query, projection = mock_collection.find.call_args.args
+    assert query == {}
+    assert projection == {"replies": 0}
+    mock_cursor.sort.assert_called_once_with(POST_SORT)
+    mock_cursor.limit.assert_called_once_with(3)
+
+
+@pytest.mark.anyio
+@patch("forumrepository.mongo_db")
+async def test_find_page_last_page_has_no_cursor(mock_mongo):
+    mock_find(mock_mongo, make_posts(2))
+
+    repo = ForumRepository()
+    page = await repo.find_page(limit=2)
+
+    assert len(page["posts"]) == 2
+    assert page["next_cursor"] is None
+
+
+@pytest.mark.anyio
+@patch("forumrepository.mongo_db")
+async def test_find_page_after_cursor_filters_by_keyset(mock_mongo):
+    mock_collection, _ = mock_find(mock_mongo, [])
+    anchor = {"_id": ObjectId(), "created_at": "2025-01-01T10:00:00.000+00:00"}
+
+    repo = ForumRepository()
+    await repo.find_page(user_id="u1", limit=5, after=encode_cursor(anchor))
+
+    query = mock_collection.find.call_args.args[0]
+    assert query["userId"] == "u1"
+    assert query["created_at"] == {"$lte": anchor["created_at"]}
+    assert {"_id": {"$lt": anchor["_id"]}} in query["$or"]
+
+
+@pytest.mark.anyio
+@patch("forumrepository.mongo_db")
+async def test_find_by_id_invalid_id(mock_mongo):
+    mock_collection = AsyncMock()
+    mock_mongo.get_collection.return_value = mock_collection
+
+    repo = ForumRepository()
+
+    assert await repo.find_by_id("not-an-id") is None
+    mock_collection.find_one.assert_not_awaited()
+
+
+@pytest.mark.anyio
+@patch("forumrepository.mongo_db")
+async def test_find_by_ids_skips_invalid_ids(mock_mongo):
+    post_id = ObjectId()
+    mock_collection, _ = mock_find(mock_mongo, [{"_id": post_id}])
+
+    repo = ForumRepository()
+
+    assert await repo.find_by_ids([str(post_id), "not-an-id"]) == [{"_id": post_id}]
+    query = mock_collection.find.call_args.args[0]
+    assert query == {"_id": {"$in": [post_id]}}
+
+
+@pytest.mark.anyio
+@patch("forumrepository.mongo_db")
+async def test_increment_reply_count(mock_mongo):
+    mock_collection = AsyncMock()
+    mock_mongo.get_collection.return_value = mock_collection
+    post_id = ObjectId()
+    mock_collection.find_one_and_update.return_value = {"reply_count": 3}
+
+    repo = ForumRepository()
+
+    assert await repo.increment_reply_count(str(post_id)) == 3
+    query, update = mock_collection.find_one_and_update.call_args.args
+    assert query == {"_id": post_id}
+    assert update == {"$inc": {"reply_count": 1}}
+
+
+@pytest.mark.anyio
+@patch("forumrepository.mongo_db")
+async def test_increment_reply_count_missing_post(mock_mongo):
+    mock_collection = AsyncMock()
+    mock_mongo.get_collection.return_value = mock_collection
+    mock_collection.find_one_and_update.return_value = None
+
+    repo = ForumRepository()
+
+    assert await repo.increment_reply_count(str(ObjectId())) is None
+    assert await repo.increment_reply_count("not-an-id") is None
+
+
+@pytest.mark.anyio
+@patch("forumrepository.mongo_db")
+async def test_create_reply_keys_by_post(mock_mongo):
+    mock_collection = AsyncMock()
+    mock_mongo.get_collection.return_value = mock_collection
+    post_id, reply_id = ObjectId(), ObjectId()
+    mock_collection.insert_one.return_value.inserted_id = reply_id
+
+    repo = ForumReplyRepository()
+    result = await repo.create(str(post_id), {"id": str(reply_id), "content": "Hi"})
+
+    stored = mock_collection.insert_one.call_args.args[0]
+    assert result == str(reply_id)
+    assert stored["_id"] == reply_id
+    assert stored["postId"] == post_id
+
+
+@pytest.mark.anyio
+@patch("forumrepository.mongo_db")
+async def test_reply_page_oldest_first(mock_mongo):
+    post_id = ObjectId()
+    replies = [
+        {"_id": ObjectId(), "id": str(i), "content": "Hi", "created_at": f"2025-01-01T00:00:0{i}.000+00:00"}
+        for i in range(3)
+    ]
+    mock_collection, mock_cursor = mock_find(mock_mongo, replies)
+
+    repo = ForumReplyRepository()
+    page = await repo.find_page(str(post_id), limit=2)
+
+    assert [r["id"] for r in page["replies"]] == ["0", "1"]
+    assert "_id" not in page["replies"][0]
+    assert page["next_cursor"] is not None
+    assert mock_collection.find.call_args.args[0] == {"postId": post_id}
+    mock_cursor.sort.assert_called_once_with(REPLY_SORT)
+
+
+@pytest.mark.anyio
+@patch("forumrepository.mongo_db")
+async def test_reply_page_after_cursor_moves_forward(mock_mongo):
+    mock_collection, _ = mock_find(mock_mongo, [])
+    anchor = {"_id": ObjectId(), "created_at": "2025-01-01T10:00:00.000+00:00"}
+
+    repo = ForumReplyRepository()
+    await repo.find_page(str(ObjectId()), after=encode_cursor(anchor))
+
+    query = mock_collection.find.call_args.args[0]
+    assert query["created_at"] == {"$gte": anchor["created_at"]}
+    assert {"_id": {"$gt": anchor["_id"]}} in query["$or"]
@@ -0,0 +1,215 @@
+import asyncio
+from functools import partial
+
+import pytest
+from bson import ObjectId
+from pymongo.errors import OperationFailure
+
+import forumstream
+from database import follow_changes
+from forumstream import KEEPALIVE, ForumBroker, Subscription, change_to_event, format_mode
+
+
+async def drain(subscription, count):
+    """The next ``count`` messages, skipping the retry hint and mode changes."""
+    received = []
+    async for message in subscription.messages(heartbeat_s=1):
+        if message.startswith((b"retry:", b"event: mode")):
+            continue
+        received.append(message)
+        if len(received) == count:
+            return received
+
+
+def test_change_to_event():
+    post_id = ObjectId()
+
+    insert = change_to_event({"operationType": "insert", "fullDocument": {"_id": post_id, "title": "Hi", "replies": []}})
+    reply = change_to_event({
+        "operationType": "update",
+        "documentKey": {"_id": post_id},
+        "updateDescription": {"updatedFields": {"reply_count": 4}},
+    })
+
+    assert insert == ("post", {"_id": post_id, "title": "Hi"})
+    assert reply == ("reply_count", {"postId": str(post_id), "reply_count": 4})
+    assert change_to_event({"operationType": "update", "updateDescription": {"updatedFields": {"title": "x"}}}) is None
+
+
+@pytest.mark.anyio
+async def test_publish_fans_out_to_every_subscriber():
+    broker = ForumBroker(queue_size=10, replay_size=10)
+    first, second = broker.subscribe(), broker.subscribe()
+
+    event_id = broker.publish("post", {"title": "Hi"})
+
+    expected = b'id: %s\nevent: post\ndata: {"title":"Hi"}\n\n' % event_id.encode()
+    assert await drain(first, 1) == await drain(second, 1) == [expected]
+
+
+@pytest.mark.anyio
+async def test_resume_replays_events_after_last_event_id():
+    broker = ForumBroker(queue_size=10, replay_size=10)
+    seen = broker.publish("post", {"n": 1})
+    broker.publish("post", {"n": 2})
+    broker.publish("reply_count", {"postId": "p", "reply_count": 1})
+
+    replayed = await drain(broker.subscribe(last_event_id=seen), 2)
+
+    assert b'"n":2' in replayed[0] and b"event: reply_count" in replayed[1]
+
+
+@pytest.mark.anyio
+async def test_unknown_last_event_id_resets():
+    broker = ForumBroker(queue_size=10, replay_size=1)
+    stale = broker.publish("post", {"n": 1})
+    broker.publish("post", {"n": 2})
+
+    assert b"event: reset" in (await drain(broker.subscribe(last_event_id=stale), 1))[0]
+
+
+@pytest.mark.anyio
+async def test_slow_subscriber_is_dropped():
+    broker = ForumBroker(queue_size=3, replay_size=10)
+    slow = broker.subscribe()
+    broker.unsubscribe(broker.subscribe())
+
+    for n in range(5):
+        broker.publish("post", {"n": n})
+
+    assert slow.closed and slow not in broker.subscribers
+    # what was queued (the retry hint, the mode and the first event) is still delivered, then the stream ends
+    assert len([m async for m in slow.messages(heartbeat_s=1)]) == 3
+
+
+@pytest.mark.anyio
+async def test_keepalive_when_idle():
+    subscription = Subscription(queue_size=1)
+
+    messages = subscription.messages(heartbeat_s=0.01)
+
+    assert await messages.__anext__() == KEEPALIVE
+    subscription.close()
+    assert [m async for m in messages] == []
+
+
+def test_publish_local_only_without_change_stream():
+    broker = ForumBroker(queue_size=10, replay_size=10)
+
+    broker.publish_local("post", {"n": 1})
+    broker.local = False
+    broker.publish_local("post", {"n": 2})
+
+    assert len(broker.recent) == 1
+
+
+class FakeStream:
+    def __init__(self, changes):
+        self.changes = changes
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for change in self.changes:
+            await asyncio.sleep(0)
+            if isinstance(change, Exception):
+                raise change
+            yield change
+
+
+class FakeCollection:
+    """Successive watch() calls play ``sessions``: a list of changes to
+    deliver, or an exception to raise. Once they run out, watching is
+    cancelled, as at shutdown."""
+
+    name = "forum"
+
+    def __init__(self, *sessions):
+        self.sessions = list(sessions)
+        self.pipeline = None
+
+    async def watch(self, pipeline, resume_after=None):
+        if not self.sessions:
+            raise asyncio.CancelledError
+        session = self.sessions.pop(0)
+        if isinstance(session, Exception):
+            raise session
+        self.pipeline = pipeline
+        return FakeStream(session)
+
+
+def change(token):
+    return {"_id": {"_data": token}, "operationType": "insert", "fullDocument": {"_id": ObjectId(), "title": "Hi"}}
+
+
+async def closing(subscription):
+    subscription.close()
+    return [m async for m in subscription.messages(heartbeat_s=1)]
+
+
+@pytest.mark.anyio
+async def test_watch_publishes_changes_with_resume_tokens():
+    broker = ForumBroker(queue_size=10, replay_size=10)
+    post_id = ObjectId()
+    collection = FakeCollection([
+        {"_id": {"_data": "826A01"}, "operationType": "insert", "fullDocument": {"_id": post_id, "title": "Hi"}},
+        {"_id": {"_data": "826A02"}, "operationType": "update", "documentKey": {"_id": post_id},
+         "updateDescription": {"updatedFields": {"reply_count": 1}}},
+    ])
+    subscription = broker.subscribe()
+
+    with pytest.raises(asyncio.CancelledError):
+        await broker.watch(collection)
+
+    assert [event.id for event in broker.recent] == ["826A01", "826A02"]
+    assert (await drain(subscription, 2))[0].startswith(b"id: 826A01\nevent: post\n")
+    assert collection.pipeline
+    # the stream ended, so the app publishes its own writes again
+    assert broker.local
+
+
+@pytest.mark.anyio
+async def test_watch_without_replica_set_stays_local():
+    broker = ForumBroker(queue_size=10, replay_size=10)
+
+    subscription = broker.subscribe()
+
+    await broker.watch(FakeCollection(OperationFailure("only supported on replica sets", code=40573)))
+
+    assert broker.local
+    assert format_mode(True) not in await closing(subscription)
+
+
+@pytest.mark.anyio
+async def test_watch_tells_clients_when_the_stream_is_live():
+    broker = ForumBroker(queue_size=10, replay_size=10)
+    subscription = broker.subscribe()
+
+    with pytest.raises(asyncio.CancelledError):
+        await broker.watch(FakeCollection([], [change("826A01")]))
+
+    modes = [m for m in await closing(subscription) if m.startswith(b"event: mode")]
+    # on connect, then each time the stream opened and closed
+    assert modes == [format_mode(False), format_mode(True), format_mode(False), format_mode(True), format_mode(False)]
+
+
+@pytest.mark.anyio
+async def test_watch_resets_clients_when_history_is_lost(monkeypatch):
+    monkeypatch.setattr(forumstream, "follow_changes", partial(follow_changes, first_delay_s=0))
+    broker = ForumBroker(queue_size=10, replay_size=10)
+    subscription = broker.subscribe()
+
+    with pytest.raises(asyncio.CancelledError):
+        await broker.watch(FakeCollection(
+            [change("826A01"), OperationFailure("history lost", code=286)],
+            [],
+        ))
+
+    assert b"event: reset" in (await drain(subscription, 2))[1]
@@ -0,0 +1,178 @@
+import gzip
+
+import orjson
+import pytest
+from starlette.requests import Request
+
+from guides import GuideIndex, GuideStore, Representation, _not_modified, serve
+
+
+def make_request(**headers):
+    raw = [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length=None):
+        return list(self.docs)
+
+
+class FakeCollection:
+    def __init__(self, docs):
+        self.docs = docs
+        self.finds = 0
+
+    def find(self, query):
+        self.finds += 1
+        return FakeCursor(self.docs)
+
+
+def test_small_bodies_not_compressed():
+    rep = Representation.build({"title": "Week 1"})
+
+    assert rep.gzip is None and rep.br is None
+    assert orjson.loads(rep.body) == {"title": "Week 1"}
+
+
+def test_large_bodies_compressed():
+    payload = {"body": "kick counts " * 200}
+    rep = Representation.build(payload)
+
+    assert orjson.loads(gzip.decompress(rep.gzip)) == payload
+    assert len(rep.gzip) < len(rep.body)
+
+
+def test_etag_depends_on_content_only():
+    assert Representation.build({"a": 1}).etag == Representation.build({"a": 1}).etag
+    assert Representation.build({"a": 1}).etag != Representation.build({"a": 2}).etag
+
+
+def test_index_listing_and_lookup():
+    index = GuideIndex.build([{"_id": "g1", "title": "Week 1", "body": "..."}])
+
+    assert orjson.loads(index.listing.body) == {"documents": [{"_id": "g1", "title": "Week 1"}]}
+    assert orjson.loads(index.get("g1").body)["body"] == "..."
+    assert index.get("g2") is None
+
+
+def test_not_modified_matching():
+    rep = Representation.build({"a": 1})
+
+    assert _not_modified(make_request(if_none_match=f'"{rep.etag}"'), rep)
+    assert _not_modified(make_request(if_none_match=f'"other", W/"{rep.etag}-gzip"'), rep)
+    assert _not_modified(make_request(if_none_match="*"), rep)
+    assert not _not_modified(make_request(if_none_match='"other"'), rep)
+    assert not _not_modified(make_request(), rep)
+
+
+def test_serve_picks_accepted_encoding():
+    rep = Representation.build({"body": "x" * 1000})
+
+    plain = serve(make_request(), rep, "no-cache")
+    gzipped = serve(make_request(accept_encoding="gzip;q=1, br;q=0"), rep, "no-cache")
+
+    assert plain.body == rep.body and "content-encoding" not in plain.headers
+    assert gzipped.body == rep.gzip
+    assert gzipped.headers["etag"] == f'"{rep.etag}-gzip"'
+
+
+@pytest.mark.anyio
+async def test_store_builds_once():
+    collection = FakeCollection([{"_id": "g1", "title": "Week 1"}])
+    store = GuideStore()
+
+    first = await store.get_index(collection)
+    second = await store.get_index(collection)
+
+    assert first is second
+    assert collection.finds == 1
+
+
+@pytest.mark.anyio
+async def test_store_reports_refreshed_documents():
+    docs = [{"_id": "g1", "title": "Week 1"}]
+    seen = []
+    store = GuideStore(on_refresh=seen.append)
+
+    await store.refresh(FakeCollection(docs))
+
+    assert seen == [docs]
+
+
+class FakeMeta:
+    def __init__(self):
+        self.version = 0
+        self.reads = 0
+
+    async def find_one(self, query):
+        self.reads += 1
+        return {"_id": query["_id"], "version": self.version}
+
+    async def update_one(self, query, update, upsert=False):
+        self.version += update["$inc"]["version"]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.anyio
+async def test_store_reloads_when_another_worker_publishes():
+    meta, clock = FakeMeta(), Clock()
+    collection = FakeCollection([{"_id": "g1", "title": "Week 1"}])
+    worker_a = GuideStore(meta=meta, check_interval_s=30, clock=clock)
+    worker_b = GuideStore(meta=meta, check_interval_s=30, clock=clock)
+    await worker_a.get_index(collection)
+    await worker_b.get_index(collection)
+
+    collection.docs = [{"_id": "g1", "title": "Week 1, revised"}]
+    await worker_a.publish(collection)
+
+    assert worker_a.index.get("g1").body.endswith(b'"Week 1, revised"}')
+    # worker_b checks the version only once the interval has passed
+    clock.now = 10
+    assert (await worker_b.get_index(collection)).get("g1").body.endswith(b'"Week 1"}')
+    clock.now = 30
+    assert (await worker_b.get_index(collection)).get("g1").body.endswith(b'"Week 1, revised"}')
+    assert worker_b.version == meta.version == 1
+
+
+@pytest.mark.anyio
+async def test_store_checks_version_at_most_once_per_interval():
+    meta, clock = FakeMeta(), Clock()
+    collection = FakeCollection([{"_id": "g1", "title": "Week 1"}])
+    store = GuideStore(meta=meta, check_interval_s=30, clock=clock)
+    await store.get_index(collection)
+
+    for second in range(0, 60, 5):
+        clock.now = second
+        await store.get_index(collection)
+
+    # the initial build, then once at 30s
+    assert meta.reads == 2
+    assert collection.finds == 1
+
+
+@pytest.mark.anyio
+async def test_store_keeps_serving_when_version_check_fails():
+    from pymongo.errors import AutoReconnect
+
+    class DownMeta(FakeMeta):
+        async def find_one(self, query):
+            raise AutoReconnect("down")
+
+    clock = Clock()
+    collection = FakeCollection([{"_id": "g1", "title": "Week 1"}])
+    store = GuideStore(check_interval_s=30, clock=clock)
+    index = await store.get_index(collection)
+    store.meta = DownMeta()
+    clock.now = 60
+
+    assert await store.get_index(collection) is index
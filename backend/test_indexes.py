@@ -0,0 +1,90 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from pymongo.errors import OperationFailure
+
+from indexes import (
+    COLLECTION_INDEXES,
+    QueryShape,
+    ensure_indexes,
+    explain_report,
+    format_report,
+    plan_stages,
+)
+
+
+class FakeDatabase(dict):
+    def __missing__(self, name):
+        collection = MagicMock()
+        collection.create_indexes = AsyncMock(return_value=["idx"])
+        self[name] = collection
+        return collection
+
+
+def explain_cursor(winning_plan):
+    cursor = MagicMock()
+    cursor.sort.return_value = cursor
+    cursor.limit.return_value = cursor
+    cursor.explain = AsyncMock(return_value={"queryPlanner": {"winningPlan": winning_plan}})
+    return cursor
+
+
+@pytest.mark.anyio
+async def test_ensure_indexes_creates_every_declared_collection():
+    db = FakeDatabase()
+
+    created = await ensure_indexes(db)
+
+    assert set(created) == set(COLLECTION_INDEXES)
+    for name, models in COLLECTION_INDEXES.items():
+        db[name].create_indexes.assert_awaited_once_with(models)
+
+
+@pytest.mark.anyio
+async def test_ensure_indexes_logs_and_continues_on_failure():
+    db = FakeDatabase()
+    db["users"].create_indexes.side_effect = OperationFailure("E11000 duplicate key")
+
+    created = await ensure_indexes(db)
+
+    assert "users" not in created
+    assert "water_intake" in created
+
+
+def test_user_date_indexes_are_unique():
+    for name in ("daily_tasks", "water_intake", "mood_tracking"):
+        spec = COLLECTION_INDEXES[name][0].document
+        assert list(spec["key"]) == ["userId", "date"]
+        assert spec["unique"] is True
+
+
+def test_plan_stages_classic_plan():
+    plan = {"stage": "LIMIT", "inputStage": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}}}
+    assert plan_stages(plan) == ["LIMIT", "FETCH", "IXSCAN"]
+
+
+def test_plan_stages_slot_based_plan():
+    plan = {"queryPlan": {"stage": "OR", "inputStages": [{"stage": "IXSCAN"}, {"stage": "COLLSCAN"}]}}
+    assert plan_stages(plan) == ["OR", "IXSCAN", "COLLSCAN"]
+
+
+@pytest.mark.anyio
+async def test_explain_report_flags_collscan():
+    db = MagicMock()
+    db.__getitem__.side_effect = lambda name: {
+        "users": MagicMock(find=MagicMock(return_value=explain_cursor({"stage": "COLLSCAN"}))),
+        "guide": MagicMock(find=MagicMock(return_value=explain_cursor({"stage": "COLLSCAN"}))),
+        "mood_tracking": MagicMock(find=MagicMock(return_value=explain_cursor(
+            {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}}
+        ))),
+    }[name]
+    shapes = [
+        QueryShape("users", {"email": "x"}),
+        QueryShape("guide", {}, allow_collscan=True),
+        QueryShape("mood_tracking", {"userId": "u"}, sort=[("date", -1)]),
+    ]
+
+    rows = await explain_report(db, shapes)
+
+    assert [row["collscan"] for row in rows] == [True, False, False]
+    assert rows[2]["sort"] == ["date"]
+    assert "[COLLSCAN] users" in format_report(rows)
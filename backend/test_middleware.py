@@ -0,0 +1,214 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from middleware import CompressionMiddleware, RoundTripMiddleware, SecurityHeadersMiddleware
+
+
+def make_client(headers):
+    app = FastAPI()
+
+    @app.get("/plain")
+    async def plain():
+        return {"ok": True}
+
+    @app.get("/own-csp")
+    async def own_csp():
+        return PlainTextResponse("x", headers={"Content-Security-Policy": "default-src *"})
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for i in range(3):
+                yield f"chunk{i};"
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    app.add_middleware(SecurityHeadersMiddleware, headers=headers)
+    return TestClient(app)
+
+
+def test_headers_added_to_response():
+    client = make_client({"Content-Security-Policy": "default-src 'self'", "X-Frame-Options": "DENY"})
+
+    r = client.get("/plain")
+
+    assert r.status_code == 200
+    assert r.headers["content-security-policy"] == "default-src 'self'"
+    assert r.headers["x-frame-options"] == "DENY"
+
+
+def test_configured_header_replaces_route_header():
+    client = make_client({"Content-Security-Policy": "default-src 'self'"})
+
+    r = client.get("/own-csp")
+
+    assert r.headers.get_list("content-security-policy") == ["default-src 'self'"]
+
+
+def test_streaming_response_passes_through():
+    client = make_client({"Content-Security-Policy": "default-src 'self'"})
+
+    r = client.get("/stream")
+
+    assert r.text == "chunk0;chunk1;chunk2;"
+    assert r.headers["content-security-policy"] == "default-src 'self'"
+
+
+@pytest.mark.anyio
+async def test_non_http_scope_untouched():
+    seen = []
+
+    async def inner(scope, receive, send):
+        await send({"type": "lifespan.startup.complete"})
+
+    async def send(message):
+        seen.append(message)
+
+    middleware = SecurityHeadersMiddleware(inner, {"X-Frame-Options": "DENY"})
+    await middleware({"type": "lifespan"}, None, send)
+
+    assert seen == [{"type": "lifespan.startup.complete"}]
+
+
+
+def make_compressing_client(minimum_size=500):
+    app = FastAPI()
+
+    @app.get("/small")
+    async def small():
+        return {"ok": True}
+
+    @app.get("/large")
+    async def large():
+        return {"posts": [{"title": f"Post {i}", "content": "Sleep tips " * 10} for i in range(50)]}
+
+    @app.get("/encoded")
+    async def encoded():
+        return PlainTextResponse("x" * 1000, headers={"Content-Encoding": "identity"})
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for i in range(3):
+                yield f"chunk{i};" * 100
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    @app.get("/tagged")
+    async def tagged():
+        # the size of an uncompressed guide just over the default minimum_size
+        return PlainTextResponse("x" * 505, headers={"ETag": '"abc"'})
+
+    @app.get("/events")
+    async def events():
+        async def chunks():
+            yield "data: " + "x" * 1000 + "\n\n"
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    app.add_middleware(CompressionMiddleware, minimum_size=minimum_size)
+    return TestClient(app)
+
+
+def test_large_response_gzipped():
+    client = make_compressing_client()
+
+    r = client.get("/large", headers={"Accept-Encoding": "gzip"})
+
+    assert r.headers["content-encoding"] == "gzip"
+    assert r.headers["vary"] == "Accept-Encoding"
+    assert int(r.headers["content-length"]) < len(r.content)
+    assert len(r.json()["posts"]) == 50
+
+
+def test_brotli_preferred_when_accepted():
+    client = make_compressing_client()
+
+    r = client.get("/large", headers={"Accept-Encoding": "gzip, br"})
+
+    assert r.headers["content-encoding"] == "br"
+    assert len(r.json()["posts"]) == 50
+
+
+def test_small_response_not_compressed():
+    client = make_compressing_client()
+
+    r = client.get("/small", headers={"Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in r.headers
+    assert r.json() == {"ok": True}
+
+
+def test_no_compression_without_accept_encoding():
+    client = make_compressing_client()
+
+    r = client.get("/large", headers={"Accept-Encoding": "identity"})
+
+    assert "content-encoding" not in r.headers
+
+
+def test_streaming_response_compressed_per_chunk():
+    client = make_compressing_client()
+
+    r = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+
+    assert r.headers["content-encoding"] == "gzip"
+    assert "content-length" not in r.headers
+    assert r.text == "".join(f"chunk{i};" * 100 for i in range(3))
+
+
+def test_encoded_tagged_and_event_stream_responses_untouched():
+    client = make_compressing_client()
+
+    encoded = client.get("/encoded", headers={"Accept-Encoding": "gzip"})
+    tagged = client.get("/tagged", headers={"Accept-Encoding": "gzip"})
+    events = client.get("/events", headers={"Accept-Encoding": "gzip"})
+
+    assert encoded.headers["content-encoding"] == "identity"
+    assert "content-encoding" not in tagged.headers
+    assert tagged.headers["etag"] == '"abc"' and tagged.text == "x" * 505
+    assert "content-encoding" not in events.headers
+    assert events.text.startswith("data: ")
+
+
+def test_round_trips_recorded_per_route():
+    from prometheus_client import REGISTRY
+
+    from mongometrics import CommandMetricsListener
+
+    listener = CommandMetricsListener(measure_bytes=False)
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: str):
+        for request_id in range(3):
+            event = SimpleNamespace(command_name="find", command={"find": "items"}, connection_id=("db", 1),
+                                    request_id=request_id)
+            listener.started(event)
+        return {"ok": True}
+
+    @app.get("/healthz")
+    async def healthz():
+        return {"ok": True}
+
+    app.add_middleware(RoundTripMiddleware, excluded_handlers=["/healthz"])
+    client = TestClient(app)
+    labels = {"method": "GET", "handler": "/items/{item_id}"}
+
+    def sample(name, labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    before_count = sample("http_request_mongo_round_trips_count", labels)
+    before_sum = sample("http_request_mongo_round_trips_sum", labels)
+    before_none = sample("http_request_mongo_round_trips_count", {"method": "GET", "handler": "none"})
+
+    client.get("/items/1")
+    client.get("/items/2")
+    client.get("/healthz")
+    client.get("/missing")
+
+    assert sample("http_request_mongo_round_trips_count", labels) == before_count + 2
+    assert sample("http_request_mongo_round_trips_sum", labels) == before_sum + 6
+    assert sample("http_request_mongo_round_trips_count", {"method": "GET", "handler": "/healthz"}) == 0
+    assert sample("http_request_mongo_round_trips_count", {"method": "GET", "handler": "none"}) == before_none + 1
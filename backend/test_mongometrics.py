@@ -0,0 +1,154 @@
+import asyncio
+from types import SimpleNamespace
+
+import bson
+import pytest
+from prometheus_client import REGISTRY
+
+from mongometrics import CommandMetricsListener, PoolMetricsListener, count_commands, instrument_repository
+
+ADDRESS = ("db.example", 27017)
+LABELS = {"address": "db.example:27017"}
+
+
+def event(**fields):
+    return SimpleNamespace(address=ADDRESS, **fields)
+
+
+def sample(name, labels=LABELS):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_checkout_lifecycle_updates_totals_and_gauges():
+    listener = PoolMetricsListener()
+    before_checked_out = sample("mongo_pool_checked_out_connections")
+    before_waits = sample("mongo_pool_checkout_wait_seconds_count")
+
+    listener.connection_check_out_started(event())
+    assert listener.snapshot() == {"checked_out": 0, "waiting": 1}
+
+    listener.connection_checked_out(event(connection_id=1, duration=0.003))
+    assert listener.snapshot() == {"checked_out": 1, "waiting": 0}
+    assert sample("mongo_pool_checked_out_connections") == before_checked_out + 1
+    assert sample("mongo_pool_checkout_wait_seconds_count") == before_waits + 1
+
+    listener.connection_checked_in(event(connection_id=1))
+    assert listener.snapshot() == {"checked_out": 0, "waiting": 0}
+    assert sample("mongo_pool_checked_out_connections") == before_checked_out
+
+
+def test_failed_checkout_counted():
+    listener = PoolMetricsListener()
+    labels = {**LABELS, "reason": "timeout"}
+    before = sample("mongo_pool_checkout_failures_total", labels)
+
+    listener.connection_check_out_started(event())
+    listener.connection_check_out_failed(event(connection_id=None, duration=1.0, reason="timeout"))
+
+    assert listener.snapshot() == {"checked_out": 0, "waiting": 0}
+    assert sample("mongo_pool_checkout_failures_total", labels) == before + 1
+
+
+def test_saturated_only_when_full_and_queueing():
+    listener = PoolMetricsListener()
+    for i in range(2):
+        listener.connection_check_out_started(event())
+        listener.connection_checked_out(event(connection_id=i, duration=0.0))
+
+    assert not listener.saturated(max_pool_size=2)
+
+    listener.connection_check_out_started(event())
+    assert listener.saturated(max_pool_size=2)
+    assert not listener.saturated(max_pool_size=3)
+
+
+def command_event(command_name, command=None, reply=None, request_id=1, duration_micros=2500):
+    return SimpleNamespace(
+        command_name=command_name,
+        command=command or {},
+        reply=reply or {},
+        connection_id=ADDRESS,
+        request_id=request_id,
+        duration_micros=duration_micros,
+    )
+
+
+def test_command_metrics_by_collection_and_command():
+    listener = CommandMetricsListener()
+    labels = {"collection": "water_intake", "command": "find"}
+    before = {
+        name: sample(name, labels)
+        for name in ("mongo_command_duration_seconds_count", "mongo_command_documents_sum",
+                     "mongo_command_reply_bytes_sum", "mongo_command_sent_bytes_total")
+    }
+    command = {"find": "water_intake", "filter": {"userId": "u1"}}
+    reply = {"cursor": {"firstBatch": [{"goalIntake": 2000}, {"goalIntake": 2500}], "id": 0}, "ok": 1}
+
+    listener.started(command_event("find", command))
+    listener.succeeded(command_event("find", reply=reply))
+
+    assert sample("mongo_command_duration_seconds_count", labels) == before["mongo_command_duration_seconds_count"] + 1
+    assert sample("mongo_command_documents_sum", labels) == before["mongo_command_documents_sum"] + 2
+    assert sample("mongo_command_reply_bytes_sum", labels) == before["mongo_command_reply_bytes_sum"] + len(bson.encode(reply))
+    assert sample("mongo_command_sent_bytes_total", labels) == before["mongo_command_sent_bytes_total"] + len(bson.encode(command))
+    assert listener._targets == {}
+
+
+def test_command_metrics_labels():
+    listener = CommandMetricsListener(measure_bytes=False)
+    get_more = {"collection": "forum_posts", "command": "getMore"}
+    admin = {"collection": "", "command": "ping"}
+    failed = {"collection": "users", "command": "insert"}
+    before = [sample("mongo_command_documents_sum", get_more), sample("mongo_command_duration_seconds_count", admin),
+              sample("mongo_command_failures_total", failed)]
+
+    listener.started(command_event("getMore", {"getMore": 123, "collection": "forum_posts"}, request_id=1))
+    listener.started(command_event("ping", {"ping": 1}, request_id=2))
+    listener.started(command_event("insert", {"insert": "users"}, request_id=3))
+    listener.succeeded(command_event("getMore", reply={"cursor": {"nextBatch": [{}] * 3}}, request_id=1))
+    listener.succeeded(command_event("ping", reply={"ok": 1}, request_id=2))
+    listener.failed(command_event("insert", request_id=3))
+
+    assert sample("mongo_command_documents_sum", get_more) == before[0] + 3
+    assert sample("mongo_command_duration_seconds_count", admin) == before[1] + 1
+    assert sample("mongo_command_failures_total", failed) == before[2] + 1
+    assert listener._targets == {}
+
+
+@pytest.mark.anyio
+async def test_commands_counted_per_context_including_child_tasks():
+    listener = CommandMetricsListener(measure_bytes=False)
+
+    async def find(request_id):
+        listener.started(command_event("find", {"find": "guide"}, request_id=request_id))
+
+    listener.started(command_event("find", {"find": "guide"}, request_id=1))
+    with count_commands() as commands:
+        await find(2)
+        await asyncio.gather(find(3), find(4))
+
+    assert commands.value == 3
+
+
+@pytest.mark.anyio
+async def test_instrument_repository_times_public_coroutines():
+    @instrument_repository
+    class ExampleRepository:
+        async def find(self, value):
+            return await self._load(value)
+
+        async def _load(self, value):
+            return value
+
+        def serialize(self, value):
+            return value
+
+    labels = {"repository": "ExampleRepository", "method": "find"}
+    before = sample("repository_call_duration_seconds_count", labels)
+
+    assert await ExampleRepository().find(5) == 5
+
+    assert sample("repository_call_duration_seconds_count", labels) == before + 1
+    assert ExampleRepository.find.__name__ == "find"
+    assert REGISTRY.get_sample_value("repository_call_duration_seconds_count",
+                                     {"repository": "ExampleRepository", "method": "_load"}) is None
@@ -1,6 +1,6 @@
 import pytest
-from unittest.mock import MagicMock, patch
-from moodrepository import MoodRepository
+from unittest.mock import AsyncMock, MagicMock, patch
+from moodrepository import VALID_MOODS, MoodRepository, current_streak
 from datetime import date
 
 @pytest.fixture
@@ -12,10 +12,11 @@ def test_date():
     return date.today().isoformat()
 
 
+@pytest.mark.anyio
 @patch("moodrepository.mongo_db")
-def test_create_mood(mock_mongo, test_user_id, test_date):
+async def test_create_mood(mock_mongo, test_user_id, test_date):
     """Test creating a new mood entry."""
-    mock_collection = MagicMock()
+    mock_collection = AsyncMock()
     mock_mongo.get_collection.return_value = mock_collection
     mock_collection.insert_one.return_value.inserted_id = "123"
     
@@ -26,17 +27,18 @@ def test_create_mood(mock_mongo, test_user_id, test_date):
         "mood": "happy"
     }
     
-    mood_id = repo.create(mood_data)
+    mood_id = await repo.create(mood_data)
     
     assert mood_id == "123"
     assert isinstance(mood_id, str)
     mock_collection.insert_one.assert_called_once()
 
 
+@pytest.mark.anyio
 @patch("moodrepository.mongo_db")
-def test_find_by_user_and_date(mock_mongo, test_user_id, test_date):
+async def test_find_by_user_and_date(mock_mongo, test_user_id, test_date):
     """Test finding a mood entry by user and date."""
-    mock_collection = MagicMock()
+    mock_collection = AsyncMock()
     mock_mongo.get_collection.return_value = mock_collection
     mock_collection.find_one.return_value = {
         "_id": "123",
@@ -47,7 +49,7 @@ def test_find_by_user_and_date(mock_mongo, test_user_id, test_date):
     }
     
     repo = MoodRepository()
-    found_mood = repo.find_by_user_and_date(test_user_id, test_date)
+    found_mood = await repo.find_by_user_and_date(test_user_id, test_date)
     
     assert found_mood is not None
     assert found_mood["userId"] == test_user_id
@@ -57,36 +59,39 @@ def test_find_by_user_and_date(mock_mongo, test_user_id, test_date):
     mock_collection.find_one.assert_called_once_with({"userId": test_user_id, "date": test_date})
 
 
+@pytest.mark.anyio
 @patch("moodrepository.mongo_db")
-def test_find_by_user_and_date_not_found(mock_mongo, test_user_id):
+async def test_find_by_user_and_date_not_found(mock_mongo, test_user_id):
     """Test finding a mood entry that doesn't exist."""
-    mock_collection = MagicMock()
+    mock_collection = AsyncMock()
     mock_mongo.get_collection.return_value = mock_collection
     mock_collection.find_one.return_value = None
     
     repo = MoodRepository()
-    found_mood = repo.find_by_user_and_date(test_user_id, "2099-12-31")
+    found_mood = await repo.find_by_user_and_date(test_user_id, "2099-12-31")
     
     assert found_mood is None
 
 
+@pytest.mark.anyio
 @patch("moodrepository.mongo_db")
-def test_find_by_user(mock_mongo, test_user_id):
+async def test_find_by_user(mock_mongo, test_user_id):
     """Test finding all mood entries for a user."""
-    mock_collection = MagicMock()
+    mock_collection = AsyncMock()
     mock_mongo.get_collection.return_value = mock_collection
     
     mock_cursor = MagicMock()
     mock_cursor.sort.return_value = mock_cursor
-    mock_cursor.limit.return_value = [
+    mock_cursor.limit.return_value = mock_cursor
+    mock_cursor.to_list = AsyncMock(return_value=[
         {"_id": "3", "userId": test_user_id, "date": "2024-01-03", "mood": "anxious"},
         {"_id": "2", "userId": test_user_id, "date": "2024-01-02", "mood": "tired"},
         {"_id": "1", "userId": test_user_id, "date": "2024-01-01", "mood": "happy"}
-    ]
-    mock_collection.find.return_value = mock_cursor
+    ])
+    mock_collection.find = MagicMock(return_value=mock_cursor)
     
     repo = MoodRepository()
-    found_moods = repo.find_by_user(test_user_id)
+    found_moods = await repo.find_by_user(test_user_id)
     
     assert len(found_moods) == 3
     assert found_moods[0]["date"] == "2024-01-03"
@@ -94,55 +99,184 @@ def test_find_by_user(mock_mongo, test_user_id):
     assert found_moods[2]["date"] == "2024-01-01"
 
 
+@pytest.mark.anyio
 @patch("moodrepository.mongo_db")
-def test_update_mood(mock_mongo, test_user_id, test_date):
+async def test_update_mood(mock_mongo, test_user_id, test_date):
     """Test updating a mood entry."""
-    mock_collection = MagicMock()
+    mock_collection = AsyncMock()
     mock_mongo.get_collection.return_value = mock_collection
     mock_collection.update_one.return_value.modified_count = 1
     
     repo = MoodRepository()
-    success = repo.update(test_user_id, test_date, "unwell")
+    success = await repo.update(test_user_id, test_date, "unwell")
     
     assert success is True
     mock_collection.update_one.assert_called_once()
 
 
+@pytest.mark.anyio
 @patch("moodrepository.mongo_db")
-def test_update_nonexistent_mood(mock_mongo, test_user_id):
+async def test_update_nonexistent_mood(mock_mongo, test_user_id):
     """Test updating a mood entry that doesn't exist."""
-    mock_collection = MagicMock()
+    mock_collection = AsyncMock()
     mock_mongo.get_collection.return_value = mock_collection
     mock_collection.update_one.return_value.modified_count = 0
     
     repo = MoodRepository()
-    success = repo.update(test_user_id, "2099-12-31", "happy")
+    success = await repo.update(test_user_id, "2099-12-31", "happy")
     
     assert success is False
 
 
+@pytest.mark.anyio
 @patch("moodrepository.mongo_db")
-def test_delete_mood(mock_mongo, test_user_id, test_date):
+async def test_delete_mood(mock_mongo, test_user_id, test_date):
     """Test deleting a mood entry."""
-    mock_collection = MagicMock()
+    mock_collection = AsyncMock()
     mock_mongo.get_collection.return_value = mock_collection
     mock_collection.delete_one.return_value.deleted_count = 1
     
     repo = MoodRepository()
-    success = repo.delete(test_user_id, test_date)
+    success = await repo.delete(test_user_id, test_date)
     
     assert success is True
     mock_collection.delete_one.assert_called_once_with({"userId": test_user_id, "date": test_date})
 
 
+@pytest.mark.anyio
 @patch("moodrepository.mongo_db")
-def test_delete_nonexistent_mood(mock_mongo, test_user_id):
+async def test_delete_nonexistent_mood(mock_mongo, test_user_id):
     """Test deleting a mood entry that doesn't exist."""
-    mock_collection = MagicMock()
+    mock_collection = AsyncMock()
     mock_mongo.get_collection.return_value = mock_collection
     mock_collection.delete_one.return_value.deleted_count = 0
     
     repo = MoodRepository()
-    success = repo.delete(test_user_id, "2099-12-31")
+    success = await repo.delete(test_user_id, "2099-12-31")
     
     assert success is False
+
+
+@pytest.mark.anyio
+@patch("moodrepository.mongo_db")
+async def test_update_and_get_mood(mock_mongo, test_user_id, test_date):
+    """Test updating a mood entry returns the new document in one call."""
+    mock_collection = AsyncMock()
+    mock_mongo.get_collection.return_value = mock_collection
+    mock_collection.find_one_and_update.return_value = {
+        "_id": "123", "userId": test_user_id, "date": test_date, "mood": "tired"
+    }
+
+    repo = MoodRepository()
+    updated = await repo.update_and_get(test_user_id, test_date, "tired")
+
+    assert updated["mood"] == "tired"
+    assert updated["_id"] == "123"
+    update = mock_collection.find_one_and_update.call_args.args[1]
+    assert update["$set"]["mood"] == "tired"
+    assert "updated_at" in update["$set"]
+
+
+@pytest.mark.anyio
+@patch("moodrepository.mongo_db")
+async def test_update_and_get_missing_mood(mock_mongo, test_user_id):
+    """Test updating a mood entry that doesn't exist returns None."""
+    mock_collection = AsyncMock()
+    mock_mongo.get_collection.return_value = mock_collection
+    mock_collection.find_one_and_update.return_value = None
+
+    repo = MoodRepository()
+    updated = await repo.update_and_get(test_user_id, "2099-12-31", "happy")
+
+    assert updated is None
+
+
+@pytest.mark.anyio
+@patch("moodrepository.mongo_db")
+async def test_find_by_user_date_range(mock_mongo, test_user_id):
+    """Range bounds are inclusive and only applied when given."""
+    mock_collection = AsyncMock()
+    mock_mongo.get_collection.return_value = mock_collection
+    mock_cursor = MagicMock()
+    mock_cursor.sort.return_value = mock_cursor
+    mock_cursor.limit.return_value = mock_cursor
+    mock_cursor.to_list = AsyncMock(return_value=[])
+    mock_collection.find = MagicMock(return_value=mock_cursor)
+
+    repo = MoodRepository()
+    await repo.find_by_user(test_user_id, limit=366, date_from="2024-01-01", date_to="2024-12-31")
+    await repo.find_by_user(test_user_id, date_from="2024-06-01")
+
+    assert mock_collection.find.call_args_list[0].args[0] == {
+        "userId": test_user_id, "date": {"$gte": "2024-01-01", "$lte": "2024-12-31"}
+    }
+    assert mock_collection.find.call_args_list[1].args[0] == {"userId": test_user_id, "date": {"$gte": "2024-06-01"}}
+    mock_cursor.limit.assert_any_call(366)
+
+
+@patch("moodrepository.mongo_db")
+def test_summary_pipeline_starts_on_the_index(mock_mongo, test_user_id):
+    repo = MoodRepository()
+
+    pipeline = repo.summary_pipeline(test_user_id, "2024-01-01", "2024-12-31", "month")
+
+    assert pipeline[0] == {"$match": {"userId": test_user_id, "date": {"$gte": "2024-01-01", "$lte": "2024-12-31"}}}
+    assert pipeline[1] == {"$sort": {"date": 1}}
+    period = pipeline[-1]["$facet"]["periods"][0]["$group"]["_id"]["period"]
+    assert period["$dateToString"]["format"] == "%Y-%m"
+
+
+@pytest.mark.anyio
+@patch("moodrepository.mongo_db")
+async def test_summarize_shapes_facets(mock_mongo, test_user_id):
+    mock_collection = AsyncMock()
+    mock_mongo.get_collection.return_value = mock_collection
+    cursor = MagicMock()
+    cursor.to_list = AsyncMock(return_value=[{
+        "periods": [
+            {"_id": "2024-W01", "total": 3, "counts": [{"mood": "happy", "count": 2}, {"mood": "tired", "count": 1}]},
+            {"_id": "2024-W02", "total": 1, "counts": [{"mood": "calm", "count": 1}]},
+        ],
+        "counts": [{"_id": "happy", "count": 2}, {"_id": "tired", "count": 1}, {"_id": "calm", "count": 1}],
+        "streaks": [{"_id": None, "longest": 3, "last": {"end": "2024-01-09", "days": 1}}],
+        "mood_streaks": [{"_id": "happy", "longest": 2}, {"_id": "tired", "longest": 1}, {"_id": "calm", "longest": 1}],
+    }])
+    mock_collection.aggregate.return_value = cursor
+
+    repo = MoodRepository()
+    summary = await repo.summarize(test_user_id, "2024-01-01", "2024-01-10")
+
+    assert summary["total"] == 4
+    assert summary["counts"] == {"happy": 2, "calm": 1, "tired": 1, "anxious": 0, "unwell": 0}
+    assert summary["most_common"] == "happy"
+    assert summary["periods"][0] == {
+        "period": "2024-W01", "total": 3, "counts": {"happy": 2, "calm": 0, "tired": 1, "anxious": 0, "unwell": 0}
+    }
+    assert summary["streaks"] == {
+        "current": 1,
+        "longest": 3,
+        "by_mood": {"happy": 2, "calm": 1, "tired": 1, "anxious": 0, "unwell": 0},
+    }
+
+
+@pytest.mark.anyio
+@patch("moodrepository.mongo_db")
+async def test_summarize_no_entries(mock_mongo, test_user_id):
+    mock_collection = AsyncMock()
+    mock_mongo.get_collection.return_value = mock_collection
+    cursor = MagicMock()
+    cursor.to_list = AsyncMock(return_value=[{"periods": [], "counts": [], "streaks": [], "mood_streaks": []}])
+    mock_collection.aggregate.return_value = cursor
+
+    summary = await MoodRepository().summarize(test_user_id, "2024-01-01", "2024-12-31")
+
+    assert summary["total"] == 0
+    assert summary["most_common"] is None
+    assert summary["streaks"] == {"current": 0, "longest": 0, "by_mood": dict.fromkeys(VALID_MOODS, 0)}
+
+
+def test_current_streak_allows_today_unlogged():
+    assert current_streak({"end": "2024-03-10", "days": 4}, "2024-03-10") == 4
+    assert current_streak({"end": "2024-03-09", "days": 4}, "2024-03-10") == 4
+    assert current_streak({"end": "2024-03-08", "days": 4}, "2024-03-10") == 0
+    assert current_streak(None, "2024-03-10") == 0
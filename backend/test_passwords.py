@@ -0,0 +1,62 @@
+import threading
+
+import pytest
+
+from passwords import Passwords
+
+
+def fast(**overrides):
+    params = {"time_cost": 1, "memory_cost": 8, "parallelism": 1, "workers": 2}
+    return Passwords(**{**params, **overrides})
+
+
+@pytest.fixture
+def passwords():
+    p = fast()
+    yield p
+    p.close()
+
+
+@pytest.mark.anyio
+async def test_hash_and_verify(passwords):
+    stored = await passwords.hash("secret")
+
+    assert stored.startswith("$argon2id$")
+    assert await passwords.verify(stored, "secret") == (True, None)
+    assert await passwords.verify(stored, "wrong") == (False, None)
+
+
+@pytest.mark.anyio
+async def test_rehash_when_cost_changes(passwords):
+    stored = await passwords.hash("secret")
+    stronger = fast(time_cost=2)
+
+    ok, new_hash = await stronger.verify(stored, "secret")
+
+    assert ok
+    assert new_hash != stored
+    assert await stronger.verify(new_hash, "secret") == (True, None)
+    stronger.close()
+
+
+@pytest.mark.anyio
+async def test_legacy_plaintext_upgraded(passwords):
+    ok, new_hash = await passwords.verify("secret", "secret")
+
+    assert ok
+    assert new_hash.startswith("$argon2id$")
+    assert await passwords.verify("secret", "wrong") == (False, None)
+
+
+@pytest.mark.anyio
+async def test_unknown_account_always_fails(passwords):
+    assert await passwords.verify(None, "unknown account") == (False, None)
+    assert await passwords.verify(None, "") == (False, None)
+
+
+@pytest.mark.anyio
+async def test_hashing_runs_in_dedicated_pool(passwords):
+    thread_name = await passwords._run(lambda: threading.current_thread().name)
+
+    assert thread_name.startswith("password-hash")
+    assert passwords.executor._max_workers == 2
@@ -0,0 +1,76 @@
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from refreshtokenrepository import RefreshTokenRepository, hash_token
+
+
+@pytest.fixture
+def repo():
+    with patch("refreshtokenrepository.mongo_db") as mock_mongo:
+        collection = AsyncMock()
+        mock_mongo.get_collection.return_value = collection
+        yield RefreshTokenRepository(), collection
+
+
+@pytest.mark.anyio
+async def test_issue_stores_only_the_hash(repo):
+    repo_obj, collection = repo
+
+    token = await repo_obj.issue({"_id": "u1", "email": "a@b.com", "name": "A"})
+
+    doc = collection.insert_one.await_args.args[0]
+    assert doc["token_hash"] == hash_token(token)
+    assert token not in doc.values()
+    assert doc["userId"] == "u1" and "email" not in doc
+    assert doc["revoked_at"] is None
+    assert doc["expires_at"] > datetime.now(timezone.utc)
+
+
+@pytest.mark.anyio
+async def test_rotate_revokes_old_and_issues_in_same_family(repo):
+    repo_obj, collection = repo
+    collection.find_one_and_update.return_value = {"userId": "u1", "family": "f1"}
+
+    session, new_token = await repo_obj.rotate("old")
+
+    query, update = collection.find_one_and_update.await_args.args
+    assert query["token_hash"] == hash_token("old") and query["revoked_at"] is None
+    assert "revoked_at" in update["$set"]
+    doc = collection.insert_one.await_args.args[0]
+    assert doc["family"] == "f1"
+    assert doc["token_hash"] == hash_token(new_token)
+    assert session["userId"] == "u1"
+
+
+@pytest.mark.anyio
+async def test_rotate_unknown_token(repo):
+    repo_obj, collection = repo
+    collection.find_one_and_update.return_value = None
+    collection.find_one.return_value = None
+
+    assert await repo_obj.rotate("nope") is None
+    collection.update_many.assert_not_awaited()
+
+
+@pytest.mark.anyio
+async def test_reused_token_revokes_family(repo):
+    repo_obj, collection = repo
+    collection.find_one_and_update.return_value = None
+    collection.find_one.return_value = {"userId": "u1", "family": "f1", "revoked_at": datetime.now(timezone.utc)}
+    collection.update_many.return_value = MagicMock(modified_count=1)
+
+    assert await repo_obj.rotate("stolen") is None
+
+    query, _ = collection.update_many.await_args.args
+    assert query == {"family": "f1", "revoked_at": None}
+
+
+@pytest.mark.anyio
+async def test_revoke_user(repo):
+    repo_obj, collection = repo
+    collection.update_many.return_value = MagicMock(modified_count=2)
+
+    assert await repo_obj.revoke_user("u1") == 2
+    query, _ = collection.update_many.await_args.args
+    assert query == {"userId": "u1", "revoked_at": None}
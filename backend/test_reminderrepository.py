@@ -0,0 +1,76 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+from bson import ObjectId
+
+from conftest import mock_find
+from reminderrepository import REMINDER_PROJECTION, REMINDER_SORT, ReminderRepository, active_range_filter
+
+
+@pytest.mark.anyio
+@patch("reminderrepository.mongo_db")
+async def test_create_stores_one_document(mock_mongo):
+    mock_collection = AsyncMock()
+    mock_mongo.get_collection.return_value = mock_collection
+
+    reminder = await ReminderRepository().create("u1", {"title": "Scan", "date": "2025-06-02", "time": "10:00"})
+
+    stored = mock_collection.insert_one.await_args.args[0]
+    assert stored["_id"] == ObjectId(reminder["id"])
+    assert stored["userId"] == "u1"
+    assert reminder == {"id": reminder["id"], "title": "Scan", "date": "2025-06-02", "time": "10:00"}
+
+
+@pytest.mark.anyio
+@patch("reminderrepository.mongo_db")
+async def test_find_by_user_sorted_by_date_and_time(mock_mongo):
+    mock_collection, mock_cursor = mock_find(mock_mongo, [{"id": "r1"}])
+
+    assert await ReminderRepository().find_by_user("u1") == [{"id": "r1"}]
+    mock_collection.find.assert_called_once_with({"userId": "u1"}, REMINDER_PROJECTION)
+    mock_cursor.sort.assert_called_once_with(REMINDER_SORT)
+    mock_cursor.limit.assert_called_once_with(0)
+
+
+@pytest.mark.anyio
+@patch("reminderrepository.mongo_db")
+async def test_find_by_user_range_and_category(mock_mongo):
+    mock_collection, _ = mock_find(mock_mongo, [])
+
+    await ReminderRepository().find_by_user("u1", "2025-06-01", "2025-06-30", "health")
+
+    query = mock_collection.find.call_args.args[0]
+    assert query["userId"] == "u1" and query["category"] == "health"
+    assert query["date"] == {"$lte": "2025-06-30"}
+
+
+def test_active_range_keeps_repeating_reminders():
+    query = active_range_filter("2025-06-01", None)
+
+    assert "date" not in query
+    assert query["$or"][0] == {"date": {"$gte": "2025-06-01"}}
+    assert query["$or"][1] == {"repeat": {"$in": ["daily", "weekly", "monthly"]}}
+    assert active_range_filter() == {}
+
+
+@pytest.mark.anyio
+@patch("reminderrepository.mongo_db")
+async def test_update_returns_updated_reminder(mock_mongo):
+    mock_collection = AsyncMock()
+    mock_mongo.get_collection.return_value = mock_collection
+    mock_collection.find_one_and_update.return_value = {"id": "r1", "title": "New"}
+
+    assert await ReminderRepository().update("u1", "r1", {"title": "New"}) == {"id": "r1", "title": "New"}
+    query, update = mock_collection.find_one_and_update.await_args.args
+    assert query == {"id": "r1", "userId": "u1"}
+    assert update == {"$set": {"title": "New"}}
+
+
+@pytest.mark.anyio
+@patch("reminderrepository.mongo_db")
+async def test_delete_reports_missing(mock_mongo):
+    mock_collection = AsyncMock()
+    mock_mongo.get_collection.return_value = mock_collection
+    mock_collection.delete_one.return_value.deleted_count = 0
+
+    assert await ReminderRepository().delete("u1", "r1") is False
+    mock_collection.delete_one.assert_awaited_once_with({"id": "r1", "userId": "u1"})
@@ -0,0 +1,74 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from bson import ObjectId
+
+from migrations.reminders import migrate, reminder_documents
+
+
+class AsyncCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def sort(self, *args):
+        return self
+
+    def batch_size(self, size):
+        return self
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for document in self.documents:
+            yield document
+
+
+def make_db(users):
+    source = MagicMock()
+    source.find.return_value = AsyncCursor(users)
+    source.bulk_write = AsyncMock()
+    reminders = MagicMock()
+    reminders.insert_many = AsyncMock(
+        side_effect=lambda docs, ordered: MagicMock(inserted_ids=[d["_id"] for d in docs])
+    )
+    return {"reminder": source, "reminders": reminders}
+
+
+def test_reminder_documents_keep_original_id():
+    reminder_id = ObjectId()
+
+    docs = reminder_documents("u1", [{"id": str(reminder_id), "title": "Scan"}, {"id": "legacy", "title": "Walk"}, {"title": "No id"}])
+
+    assert docs[0]["_id"] == reminder_id and docs[0]["id"] == str(reminder_id)
+    assert docs[0]["userId"] == "u1"
+    # ids that are not ObjectIds stay as the client knows them
+    assert docs[1]["id"] == "legacy"
+    assert docs[2]["id"] == str(docs[2]["_id"])
+
+
+@pytest.mark.anyio
+async def test_migrate_moves_reminders_in_batches():
+    users = [
+        {"_id": ObjectId(), "userId": "u1", "reminders": [{"id": str(ObjectId()), "title": "a"} for _ in range(3)]},
+        {"_id": ObjectId(), "userId": "u2", "reminders": [{"id": str(ObjectId()), "title": "b"}]},
+        {"_id": ObjectId(), "userId": "u3", "reminders": []},
+    ]
+    db = make_db(users)
+
+    migrated_users, migrated_reminders = await migrate(db, batch_size=2)
+
+    assert (migrated_users, migrated_reminders) == (3, 4)
+    assert db["reminders"].insert_many.await_count == 2
+    deletes = [op for call in db["reminder"].bulk_write.await_args_list for op in call.args[0]]
+    assert len(deletes) == 3
+    # only deleted if nothing was appended since it was read
+    assert deletes[0]._filter == {"_id": users[0]["_id"], "reminders": {"$size": 3}}
+
+
+@pytest.mark.anyio
+async def test_migrate_dry_run_writes_nothing():
+    db = make_db([{"_id": ObjectId(), "userId": "u1", "reminders": [{"id": str(ObjectId())}]}])
+
+    assert await migrate(db, dry_run=True) == (1, 1)
+    db["reminders"].insert_many.assert_not_awaited()
+    db["reminder"].bulk_write.assert_not_awaited()
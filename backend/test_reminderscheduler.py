@@ -0,0 +1,278 @@
+from datetime import date, datetime, timedelta, timezone
+from unittest.mock import patch
+from zoneinfo import ZoneInfo
+
+import pytest
+from pymongo import DeleteOne, UpdateOne
+
+from reminderscheduler import (
+    EPOCH,
+    ReminderScheduler,
+    fire_dates,
+    next_fire,
+    occurrences_between,
+)
+
+UTC = timezone.utc
+
+
+def at(*args):
+    return datetime(*args, tzinfo=UTC)
+
+
+# ------------------------------------------------
+# In-memory stand-in for reminder_occurrences
+# ------------------------------------------------
+def matches(doc, query):
+    for field, condition in query.items():
+        value = doc.get(field)
+        if isinstance(condition, dict):
+            if "$lte" in condition and not (value is not None and value <= condition["$lte"]):
+                return False
+            if "$in" in condition and value not in condition["$in"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, field, direction=1):
+        self.docs.sort(key=lambda doc: doc[field], reverse=direction == -1)
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    async def to_list(self, length=None):
+        return [dict(doc) for doc in self.docs]
+
+    def __aiter__(self):
+        self._iter = iter(self.docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return dict(next(self._iter))
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeOccurrences:
+    def __init__(self):
+        self.docs = {}
+
+    def find(self, query, projection=None, **kwargs):
+        return FakeCursor([doc for doc in self.docs.values() if matches(doc, query)])
+
+    async def update_many(self, query, update):
+        for doc in self.docs.values():
+            if matches(doc, query):
+                doc.update(update["$set"])
+
+    async def delete_one(self, query):
+        for key, doc in list(self.docs.items()):
+            if matches(doc, query):
+                del self.docs[key]
+                return
+
+    async def bulk_write(self, ops, ordered=True):
+        for op in ops:
+            query = op._filter
+            if isinstance(op, DeleteOne):
+                await self.delete_one(query)
+            elif isinstance(op, UpdateOne):
+                doc = next((d for d in self.docs.values() if matches(d, query)), None)
+                if doc is None and op._upsert:
+                    doc = self.docs[query["_id"]] = {"_id": query["_id"]}
+                if doc is not None:
+                    doc.update(op._doc["$set"])
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, **delta):
+        self.now += timedelta(**delta)
+
+
+@pytest.fixture
+def clock():
+    return FakeClock(at(2025, 6, 2, 8, 0))
+
+
+@pytest.fixture
+def scheduler(clock):
+    fired = []
+
+    async def handler(batch):
+        fired.extend(batch)
+
+    with patch("reminderscheduler.mongo_db"):
+        scheduler = ReminderScheduler(clock=clock, handler=handler, batch_size=2, timezone_name="UTC")
+    scheduler.collection = FakeOccurrences()
+    scheduler.fired = fired
+    return scheduler
+
+
+def reminder(rid, date="2025-06-02", time="09:00", repeat="none", **fields):
+    return {"id": rid, "title": rid, "description": "", "category": "health", "date": date, "time": time,
+            "repeat": repeat, **fields}
+
+
+# ------------------------------------------------
+# Repeat rules
+# ------------------------------------------------
+def test_fire_dates_rules():
+    start = date(2025, 1, 31)
+
+    daily = fire_dates(start, "daily", date(2025, 3, 1))
+    weekly = fire_dates(start, "weekly", date(2025, 2, 1))
+    monthly = fire_dates(start, "monthly", date(2025, 2, 1))
+
+    assert [next(daily), next(daily)] == [date(2025, 3, 1), date(2025, 3, 2)]
+    assert next(weekly) == date(2025, 2, 7)
+    # February and April have no 31st
+    assert [next(monthly), next(monthly)] == [date(2025, 3, 31), date(2025, 5, 31)]
+    assert list(fire_dates(start, "none", date(2025, 2, 1))) == []
+    assert list(fire_dates(start, "none", start)) == [start]
+
+
+def test_next_fire_is_strictly_after():
+    r = reminder("r1", repeat="daily")
+
+    assert next_fire(r, at(2025, 6, 2, 8, 0), UTC) == at(2025, 6, 2, 9, 0)
+    assert next_fire(r, at(2025, 6, 2, 9, 0), UTC) == at(2025, 6, 3, 9, 0)
+    assert next_fire(reminder("r2"), at(2025, 6, 2, 9, 0), UTC) is None
+    assert next_fire(reminder("bad", time="9am"), at(2025, 6, 2), UTC) is None
+
+
+def test_wall_clock_time_in_configured_zone():
+    r = reminder("r1", date="2025-01-15", time="09:00")
+
+    assert next_fire(r, at(2025, 1, 1), ZoneInfo("Asia/Colombo")) == at(2025, 1, 15, 3, 30)
+
+
+def test_occurrences_between_inclusive():
+    r = reminder("r1", repeat="daily")
+
+    fires = list(occurrences_between(r, at(2025, 6, 3, 9, 0), at(2025, 6, 5, 9, 0), UTC))
+
+    assert fires == [at(2025, 6, 3, 9, 0), at(2025, 6, 4, 9, 0), at(2025, 6, 5, 9, 0)]
+
+
+# ------------------------------------------------
+# Scheduler with a fake clock
+# ------------------------------------------------
+@pytest.mark.anyio
+async def test_schedule_stores_next_fire(scheduler):
+    assert await scheduler.schedule("u1", reminder("r1")) == at(2025, 6, 2, 9, 0)
+
+    doc = scheduler.collection.docs["r1"]
+    assert doc["userId"] == "u1" and doc["fire_at"] == at(2025, 6, 2, 9, 0)
+    assert doc["leased_until"] == EPOCH
+
+
+@pytest.mark.anyio
+async def test_schedule_past_one_off_removes_it(scheduler):
+    await scheduler.schedule("u1", reminder("r1"))
+
+    assert await scheduler.schedule("u1", reminder("r1", date="2025-06-01")) is None
+    assert scheduler.collection.docs == {}
+
+
+@pytest.mark.anyio
+async def test_worker_fires_due_batches_in_order(scheduler, clock):
+    await scheduler.schedule("u1", reminder("late", time="09:30"))
+    await scheduler.schedule("u1", reminder("early", time="09:00", repeat="daily"))
+    await scheduler.schedule("u2", reminder("later", time="09:45"))
+
+    assert await scheduler.run_once() == 0
+
+    clock.advance(hours=2)
+    assert await scheduler.run_once() == 2
+    assert [doc["_id"] for doc in scheduler.fired] == ["early", "late"]
+    assert await scheduler.run_once() == 1
+
+    # the daily reminder moved on; the one-offs are gone
+    assert scheduler.collection.docs.keys() == {"early"}
+    assert scheduler.collection.docs["early"]["fire_at"] == at(2025, 6, 3, 9, 0)
+    assert scheduler.collection.docs["early"]["lease"] is None
+
+
+@pytest.mark.anyio
+async def test_missed_occurrences_not_replayed(scheduler, clock):
+    await scheduler.schedule("u1", reminder("r1", repeat="daily"))
+
+    clock.advance(days=3)
+    assert await scheduler.run_once() == 1
+    assert await scheduler.run_once() == 0
+    assert scheduler.collection.docs["r1"]["fire_at"] == at(2025, 6, 5, 9, 0)
+
+
+@pytest.mark.anyio
+async def test_leased_batch_retried_after_lease_expires(scheduler, clock):
+    await scheduler.schedule("u1", reminder("r1"))
+    clock.advance(hours=2)
+
+    token, claimed = await scheduler.claim_batch(clock())
+    assert [doc["_id"] for doc in claimed] == ["r1"]
+    # a second worker sees nothing while the lease holds
+    assert (await scheduler.claim_batch(clock()))[1] == []
+
+    clock.advance(seconds=scheduler.lease.total_seconds())
+    assert await scheduler.run_once() == 1
+    assert scheduler.collection.docs == {}
+
+
+@pytest.mark.anyio
+async def test_edit_during_batch_wins(scheduler, clock):
+    await scheduler.schedule("u1", reminder("r1", repeat="daily"))
+    clock.advance(hours=2)
+    token, claimed = await scheduler.claim_batch(clock())
+
+    await scheduler.schedule("u1", reminder("r1", time="18:00", repeat="daily"))
+    await scheduler.complete(token, claimed, clock())
+
+    assert scheduler.collection.docs["r1"]["fire_at"] == at(2025, 6, 2, 18, 0)
+
+
+@pytest.mark.anyio
+async def test_due_expands_repeats_in_window(scheduler):
+    await scheduler.schedule("u1", reminder("daily", repeat="daily", time="07:00"))
+    await scheduler.schedule("u1", reminder("once", date="2025-06-03", time="12:00"))
+    await scheduler.schedule("u1", reminder("next-week", date="2025-06-10"))
+    await scheduler.schedule("u2", reminder("other"))
+
+    due = await scheduler.due("u1", at(2025, 6, 3, 0, 0), at(2025, 6, 4, 23, 59))
+
+    assert [(d["reminderId"], d["fire_at"]) for d in due] == [
+        ("daily", at(2025, 6, 3, 7, 0)),
+        ("once", at(2025, 6, 3, 12, 0)),
+        ("daily", at(2025, 6, 4, 7, 0)),
+    ]
+
+
+@pytest.mark.anyio
+async def test_backfill_streams_in_batches(scheduler):
+    class Source:
+        def find(self, query, projection=None, batch_size=None):
+            return FakeCursor([
+                {"userId": "u1", **reminder("a")},
+                {"userId": "u1", **reminder("b", repeat="weekly")},
+                {"userId": "u2", **reminder("c", date="2025-06-01")},
+            ])
+
+    total = await scheduler.backfill(Source())
+
+    assert total == 3
+    # "c" already fired and does not repeat, so it is not scheduled
+    assert scheduler.collection.docs.keys() == {"a", "b"}
@@ -0,0 +1,39 @@
+from datetime import datetime, timezone
+
+import orjson
+import pytest
+from bson import ObjectId
+
+from responses import MongoJSONResponse, accepted_encodings, dumps
+
+
+def test_object_id_rendered_as_hex():
+    oid = ObjectId()
+
+    assert orjson.loads(dumps({"_id": oid, "ids": [oid]})) == {"_id": str(oid), "ids": [str(oid)]}
+
+
+def test_datetimes_rendered_as_utc():
+    naive = datetime(2025, 6, 2, 8, 30)
+    aware = datetime(2025, 6, 2, 8, 30, tzinfo=timezone.utc)
+
+    assert orjson.loads(dumps([naive, aware])) == ["2025-06-02T08:30:00+00:00"] * 2
+
+
+def test_unknown_types_still_fail():
+    with pytest.raises(TypeError):
+        dumps({"value": object()})
+
+
+def test_response_body_and_media_type():
+    oid = ObjectId()
+    response = MongoJSONResponse({"posts": [{"_id": oid, "title": "Hi"}]})
+
+    assert response.media_type == "application/json"
+    assert orjson.loads(response.body) == {"posts": [{"_id": str(oid), "title": "Hi"}]}
+
+
+def test_accepted_encodings_honours_q_values():
+    assert accepted_encodings("gzip, br;q=0, deflate;q=0.5") == {"gzip", "deflate"}
+    assert accepted_encodings("GZIP") == {"gzip"}
+    assert accepted_encodings("") == set()
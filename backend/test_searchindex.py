@@ -0,0 +1,296 @@
+import asyncio
+
+import pytest
+from bson import ObjectId
+
+from searchindex import (
+    Entry,
+    Hit,
+    SearchIndex,
+    guide_entry,
+    highlight,
+    plain_text,
+    query_terms,
+    search_result,
+    tokenize,
+)
+
+
+def post(doc_id, title, text):
+    return Entry("post", doc_id, title, text)
+
+
+@pytest.fixture
+def index():
+    index = SearchIndex(champions=100)
+    index.add_batch([
+        post("p1", "Sleeping on your side", "Pillows help with back pain at night"),
+        post("p2", "Morning sickness", "Ginger tea and crackers before getting up"),
+        post("p3", "Back pain at work", "A lumbar cushion and short walks every hour"),
+        Entry("reply", "r1", "", "Ginger biscuits worked for my morning sickness too"),
+    ])
+    return index
+
+
+def test_tokenize_lowercases_and_drops_stopwords():
+    assert tokenize("The BEST pillow for a 2nd-trimester back") == ["best", "pillow", "2nd", "trimester", "back"]
+    assert query_terms("ginger Ginger tea") == ["ginger", "tea"]
+
+
+def test_plain_text_strips_html():
+    assert plain_text("<p>Eat <b>iron</b>&amp;folate</p>").split() == ["Eat", "iron", "&folate"]
+    assert guide_entry({"_id": ObjectId("6568f0f0f0f0f0f0f0f0f0f0"), "title": "Diet", "content": "<p>Iron</p>"}).text.strip() == "Iron"
+
+
+def test_search_ranks_by_bm25(index):
+    hits, more = index.search("back pain")
+
+    # both match both terms; p3 has them in its title, which counts double
+    assert [hit.id for hit in hits] == ["p3", "p1"]
+    assert not more
+
+
+def test_search_covers_replies(index):
+    hits, _ = index.search("ginger")
+
+    assert {(hit.kind, hit.id) for hit in hits} == {("post", "p2"), ("reply", "r1")}
+
+
+def test_search_pages(index):
+    first, more = index.search("ginger sickness pain", limit=2)
+    second, more_after = index.search("ginger sickness pain", limit=2, offset=2)
+
+    assert more and not more_after
+    assert len(first) == 2 and len(second) == 2
+    assert not {hit.id for hit in first} & {hit.id for hit in second}
+
+
+def test_readding_replaces_and_removing_hides(index):
+    index.add(post("p1", "Sleeping on your side", "A wedge pillow under the bump"))
+
+    assert [hit.id for hit in index.search("pain")[0]] == ["p3"]
+    assert [hit.id for hit in index.search("wedge")[0]] == ["p1"]
+    assert index.remove("post", "p1")
+    assert index.search("wedge")[0] == []
+    assert len(index) == 3
+
+
+def scores(index, query):
+    return {hit.id: hit.score for hit in index.search(query, limit=50)[0]}
+
+
+def test_readding_unchanged_document_changes_nothing(index):
+    before = scores(index, "back pain ginger")
+    df = index._terms["pain"].df
+
+    for _ in range(5):
+        index.add(post("p1", "Sleeping on your side", "Pillows help with back pain at night"))
+
+    assert index._terms["pain"].df == df
+    assert scores(index, "back pain ginger") == before
+
+
+def test_removing_restores_document_frequency_and_lengths(index):
+    df, lengths = index._terms["ginger"].df, (index._total_length, index._length_count)
+
+    index.add(post("p9", "Ginger chews", "Ginger chews in the car"))
+    index.remove("post", "p9")
+
+    assert index._terms["ginger"].df == df
+    assert (index._total_length, index._length_count) == lengths
+    assert "p9" not in index._terms["ginger"].docs.tolist() + [hit.id for hit in index.search("chews")[0]]
+
+
+def test_document_numbers_are_reused(index):
+    size = len(index._keys)
+
+    for revision in range(20):
+        index.add(post("p1", "Sleeping on your side", f"Revision {revision} of the pillow advice"))
+        index.add(Entry("guide", "g1", "Iron", f"Leafy greens, revision {revision}"))
+
+    assert len(index._keys) == size + 1
+    assert sorted(hit.id for hit in index.search("revision 19")[0]) == ["g1", "p1"]
+    assert [hit.id for hit in index.search("pain")[0]] == ["p3"]
+
+
+def test_replace_keeps_unchanged_documents(index):
+    guides = [Entry("guide", "g1", "Iron", "Leafy greens"), Entry("guide", "g2", "Folate", "Beans and greens")]
+    index.replace("guide", guides)
+    before = scores(index, "greens leafy")
+    df = index._terms["greens"].df
+
+    index.replace("guide", guides)
+
+    assert index._terms["greens"].df == df
+    assert scores(index, "greens leafy") == before
+
+
+def test_replace_kind(index):
+    index.add(Entry("guide", "g1", "Iron", "Leafy greens"))
+
+    index.replace("guide", [Entry("guide", "g2", "Folate", "Leafy greens and beans")])
+
+    assert [hit.id for hit in index.search("leafy")[0]] == ["g2"]
+
+
+def test_champion_lists_keep_the_strongest_postings():
+    index = SearchIndex(champions=3)
+    # "tea" repeated more often in shorter documents weighs more
+    index.add_batch([post(f"weak{n}", "", "tea " + "filler " * 20) for n in range(5)])
+    index.add_batch([post("strong", "", "tea tea tea"), post("mid", "", "tea tea filler")])
+
+    hits, _ = index.search("tea", limit=10)
+
+    assert len(hits) == 3
+    assert [hit.id for hit in hits][:2] == ["strong", "mid"]
+    # document frequency still counts every document
+    assert index._terms["tea"].df == 7
+
+
+def test_full_champion_list_takes_new_documents():
+    index = SearchIndex(champions=2)
+    index.add_batch([post(f"old{n}", "", "tea") for n in range(3)])
+
+    index.add(post("new", "", "tea"))
+
+    # equal weights: the newest document displaces the oldest
+    assert "new" in [hit.id for hit in index.search("tea")[0]]
+
+    index.remove("post", "new")
+    assert index._terms["tea"].df == 3
+    assert len(index._terms["tea"].docs) == 1
+
+
+def test_highlight_windows_around_first_match():
+    text = "word " * 60 + "Ginger tea helps. " + "more " * 10
+
+    result = highlight(text, ["ginger", "tea"], width=80)
+
+    start, end = result["highlights"][0]
+    assert result["snippet"][start:end] == "Ginger"
+    assert len(result["snippet"]) <= 80
+    assert [result["snippet"][s:e] for s, e in result["highlights"]] == ["Ginger", "tea"]
+
+
+def test_search_result_shapes():
+    terms = ["ginger"]
+    reply = search_result(Hit("reply", "r1", 1.5), {"postId": ObjectId("6568f0f0f0f0f0f0f0f0f0f0"), "content": "Ginger!"}, terms)
+    guide = search_result(Hit("guide", "g1", 0.5), {"title": "Ginger", "content": "<p>Try ginger</p>"}, terms)
+
+    assert reply == {"type": "reply", "id": "r1", "score": 1.5, "postId": "6568f0f0f0f0f0f0f0f0f0f0",
+                     "snippet": "Ginger!", "highlights": [[0, 6]]}
+    assert guide["title_highlights"] == [[0, 6]]
+    assert "<p>" not in guide["snippet"]
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+
+class FakeCollection:
+    name = "forum_posts"
+
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query, projection=None, batch_size=None):
+        return FakeCursor(self.docs)
+
+
+@pytest.mark.anyio
+async def test_build_streams_sources_in_batches():
+    from searchindex import post_entry, reply_entry
+
+    index = SearchIndex()
+    posts = FakeCollection([{"_id": ObjectId(), "title": f"Post {n}", "content": "kicks"} for n in range(5)])
+    replies = FakeCollection([{"_id": ObjectId(), "id": "r1", "content": "kicks at night"}])
+
+    assert not index.ready
+    assert await index.build([(posts, {}, post_entry), (replies, {}, reply_entry)], batch_size=2) == 6
+    assert index.ready
+    assert len(index.search("kicks", limit=10)[0]) == 6
+
+
+class ChangeCollection:
+    name = "forum_posts"
+
+    def __init__(self, *sessions):
+        self.sessions = list(sessions)
+
+    async def watch(self, pipeline, resume_after=None):
+        if not self.sessions:
+            raise asyncio.CancelledError
+        session = self.sessions.pop(0)
+        if isinstance(session, Exception):
+            raise session
+        return ChangeStream(session)
+
+
+class ChangeStream:
+    def __init__(self, items):
+        self.items = items
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def __aiter__(self):
+        for item in self.items:
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+
+def inserted(token, title):
+    return {"_id": {"_data": token}, "operationType": "insert",
+            "fullDocument": {"_id": token, "title": title, "content": ""}}
+
+
+@pytest.mark.anyio
+async def test_watch_indexes_inserts_and_rebuilds_when_resume_fails(monkeypatch):
+    from functools import partial
+
+    from pymongo.errors import OperationFailure
+
+    from database import follow_changes
+    from searchindex import post_entry
+
+    monkeypatch.setattr("searchindex.follow_changes", partial(follow_changes, first_delay_s=0))
+    index = SearchIndex()
+    rebuilds = []
+
+    async def rebuild():
+        rebuilds.append(1)
+
+    collection = ChangeCollection(
+        [inserted("a", "Nursery colours"), OperationFailure("history lost", code=286)],
+        [inserted("b", "Nursery lighting")],
+    )
+
+    with pytest.raises(asyncio.CancelledError):
+        await index.watch(collection, post_entry, rebuild)
+
+    assert sorted(hit.id for hit in index.search("nursery")[0]) == ["a", "b"]
+    assert rebuilds == [1]
+
+
+@pytest.mark.anyio
+async def test_watch_falls_back_to_local_writes_without_change_streams(caplog):
+    from pymongo.errors import OperationFailure
+    from searchindex import post_entry
+
+    collection = ChangeCollection(OperationFailure("only supported on replica sets", code=40573))
+
+    await SearchIndex().watch(collection, post_entry)
+
+    assert "not supported" in caplog.text
@@ -0,0 +1,53 @@
+from dataclasses import replace
+
+import serve
+from settings import Settings
+
+
+def test_worker_count_defaults_to_available_cpus(monkeypatch):
+    monkeypatch.setattr(serve, "available_cpus", lambda: 6)
+
+    assert serve.worker_count(Settings()) == 6
+    assert serve.worker_count(Settings(web_workers=2)) == 2
+
+
+def test_uvicorn_options_prefer_uvloop_and_httptools(monkeypatch):
+    monkeypatch.setattr(serve, "_installed", lambda module: True)
+    settings = Settings(web_workers=3, web_port=9000, graceful_timeout_s=15)
+
+    options = serve.uvicorn_options(settings)
+
+    assert options == {
+        "host": "0.0.0.0",
+        "port": 9000,
+        "workers": 3,
+        "loop": "uvloop",
+        "http": "httptools",
+        "timeout_graceful_shutdown": 15,
+    }
+
+
+def test_uvicorn_options_fall_back_without_extras(monkeypatch):
+    monkeypatch.setattr(serve, "_installed", lambda module: False)
+
+    options = serve.uvicorn_options(Settings(web_workers=1))
+
+    assert options["loop"] == "asyncio"
+    assert options["http"] == "h11"
+
+
+def test_explicit_loop_and_http_kept(monkeypatch):
+    monkeypatch.setattr(serve, "_installed", lambda module: True)
+    settings = replace(Settings(web_workers=1), web_loop="asyncio", web_http="h11")
+
+    options = serve.uvicorn_options(settings)
+
+    assert (options["loop"], options["http"]) == ("asyncio", "h11")
+
+
+def test_server_settings_from_env():
+    settings = Settings.from_env({"PORT": "10000", "WEB_WORKERS": "4", "THREADPOOL_SIZE": "8"})
+
+    assert settings.web_port == 10000
+    assert settings.web_workers == 4
+    assert settings.threadpool_size == 8
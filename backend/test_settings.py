@@ -0,0 +1,68 @@
+from settings import DEFAULT_CONTENT_SECURITY_POLICY, Settings
+
+
+def test_settings_defaults():
+    settings = Settings.from_env({})
+
+    assert settings.security_headers == {"Content-Security-Policy": DEFAULT_CONTENT_SECURITY_POLICY}
+
+
+def test_settings_from_env():
+    settings = Settings.from_env({
+        "CONTENT_SECURITY_POLICY": "default-src 'none'",
+        "SECURITY_HEADERS": '{"X-Content-Type-Options": "nosniff"}',
+    })
+
+    assert settings.security_headers == {
+        "Content-Security-Policy": "default-src 'none'",
+        "X-Content-Type-Options": "nosniff",
+    }
+
+
+def test_jwt_cache_size_from_env():
+    assert Settings.from_env({}).jwt_cache_size == 1024
+    assert Settings.from_env({"JWT_CACHE_SIZE": "64"}).jwt_cache_size == 64
+
+
+def test_mongo_defaults_match_pymongo():
+    options = Settings.from_env({}).mongo_client_options()
+
+    assert options == {
+        "maxPoolSize": 100,
+        "minPoolSize": 0,
+        "waitQueueTimeoutMS": None,
+        "serverSelectionTimeoutMS": 30000,
+        "readPreference": "primary",
+    }
+
+
+def test_mongo_settings_from_env():
+    settings = Settings.from_env({
+        "MONGO_URI": "mongodb://db:27017",
+        "MONGO_DB": "other",
+        "MONGO_MAX_POOL_SIZE": "20",
+        "MONGO_MIN_POOL_SIZE": "5",
+        "MONGO_WAIT_QUEUE_TIMEOUT_MS": "250",
+        "MONGO_SERVER_SELECTION_TIMEOUT_MS": "3000",
+        "MONGO_COMPRESSORS": "zstd,snappy",
+        "MONGO_READ_PREFERENCE": "secondaryPreferred",
+        "MONGO_COMMAND_BYTES": "false",
+    })
+
+    assert settings.mongo_uri == "mongodb://db:27017"
+    assert not settings.mongo_command_bytes
+    assert Settings.from_env({}).mongo_command_bytes
+    assert settings.mongo_db == "other"
+    assert settings.mongo_client_options() == {
+        "maxPoolSize": 20,
+        "minPoolSize": 5,
+        "waitQueueTimeoutMS": 250,
+        "serverSelectionTimeoutMS": 3000,
+        "readPreference": "secondaryPreferred",
+        "compressors": "zstd,snappy",
+    }
+
+
+def test_change_stream_feeds_on_by_default():
+    assert Settings.from_env({}).search_watch
+    assert not Settings.from_env({"SEARCH_WATCH": "false"}).search_watch
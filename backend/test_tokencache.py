@@ -0,0 +1,65 @@
+from tokencache import TokenCache
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_get_returns_cached_claims():
+    cache = TokenCache(clock=FakeClock())
+    cache.put("t1", {"user_id": "u1", "exp": 2000})
+
+    assert cache.get("t1") == {"user_id": "u1", "exp": 2000}
+    assert cache.hits == 1
+
+
+def test_get_missing_token():
+    cache = TokenCache(clock=FakeClock())
+
+    assert cache.get("nope") is None
+    assert cache.misses == 1
+
+
+def test_entry_evicted_at_exp():
+    clock = FakeClock()
+    cache = TokenCache(clock=clock)
+    cache.put("t1", {"user_id": "u1", "exp": 1500})
+
+    clock.now = 1499.9
+    assert cache.get("t1") is not None
+
+    clock.now = 1500
+    assert cache.get("t1") is None
+    assert len(cache) == 0
+
+
+def test_least_recently_used_evicted_when_full():
+    cache = TokenCache(maxsize=2, clock=FakeClock())
+    cache.put("t1", {"exp": 2000})
+    cache.put("t2", {"exp": 2000})
+
+    # touching t1 makes t2 the oldest entry
+    cache.get("t1")
+    cache.put("t3", {"exp": 2000})
+
+    assert cache.get("t2") is None
+    assert cache.get("t1") is not None
+    assert cache.get("t3") is not None
+
+
+def test_tokens_without_exp_not_cached():
+    cache = TokenCache(clock=FakeClock())
+    cache.put("t1", {"user_id": "u1"})
+
+    assert len(cache) == 0
+
+
+def test_zero_size_disables_cache():
+    cache = TokenCache(maxsize=0, clock=FakeClock())
+    cache.put("t1", {"exp": 2000})
+
+    assert cache.get("t1") is None
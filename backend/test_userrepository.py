@@ -2,12 +2,21 @@ import pytest
 from unittest.mock import MagicMock
 from bson import ObjectId
 
+from passwords import Passwords
 from userrepository import UserRepository
 
 
 # ------------------------------------------------
 # Sample Mongo Collection for Isolated Testing
 # ------------------------------------------------
+class SampleCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    async def to_list(self, length=None):
+        return list(self.documents)
+
+
 class MockCollection:
     def __init__(self):
         self.find_result = []
@@ -15,20 +24,32 @@ class MockCollection:
         self.insert_result = MagicMock(inserted_id=ObjectId("6568f0f0f0f0f0f0f0f0f0f0"))
         self.update_result = MagicMock(modified_count=1)
         self.delete_result = MagicMock(deleted_count=1)
+        self.updates = []
+        self.projections = []
+
+    def _project(self, document, projection):
+        self.projections.append(projection)
+        if document is None or not projection:
+            return document
+        # an inclusion projection keeps only the fields it names, and _id unless excluded
+        inclusive = any(value for key, value in projection.items() if key != "_id")
+        return {key: value for key, value in document.items()
+                if projection.get(key, key == "_id" or not inclusive)}
 
-    def find(self):
-        return self.find_result
+    def find(self, query=None, projection=None):
+        return SampleCursor([self._project(doc, projection) for doc in self.find_result])
 
-    def find_one(self, query):
-        return self.find_one_result
+    async def find_one(self, query, projection=None):
+        return self._project(dict(self.find_one_result) if self.find_one_result else None, projection)
 
-    def insert_one(self, data):
+    async def insert_one(self, data):
         return self.insert_result
 
-    def update_one(self, q, u):
+    async def update_one(self, q, u):
+        self.updates.append((q, u))
         return self.update_result
 
-    def delete_one(self, q):
+    async def delete_one(self, q):
         return self.delete_result
 
 
@@ -42,63 +63,81 @@ def repo(monkeypatch):
         "database.mongo_db.get_collection",
         lambda name: fake
     )
-    return UserRepository(), fake
+    repository = UserRepository()
+    repository.passwords = Passwords(time_cost=1, memory_cost=8, parallelism=1)
+    return repository, fake
 
 
 # ------------------------------------------------
 # TESTS
 # ------------------------------------------------
 
-def test_find_all(repo):
+@pytest.mark.anyio
+async def test_find_all(repo):
     repo_obj, fake = repo
     fake.find_result = [
         {"_id": ObjectId("6568f0f0f0f0f0f0f0f0f0f0"), "email": "a@b.com"}
     ]
 
-    result = repo_obj.find_all()
+    result = await repo_obj.find_all()
+    assert fake.projections == [{"password": 0}]
     assert len(result) == 1
-    assert result[0]["_id"] == "6568f0f0f0f0f0f0f0f0f0f0"
+    assert result[0]["_id"] == ObjectId("6568f0f0f0f0f0f0f0f0f0f0")
     assert result[0]["email"] == "a@b.com"
 
 
-def test_find_by_id(repo):
+@pytest.mark.anyio
+async def test_find_by_id(repo):
     repo_obj, fake = repo
     fake.find_one_result = {"_id": ObjectId("6568f0f0f0f0f0f0f0f0f0f0"), "name": "Test"}
 
-    result = repo_obj.find_by_id("6568f0f0f0f0f0f0f0f0f0f0")
+    result = await repo_obj.find_by_id("6568f0f0f0f0f0f0f0f0f0f0")
     assert result["name"] == "Test"
     assert result["_id"] == "6568f0f0f0f0f0f0f0f0f0f0"
 
 
-def test_find_by_email(repo):
+@pytest.mark.anyio
+async def test_find_claims_reads_only_email_and_name(repo):
+    repo_obj, fake = repo
+    fake.find_one_result = {"_id": ObjectId("6568f0f0f0f0f0f0f0f0f0f0"), "email": "x@y.com", "name": "New",
+                            "password": "hash", "age": 30}
+
+    assert await repo_obj.find_claims("6568f0f0f0f0f0f0f0f0f0f0") == {"email": "x@y.com", "name": "New"}
+
+
+@pytest.mark.anyio
+async def test_find_by_email(repo):
     repo_obj, fake = repo
     fake.find_one_result = {"_id": ObjectId("6568f0f0f0f0f0f0f0f0f0f0"), "email": "x@y.com"}
 
-    result = repo_obj.find_by_email("x@y.com")
+    result = await repo_obj.find_by_email("x@y.com")
     assert result["email"] == "x@y.com"
     assert result["_id"] == "6568f0f0f0f0f0f0f0f0f0f0"
 
 
-def test_create(repo):
+@pytest.mark.anyio
+async def test_create(repo):
     repo_obj, fake = repo
-    result = repo_obj.create({"name": "A"})
+    result = await repo_obj.create({"name": "A"})
 
     assert result == "6568f0f0f0f0f0f0f0f0f0f0"
 
 
-def test_update(repo):
+@pytest.mark.anyio
+async def test_update(repo):
     repo_obj, fake = repo
     fake.update_result.modified_count = 1
 
-    result = repo_obj.update("6568f0f0f0f0f0f0f0f0f0f0", {"name": "New"})
+    result = await repo_obj.update("6568f0f0f0f0f0f0f0f0f0f0", {"name": "New"})
     assert result is True
 
 
-def test_delete(repo):
+@pytest.mark.anyio
+async def test_delete(repo):
     repo_obj, fake = repo
     fake.delete_result.deleted_count = 1
 
-    result = repo_obj.delete("6568f0f0f0f0f0f0f0f0f0f0")
+    result = await repo_obj.delete("6568f0f0f0f0f0f0f0f0f0f0")
     assert result is True
 
 
@@ -110,3 +149,65 @@ def test_serialize_object_id(repo):
 
     assert result["_id"] == "6568f0f0f0f0f0f0f0f0f0f0"
     assert result["x"] == 1
+
+
+@pytest.mark.anyio
+async def test_create_hashes_password(repo):
+    repo_obj, fake = repo
+    user = {"email": "a@b.com", "password": "secret"}
+
+    await repo_obj.create(user)
+
+    assert user["password"].startswith("$argon2id$")
+    assert (await repo_obj.passwords.verify(user["password"], "secret"))[0]
+
+
+@pytest.mark.anyio
+async def test_update_hashes_password_when_given(repo):
+    repo_obj, fake = repo
+
+    await repo_obj.update("6568f0f0f0f0f0f0f0f0f0f0", {"password": "new"})
+    await repo_obj.update("6568f0f0f0f0f0f0f0f0f0f0", {"name": "New"})
+
+    assert fake.updates[0][1]["$set"]["password"].startswith("$argon2id$")
+    assert fake.updates[1][1] == {"$set": {"name": "New"}}
+
+
+@pytest.mark.anyio
+async def test_authenticate_upgrades_legacy_plaintext(repo):
+    repo_obj, fake = repo
+    fake.find_one_result = {"_id": ObjectId("6568f0f0f0f0f0f0f0f0f0f0"), "email": "a@b.com", "password": "secret"}
+
+    user = await repo_obj.authenticate("a@b.com", "secret")
+
+    assert user["email"] == "a@b.com"
+    query, update = fake.updates[0]
+    assert query == {"_id": ObjectId("6568f0f0f0f0f0f0f0f0f0f0")}
+    assert update["$set"]["password"].startswith("$argon2id$")
+
+
+@pytest.mark.anyio
+async def test_authenticate_rejects_wrong_password_and_unknown_user(repo):
+    repo_obj, fake = repo
+    stored = await repo_obj.passwords.hash("secret")
+    fake.find_one_result = {"_id": ObjectId("6568f0f0f0f0f0f0f0f0f0f0"), "email": "a@b.com", "password": stored}
+
+    assert await repo_obj.authenticate("a@b.com", "wrong") is None
+    assert await repo_obj.authenticate("a@b.com", "secret") is not None
+    fake.find_one_result = None
+    assert await repo_obj.authenticate("nobody@b.com", "secret") is None
+    assert fake.updates == []
+
+
+@pytest.mark.anyio
+async def test_lookups_leave_out_password_hash(repo):
+    repo_obj, fake = repo
+    stored = await repo_obj.passwords.hash("secret")
+    fake.find_result = [{"_id": ObjectId("6568f0f0f0f0f0f0f0f0f0f0"), "email": "a@b.com", "password": stored}]
+    fake.find_one_result = fake.find_result[0]
+
+    assert "password" not in (await repo_obj.find_all())[0]
+    assert "password" not in await repo_obj.find_by_id("6568f0f0f0f0f0f0f0f0f0f0")
+    assert "password" not in await repo_obj.find_by_email("a@b.com")
+    user = await repo_obj.authenticate("a@b.com", "secret")
+    assert user["email"] == "a@b.com" and "password" not in user
@@ -1,10 +1,13 @@
-from unittest.mock import MagicMock, patch
+import pytest
+from unittest.mock import AsyncMock, patch
+from pymongo.errors import DuplicateKeyError
 from waterintakerepository import WaterIntakeRepository
 
 
+@pytest.mark.anyio
 @patch("waterintakerepository.mongo_db")
-def test_find_by_user_and_date(mock_mongo):
-    mock_collection = MagicMock()
+async def test_find_by_user_and_date(mock_mongo):
+    mock_collection = AsyncMock()
     mock_mongo.get_collection.return_value = mock_collection
 
     mock_collection.find_one.return_value = {
@@ -15,7 +18,7 @@ def test_find_by_user_and_date(mock_mongo):
     }
 
     repo = WaterIntakeRepository()
-    result = repo.find_by_user_and_date("user123", "2025-12-02")
+    result = await repo.find_by_user_and_date("user123", "2025-12-02")
 
     assert result["userId"] == "user123"
     assert result["_id"] == "123"
@@ -24,67 +27,167 @@ def test_find_by_user_and_date(mock_mongo):
     )
 
 
+@pytest.mark.anyio
 @patch("waterintakerepository.mongo_db")
-def test_find_latest_goal(mock_mongo):
-    mock_collection = MagicMock()
+async def test_find_latest_goal(mock_mongo):
+    mock_collection = AsyncMock()
     mock_mongo.get_collection.return_value = mock_collection
 
     mock_collection.find_one.return_value = {"goalIntake": 2500}
 
     repo = WaterIntakeRepository()
-    result = repo.find_latest_goal("user123")
+    result = await repo.find_latest_goal("user123")
 
     assert result == 2500
     mock_collection.find_one.assert_called_once()
 
 
+@pytest.mark.anyio
 @patch("waterintakerepository.mongo_db")
-def test_create(mock_mongo):
-    mock_collection = MagicMock()
+async def test_create(mock_mongo):
+    mock_collection = AsyncMock()
     mock_mongo.get_collection.return_value = mock_collection
 
     mock_collection.insert_one.return_value.inserted_id = "abc123"
 
     repo = WaterIntakeRepository()
-    result = repo.create({"userId": "user123"})
+    result = await repo.create({"userId": "user123"})
 
     assert result == "abc123"
 
 
+@pytest.mark.anyio
 @patch("waterintakerepository.mongo_db")
-def test_update_intake(mock_mongo):
-    mock_collection = MagicMock()
+async def test_update_intake(mock_mongo):
+    mock_collection = AsyncMock()
     mock_mongo.get_collection.return_value = mock_collection
 
     mock_collection.update_one.return_value.modified_count = 1
 
     repo = WaterIntakeRepository()
-    result = repo.update_intake("user123", "2025-12-02", 700)
+    result = await repo.update_intake("user123", "2025-12-02", 700)
 
     assert result is True
 
 
+@pytest.mark.anyio
 @patch("waterintakerepository.mongo_db")
-def test_increment_intake(mock_mongo):
-    mock_collection = MagicMock()
+async def test_increment_intake(mock_mongo):
+    mock_collection = AsyncMock()
     mock_mongo.get_collection.return_value = mock_collection
 
     mock_collection.update_one.return_value.modified_count = 1
 
     repo = WaterIntakeRepository()
-    result = repo.increment_intake("user123", "2025-12-02", 300)
+    result = await repo.increment_intake("user123", "2025-12-02", 300)
 
     assert result is True
 
 
+@pytest.mark.anyio
 @patch("waterintakerepository.mongo_db")
-def test_delete(mock_mongo):
-    mock_collection = MagicMock()
+async def test_delete(mock_mongo):
+    mock_collection = AsyncMock()
     mock_mongo.get_collection.return_value = mock_collection
 
     mock_collection.delete_one.return_value.deleted_count = 1
 
     repo = WaterIntakeRepository()
-    result = repo.delete("user123", "2025-12-02")
+    result = await repo.delete("user123", "2025-12-02")
 
     assert result is True
+
+
+@pytest.mark.anyio
+@patch("waterintakerepository.mongo_db")
+async def test_update_intake_and_get_missing(mock_mongo):
+    mock_collection = AsyncMock()
+    mock_mongo.get_collection.return_value = mock_collection
+
+    mock_collection.find_one_and_update.return_value = None
+
+    repo = WaterIntakeRepository()
+    result = await repo.update_intake_and_get("user123", "2025-12-02", 0)
+
+    assert result is None
+    assert mock_collection.find_one_and_update.call_args.args[1] == {"$set": {"currentIntake": 0}}
+
+
+@pytest.mark.anyio
+@patch("waterintakerepository.mongo_db")
+async def test_add_creates_day_in_one_upsert(mock_mongo):
+    mock_collection = AsyncMock()
+    mock_mongo.get_collection.return_value = mock_collection
+
+    # no pre-image: the upsert inserted the record
+    mock_collection.find_one_and_update.return_value = None
+
+    repo = WaterIntakeRepository()
+    record, created = await repo.add("user123", "2025-12-02", 300)
+
+    assert created is True
+    assert record["currentIntake"] == 300
+    assert record["goalIntake"] == 2000
+    query, update = mock_collection.find_one_and_update.call_args.args
+    kwargs = mock_collection.find_one_and_update.call_args.kwargs
+    assert query == {"userId": "user123", "date": "2025-12-02"}
+    assert update["$inc"] == {"currentIntake": 300}
+    assert update["$setOnInsert"]["goalIntake"] == 2000
+    assert str(update["$setOnInsert"]["_id"]) == record["_id"]
+    assert kwargs["upsert"] is True
+    mock_collection.find_one_and_update.assert_awaited_once()
+
+
+@pytest.mark.anyio
+@patch("waterintakerepository.mongo_db")
+async def test_add_existing_day(mock_mongo):
+    mock_collection = AsyncMock()
+    mock_mongo.get_collection.return_value = mock_collection
+
+    mock_collection.find_one_and_update.return_value = {
+        "_id": "123", "userId": "user123", "date": "2025-12-02", "goalIntake": 2500, "currentIntake": 500
+    }
+
+    repo = WaterIntakeRepository()
+    record, created = await repo.add("user123", "2025-12-02", 300)
+
+    assert created is False
+    assert record["currentIntake"] == 800
+    assert record["goalIntake"] == 2500
+
+
+@pytest.mark.anyio
+@patch("waterintakerepository.mongo_db")
+async def test_set_goal_keeps_intake(mock_mongo):
+    mock_collection = AsyncMock()
+    mock_mongo.get_collection.return_value = mock_collection
+
+    mock_collection.find_one_and_update.return_value = {"_id": "123", "goalIntake": 2000, "currentIntake": 750}
+
+    repo = WaterIntakeRepository()
+    record, created = await repo.set_goal("user123", "2025-12-02", 3000)
+
+    assert created is False
+    assert record == {"_id": "123", "goalIntake": 3000, "currentIntake": 750}
+    update = mock_collection.find_one_and_update.call_args.args[1]
+    assert update["$set"] == {"goalIntake": 3000}
+    assert update["$setOnInsert"]["currentIntake"] == 0
+
+
+@pytest.mark.anyio
+@patch("waterintakerepository.mongo_db")
+async def test_ensure_day_retries_lost_upsert_race(mock_mongo):
+    mock_collection = AsyncMock()
+    mock_mongo.get_collection.return_value = mock_collection
+
+    mock_collection.find_one_and_update.side_effect = [
+        DuplicateKeyError("E11000"),
+        {"_id": "123", "goalIntake": 2500, "currentIntake": 0},
+    ]
+
+    repo = WaterIntakeRepository()
+    record, created = await repo.ensure_day("user123", "2025-12-02", 2500)
+
+    assert created is False
+    assert record["_id"] == "123"
+    assert mock_collection.find_one_and_update.await_count == 2
@@ -0,0 +1,56 @@
+"""Bounded cache of verified JWTs.
+
+Every authenticated request re-sends the same bearer token, and a
+dashboard load fans out into a dozen of them. Verifying a token means an
+HMAC over the header and payload plus JSON decoding, so ``verify_token``
+remembers the claims of tokens it has already accepted.
+
+Entries are dropped at the token's ``exp`` so an expired token is never
+served from the cache; it falls through to ``jwt.decode``, which rejects
+it. Only successfully verified tokens are stored.
+"""
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+
+class TokenCache:
+    def __init__(self, maxsize: int = 1024, clock: Callable[[], float] = time.time):
+        self.maxsize = maxsize
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, token: str) -> Optional[dict]:
+        """Return the cached claims for ``token``, or None if absent or expired."""
+        entry = self._entries.get(token)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, claims = entry
+        if self.clock() >= expires_at:
+            del self._entries[token]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(token)
+        self.hits += 1
+        return claims
+
+    def put(self, token: str, claims: dict) -> None:
+        """Remember verified ``claims`` until the token's exp."""
+        expires_at = claims.get("exp")
+        if expires_at is None or self.maxsize <= 0:
+            # tokens without an expiry are not worth the risk of caching forever
+            return
+        self._entries[token] = (float(expires_at), claims)
+        self._entries.move_to_end(token)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.hits = self.misses = 0
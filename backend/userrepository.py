@@ -1,33 +1,90 @@
+import logging
+
 from bson.objectid import ObjectId
+from prometheus_client import Counter
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import PyMongoError
 from database import mongo_db
+from mongometrics import instrument_repository
+from passwords import passwords
+
+logger = logging.getLogger(__name__)
+
+# reads here are what refresh tokens and token claims save
+USERS_READS = Counter("app_users_reads", "Reads of the users collection, by repository method", ["method"])
 
+# the password hash never leaves the repository; only authenticate reads it
+USER_PROJECTION = {"password": 0}
+
+@instrument_repository
 class UserRepository:
+    indexes = [
+        IndexModel([("email", ASCENDING)], unique=True, name="email_unique"),
+    ]
+
     def __init__(self):
         self.collection = mongo_db.get_collection('users')
+        self.passwords = passwords
 
-    def find_all(self):
-        return [self.serialize_object_id(p) for p in self.collection.find()]
+    async def find_all(self):
+        """All users, with ObjectId _ids (MongoJSONResponse renders them)."""
+        USERS_READS.labels("find_all").inc()
+        return await self.collection.find({}, USER_PROJECTION).to_list(None)
 
-    def find_by_id(self, user_id):
-        userdata = self.collection.find_one({"_id": ObjectId(user_id)})
+    async def find_by_id(self, user_id):
+        USERS_READS.labels("find_by_id").inc()
+        userdata = await self.collection.find_one({"_id": ObjectId(user_id)}, USER_PROJECTION)
         return self.serialize_object_id(userdata) if userdata else None
 
-    def find_by_email(self, user_name):
-        user_in_db = self.collection.find_one({"email": user_name})
+    async def find_claims(self, user_id):
+        """The email and name that go into the user's access tokens, or None if the user is gone."""
+        USERS_READS.labels("find_claims").inc()
+        return await self.collection.find_one({"_id": ObjectId(user_id)}, {"_id": 0, "email": 1, "name": 1})
+
+    async def find_by_email(self, user_name):
+        USERS_READS.labels("find_by_email").inc()
+        user_in_db = await self.collection.find_one({"email": user_name}, USER_PROJECTION)
         return self.serialize_object_id(user_in_db) if user_in_db else None
 
-    def create(self, user_data):
-        result = self.collection.insert_one(user_data)
+    async def create(self, user_data):
+        """Insert a user; the password is stored as an argon2id hash."""
+        await self._hash_password(user_data)
+        result = await self.collection.insert_one(user_data)
         return str(result.inserted_id)
 
-    def update(self, user_id, data):
-        result = self.collection.update_one({"_id": ObjectId(user_id)}, {"$set": data})
+    async def update(self, user_id, data):
+        await self._hash_password(data)
+        result = await self.collection.update_one({"_id": ObjectId(user_id)}, {"$set": data})
         return result.modified_count > 0
 
-    def delete(self, user_id):
-        result = self.collection.delete_one({"_id": ObjectId(user_id)})
+    async def delete(self, user_id):
+        result = await self.collection.delete_one({"_id": ObjectId(user_id)})
         return result.deleted_count > 0
     
+    async def authenticate(self, email, password):
+        """The user with this email if ``password`` matches, else None.
+
+        Legacy plaintext passwords and hashes with outdated cost parameters
+        are replaced with a fresh hash on success. The returned user does
+        not carry the hash.
+        """
+        USERS_READS.labels("authenticate").inc()
+        user = self.serialize_object_id(await self.collection.find_one({"email": email}))
+        ok, new_hash = await self.passwords.verify(user.pop("password", None) if user else None, password)
+        if not ok:
+            return None
+        if new_hash:
+            try:
+                await self.collection.update_one({"_id": ObjectId(user["_id"])}, {"$set": {"password": new_hash}})
+            except PyMongoError as exc:
+                # the login is still valid; the upgrade is retried next time
+                logger.warning("Could not rehash password for user %s: %s", user["_id"], exc)
+        return user
+
+    async def _hash_password(self, data):
+        if data.get("password"):
+            data["password"] = await self.passwords.hash(data["password"])
+
     def serialize_object_id(self, document):
         if document and '_id' in document:
             document['_id'] = str(document['_id'])
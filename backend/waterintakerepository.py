@@ -1,47 +1,123 @@
 from bson.objectid import ObjectId
+from pymongo import ASCENDING, IndexModel, ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from database import mongo_db
+from mongometrics import instrument_repository
 
+DEFAULT_GOAL = 2000
+
+@instrument_repository
 class WaterIntakeRepository:
+    # also serves find_latest_goal: equality on userId, sort on date
+    indexes = [
+        IndexModel([("userId", ASCENDING), ("date", ASCENDING)], unique=True, name="userId_date_unique"),
+    ]
+
+    projection = {"userId": 1, "date": 1, "goalIntake": 1, "currentIntake": 1}
+
     def __init__(self):
         self.collection = mongo_db.get_collection('water_intake')
 
-    def find_by_user_and_date(self, user_id, date):
+    async def find_by_user_and_date(self, user_id, date):
         """Find water intake record for a specific user and date"""
-        data = self.collection.find_one({"userId": user_id, "date": date})
+        data = await self.collection.find_one({"userId": user_id, "date": date})
         return self.serialize_object_id(data) if data else None
 
-    def find_latest_goal(self, user_id):
+    async def find_latest_goal(self, user_id):
         """Find the most recent goal for a user (from any previous date)"""
-        data = self.collection.find_one(
+        data = await self.collection.find_one(
             {"userId": user_id},
             sort=[("date", -1)]  # Sort by date descending
         )
         return data.get('goalIntake') if data else None
 
-    def create(self, intake_data):
+    async def create(self, intake_data):
         """Create a new water intake record"""
-        result = self.collection.insert_one(intake_data)
+        result = await self.collection.insert_one(intake_data)
         return str(result.inserted_id)
 
-    def update_intake(self, user_id, date, current_intake):
+    async def update_intake(self, user_id, date, current_intake):
         """Update the current water intake for a user on a specific date"""
-        result = self.collection.update_one(
+        result = await self.collection.update_one(
             {"userId": user_id, "date": date}, 
             {"$set": {"currentIntake": current_intake}}
         )
         return result.modified_count > 0
 
-    def increment_intake(self, user_id, date, amount):
+    async def increment_intake(self, user_id, date, amount):
         """Increment water intake by a specific amount"""
-        result = self.collection.update_one(
+        result = await self.collection.update_one(
             {"userId": user_id, "date": date},
             {"$inc": {"currentIntake": amount}}
         )
         return result.modified_count > 0
 
-    def delete(self, user_id, date):
+    async def update_intake_and_get(self, user_id, date, current_intake):
+        """Set the current water intake and return the updated record, or None if missing"""
+        data = await self.collection.find_one_and_update(
+            {"userId": user_id, "date": date},
+            {"$set": {"currentIntake": current_intake}},
+            projection=self.projection,
+            return_document=ReturnDocument.AFTER
+        )
+        return self.serialize_object_id(data) if data else None
+
+    async def ensure_day(self, user_id, date, goal_intake=DEFAULT_GOAL):
+        """Return the day's record, creating it with 0 intake if missing.
+        Returns (record, created)"""
+        return await self._upsert(user_id, date, {}, {"goalIntake": goal_intake, "currentIntake": 0})
+
+    async def add(self, user_id, date, amount, default_goal=DEFAULT_GOAL):
+        """Add to the day's intake, creating the record if missing.
+        Returns (record, created)"""
+        return await self._upsert(
+            user_id, date, {"$inc": {"currentIntake": amount}}, {"goalIntake": default_goal}
+        )
+
+    async def set_goal(self, user_id, date, goal_intake):
+        """Set the day's goal, creating the record if missing.
+        Returns (record, created)"""
+        return await self._upsert(
+            user_id, date, {"$set": {"goalIntake": goal_intake}}, {"currentIntake": 0}
+        )
+
+    async def _upsert(self, user_id, date, update, on_insert):
+        """Apply ``update`` to the day's record in a single atomic upsert.
+
+        The pre-image is fetched (ReturnDocument.BEFORE) so the caller can tell
+        whether the record was created, and the post-image is derived from it:
+        $setOnInsert/$set/$inc are applied to exactly that document, so the
+        result matches what was stored without a second read.
+        """
+        new_id = ObjectId()
+        query = {"userId": user_id, "date": date}
+        full_update = {**update, "$setOnInsert": {"_id": new_id, **on_insert}}
+        try:
+            before = await self._find_one_and_upsert(query, full_update)
+        except DuplicateKeyError:
+            # two upserts raced on the unique (userId, date) index; the
+            # record exists now, so the retry is a plain update
+            before = await self._find_one_and_upsert(query, full_update)
+
+        created = before is None
+        record = {"_id": new_id, **query, **on_insert} if created else dict(before)
+        record.update(update.get("$set", {}))
+        for field, amount in update.get("$inc", {}).items():
+            record[field] = record.get(field, 0) + amount
+        return self.serialize_object_id(record), created
+
+    async def _find_one_and_upsert(self, query, update):
+        return await self.collection.find_one_and_update(
+            query,
+            update,
+            projection=self.projection,
+            upsert=True,
+            return_document=ReturnDocument.BEFORE
+        )
+
+    async def delete(self, user_id, date):
         """Delete water intake record for a specific date"""
-        result = self.collection.delete_one({"userId": user_id, "date": date})
+        result = await self.collection.delete_one({"userId": user_id, "date": date})
         return result.deleted_count > 0
     
     def serialize_object_id(self, document):
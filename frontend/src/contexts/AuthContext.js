@@ -34,6 +34,7 @@ export const AuthProvider = ({ children }) => {
           );
 
           sessionStorage.setItem('authToken', response.data.token);
+          sessionStorage.setItem('refreshToken', response.data.refresh_token);
           sessionStorage.setItem('userdata', JSON.stringify(response.data.user));
           const storedToken = sessionStorage.getItem('authToken');
           const storedUser = sessionStorage.getItem('userdata');
@@ -53,7 +54,13 @@ export const AuthProvider = ({ children }) => {
   };
 
   const logout = () => {
+    const refreshToken = sessionStorage.getItem('refreshToken');
+    if (refreshToken) {
+      // best effort; the session expires on its own if this fails
+      apiClient.post('/logout', { refresh_token: refreshToken }).catch(() => {});
+    }
     sessionStorage.removeItem('authToken');
+    sessionStorage.removeItem('refreshToken');
     sessionStorage.removeItem('userdata');
     setUser(null);
     alert("You have signed out.");
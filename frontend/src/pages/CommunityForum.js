@@ -3,23 +3,72 @@ import { useNavigate } from "react-router-dom";
 import "bootstrap/dist/css/bootstrap.min.css";
 import "./css/CommunityForum.css";
 import apiClient from "../service/Api";
+import subscribeForum from "../service/ForumStream";
+
+// how often to check for new posts while the stream only carries this server's activity
+const POLL_MS = 30000;
 
 export default function CommunityForum() {
   const navigate = useNavigate();
   const [posts, setPosts] = useState([]);
   const [title, setTitle] = useState("");
   const [content, setContent] = useState("");
+  const [nextCursor, setNextCursor] = useState(null);
 
   
   const uuss = sessionStorage.getItem("userdata") || "{}";
   const parsedData = JSON.parse(uuss);
   const userId = parsedData.name || "TestUser";
 
-  useEffect(() => {
+  const loadPosts = (after = null) => {
+    apiClient
+      .get(`/forum`, { params: after ? { after } : {} })
+      .then((res) => {
+        setPosts((prev) => (after ? [...prev, ...res.data.posts] : res.data.posts));
+        setNextCursor(res.data.next_cursor);
+      })
+      .catch((err) => console.error(err));
+  };
+
+  // the stream also delivers our own posts, so add each post only once
+  const addPost = (post) => setPosts((prev) => (prev.some((p) => p._id === post._id) ? prev : [post, ...prev]));
+
+  // merge a fresh first page: add posts we lack, update reply counts of those we have
+  const pollPosts = () => {
     apiClient
       .get(`/forum`)
-      .then((res) => setPosts(res.data))
+      .then((res) =>
+        setPosts((prev) => {
+          const fresh = new Map(res.data.posts.map((p) => [p._id, p]));
+          const known = new Set(prev.map((p) => p._id));
+          const added = res.data.posts.filter((p) => !known.has(p._id));
+          return [...added, ...prev.map((p) => (fresh.has(p._id) ? { ...p, reply_count: fresh.get(p._id).reply_count } : p))];
+        })
+      )
       .catch((err) => console.error(err));
+  };
+
+  useEffect(() => {
+    loadPosts();
+    let poller = null;
+    // new posts and reply counts arrive live instead of by reloading
+    const unsubscribe = subscribeForum((event, data) => {
+      if (event === "mode") {
+        // not live: other servers' activity only shows up by polling
+        clearInterval(poller);
+        poller = data.live ? null : setInterval(pollPosts, POLL_MS);
+      } else if (event === "post") {
+        addPost(data);
+      } else if (event === "reply_count") {
+        setPosts((prev) => prev.map((p) => (p._id === data.postId ? { ...p, reply_count: data.reply_count } : p)));
+      } else if (event === "reset") {
+        loadPosts();
+      }
+    });
+    return () => {
+      clearInterval(poller);
+      unsubscribe();
+    };
   }, []);
 
   const handleSubmit = async (e) => {
@@ -28,7 +77,7 @@ export default function CommunityForum() {
 
     try {
       const res = await apiClient.post(`/forum`, newPost);
-      setPosts([...posts, res.data]);
+      addPost(res.data);
       setTitle("");
       setContent("");
     } catch (err) {
@@ -76,11 +125,20 @@ export default function CommunityForum() {
                 onClick={() => navigate(`/forum/${post._id}`, { state: post })}
               >
                 <h5 className="mb-1">{post.title}</h5>
-                <small className="text-muted">Posted by {post.userId}</small>
+                <small className="text-muted">
+                  Posted by {post.userId} · {post.reply_count || 0} replies
+                </small>
                 <p className="mb-1">{post.content}</p>
               </button>
             ))}
           </div>
+          {nextCursor && (
+            <div className="text-center">
+              <button className="btn btn-outline-primary" onClick={() => loadPosts(nextCursor)}>
+                Load more
+              </button>
+            </div>
+          )}
         </div>
       </div>
     </div>
@@ -66,13 +66,41 @@ const dailyTaskList = getUserTasks(appUserData);
 
   useEffect(() => {
      if (!effectRan.current) {
-      loadTasks();
-      loadWaterIntake();
-      loadMood();
+      loadDashboard();
       effectRan.current = true;
      }
   }, []);
   
+  // LOAD THE WHOLE DAY (tasks, water, mood) IN ONE REQUEST
+
+  const loadDashboard = async () => {
+    try {
+      const res = await apiClient.get(`/dashboard`, {
+        params: { userId, date: today },
+      });
+
+      applyWaterIntake(res.data.waterIntake);
+      if (res.data.mood) {
+        setCurrentMood(res.data.mood.mood);
+      }
+
+      const existingTasks = res.data.tasks || [];
+      if (existingTasks.length === 0) {
+        await initializeDefaultTasks();
+      } else {
+        setTasks(existingTasks);
+      }
+    } catch (e) {
+      console.error("Error loading dashboard:", e);
+      setTasks(dailyTaskList.map((t, i) => ({ ...t, id: i, completed: false })));
+      setWaterIntake(0);
+      setWaterGoal(8);
+    } finally {
+      setLoading(false);
+      setWaterLoading(false);
+    }
+  };
+
   const loadTasks = async () => {
     try {
       const res = await apiClient.get(`/tasks`, {
@@ -110,47 +138,12 @@ const dailyTaskList = getUserTasks(appUserData);
   };
 
   
-  // LOAD WATER INTAKE
-
-  const loadWaterIntake = async () => {
-    try {
-      const res = await apiClient.get(`/waterintake`, {
-        params: { userId, date: today },
-      });
-
-      if (res.data.data) {
-        const glasses = Math.floor(res.data.data.currentIntake / 250);
-        setWaterIntake(glasses);
-        const goalGlasses = Math.floor(res.data.data.goalIntake / 250);
-        setWaterGoal(goalGlasses);
+  // WATER INTAKE
 
-        if (res.data.message && res.data.message.includes("New day")) {
-          console.log("🌅 New day started! Water intake reset to 0");
-        }
-      }
-    } catch (e) {
-      console.error("Error loading water intake:", e);
-      setWaterIntake(0);
-      setWaterGoal(8);
-    } finally {
-      setWaterLoading(false);
-    }
-  };
-
-  
-  // LOAD MOOD
- 
-  const loadMood = async () => {
-    try {
-      const res = await apiClient.get(`/mood`, {
-        params: { userId, date: today },
-      });
-      
-      if (res.data.data) {
-        setCurrentMood(res.data.data.mood);
-      }
-    } catch (e) {
-      console.error("Error loading mood:", e);
+  const applyWaterIntake = (intake) => {
+    if (intake) {
+      setWaterIntake(Math.floor(intake.currentIntake / 250));
+      setWaterGoal(Math.floor(intake.goalIntake / 250));
     }
   };
 
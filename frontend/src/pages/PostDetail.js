@@ -14,6 +14,7 @@ export default function PostDetail() {
   const [post, setPost] = useState(location.state || null);
   const [replies, setReplies] = useState([]);
   const [replyContent, setReplyContent] = useState("");
+  const [nextCursor, setNextCursor] = useState(null);
 
   const uuss = sessionStorage.getItem("userdata") || "{}";
   const parsedData = JSON.parse(uuss);
@@ -29,11 +30,18 @@ export default function PostDetail() {
     }
   }, [id, post]);
 
-  useEffect(() => {
+  const loadReplies = (after = null) => {
     apiClient
-      .get(`/forum/${id}/replies`)
-      .then((res) => setReplies(res.data))
+      .get(`/forum/${id}/replies`, { params: after ? { after } : {} })
+      .then((res) => {
+        setReplies((prev) => (after ? [...prev, ...res.data.replies] : res.data.replies));
+        setNextCursor(res.data.next_cursor);
+      })
       .catch((err) => console.error("Error fetching replies:", err));
+  };
+
+  useEffect(() => {
+    loadReplies();
   }, [id]);
 
   const handleReplySubmit = async (e) => {
@@ -82,6 +90,11 @@ export default function PostDetail() {
                   </small>
                 </div>
               ))}
+              {nextCursor && (
+                <button className="btn btn-link" onClick={() => loadReplies(nextCursor)}>
+                  Show more replies
+                </button>
+              )}
             </div>
           )}
 
@@ -18,10 +18,43 @@ apiClient.interceptors.request.use(
     }
 );
 
+const refreshAccessToken = async () => {
+    const refreshToken = sessionStorage.getItem('refreshToken');
+    if(!refreshToken){
+        throw new Error("No refresh token");
+    }
+    // plain axios, so a failed refresh does not come back through the interceptor
+    const response = await axios.post(
+        `${process.env.REACT_APP_API_URL}/token/refresh`,
+        {"refresh_token": refreshToken}
+    );
+    sessionStorage.setItem('authToken', response.data.token);
+    sessionStorage.setItem('refreshToken', response.data.refresh_token);
+};
+
+// concurrent 401s share one refresh; a rotated refresh token only works once,
+// and presenting it twice revokes the whole session. Every caller goes through here.
+let refreshing = null;
+
+export const refreshOnce = () => {
+    refreshing = refreshing || refreshAccessToken().finally(() => { refreshing = null; });
+    return refreshing;
+};
+
 apiClient.interceptors.response.use(
     (_) =>_,
     async (error)=>{
-        if(error.response.status=== 401){
+        const request = error.config;
+        if(error.response && error.response.status=== 401){
+            if(!request._retried && sessionStorage.getItem('refreshToken')){
+                request._retried = true;
+                try {
+                    await refreshOnce();
+                    return apiClient(request);
+                } catch (refreshError) {
+                    sessionStorage.removeItem('refreshToken');
+                }
+            }
             window.location.href="/"
         }
         return Promise.reject(error);
@@ -0,0 +1,73 @@
+import { refreshOnce } from "./Api";
+
+// Live forum activity from GET /forum/stream (Server-Sent Events).
+// Read with fetch rather than EventSource, which cannot send the
+// Authorization header. Reconnects on its own, passing Last-Event-ID so
+// the server replays what was missed.
+export default function subscribeForum(onEvent) {
+    const controller = new AbortController();
+    let lastEventId = null;
+    let retryMs = 3000;
+
+    const dispatch = (block) => {
+        let id = null;
+        let event = "message";
+        let data = "";
+        for (const line of block.split("\n")) {
+            if (!line || line.startsWith(":")) continue;
+            const sep = line.indexOf(":");
+            const field = sep === -1 ? line : line.slice(0, sep);
+            const value = sep === -1 ? "" : line.slice(sep + 1).replace(/^ /, "");
+            if (field === "id") id = value;
+            else if (field === "event") event = value;
+            else if (field === "data") data += (data ? "\n" : "") + value;
+            else if (field === "retry") retryMs = Number(value) || retryMs;
+        }
+        if (id !== null) lastEventId = id;
+        if (data) onEvent(event, JSON.parse(data));
+    };
+
+    const connect = async () => {
+        const headers = { Authorization: `Bearer ${sessionStorage.getItem("authToken")}` };
+        if (lastEventId) headers["Last-Event-ID"] = lastEventId;
+        const response = await fetch(`${process.env.REACT_APP_API_URL}/forum/stream`, {
+            headers,
+            signal: controller.signal,
+        });
+        if (response.status === 401) {
+            // expired access token; shares any refresh already in flight from apiClient,
+            // and stops for good if it cannot be renewed
+            await refreshOnce().catch(() => controller.abort());
+            return;
+        }
+        if (!response.ok) throw new Error(`Forum stream failed with ${response.status}`);
+
+        const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+        let buffer = "";
+        for (;;) {
+            const { value, done } = await reader.read();
+            if (done) return;
+            buffer += value;
+            let end;
+            while ((end = buffer.indexOf("\n\n")) !== -1) {
+                dispatch(buffer.slice(0, end));
+                buffer = buffer.slice(end + 2);
+            }
+        }
+    };
+
+    const run = async () => {
+        while (!controller.signal.aborted) {
+            try {
+                await connect();
+            } catch (err) {
+                if (controller.signal.aborted) return;
+                console.error(err);
+            }
+            await new Promise((resolve) => setTimeout(resolve, retryMs));
+        }
+    };
+
+    run();
+    return () => controller.abort();
+}